@@ -1,9 +1,9 @@
 from __future__ import annotations
 
-from typing import Any, Dict
+from typing import Any, Dict, Optional, Tuple
 
 from backend.graph.fraud_detector import calculate_risk_scores, detect_circular_chains, get_risk_summary
-from backend.graph.graph_builder import graph_store
+from backend.graph.graph_view import PAGE_SIZE, graph_view
 
 
 class FraudAgent:
@@ -14,9 +14,17 @@ class FraudAgent:
         flagged = [x for x in summary.get("top10", []) if float(x.get("risk_score", 0)) > 0.4]
         return {"chains_found": chains, "risk_summary": summary, "flagged_gstins": flagged}
 
-    async def get_graph_visualization_data(self) -> Dict[str, Any]:
-        data = await graph_store.export_pyvis_data()
-        # color coding hints for frontend
+    async def get_graph_visualization_data(
+        self,
+        level: Optional[int] = None,
+        cursor: Optional[str] = None,
+        limit: int = PAGE_SIZE,
+        community: Optional[int] = None,
+        bbox: Optional[Tuple[float, float, float, float]] = None,
+    ) -> Dict[str, Any]:
+        """One page of the level-of-detail graph export (see backend.graph.graph_view)."""
+        data = await graph_view.export(level=level, cursor=cursor, limit=limit, community=community, bbox=bbox)
+        # color coding hints for frontend (community nodes colored by their riskiest member)
         for n in data.get("nodes", []):
             r = float(n.get("risk_score", 0.0))
             n["color"] = "red" if r > 0.7 else "orange" if r > 0.4 else "green"
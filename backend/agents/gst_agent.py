@@ -9,10 +9,10 @@ from loguru import logger
 from sqlalchemy import text
 
 from backend.database.postgres_client import postgres_client
-from backend.graph.graph_builder import graph_store
+from backend.graph.bulk_writer import BulkGraphWriter
 from backend.models.invoice import Invoice
 from backend.pipelines.gstr1_builder import build_gstr1_entry, build_gstr1_return
-from backend.pipelines.invoice_parser import parse_invoice
+from backend.pipelines.invoice_parser import parse_invoice_async
 
 
 @dataclass
@@ -44,7 +44,7 @@ class GSTAgent:
             logger.warning("Postgres not ready; using in-memory invoice store. err={}", str(e))
 
     async def process_invoice(self, image_path: str) -> Dict[str, Any]:
-        invoice = parse_invoice(image_path)
+        invoice = await parse_invoice_async(image_path)
         gstr1_entry = build_gstr1_entry(invoice)
 
         warnings: List[str] = []
@@ -108,10 +108,12 @@ class GSTAgent:
     async def load_into_graph(self, invoice: Invoice) -> None:
         supplier = invoice.vendor_gstin or "27DEMOX0000X1Z9"
         buyer = invoice.buyer_gstin or "27AAACG1000A1Z5"
-        await graph_store.create_gstin_node(gstin=supplier, name=invoice.vendor_name or "Supplier", state=supplier[:2], type="REGULAR")
-        await graph_store.create_gstin_node(gstin=buyer, name="Buyer", state=buyer[:2], type="REGULAR")
-        await graph_store.create_invoice_node(invoice_id=invoice.invoice_number, date=invoice.invoice_date, value=invoice.total_value, tax=(invoice.cgst + invoice.sgst + invoice.igst))
-        await graph_store.link_supplier_buyer(supplier_gstin=supplier, buyer_gstin=buyer, invoice_id=invoice.invoice_number, itc_value=(invoice.cgst + invoice.sgst + invoice.igst))
+        tax = invoice.cgst + invoice.sgst + invoice.igst
+        async with BulkGraphWriter() as w:
+            await w.add_gstin(supplier, name=invoice.vendor_name or "Supplier", state=supplier[:2], type="REGULAR")
+            await w.add_gstin(buyer, name="Buyer", state=buyer[:2], type="REGULAR")
+            await w.add_invoice(invoice.invoice_number, date=invoice.invoice_date, value=invoice.total_value, tax=tax)
+            await w.link(supplier, buyer, invoice.invoice_number, itc_value=tax)
 
     def build_gstr1_return(self, user_gstin: str, period: str) -> Dict[str, Any]:
         invoices: List[Invoice] = []
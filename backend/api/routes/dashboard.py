@@ -8,13 +8,16 @@ from typing import Any, Dict
 
 from fastapi import APIRouter
 
+from backend.core.batch_reconciliation import batch_reconciler
 from backend.core.itc_recovery import ITCRecoveryPipeline
 from backend.core.nexus_scorer import NexusScorer
-from backend.core.reconciliation_engine import ReconciliationEngine
 from backend.graph.fraud_detector import detect_circular_chains
 
 router = APIRouter(prefix="/api/dashboard", tags=["dashboard"])
 
+KPI_GSTIN = "27AADCB2230M1ZT"
+KPI_PERIOD = "2024-01"
+
 
 @router.get("/kpis")
 async def get_dashboard_kpis() -> Dict[str, Any]:
@@ -36,13 +39,17 @@ async def get_dashboard_kpis() -> Dict[str, Any]:
     except Exception:
         pass
 
-    # Reconciliation mismatches
+    # One batch covers the KPI GSTIN and every recovery-pipeline vendor
+    pipeline = ITCRecoveryPipeline()
+    vendor_results = None
     try:
-        engine = ReconciliationEngine()
-        result = await engine.reconcile("27AADCB2230M1ZT", "2024-01")
-        kpis["invoices_processed"] = result.get("total_invoices_checked", 0)
-        kpis["mismatches_caught"] = len(result.get("mismatches", []))
-        kpis["tax_saved"] = result.get("total_itc_at_risk", 0)
+        pairs = [(KPI_GSTIN, KPI_PERIOD)] + [(g, KPI_PERIOD) for g, _ in pipeline.VENDORS]
+        batch = await batch_reconciler.run(pairs, include_mismatches=True, persist=False)
+        result, vendor_results = batch["results"][0], batch["results"][1:]
+        if result.get("status") == "COMPLETE":
+            kpis["invoices_processed"] = result.get("total_invoices_checked", 0)
+            kpis["mismatches_caught"] = result.get("mismatch_count", 0)
+            kpis["tax_saved"] = result.get("total_itc_at_risk", 0)
     except Exception:
         pass
 
@@ -59,8 +66,7 @@ async def get_dashboard_kpis() -> Dict[str, Any]:
 
     # ITC Recovery
     try:
-        pipeline = ITCRecoveryPipeline()
-        data = await pipeline.get_pipeline()
+        data = await pipeline.get_pipeline(period=KPI_PERIOD, results=vendor_results)
         kpis["itc_recovered"] = sum(c["amount"] for c in data.get("recovered", []))
         kpis["notices_generated"] = len(data.get("in_progress", [])) + len(data.get("recovered", []))
     except Exception:
@@ -1,16 +1,34 @@
 from fastapi import APIRouter, Query
 
 from backend.core.fraud_detector import FraudDetector
+from backend.graph.ring_clusters import ring_clusters
 
 router = APIRouter(prefix="/api/fraud", tags=["fraud"])
 
 
 @router.get("/rings")
-async def list_fraud_rings(min_confidence: float = Query(default=0.6), min_amount: float = Query(default=100000)):
+async def list_fraud_rings(
+    min_confidence: float = Query(default=0.6),
+    min_amount: float = Query(default=100000),
+    limit: int = Query(default=50, ge=1, le=1000),
+    offset: int = Query(default=0, ge=0),
+):
+    """Ring entities (overlapping cycles merged) from the latest clustering run, by fraud amount."""
     detector = FraudDetector()
-    rings = await detector.detect_circular_rings()
-    rings = [r for r in rings if r["confidence"] >= min_confidence and r["fraudAmount"] >= min_amount]
-    return {"rings": rings}
+    return await detector.detect_circular_rings(min_confidence=min_confidence, min_amount=min_amount,
+                                                limit=limit, offset=offset)
+
+
+@router.post("/rings/refresh")
+async def refresh_fraud_rings():
+    """Recompute communities and ring entities now and persist them."""
+    return await ring_clusters.refresh()
+
+
+@router.get("/communities")
+async def list_communities(limit: int = Query(default=50, ge=1, le=1000), offset: int = Query(default=0, ge=0)):
+    """ITC communities scored by cycle density and ITC volume, highest first."""
+    return await ring_clusters.communities(limit=limit, offset=offset)
 
 
 @router.get("/shell-companies")
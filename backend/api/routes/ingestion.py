@@ -14,6 +14,9 @@ from typing import Any, Dict, List, Optional
 from fastapi import APIRouter, File, UploadFile, HTTPException
 from pydantic import BaseModel
 
+from backend.core.incremental_reconciliation import incremental_reconciler
+from backend.graph.bulk_writer import GRAPH_BATCH_SIZE, load_b2b
+from backend.services.gstn_client import GSTNClient
 from backend.services.mock_gstn import MockGSTNClient
 
 router = APIRouter(prefix="/api/ingest", tags=["ingestion"])
@@ -134,6 +137,67 @@ async def ingest_gstr2b(
     )
 
 
+class DeltaIngestRequest(BaseModel):
+    gstin: str = "29AAACN0001A1Z5"
+    period: str = "2024-01"
+    # New or amended invoices in GSTN b2b "inv" shape (inum, idt, val, txval, camt/samt/iamt, supplier_gstin)
+    gstr1: List[Dict[str, Any]] = []
+    gstr2b: List[Dict[str, Any]] = []
+    deleted_gstr1: List[str] = []
+    deleted_gstr2b: List[str] = []
+
+
+@router.post("/delta")
+async def ingest_delta(req: DeltaIngestRequest) -> Dict[str, Any]:
+    """
+    Ingest only new / amended / deleted invoices and patch the stored
+    reconciliation for (gstin, period) by re-classifying just those IDs.
+    """
+    missing = [i for i, inv in enumerate(req.gstr1 + req.gstr2b) if not inv.get("inum")]
+    if missing:
+        raise HTTPException(status_code=400, detail=f"Invoices at positions {missing[:10]} have no 'inum'")
+
+    result = await incremental_reconciler.apply_delta(
+        req.gstin, req.period,
+        gstr1=req.gstr1, gstr2b=req.gstr2b,
+        deleted_gstr1=req.deleted_gstr1, deleted_gstr2b=req.deleted_gstr2b,
+    )
+
+    now = datetime.utcnow().isoformat() + "Z"
+    for source, label, invoices in (("gstr1", "GSTR-1", req.gstr1), ("gstr2b", "GSTR-2B", req.gstr2b)):
+        _ingested[source].extend({
+            "source": label,
+            "gstin": req.gstin,
+            "period": req.period,
+            "invoice_id": inv["inum"],
+            "supplier_gstin": inv.get("supplier_gstin", ""),
+            "amount": inv.get("val", inv.get("txval", 0)),
+            "tax_amount": sum(float(inv.get(k, 0)) for k in ("camt", "samt", "iamt")),
+            "date": inv.get("idt", ""),
+            "status": "AMENDED",
+            "ingested_at": now,
+        } for inv in invoices)
+
+    return result
+
+
+@router.post("/graph")
+async def ingest_graph(
+    gstin: str = "29AAACN0001A1Z5",
+    period: str = "2024-01",
+    batch_size: int = GRAPH_BATCH_SIZE,
+) -> Dict[str, Any]:
+    """
+    Load a buyer's GSTR-2B into the ITC graph with batched writes
+    (suppliers, invoices, ISSUED / RECEIVED_BY / CLAIMED_ITC_FROM edges).
+    """
+    if batch_size < 1:
+        raise HTTPException(status_code=400, detail="batch_size must be >= 1")
+    data = await GSTNClient().get_gstr2b(gstin, period)
+    stats = await load_b2b(gstin, data.get("b2b", []), batch_size=batch_size)
+    return {"gstin": gstin, "period": period, **stats}
+
+
 @router.post("/purchase-register")
 async def ingest_purchase_register(
     file: UploadFile = File(None),
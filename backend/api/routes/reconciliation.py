@@ -1,43 +1,143 @@
-from fastapi import APIRouter
+import asyncio
+import json
+import uuid
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Optional
 
+from backend.core.batch_reconciliation import batch_reconciler
 from backend.core.reconciliation_engine import ReconciliationEngine
+from backend.database.recon_store import recon_store
 from backend.services.ws_manager import manager
 
 router = APIRouter(prefix="/api/reconcile", tags=["reconciliation"])
 
+# Streamed mismatches are written to the result store in batches of this size
+STORE_BATCH = 1000
+
 
 class ReconcileRequest(BaseModel):
     gstin: str
     period: str
+    # stream=True returns NDJSON: summary line, one line per mismatch, complete line
+    stream: bool = False
+    # Audit text per mismatch; defaults to on for the buffered response, off for streams
+    include_audit: Optional[bool] = None
 
 
-@router.post("/run")
-async def run_reconciliation(req: ReconcileRequest):
-    engine = ReconciliationEngine()
-    result = await engine.reconcile_gstin(gstin=req.gstin, period=req.period)
+class BatchPair(BaseModel):
+    gstin: str
+    period: str = "2024-01"
+
 
+class BatchReconcileRequest(BaseModel):
+    pairs: List[BatchPair]
+    # Per-pair mismatch lists are large; by default only summaries + jobId (page via /mismatches)
+    include_mismatches: bool = False
+    include_audit: bool = False
+    # GSTIN channel that receives BATCH_PROGRESS / BATCH_COMPLETE events
+    notify_gstin: Optional[str] = None
+    max_concurrency: Optional[int] = None
+    # background=True returns the batchId at once; poll /batch/{batch_id}
+    background: bool = False
+
+
+async def _broadcast_complete(gstin: str, job_id: str, total: int, mismatches: int) -> None:
     try:
         await manager.broadcast(
-            req.gstin,
+            gstin,
             {
                 "type": "RECON_COMPLETE",
-                "payload": {
-                    "jobId": result.get("jobId", ""),
-                    "matched": result.get("total_invoices_checked", 0) - len(result.get("mismatches", [])),
-                    "mismatches": len(result.get("mismatches", [])),
-                },
+                "payload": {"jobId": job_id, "matched": total - mismatches, "mismatches": mismatches},
             },
         )
     except Exception:
         pass
+
+
+async def _ndjson(engine: ReconciliationEngine, req: ReconcileRequest, job_id: str) -> AsyncIterator[str]:
+    summary: Dict[str, Any] = {}
+    batch: List[Dict[str, Any]] = []
+    done = False
+    try:
+        async for event in engine.reconcile_stream(req.gstin, req.period,
+                                                   include_audit=bool(req.include_audit), job_id=job_id):
+            if event["type"] == "summary":
+                summary = event
+            elif event["type"] == "mismatch":
+                batch.append({k: v for k, v in event.items() if k not in {"type", "audit_trail"}})
+                if len(batch) >= STORE_BATCH:
+                    await asyncio.to_thread(recon_store.add_mismatches, job_id, batch)
+                    batch = []
+            yield json.dumps(event, ensure_ascii=False) + "\n"
+        await asyncio.to_thread(recon_store.add_mismatches, job_id, batch)
+        await asyncio.to_thread(recon_store.complete, job_id, summary)
+        done = True
+    except Exception as e:
+        recon_store.fail(job_id, str(e))
+        done = True
+        raise
+    finally:
+        # client disconnect (CancelledError / GeneratorExit) must not leave the job RUNNING
+        if not done:
+            recon_store.fail(job_id, "stream cancelled")
+    await _broadcast_complete(req.gstin, job_id,
+                              summary.get("total_invoices_checked", 0), summary.get("mismatch_count", 0))
+
+
+@router.post("/run")
+async def run_reconciliation(req: ReconcileRequest):
+    engine = ReconciliationEngine()
+    job_id = str(uuid.uuid4())
+    recon_store.begin(job_id, req.gstin, req.period)
+    if req.stream:
+        return StreamingResponse(_ndjson(engine, req, job_id), media_type="application/x-ndjson")
+
+    include_audit = True if req.include_audit is None else req.include_audit
+    try:
+        result = await engine.reconcile(gstin=req.gstin, period=req.period,
+                                        include_audit=include_audit, job_id=job_id)
+    except Exception as e:
+        recon_store.fail(job_id, str(e))
+        raise
+    recon_store.add_mismatches(job_id, result["mismatches"])
+    recon_store.complete(job_id, result)
+    await _broadcast_complete(req.gstin, job_id,
+                              result.get("total_invoices_checked", 0), len(result.get("mismatches", [])))
     return result
 
 
+@router.post("/batch")
+async def run_batch_reconciliation(req: BatchReconcileRequest):
+    if not req.pairs:
+        raise HTTPException(status_code=400, detail="pairs must not be empty")
+    pairs = [(p.gstin, p.period) for p in req.pairs]
+    kwargs = dict(
+        include_mismatches=req.include_mismatches, include_audit=req.include_audit,
+        notify_gstin=req.notify_gstin, max_concurrency=req.max_concurrency,
+    )
+    if req.background:
+        batch_id = batch_reconciler.start(pairs, **kwargs)
+        return batch_reconciler.get_batch(batch_id)
+    return await batch_reconciler.run(pairs, **kwargs)
+
+
+@router.get("/batch/{batch_id}")
+async def get_batch_status(batch_id: str):
+    batch = batch_reconciler.get_batch(batch_id)
+    if batch is None:
+        raise HTTPException(status_code=404, detail=f"Unknown batch: {batch_id}")
+    return batch
+
+
 @router.get("/status/{job_id}")
 async def get_reconciliation_status(job_id: str):
-    return {"jobId": job_id, "status": "COMPLETE", "progress": 1.0}
+    job = recon_store.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+    return job
 
 
 @router.get("/mismatches/{gstin}")
@@ -49,23 +149,21 @@ async def get_mismatches(
     sort_by: str = "severity",
     page: int = 1,
     limit: int = 50,
+    job_id: str | None = None,
 ):
-    engine = ReconciliationEngine()
-    mismatches = await engine.list_mismatches(gstin=gstin, period=period)
-
-    if status:
-        mismatches = [m for m in mismatches if m.mismatchType == status]
-    if risk_level:
-        mismatches = [m for m in mismatches if m.riskLevel == risk_level]
-
-    if sort_by == "amount":
-        mismatches.sort(key=lambda m: m.amount, reverse=True)
-    else:
-        mismatches.sort(key=lambda m: m.severity, reverse=True)
-
-    start = (page - 1) * limit
-    end = start + limit
-    return {"gstin": gstin, "period": period, "items": [m.model_dump() for m in mismatches[start:end]], "total": len(mismatches)}
+    """Page through stored results; reconciles once if (gstin, period) has never been run."""
+    if job_id is None:
+        job_id = recon_store.latest_job_id(gstin, period)
+    if job_id is None:
+        engine = ReconciliationEngine()
+        result = await engine.reconcile(gstin=gstin, period=period, include_audit=False)
+        recon_store.save_result(result)
+        job_id = result["jobId"]
+
+    items, total = recon_store.query_mismatches(
+        job_id, mismatch_type=status, risk_level=risk_level, sort_by=sort_by, page=page, limit=limit,
+    )
+    return {"gstin": gstin, "period": period, "jobId": job_id, "items": items, "total": total}
 
 
 @router.get("/audit-trail/{invoice_id}")
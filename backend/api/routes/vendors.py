@@ -4,7 +4,9 @@ from typing import DefaultDict
 
 from fastapi import APIRouter, Header, HTTPException, Query
 
+from backend.core.bulk_scorer import BulkNexusScorer
 from backend.core.nexus_scorer import NexusScorer
+from backend.database.score_store import score_store
 
 router = APIRouter(prefix="/api/vendors", tags=["vendors"])
 
@@ -32,12 +34,24 @@ async def get_vendor_score(gstin: str):
 
 
 @router.get("/list")
-async def list_vendors(risk_level: str | None = None, sort_by: str = "nexusScore", order: str = "desc"):
-    scorer = NexusScorer()
-    items = await scorer.get_all_vendor_scores(risk_level=risk_level)
-    reverse = order.lower() == "desc"
-    items.sort(key=lambda x: x.get(sort_by, x.get("nexusScore", 0)), reverse=reverse)
-    return {"vendors": items}
+async def list_vendors(
+    risk_level: str | None = None,
+    sort_by: str = "nexusScore",
+    order: str = "desc",
+    page: int = Query(default=1, ge=1),
+    limit: int = Query(default=50, ge=1, le=500),
+):
+    """Page through the stored score table; seeds it with one bulk run if empty."""
+    if score_store.count() == 0:
+        await BulkNexusScorer().score_and_store()
+    items, total = score_store.query(risk_level=risk_level, sort_by=sort_by, order=order, page=page, limit=limit)
+    return {"vendors": items, "total": total, "page": page, "limit": limit}
+
+
+@router.post("/rescore")
+async def rescore_vendors():
+    """Run the bulk scoring pass now (normally the nightly score_vendors task)."""
+    return await BulkNexusScorer().score_and_store()
 
 
 @router.get("/{gstin}/history")
@@ -51,7 +65,11 @@ async def get_vendor_history(gstin: str, months: int = Query(default=6, le=12)):
 async def predict_vendor_risk(gstin: str, months_ahead: int = Query(default=3, le=6)):
     """Predictive vendor compliance risk model using historical patterns."""
     scorer = NexusScorer()
-    current = await scorer.calculate_score(gstin=gstin)
+    # Stored score + snapshot series; GSTN is only hit the first time a GSTIN is seen
+    current = score_store.get(gstin)
+    if current is None:
+        await BulkNexusScorer(scorer).score_and_store([gstin])
+        current = score_store.get(gstin)
     history = await scorer.get_vendor_history(gstin=gstin, months=6)
 
     # Compute trend slope from history
@@ -0,0 +1,212 @@
+"""
+TaxIQ — Batch Reconciliation
+Reconciles many (gstin, period) pairs at once for month-end runs:
+  - GSTN fetches run concurrently, bounded by an asyncio.Semaphore
+  - CPU-bound classification runs in a shared process pool
+  - each finished pair is persisted to the result store and reported as a
+    BATCH_PROGRESS event over ws_manager
+Falls back to in-process classification when a process pool is unavailable.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from loguru import logger
+
+from backend.core.reconciliation_engine import ReconciliationEngine
+from backend.database.recon_store import recon_store
+from backend.services.ws_manager import manager
+
+
+# ── Process-pool worker ─────────────────────────────────
+
+_worker_engine: Optional[ReconciliationEngine] = None
+
+
+def _classify_job(gstin: str, period: str, gstr1_invoices: List[Dict[str, Any]],
+                  gstr2b_invoices: List[Dict[str, Any]], include_audit: bool,
+                  job_id: str, started: datetime, match_stats: Dict[str, int]) -> Dict[str, Any]:
+    """Runs in a worker process; returns the same dict as ReconciliationEngine.reconcile()."""
+    global _worker_engine
+    if _worker_engine is None:
+        _worker_engine = ReconciliationEngine()
+    mismatches, matched, total = _worker_engine._classify(gstin, period, gstr1_invoices, gstr2b_invoices)
+    return _worker_engine._build_result(gstin, period, mismatches, matched, total,
+                                        include_audit=include_audit, job_id=job_id, started=started,
+                                        match_stats=match_stats)
+
+
+_pool: Optional[Executor] = None
+_pool_failed = False
+
+
+def _get_pool() -> Optional[Executor]:
+    global _pool, _pool_failed
+    if _pool is None and not _pool_failed:
+        try:
+            _pool = ProcessPoolExecutor(max_workers=BatchReconciler.PROCESSES)
+        except Exception as e:
+            logger.warning("Process pool unavailable; batch classification runs in-process. err={}", str(e))
+            _pool_failed = True
+    return _pool
+
+
+# ── Batch runner ────────────────────────────────────────
+
+class BatchReconciler:
+    """
+    run() reconciles every pair and returns per-pair summaries in input order.
+    start() does the same in a background task and returns the batchId at
+    once; poll get_batch() or listen for BATCH_PROGRESS / BATCH_COMPLETE.
+    """
+
+    # Concurrent GSTN fetches per batch
+    MAX_CONCURRENCY = 16
+    PROCESSES = max(1, (os.cpu_count() or 2) - 1)
+    # Periods smaller than this are classified in-process; pickling them costs more than it saves
+    PROCESS_MIN_INVOICES = 2_000
+    MAX_BATCHES = 50
+
+    def __init__(self, engine: Optional[ReconciliationEngine] = None) -> None:
+        self._engine = engine
+        self._batches: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    @property
+    def engine(self) -> ReconciliationEngine:
+        if self._engine is None:
+            self._engine = ReconciliationEngine()
+        return self._engine
+
+    # ── Public API ──────────────────────────────────────
+
+    async def run(
+        self,
+        pairs: Iterable[Tuple[str, str]],
+        include_mismatches: bool = False,
+        include_audit: bool = False,
+        notify_gstin: Optional[str] = None,
+        max_concurrency: Optional[int] = None,
+        batch_id: Optional[str] = None,
+        persist: bool = True,
+    ) -> Dict[str, Any]:
+        pairs = list(pairs)
+        batch = self._register(batch_id or str(uuid.uuid4()), len(pairs))
+        sem = asyncio.Semaphore(max_concurrency or self.MAX_CONCURRENCY)
+        results: List[Optional[Dict[str, Any]]] = [None] * len(pairs)
+
+        async def one(i: int, gstin: str, period: str) -> None:
+            job_id = str(uuid.uuid4())
+            try:
+                async with sem:
+                    result = await self._reconcile_one(gstin, period, include_audit, job_id)
+                if persist:
+                    await asyncio.to_thread(recon_store.save_result, result)
+                entry = self._entry(result, include_mismatches)
+            except Exception as e:
+                logger.warning("Batch reconcile failed gstin={} period={} err={}", gstin, period, str(e))
+                entry = {"gstin": gstin, "period": period, "jobId": job_id, "status": "FAILED", "error": str(e)}
+            results[i] = entry
+            batch["done"] += 1
+            batch["failed"] += entry["status"] == "FAILED"
+            await self._progress(batch, entry, notify_gstin)
+
+        await asyncio.gather(*(one(i, g, p) for i, (g, p) in enumerate(pairs)))
+
+        batch["status"] = "COMPLETE"
+        batch["completedAt"] = datetime.utcnow().isoformat() + "Z"
+        batch["results"] = results
+        await self._broadcast(notify_gstin, {"type": "BATCH_COMPLETE", "payload": self._status(batch)})
+        return batch
+
+    def start(self, pairs: Iterable[Tuple[str, str]], **kwargs: Any) -> str:
+        """Run in the background; returns the batchId immediately."""
+        batch_id = str(uuid.uuid4())
+        pairs = list(pairs)
+        self._register(batch_id, len(pairs))
+        task = asyncio.create_task(self.run(pairs, batch_id=batch_id, **kwargs))
+        self._tasks[batch_id] = task
+        task.add_done_callback(lambda _t: self._tasks.pop(batch_id, None))
+        return batch_id
+
+    def get_batch(self, batch_id: str) -> Optional[Dict[str, Any]]:
+        return self._batches.get(batch_id)
+
+    # ── Internal helpers ────────────────────────────────
+
+    async def _reconcile_one(self, gstin: str, period: str, include_audit: bool,
+                             job_id: str) -> Dict[str, Any]:
+        started = datetime.utcnow()
+        gstr1_invoices, gstr2b_invoices, match_stats = await self.engine._prepare_returns(gstin, period)
+        pool = None
+        if len(gstr1_invoices) + len(gstr2b_invoices) >= self.PROCESS_MIN_INVOICES:
+            pool = _get_pool()
+        if pool is None:
+            mismatches, matched, total = self.engine._classify(gstin, period, gstr1_invoices, gstr2b_invoices)
+            return self.engine._build_result(gstin, period, mismatches, matched, total,
+                                             include_audit=include_audit, job_id=job_id, started=started,
+                                             match_stats=match_stats)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            pool, _classify_job, gstin, period, gstr1_invoices, gstr2b_invoices,
+            include_audit, job_id, started, match_stats,
+        )
+
+    def _register(self, batch_id: str, total: int) -> Dict[str, Any]:
+        if batch_id not in self._batches:
+            self._batches[batch_id] = {
+                "batchId": batch_id, "status": "RUNNING", "total": total, "done": 0, "failed": 0,
+                "startedAt": datetime.utcnow().isoformat() + "Z", "completedAt": None, "results": [],
+            }
+            while len(self._batches) > self.MAX_BATCHES:
+                self._batches.popitem(last=False)
+        return self._batches[batch_id]
+
+    @staticmethod
+    def _entry(result: Dict[str, Any], include_mismatches: bool) -> Dict[str, Any]:
+        entry = {k: v for k, v in result.items() if k not in {"mismatches", "audit_trail"}}
+        entry["status"] = "COMPLETE"
+        entry["mismatch_count"] = len(result.get("mismatches", []))
+        if include_mismatches:
+            entry["mismatches"] = result.get("mismatches", [])
+            entry["audit_trail"] = result.get("audit_trail", [])
+        return entry
+
+    @staticmethod
+    def _status(batch: Dict[str, Any]) -> Dict[str, Any]:
+        return {k: v for k, v in batch.items() if k != "results"}
+
+    async def _progress(self, batch: Dict[str, Any], entry: Dict[str, Any], notify_gstin: Optional[str]) -> None:
+        payload = {
+            **self._status(batch),
+            "gstin": entry["gstin"], "period": entry["period"],
+            "jobId": entry["jobId"], "pairStatus": entry["status"],
+        }
+        await self._broadcast(notify_gstin, {"type": "BATCH_PROGRESS", "payload": payload})
+        if entry["status"] == "COMPLETE":
+            await self._broadcast(entry["gstin"], {
+                "type": "RECON_COMPLETE",
+                "payload": {
+                    "jobId": entry["jobId"],
+                    "matched": entry.get("total_invoices_checked", 0) - entry["mismatch_count"],
+                    "mismatches": entry["mismatch_count"],
+                },
+            })
+
+    @staticmethod
+    async def _broadcast(gstin: Optional[str], message: Dict[str, Any]) -> None:
+        if not gstin:
+            return
+        try:
+            await manager.broadcast(gstin, message)
+        except Exception:
+            pass
+
+
+batch_reconciler = BatchReconciler()
@@ -0,0 +1,257 @@
+"""
+TaxIQ — Bulk NEXUS Scoring
+Scores a whole vendor population in one vectorized pass:
+  1. gather factor inputs (filing status, GSTR-2B reflectance, graph risk,
+     GSTIN hashes) for every vendor, with bounded fetch concurrency
+  2. compute the five factors, weighted NEXUS score, grade, trend and loan
+     fields as NumPy arrays
+  3. emit the same record shape as NexusScorer.calculate_score()
+score_and_store() writes the results to the vendor score table that
+/api/vendors/list pages through, and the current month's snapshot to the
+score history series (plus, for months a vendor has no snapshot yet, ones
+seeded from the filing history already fetched, so history reads never
+call GSTN).
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from loguru import logger
+
+from backend.core.nexus_scorer import NexusScorer, gstin_hashes, risk_bucket
+
+# _grade() thresholds, ascending, and the grade for each band
+_GRADE_EDGES = np.array([30, 40, 50, 60, 70, 75, 80, 85, 90])
+_GRADES = np.array(["D", "CCC", "B", "BB", "BBB", "A", "A+", "AA", "AA+", "AAA"])
+
+
+def vendor_master_list() -> List[str]:
+    """
+    GSTINs to score nightly: VENDOR_MASTER_PATH (one GSTIN per line, first CSV
+    column) when set, plus the known demo vendors and every graph node.
+    """
+    gstins: Dict[str, None] = dict.fromkeys(NexusScorer.ALL_VENDOR_GSTINS)
+    path = os.getenv("VENDOR_MASTER_PATH", "")
+    if path and Path(path).exists():
+        for line in Path(path).read_text(encoding="utf-8").splitlines():
+            gstin = line.split(",")[0].strip().upper()
+            if len(gstin) == 15:
+                gstins[gstin] = None
+    try:
+        from backend.graph.graph_builder import graph_store
+        for node in graph_store.graph.names():
+            if len(node) == 15:
+                gstins[node] = None
+    except Exception:
+        pass
+    return list(gstins)
+
+
+class BulkNexusScorer:
+    """Vectorized counterpart of NexusScorer.calculate_score() for many GSTINs."""
+
+    # Concurrent vendor input fetches
+    CONCURRENCY = 64
+    PERIOD = "2024-01"
+
+    def __init__(self, scorer: Optional[NexusScorer] = None) -> None:
+        self.scorer = scorer or NexusScorer()
+
+    # ── Public API ──────────────────────────────────────
+
+    async def score(self, gstins: Sequence[str]) -> List[Dict[str, Any]]:
+        """Score every GSTIN; output order follows the input."""
+        gstins = list(dict.fromkeys(gstins))
+        if not gstins:
+            return []
+        inputs = await self._gather_inputs(gstins)
+        return self._score_arrays(gstins, inputs)
+
+    async def score_and_store(self, gstins: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+        """
+        Score the population (default: vendor_master_list()), upsert the score
+        table and append this month's snapshot for every vendor.
+        """
+        from backend.database.score_store import score_store
+        from backend.database.snapshot_store import snapshot_store
+
+        run_id = str(uuid.uuid4())
+        started = datetime.utcnow()
+        population = list(dict.fromkeys(gstins if gstins is not None else vendor_master_list()))
+        inputs = await self._gather_inputs(population) if population else {}
+        records = self._score_arrays(population, inputs) if population else []
+        await asyncio.to_thread(score_store.upsert_many, records, run_id)
+        month = started.strftime("%Y-%m")
+        filed = inputs["filed_now"].tolist() if population else []
+        if population:
+            stored = await asyncio.to_thread(snapshot_store.months, population)
+            backfill = self._backfill(records, inputs["months"], stored, month)
+            if backfill:
+                await asyncio.to_thread(snapshot_store.append, backfill)
+        await asyncio.to_thread(snapshot_store.append, (
+            {
+                "gstin": r["gstin"], "month": month, "score": r["nexusScore"], "grade": r["nexusGrade"],
+                "filed": f, "factors": r["factors"], "source": "nightly",
+            }
+            for r, f in zip(records, filed)
+        ))
+        elapsed = (datetime.utcnow() - started).total_seconds()
+        logger.info("Bulk NEXUS scoring stored {} vendors in {:.1f}s (run {})", len(records), elapsed, run_id)
+        return {"runId": run_id, "vendors_scored": len(records), "elapsed_s": round(elapsed, 2)}
+
+    # ── Input gathering ─────────────────────────────────
+
+    async def _gather_inputs(self, gstins: List[str]) -> Dict[str, np.ndarray]:
+        n = len(gstins)
+        filing_rate = np.empty(n)
+        reflected = np.zeros(n)
+        missing = np.zeros(n)
+        recent = np.zeros(n, dtype=np.int64)
+        older = np.zeros(n, dtype=np.int64)
+        filed_now = np.zeros(n, dtype=bool)
+        history = np.empty(n, dtype=object)
+        sem = asyncio.Semaphore(self.CONCURRENCY)
+        client = self.scorer.client
+
+        async def one(i: int, gstin: str) -> None:
+            async with sem:
+                filing, gstr2b = await asyncio.gather(
+                    client.get_filing_status(gstin), client.get_gstr2b(gstin, self.PERIOD),
+                )
+            filing_rate[i] = filing.get("filing_rate", 50)
+            months = filing.get("months", [])
+            history[i] = months
+            filed_now[i] = bool(months and months[0].get("gstr1_filed"))
+            recent[i] = sum(1 for m in months[:3] if m.get("gstr1_filed"))
+            older[i] = sum(1 for m in months[3:6] if m.get("gstr1_filed"))
+            reflected[i] = gstr2b.get("total_reflected", 0)
+            missing[i] = gstr2b.get("total_missing", 0)
+
+        await asyncio.gather(*(one(i, g) for i, g in enumerate(gstins)))
+
+        hashes = np.array([gstin_hashes(g) for g in gstins], dtype=np.int64).reshape(n, 2)
+        return {
+            "filing_rate": filing_rate, "reflected": reflected, "missing": missing,
+            "recent": recent, "older": older, "filed_now": filed_now, "months": history,
+            "h1": hashes[:, 0], "h2": hashes[:, 1],
+            "graph_risk": self._graph_risk(gstins),
+        }
+
+    @staticmethod
+    def _backfill(records: List[Dict[str, Any]], histories: np.ndarray, stored: Dict[str, set],
+                  month: str) -> List[Dict[str, Any]]:
+        """
+        Snapshots for filing-history months a vendor has none for (current
+        score, -2 per month back, +3/-5 for filed/unfiled); stored months and
+        the month being scored are left alone.
+        """
+        rows: List[Dict[str, Any]] = []
+        for r, months in zip(records, histories):
+            have = stored.get(r["gstin"], set())
+            base_score = r["nexusScore"]
+            for i, m in enumerate(months):
+                period = m.get("period", f"Month-{i}")
+                if period in have or period == month:
+                    continue
+                filed = m.get("gstr1_filed", False)
+                adjustment = 3 if filed else -5
+                score_at_month = max(5, min(99, base_score - (i * 2) + (adjustment if i > 0 else 0)))
+                rows.append({
+                    "gstin": r["gstin"], "month": period, "score": score_at_month,
+                    "grade": str(_GRADES[np.searchsorted(_GRADE_EDGES, score_at_month, side="right")]),
+                    "filed": filed, "factors": r["factors"] if i == 0 else None, "source": "backfill",
+                })
+        return rows
+
+    @staticmethod
+    def _graph_risk(gstins: List[str]) -> np.ndarray:
+        """risk_score per GSTIN from the transaction graph; NaN when the GSTIN is not a node."""
+        risk = np.full(len(gstins), np.nan)
+        try:
+            from backend.graph.graph_builder import graph_store
+            g = graph_store.graph
+            ids = g.ids(gstins)
+            known = ids >= 0
+            # a node without a risk_score of its own counts as 0.5
+            risk[known] = np.nan_to_num(g.risk_score[ids[known]], nan=0.5)
+        except Exception:
+            pass
+        return risk
+
+    # ── Vectorized scoring ──────────────────────────────
+
+    def _score_arrays(self, gstins: List[str], x: Dict[str, np.ndarray]) -> List[Dict[str, Any]]:
+        w = NexusScorer.WEIGHTS
+        fr = x["filing_rate"]
+        total = x["reflected"] + x["missing"]
+        reflectance = np.round(x["reflected"] / np.maximum(total, 1) * 100, 0)
+
+        filing_regularity = np.minimum(100, np.trunc(fr * 1.1))
+        itc_accuracy = np.minimum(100, np.trunc(reflectance * 1.05))
+        turnover = np.clip(50 + x["h1"] % 45, 20, 95).astype(float)
+        network = np.where(
+            np.isnan(x["graph_risk"]),
+            np.clip(45 + x["h1"] % 50, 20, 90),
+            np.clip(np.trunc((1 - np.nan_to_num(x["graph_risk"])) * 100), 10, 95),
+        )
+        amendment = np.clip(np.trunc(fr * 0.9 + x["h2"] % 20), 20, 95)
+
+        # Same left-to-right float sum as calculate_score()
+        weighted = (
+            filing_regularity * w["filing_regularity"]
+            + itc_accuracy * w["itc_accuracy"]
+            + turnover * w["turnover_consistency"]
+            + network * w["network_trustworthiness"]
+            + amendment * w["amendment_frequency"]
+        )
+        nexus = np.clip(np.trunc(weighted), 5, 99).astype(np.int64)
+        grade = _GRADES[np.searchsorted(_GRADE_EDGES, nexus, side="right")]
+        trend = np.where(x["recent"] > x["older"], "UP", np.where(x["recent"] < x["older"], "DOWN", "FLAT"))
+        loan_eligible = (nexus >= 75) & (filing_regularity >= 80)
+        loan_limit = np.where(loan_eligible, np.trunc(nexus * 65000 * 0.5), 0).astype(np.int64)
+
+        now = datetime.utcnow().isoformat() + "Z"
+        names = NexusScorer.VENDOR_NAMES
+        cols = zip(
+            gstins, nexus.tolist(), grade.tolist(), fr.astype(np.int64).tolist(), reflectance.astype(np.int64).tolist(),
+            filing_regularity.astype(np.int64).tolist(), itc_accuracy.astype(np.int64).tolist(),
+            turnover.astype(np.int64).tolist(), network.astype(np.int64).tolist(),
+            amendment.astype(np.int64).tolist(), trend.tolist(), loan_eligible.tolist(), loan_limit.tolist(),
+        )
+        out: List[Dict[str, Any]] = []
+        for gstin, score, grd, f_rate, refl, freg, itc, tc, nt, af, trd, eligible, limit in cols:
+            out.append({
+                "gstin": gstin,
+                "name": names.get(gstin, f"Vendor {gstin[:8]}"),
+                "nexusScore": score,
+                "nexusGrade": grd,
+                "grade": grd,
+                "complianceScore": min(100, score + 4),
+                "filingRate": f_rate,
+                "gstr2bReflectance": refl,
+                "itcAccuracy": itc,
+                "networkRisk": nt,
+                "ewayCompliance": af,
+                "factors": {
+                    "filing_regularity": freg,
+                    "itc_accuracy": itc,
+                    "turnover_consistency": tc,
+                    "network_trustworthiness": nt,
+                    "amendment_frequency": af,
+                },
+                "trend": trd,
+                "riskLevel": risk_bucket(score),
+                "lastUpdated": now,
+                "loanEligible": eligible,
+                "loanLimit": limit,
+                "creditRating": grd,
+                "loanOfferApr": 13.5 if eligible else None,
+                "loanTenorMonths": 12 if eligible else None,
+            })
+        return out
@@ -0,0 +1,287 @@
+"""
+TaxIQ — Columnar Reconciliation Core
+Loads GSTR-1 / GSTR-2B invoices into NumPy/pandas columns, joins them on
+invoice number in one pass and classifies TYPE_1..TYPE_5 with vector masks.
+Produces exactly the same Mismatch records as the per-invoice loop.
+"""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from backend.models.mismatch import Mismatch, MISMATCH_LABELS
+
+if TYPE_CHECKING:
+    from backend.core.reconciliation_engine import ReconciliationEngine
+
+
+# Row classification codes stored in the joined frame's "mtype" column
+MATCHED = ""
+
+
+_FIELDS = ["inum", "idt", "val", "txval", "camt", "samt", "iamt", "supplier_gstin", "buyer_gstin_mismatch"]
+
+
+def _num(raw: pd.DataFrame, key: str) -> np.ndarray:
+    return pd.to_numeric(raw[key], errors="raise").to_numpy(dtype=float)
+
+
+def _load_side(invoices: List[Dict[str, Any]], default_gstin: str) -> Dict[str, np.ndarray]:
+    """
+    Build the per-side columns in one pass over the dicts. Absent keys become
+    NaN and are back-filled to mirror inv.get(key, inv.get(fallback, 0)).
+    """
+    raw = pd.DataFrame.from_records(invoices, columns=_FIELDS) if invoices else pd.DataFrame(columns=_FIELDS)
+    txval, val = _num(raw, "txval"), _num(raw, "val")
+    camt, samt, iamt = (np.nan_to_num(_num(raw, k)) for k in ("camt", "samt", "iamt"))
+    return {
+        "inum": raw["inum"].to_numpy(dtype=object),
+        "txval0": np.nan_to_num(txval),
+        "amt": np.nan_to_num(np.where(np.isnan(txval), val, txval)),
+        "val0": np.nan_to_num(val),
+        "calc_base": np.nan_to_num(np.where(np.isnan(val), txval, val)),
+        "tax": camt + samt + iamt,
+        "supplier_gstin": raw["supplier_gstin"].fillna(default_gstin).to_numpy(dtype=object),
+        "idt": raw["idt"].fillna("").to_numpy(dtype=object),
+        "gstin_mismatch": raw["buyer_gstin_mismatch"].fillna(False).to_numpy(dtype=bool),
+    }
+
+
+def _last_position(codes: np.ndarray, n_keys: int) -> np.ndarray:
+    """Row index of the last occurrence of each key (-1 if absent); dict semantics for duplicates."""
+    pos = np.full(n_keys, -1, dtype=np.int64)
+    np.maximum.at(pos, codes, np.arange(len(codes), dtype=np.int64))
+    return pos
+
+
+def _gather(side: Dict[str, np.ndarray], pos: np.ndarray, key: str, fill: Any) -> np.ndarray:
+    col = side[key]
+    present = pos >= 0
+    out = np.full(len(pos), fill, dtype=col.dtype)
+    out[present] = col[pos[present]]
+    return out
+
+
+def _py_round(raw: np.ndarray, ndigits: int) -> np.ndarray:
+    """
+    np.round(x, n) scales by 10**n and can disagree with Python's round() on
+    half-way ties; re-round just those few entries with the builtin.
+    """
+    scale = 10.0 ** ndigits
+    out = np.round(raw, ndigits)
+    frac = np.abs(np.mod(raw * scale, 1.0) - 0.5)
+    for i in np.flatnonzero(frac < 1e-6):
+        out[i] = round(float(raw[i]), ndigits)
+    return out
+
+
+def _itc(calc_base: np.ndarray, tax: np.ndarray) -> np.ndarray:
+    """Vector form of ReconciliationEngine._calc_tax."""
+    return np.where(tax > 0, _py_round(tax, 2), _py_round(calc_base * 0.18, 2))
+
+
+def _parse_idt(values: np.ndarray) -> pd.DatetimeIndex:
+    return pd.to_datetime(values, format="%d-%m-%Y", errors="coerce")
+
+
+class ColumnarReconciler:
+    """
+    Vectorized drop-in for ReconciliationEngine's per-invoice loop.
+    Risk level / severity thresholds are taken from the owning engine so both
+    paths share a single source of truth.
+    """
+
+    def __init__(self, engine: "ReconciliationEngine") -> None:
+        self.engine = engine
+
+    # ── Public API ──────────────────────────────────────
+
+    def classify(self, gstin: str, period: str,
+                 gstr1_invoices: List[Dict[str, Any]],
+                 gstr2b_invoices: List[Dict[str, Any]]) -> Tuple[List[Mismatch], int, int]:
+        """Return (mismatches, matched_count, total_invoices) like the loop does."""
+        frame = self.build_frame(gstr1_invoices, gstr2b_invoices, gstin=gstin)
+        mismatches = list(self.iter_mismatches(frame, gstin, period))
+        matched = int((frame["mtype"] == MATCHED).sum())
+        return mismatches, matched, len(frame)
+
+    def build_frame(self, gstr1_invoices: List[Dict[str, Any]],
+                    gstr2b_invoices: List[Dict[str, Any]], gstin: str = "") -> pd.DataFrame:
+        """Outer-join both returns on inum (sorted) and attach an "mtype" column."""
+        s = _load_side(gstr1_invoices, gstin)
+        b = _load_side(gstr2b_invoices, gstin)
+        n_s = len(s["inum"])
+        codes, keys = pd.factorize(np.concatenate([s["inum"], b["inum"]]), sort=True)
+        pos_s = _last_position(codes[:n_s], len(keys))
+        pos_b = _last_position(codes[n_s:], len(keys))
+
+        only_s = (pos_s >= 0) & (pos_b < 0)
+        only_b = (pos_s < 0) & (pos_b >= 0)
+        both = (pos_s >= 0) & (pos_b >= 0)
+
+        cols: Dict[str, np.ndarray] = {"inum": np.asarray(keys, dtype=object)}
+        for name, side, pos in (("s", s, pos_s), ("b", b, pos_b)):
+            for key in ("txval0", "amt", "val0", "calc_base", "tax"):
+                cols[f"{key}_{name}"] = _gather(side, pos, key, 0.0)
+            cols[f"supplier_gstin_{name}"] = _gather(side, pos, "supplier_gstin", None)
+            cols[f"idt_{name}"] = _gather(side, pos, "idt", "")
+        val_s, val_b = cols["amt_s"], cols["amt_b"]
+        tax_s, tax_b = cols["tax_s"], cols["tax_b"]
+        t4 = both & _gather(b, pos_b, "gstin_mismatch", False)
+
+        # TYPE_2: taxable value differs by more than 1%
+        positive = (val_s > 0) & (val_b > 0)
+        diff = np.abs(val_s - val_b)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            pct = np.where(positive, diff / np.maximum(val_s, val_b) * 100, 0.0)
+        t2 = both & ~t4 & positive & (pct > 1.0)
+
+        # TYPE_3: effective tax rate differs by more than 2 points
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rate_s = _py_round(np.where(val_s > 0, tax_s / np.where(val_s > 0, val_s, 1.0) * 100, 0.0), 1)
+            rate_b = _py_round(np.where(val_b > 0, tax_b / np.where(val_b > 0, val_b, 1.0) * 100, 0.0), 1)
+        t3 = both & ~t4 & ~t2 & (rate_s > 0) & (rate_b > 0) & (np.abs(rate_s - rate_b) > 2)
+
+        # TYPE_5: filing dates more than 15 days apart
+        idt_s, idt_b = cols["idt_s"], cols["idt_b"]
+        dated = both & ~t4 & ~t2 & ~t3 & (idt_s != "") & (idt_b != "") & (idt_s != idt_b)
+        delay = np.zeros(len(keys), dtype=np.int64)
+        if dated.any():
+            days = (_parse_idt(idt_s[dated]) - _parse_idt(idt_b[dated])).days
+            delay[dated] = np.abs(np.nan_to_num(np.asarray(days, dtype=float))).astype(np.int64)
+        t5 = dated & (delay > 15)
+
+        # ITC at risk per flagged row (0 for matched rows)
+        amount = np.zeros(len(keys), dtype=float)
+        amount[only_s | t4] = _itc(cols["calc_base_s"], tax_s)[only_s | t4]
+        amount[only_b] = _itc(cols["calc_base_b"], tax_b)[only_b]
+        amount[t2] = _py_round(diff * 0.18, 2)[t2]
+        amount[t3] = _py_round(np.abs(tax_s - tax_b), 2)[t3]
+        amount[t5] = _py_round(val_s * 0.18 * delay / 365, 2)[t5]
+        # TYPE_3 grades risk on the unrounded tax difference, like the loop
+        risk_amount = np.where(t3, np.abs(tax_s - tax_b), amount)
+
+        mtype = np.full(len(keys), MATCHED, dtype=object)
+        mtype[only_s | only_b] = "TYPE_1"
+        mtype[t4] = "TYPE_4"
+        mtype[t2] = "TYPE_2"
+        mtype[t3] = "TYPE_3"
+        mtype[t5] = "TYPE_5"
+
+        cols["mtype"] = mtype
+        cols["side"] = np.where(only_s, "S", np.where(only_b, "B", "SB")).astype(object)
+        cols["rate_s"] = rate_s
+        cols["rate_b"] = rate_b
+        cols["delay"] = delay
+        cols["amount"] = amount
+        cols["risk_amount"] = risk_amount
+        return pd.DataFrame(cols, copy=False)
+
+    def summarize(self, frame: pd.DataFrame) -> Dict[str, Any]:
+        """
+        Totals, risk_summary and mismatch_breakdown straight from the frame,
+        without materializing any Mismatch records.
+        """
+        flagged = frame[frame["mtype"] != MATCHED]
+        amounts = flagged["amount"].tolist()
+        total = len(frame)
+        matched = total - len(flagged)
+
+        risk = {"high": 0, "medium": 0, "low": 0}
+        for amt in flagged["risk_amount"].tolist():
+            level = self.engine._risk_level(amt).lower()
+            risk[level] = risk.get(level, 0) + 1
+
+        breakdown: Dict[str, int] = {}
+        counts = flagged["mtype"].value_counts()
+        for mtype in pd.unique(flagged["mtype"]):
+            breakdown[MISMATCH_LABELS.get(mtype, mtype)] = int(counts[mtype])
+
+        return {
+            "total_invoices_checked": total,
+            "mismatch_count": len(flagged),
+            "total_itc_at_risk": round(sum(amounts), 2),
+            "risk_summary": risk,
+            "reconciliation_score": round((matched / total) * 100, 1) if total else 100.0,
+            "mismatch_breakdown": breakdown,
+        }
+
+    def iter_mismatches(self, frame: pd.DataFrame, gstin: str, period: str) -> Iterator[Mismatch]:
+        """Materialize Mismatch records row by row, in inum order, for flagged rows only."""
+        flagged = frame[frame["mtype"] != MATCHED]
+        for row in flagged.itertuples(index=False, name="Row"):
+            yield self._materialize(row, gstin, period)
+
+    # ── Record builders (scalar math kept identical to _compare_invoices) ──
+
+    def _materialize(self, r: Any, gstin: str, period: str) -> Mismatch:
+        e = self.engine
+        inv_id = r.inum
+        itc = float(r.amount)
+        if r.mtype == "TYPE_1" and r.side == "S":
+            return Mismatch(
+                invoiceId=inv_id, gstin=gstin, vendorGstin=r.supplier_gstin_s,
+                period=period, mismatchType="TYPE_1",
+                riskLevel=e._risk_level(itc), severity=e._severity(itc), amount=itc,
+                supplierAmount=float(r.amt_s), buyerAmount=0.0, difference=itc,
+                detail=(f"Invoice {inv_id} filed in GSTR-1 for "
+                        f"₹{float(r.val0_s):,.0f} but NOT reflected "
+                        f"in GSTR-2B. ITC of ₹{itc:,.0f} is blocked under Rule 36(4)."),
+            )
+        if r.mtype == "TYPE_1":
+            return Mismatch(
+                invoiceId=inv_id, gstin=gstin, vendorGstin=r.supplier_gstin_b,
+                period=period, mismatchType="TYPE_1",
+                riskLevel=e._risk_level(itc), severity=e._severity(itc), amount=itc,
+                supplierAmount=0.0, buyerAmount=float(r.amt_b), difference=itc,
+                detail=(f"Invoice {inv_id} in GSTR-2B but supplier did not "
+                        f"file in GSTR-1. ITC claim of ₹{itc:,.0f} at risk."),
+            )
+
+        val_s = float(r.amt_s)
+        val_b = float(r.amt_b)
+        if r.mtype == "TYPE_4":
+            return Mismatch(
+                invoiceId=inv_id, gstin=gstin, vendorGstin=r.supplier_gstin_s,
+                period=period, mismatchType="TYPE_4",
+                riskLevel=e._risk_level(itc), severity=e._severity(itc), amount=itc,
+                supplierAmount=float(r.txval0_s), buyerAmount=float(r.txval0_b),
+                difference=itc,
+                detail=(f"Invoice {inv_id} references wrong buyer GSTIN. "
+                        f"ITC of ₹{itc:,.0f} cannot be claimed."),
+            )
+        if r.mtype == "TYPE_2":
+            diff = abs(val_s - val_b)
+            pct = diff / max(val_s, val_b) * 100
+            return Mismatch(
+                invoiceId=inv_id, gstin=gstin, vendorGstin=r.supplier_gstin_s,
+                period=period, mismatchType="TYPE_2",
+                riskLevel=e._risk_level(itc), severity=e._severity(itc), amount=itc,
+                supplierAmount=val_s, buyerAmount=val_b, difference=round(diff, 2),
+                detail=(f"Taxable value mismatch: GSTR-1 ₹{val_s:,.0f} vs "
+                        f"GSTR-2B ₹{val_b:,.0f} (diff ₹{diff:,.0f}, "
+                        f"{pct:.1f}%). Tax on difference: ₹{itc:,.0f} at risk."),
+            )
+        if r.mtype == "TYPE_3":
+            rate_s, rate_b = float(r.rate_s), float(r.rate_b)
+            tax_diff = abs(float(r.tax_s) - float(r.tax_b))
+            return Mismatch(
+                invoiceId=inv_id, gstin=gstin, vendorGstin=r.supplier_gstin_s,
+                period=period, mismatchType="TYPE_3",
+                riskLevel=e._risk_level(tax_diff), severity=e._severity(tax_diff), amount=itc,
+                supplierAmount=val_s, buyerAmount=val_b,
+                difference=round(abs(rate_s - rate_b), 1),
+                detail=(f"Tax rate mismatch: GSTR-1 effective {rate_s}% vs "
+                        f"GSTR-2B {rate_b}%. Difference: ₹{tax_diff:,.0f}."),
+            )
+        delay = int(r.delay)
+        return Mismatch(
+            invoiceId=inv_id, gstin=gstin, vendorGstin=r.supplier_gstin_s,
+            period=period, mismatchType="TYPE_5",
+            riskLevel=e._risk_level(itc), severity=e._severity(itc), amount=itc,
+            supplierAmount=val_s, buyerAmount=val_b, difference=float(delay),
+            detail=(f"Period mismatch: {delay} days between filing dates. "
+                    f"Interest @18% p.a. = ₹{itc:,.0f}."),
+        )
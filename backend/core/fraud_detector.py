@@ -2,50 +2,35 @@ from datetime import datetime
 from typing import Any, Dict, List
 
 from backend.graph.fraud_detector import (
-    detect_circular_chains,
+    SHELL_MAX_AGE_DAYS,
+    SHELL_MAX_SUPPLIERS,
+    SHELL_MIN_BUYERS,
+    SHELL_NO_SUPPLIER_MIN_BUYERS,
+    detect_shell_candidates,
     calculate_risk_scores,
     get_risk_summary,
 )
 from backend.graph.graph_builder import graph_store
+from backend.graph.ring_clusters import ring_clusters
+from backend.graph.ring_index import ITC_EDGE
 
 
 class FraudDetector:
     """
     Delegates to the real graph-based fraud detector in backend.graph.fraud_detector.
-    Wraps the raw cycle data into the richer ring / shell-company response format
+    Wraps the graph results into the richer ring / shell-company response format
     expected by the /api/fraud/* endpoints.
     """
 
-    async def detect_circular_rings(self, min_nodes: int = 3) -> List[Dict[str, Any]]:
-        """Detect circular ITC chains using real graph cycle detection."""
-        # Ensure risk scores are up-to-date
-        await calculate_risk_scores()
-        chains = await detect_circular_chains()
-
-        rings: List[Dict[str, Any]] = []
-        for idx, chain in enumerate(chains, start=1):
-            gstins = chain.get("gstins", [])
-            # Filter by minimum node count
-            if len(set(gstins)) < min_nodes:
-                continue
-
-            # Estimate fraud amount from graph edge values
-            fraud_amount = self._estimate_ring_amount(gstins)
-            ring_size = chain.get("chain_length", len(set(gstins)))
-            confidence = self._calculate_confidence(ring_size, fraud_amount)
-
-            rings.append({
-                "ringId": f"RING-{idx:03d}",
-                "gstins": gstins,
-                "confidence": round(confidence, 2),
-                "fraudAmount": fraud_amount,
-                "ringSize": ring_size,
-                "detectedOn": datetime.utcnow().isoformat() + "Z",
-            })
-
-        # Sort by fraud amount descending
-        rings.sort(key=lambda r: r["fraudAmount"], reverse=True)
-        return rings
+    async def detect_circular_rings(self, min_confidence: float = 0.0, min_amount: float = 0.0,
+                                    limit: int = 50, offset: int = 0) -> Dict[str, Any]:
+        """
+        Merged ring entities from the latest persisted clustering run
+        (backend.graph.ring_clusters); overlapping cycles come back as one
+        ring with their combined fraud amount.
+        """
+        return await ring_clusters.rings(min_confidence=min_confidence, min_amount=min_amount,
+                                         limit=limit, offset=offset)
 
     async def detect_shell_companies(self) -> List[Dict[str, Any]]:
         """
@@ -57,54 +42,34 @@ class FraudDetector:
         summary = await get_risk_summary()
 
         shells: List[Dict[str, Any]] = []
-        g = graph_store.nx_graph
-
-        # Pass 1: topology-based detection
-        for node in g.nodes():
-            # Count buyers (nodes that claim ITC FROM this node)
-            buyers = sum(1 for _, _, a in g.in_edges(node, data=True)
-                         if a.get("type") == "CLAIMED_ITC_FROM")
-            # Count suppliers (nodes this node claims ITC FROM)
-            suppliers = sum(1 for _, _, a in g.out_edges(node, data=True)
-                            if a.get("type") == "CLAIMED_ITC_FROM")
-
-            node_data = g.nodes[node]
-            reg_date_str = node_data.get("registration_date", "")
-            days_since_reg = 999
-            if reg_date_str:
-                try:
-                    from datetime import datetime as dt
-                    reg_date = dt.strptime(reg_date_str, "%Y-%m-%d")
-                    days_since_reg = (dt.utcnow() - reg_date).days
-                except (ValueError, TypeError):
-                    pass
+        # Pass 1: topology-based detection (buyers = GSTINs claiming ITC from this
+        # one, suppliers = GSTINs it claims from), filtered by the graph backend
+        detected_on = datetime.utcnow().isoformat() + "Z"
+        for c in await detect_shell_candidates():
+            buyers, suppliers = c["buyers"], c["suppliers"]
+            days_since_reg = c["days_since_registration"]
 
             reasons = []
-            is_shell = False
-
-            if buyers > 10 and suppliers < 2:
+            if buyers > SHELL_MIN_BUYERS and suppliers < SHELL_MAX_SUPPLIERS:
                 reasons.append(f"{buyers} buyers but only {suppliers} suppliers — classic pass-through")
-                is_shell = True
-            if days_since_reg < 180:
+            if days_since_reg < SHELL_MAX_AGE_DAYS:
                 reasons.append(f"Registered only {days_since_reg} days ago")
-                is_shell = True
-            if buyers > 5 and suppliers == 0:
+            if buyers > SHELL_NO_SUPPLIER_MIN_BUYERS and suppliers == 0:
                 reasons.append(f"{buyers} outward ITC claims with zero inward invoices")
-                is_shell = True
 
-            if is_shell:
-                shells.append({
-                    "gstin": node,
-                    "name": node_data.get("name", node),
-                    "riskScore": min(0.95, 0.7 + buyers * 0.02),
-                    "buyers": buyers,
-                    "suppliers": suppliers,
-                    "daysSinceRegistration": days_since_reg,
-                    "reason": "; ".join(reasons),
-                    "detectedOn": datetime.utcnow().isoformat() + "Z",
-                })
+            shells.append({
+                "gstin": c["gstin"],
+                "name": c["name"],
+                "riskScore": min(0.95, 0.7 + buyers * 0.02),
+                "buyers": buyers,
+                "suppliers": suppliers,
+                "daysSinceRegistration": days_since_reg,
+                "reason": "; ".join(reasons),
+                "detectedOn": detected_on,
+            })
 
         # Pass 2: risk-score fallback for nodes not caught by topology
+        g = graph_store.graph
         seen = {s["gstin"] for s in shells}
         for entry in summary.get("top10", []):
             risk = entry.get("risk_score", 0)
@@ -114,10 +79,8 @@ class FraudDetector:
 
             reasons = []
             if gstin in g:
-                out_itc = sum(1 for _, _, a in g.out_edges(gstin, data=True)
-                              if a.get("type") == "CLAIMED_ITC_FROM")
-                in_itc = sum(1 for _, _, a in g.in_edges(gstin, data=True)
-                             if a.get("type") == "CLAIMED_ITC_FROM")
+                out_itc = g.out_degree(gstin, ITC_EDGE)
+                in_itc = g.in_degree(gstin, ITC_EDGE)
                 if out_itc > 3 and in_itc == 0:
                     reasons.append("High outward ITC claims with zero inward invoices")
                 if out_itc > 5:
@@ -136,25 +99,3 @@ class FraudDetector:
             })
 
         return shells
-
-    def _estimate_ring_amount(self, gstins: List[str]) -> float:
-        """Sum edge values in the ring from the networkx graph."""
-        g = graph_store.nx_graph
-        total = 0.0
-        unique = list(dict.fromkeys(gstins))  # preserve order, dedupe
-        for i in range(len(unique)):
-            src = unique[i]
-            dst = unique[(i + 1) % len(unique)]
-            if g.has_edge(src, dst):
-                edge_data = g.edges[src, dst]
-                total += float(edge_data.get("value", 0))
-        # Fallback: if graph has no values, estimate from count
-        if total == 0:
-            total = len(unique) * 210000  # avg ₹2.1L per edge from mock data
-        return total
-
-    def _calculate_confidence(self, ring_size: int, amount: float) -> float:
-        """Confidence heuristic: longer rings + higher amounts = higher confidence."""
-        size_factor = min(ring_size / 8, 1.0) * 0.5
-        amount_factor = min(amount / 5_000_000, 1.0) * 0.5
-        return min(size_factor + amount_factor + 0.3, 0.99)
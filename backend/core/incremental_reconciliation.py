@@ -0,0 +1,252 @@
+"""
+TaxIQ — Incremental Reconciliation
+Keeps the last reconciled GSTR-1 / GSTR-2B invoice maps and the per-invoice
+classification for each (gstin, period). A delta ingestion re-classifies only
+the touched invoice IDs and patches the stored mismatch set and the running
+totals (score, ITC at risk, risk_summary, mismatch_breakdown) in place, so a
+single-invoice amendment costs O(1) instead of a full re-run.
+"""
+from __future__ import annotations
+
+import threading
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from backend.core.invoice_matcher import InvoiceMatcher
+from backend.core.reconciliation_engine import ReconciliationEngine
+from backend.database.recon_store import recon_store
+from backend.models.mismatch import Mismatch, MISMATCH_LABELS
+
+
+def _now_iso() -> str:
+    return datetime.utcnow().isoformat() + "Z"
+
+
+def _paise(amount: float) -> int:
+    # Mismatch amounts are already rounded to 2dp; integer paise keep the running total exact
+    return int(round(amount * 100))
+
+
+@dataclass
+class _PeriodState:
+    gstin: str
+    period: str
+    job_id: str
+    started_at: str
+    gstr1: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    gstr2b: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    mismatches: Dict[str, Mismatch] = field(default_factory=dict)
+    # GSTR-2B inum as filed -> GSTR-1 inum InvoiceMatcher re-keyed it to
+    aliases: Dict[str, str] = field(default_factory=dict)
+    total: int = 0
+    matched: int = 0
+    itc_paise: int = 0
+    risk: Dict[str, int] = field(default_factory=lambda: {"high": 0, "medium": 0, "low": 0})
+    breakdown: Dict[str, int] = field(default_factory=dict)
+
+    def count(self, inv_id: str, sign: int) -> None:
+        """Add (sign=1) or remove (sign=-1) inv_id's contribution to the running totals."""
+        s, b = self.gstr1.get(inv_id), self.gstr2b.get(inv_id)
+        if s is None and b is None:
+            return
+        self.total += sign
+        mm = self.mismatches.get(inv_id)
+        if mm is None:
+            if s and b:
+                self.matched += sign
+            return
+        self.itc_paise += sign * _paise(mm.amount)
+        level = mm.riskLevel.lower()
+        self.risk[level] = self.risk.get(level, 0) + sign
+        label = MISMATCH_LABELS.get(mm.mismatchType, mm.mismatchType)
+        self.breakdown[label] = self.breakdown.get(label, 0) + sign
+        if not self.breakdown[label]:
+            del self.breakdown[label]
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "gstin": self.gstin,
+            "period": self.period,
+            "total_invoices_checked": self.total,
+            "mismatch_count": len(self.mismatches),
+            "total_itc_at_risk": self.itc_paise / 100,
+            "risk_summary": dict(self.risk),
+            "reconciliation_score": round((self.matched / self.total) * 100, 1) if self.total else 100.0,
+            "mismatch_breakdown": dict(self.breakdown),
+            "jobId": self.job_id,
+            "startedAt": self.started_at,
+            "completedAt": _now_iso(),
+        }
+
+
+class IncrementalReconciler:
+    """
+    apply_delta() is the entry point. The first delta for a (gstin, period)
+    runs one full reconciliation to seed the state; later deltas only touch
+    the invoices they carry. A newer full run (/api/reconcile/run) supersedes
+    the seeded state, which is then rebuilt on the next delta.
+    """
+
+    MAX_STATES = 64
+
+    def __init__(self, engine: Optional[ReconciliationEngine] = None) -> None:
+        self._engine = engine
+        self._lock = threading.Lock()
+        self._states: "OrderedDict[Tuple[str, str], _PeriodState]" = OrderedDict()
+
+    @property
+    def engine(self) -> ReconciliationEngine:
+        if self._engine is None:
+            self._engine = ReconciliationEngine()
+        return self._engine
+
+    # ── Public API ──────────────────────────────────────
+
+    async def apply_delta(
+        self,
+        gstin: str,
+        period: str,
+        gstr1: Iterable[Dict[str, Any]] = (),
+        gstr2b: Iterable[Dict[str, Any]] = (),
+        deleted_gstr1: Iterable[str] = (),
+        deleted_gstr2b: Iterable[str] = (),
+    ) -> Dict[str, Any]:
+        """
+        Upsert new/amended invoices (keyed by "inum") and drop deleted ones,
+        re-classify just those IDs and patch the stored result.
+        Returns the patched summary plus the re-classified mismatches.
+        """
+        state = await self._ensure_state(gstin, period)
+        engine = self.engine
+
+        with self._lock:
+            touched: Dict[str, None] = {}
+            gstr1 = list(gstr1)
+            gstr2b = self._align_delta(state, touched, gstr1, list(gstr2b))
+            deleted_gstr2b = [state.aliases.pop(inv_id, inv_id) for inv_id in deleted_gstr2b]
+            for side, invoices, deleted in (
+                (state.gstr1, gstr1, deleted_gstr1),
+                (state.gstr2b, gstr2b, deleted_gstr2b),
+            ):
+                for inv in invoices:
+                    self._touch(state, touched, inv["inum"])
+                    side[inv["inum"]] = inv
+                for inv_id in deleted:
+                    self._touch(state, touched, inv_id)
+                    side.pop(inv_id, None)
+
+            upserts: List[Dict[str, Any]] = []
+            deletes: List[str] = []
+            for inv_id in touched:
+                mm = engine._classify_invoice(inv_id, state.gstr1.get(inv_id), state.gstr2b.get(inv_id),
+                                              gstin, period)
+                if mm is None:
+                    if state.mismatches.pop(inv_id, None) is not None:
+                        deletes.append(inv_id)
+                else:
+                    state.mismatches[inv_id] = mm
+                    upserts.append(mm.model_dump())
+                state.count(inv_id, 1)
+            summary = state.summary()
+
+        recon_store.patch_mismatches(state.job_id, upserts, deletes, summary)
+        return {**summary, "reclassified": len(touched), "mismatches": upserts, "cleared": deletes}
+
+    def drop(self, gstin: str, period: str) -> None:
+        with self._lock:
+            self._states.pop((gstin, period), None)
+
+    # ── Internal helpers ────────────────────────────────
+
+    @staticmethod
+    def _touch(state: _PeriodState, touched: Dict[str, None], inv_id: str) -> None:
+        # Take the old classification out of the totals once, before the first edit to inv_id
+        if inv_id not in touched:
+            state.count(inv_id, -1)
+            touched[inv_id] = None
+
+    def _align_delta(self, state: _PeriodState, touched: Dict[str, None],
+                     gstr1: List[Dict[str, Any]], gstr2b: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Re-key delta GSTR-2B rows the way the seeding run's InvoiceMatcher
+        would: known aliases first, then new numbers aligned against the
+        GSTR-1 invoices still without a counterpart. New GSTR-1 rows may also
+        claim GSTR-2B rows that were unmatched so far; those are moved to the
+        GSTR-1 inum here. Only the mismatch residue is scanned, not the period.
+        """
+        if not self.engine.match_invoices:
+            return gstr2b
+        s_ids = {inv["inum"] for inv in gstr1}
+        rows: List[Dict[str, Any]] = []
+        pending: List[Dict[str, Any]] = []
+        for inv in gstr2b:
+            raw = inv.get("buyer_inum", inv["inum"])
+            canon = state.aliases.get(raw)
+            if canon is not None:
+                rows.append({**inv, "inum": canon, "buyer_inum": raw})
+            elif raw in state.gstr1 or raw in s_ids:
+                rows.append(inv)
+            else:
+                pending.append(inv)
+
+        b_ids = {inv["inum"] for inv in gstr2b}
+        s_pool = [inv for inv in gstr1 if inv["inum"] not in state.gstr2b and inv["inum"] not in b_ids]
+        s_pool += [state.gstr1[i] for i in state.mismatches
+                   if i in state.gstr1 and i not in state.gstr2b and i not in s_ids]
+        # unmatched GSTR-2B rows already held can only meet a GSTR-1 row new in this delta
+        orphans = [state.gstr2b[i] for i in state.mismatches
+                   if i in state.gstr2b and i not in state.gstr1 and i not in b_ids] if s_pool and gstr1 else []
+        if not s_pool or not (pending or orphans):
+            return rows + pending
+
+        aligned, _ = InvoiceMatcher().align(s_pool, pending + orphans)
+        for i, inv in enumerate(aligned):
+            if "buyer_inum" in inv:
+                raw = inv["buyer_inum"]
+                state.aliases[raw] = inv["inum"]
+                if raw in state.gstr2b:
+                    # the row held under the filed number moves to the GSTR-1 inum
+                    self._touch(state, touched, raw)
+                    del state.gstr2b[raw]
+            elif i >= len(pending):
+                continue  # orphan still unmatched, left as it is
+            rows.append(inv)
+        return rows
+
+    async def _ensure_state(self, gstin: str, period: str) -> _PeriodState:
+        key = (gstin, period)
+        state = self._states.get(key)
+        if state is not None and recon_store.latest_job_id(gstin, period) == state.job_id:
+            self._states.move_to_end(key)
+            return state
+
+        engine = self.engine
+        started = _now_iso()
+        gstr1_invoices, gstr2b_invoices, _ = await engine._prepare_returns(gstin, period)
+        mismatches, _, _ = engine._classify(gstin, period, gstr1_invoices, gstr2b_invoices)
+
+        state = _PeriodState(
+            gstin=gstin, period=period, job_id=str(uuid.uuid4()), started_at=started,
+            gstr1={inv["inum"]: inv for inv in gstr1_invoices},
+            gstr2b={inv["inum"]: inv for inv in gstr2b_invoices},
+            mismatches={m.invoiceId: m for m in mismatches},
+            aliases={inv["buyer_inum"]: inv["inum"] for inv in gstr2b_invoices if "buyer_inum" in inv},
+        )
+        for inv_id in state.gstr1.keys() | state.gstr2b.keys():
+            state.count(inv_id, 1)
+
+        recon_store.begin(state.job_id, gstin, period)
+        recon_store.add_mismatches(state.job_id, (m.model_dump() for m in mismatches))
+        recon_store.complete(state.job_id, state.summary())
+
+        with self._lock:
+            self._states[key] = state
+            while len(self._states) > self.MAX_STATES:
+                self._states.popitem(last=False)
+        return state
+
+
+incremental_reconciler = IncrementalReconciler()
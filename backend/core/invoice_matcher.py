@@ -0,0 +1,189 @@
+"""
+TaxIQ — Invoice Number Matcher
+Pairs GSTR-1 and GSTR-2B invoices whose numbers were typed differently
+("INV/23-24/001" vs "INV-2324-1") before the reconciliation join, so they
+classify as one matched / TYPE_2 pair instead of two TYPE_1 gaps.
+
+Stages, each run only on what the previous one left unmatched:
+  1. exact      — identical inum
+  2. canonical  — same supplier GSTIN + canonical key (case, separators,
+                  leading zeros stripped)
+  3. fuzzy      — blocked by supplier GSTIN + trailing serial number +
+                  amount band, bucketed by date window, string similarity
+                  >= threshold
+Blocking keeps stage 3 near-linear: each residue invoice is only scored
+against the few candidates in its block.
+"""
+from __future__ import annotations
+
+import math
+import re
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime
+from difflib import SequenceMatcher
+from typing import Any, Dict, List, Optional, Tuple
+
+_TOKEN = re.compile(r"[A-Z]+|\d+")
+
+
+def _canon(tokens: List[str]) -> str:
+    return "".join((t.lstrip("0") or "0") if t.isdigit() else t for t in tokens)
+
+
+def canonical_inum(inum: Any) -> str:
+    """Uppercase alphanumeric tokens with leading zeros dropped: "inv/23-24/001" -> "INV23241"."""
+    return _canon(_TOKEN.findall(str(inum).upper()))
+
+
+def _serial(tokens: List[str]) -> Optional[int]:
+    for t in reversed(tokens):
+        if t.isdigit():
+            return int(t)
+    return None
+
+
+def _amount(inv: Dict[str, Any]) -> float:
+    try:
+        return float(inv.get("txval", inv.get("val", 0)) or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _ordinal(inv: Dict[str, Any]) -> Optional[int]:
+    try:
+        return datetime.strptime(inv.get("idt", ""), "%d-%m-%Y").toordinal()
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclass
+class _Entry:
+    inum: str
+    supplier: str
+    canon: str
+    serial: Optional[int]
+    amount: float
+    day: Optional[int]
+
+
+class InvoiceMatcher:
+    """align() rewrites matched GSTR-2B rows to the supplier's inum and reports per-stage counts."""
+
+    # Log-scale amount bands; neighbours are searched too, so ~25-55% apart still meet
+    AMOUNT_BAND_RATIO = 1.25
+    DATE_WINDOW_DAYS = 15
+    MIN_SIMILARITY = 0.75
+
+    # ── Public API ──────────────────────────────────────
+
+    def align(
+        self,
+        gstr1_invoices: List[Dict[str, Any]],
+        gstr2b_invoices: List[Dict[str, Any]],
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+        """
+        Returns (gstr2b_invoices with recovered rows re-keyed, stats).
+        Re-keyed rows keep the buyer's original number in "buyer_inum".
+        """
+        s_ids = {inv["inum"] for inv in gstr1_invoices}
+        b_ids = {inv["inum"] for inv in gstr2b_invoices}
+        exact = s_ids & b_ids
+        stats = {"exact": len(exact), "canonical": 0, "fuzzy": 0, "candidates_scored": 0}
+
+        s_rest = [self._entry(inv) for inv in gstr1_invoices if inv["inum"] not in exact]
+        b_rest = [self._entry(inv) for inv in gstr2b_invoices if inv["inum"] not in exact]
+        rekey: Dict[str, str] = {}
+        if s_rest and b_rest:
+            s_rest, b_rest = self._match_canonical(s_rest, b_rest, rekey, stats)
+        if s_rest and b_rest:
+            s_rest, b_rest = self._match_fuzzy(s_rest, b_rest, rekey, stats)
+
+        stats["unmatched_gstr1"] = len({e.inum for e in s_rest})
+        stats["unmatched_gstr2b"] = len({e.inum for e in b_rest})
+        if not rekey:
+            return gstr2b_invoices, stats
+        aligned = [
+            {**inv, "inum": rekey[inv["inum"]], "buyer_inum": inv["inum"]} if inv["inum"] in rekey else inv
+            for inv in gstr2b_invoices
+        ]
+        return aligned, stats
+
+    # ── Stages ──────────────────────────────────────────
+
+    def _match_canonical(self, s_rest: List[_Entry], b_rest: List[_Entry],
+                         rekey: Dict[str, str], stats: Dict[str, int]) -> Tuple[List[_Entry], List[_Entry]]:
+        s_by_key: Dict[Tuple[str, str], List[_Entry]] = defaultdict(list)
+        b_by_key: Dict[Tuple[str, str], List[_Entry]] = defaultdict(list)
+        for e in s_rest:
+            s_by_key[(e.supplier, e.canon)].append(e)
+        for e in b_rest:
+            b_by_key[(e.supplier, e.canon)].append(e)
+        for key, bs in b_by_key.items():
+            ss = s_by_key.get(key)
+            # Only unambiguous one-to-one keys; anything else is left to the fuzzy stage
+            if ss and len(ss) == 1 and len(bs) == 1:
+                rekey[bs[0].inum] = ss[0].inum
+                stats["canonical"] += 1
+        matched = set(rekey.values())
+        return [e for e in s_rest if e.inum not in matched], [e for e in b_rest if e.inum not in rekey]
+
+    def _match_fuzzy(self, s_rest: List[_Entry], b_rest: List[_Entry],
+                     rekey: Dict[str, str], stats: Dict[str, int]) -> Tuple[List[_Entry], List[_Entry]]:
+        # block: (supplier, serial, amount band) -> day bucket (None = undated) -> entries
+        blocks: Dict[Tuple[str, Optional[int], int], Dict[Optional[int], List[_Entry]]] = defaultdict(
+            lambda: defaultdict(list))
+        for e in s_rest:
+            blocks[(e.supplier, e.serial, self._band(e.amount))][self._bucket(e.day)].append(e)
+
+        scored: List[Tuple[float, str, str]] = []
+        for b in b_rest:
+            band = self._band(b.amount)
+            for k in (band - 1, band, band + 1):
+                block = blocks.get((b.supplier, b.serial, k))
+                if not block:
+                    continue
+                if b.day is None:
+                    candidates = [s for bucket in block.values() for s in bucket]
+                else:
+                    d = self._bucket(b.day)
+                    candidates = [s for bk in (d - 1, d, d + 1, None) for s in block.get(bk, ())]
+                for s in candidates:
+                    if s.day is not None and b.day is not None and abs(s.day - b.day) > self.DATE_WINDOW_DAYS:
+                        continue
+                    stats["candidates_scored"] += 1
+                    sm = SequenceMatcher(None, s.canon, b.canon)
+                    if sm.quick_ratio() < self.MIN_SIMILARITY:
+                        continue
+                    score = sm.ratio()
+                    if score >= self.MIN_SIMILARITY:
+                        scored.append((score, b.inum, s.inum))
+
+        # Greedy one-to-one assignment, best score first (ties: invoice order)
+        scored.sort(key=lambda t: (-t[0], t[1], t[2]))
+        used_s: set = set()
+        for _, b_inum, s_inum in scored:
+            if b_inum in rekey or s_inum in used_s:
+                continue
+            rekey[b_inum] = s_inum
+            used_s.add(s_inum)
+            stats["fuzzy"] += 1
+        return [e for e in s_rest if e.inum not in used_s], [e for e in b_rest if e.inum not in rekey]
+
+    # ── Internal helpers ────────────────────────────────
+
+    def _entry(self, inv: Dict[str, Any]) -> _Entry:
+        tokens = _TOKEN.findall(str(inv["inum"]).upper())
+        return _Entry(
+            inum=inv["inum"], supplier=inv.get("supplier_gstin", ""), canon=_canon(tokens),
+            serial=_serial(tokens), amount=_amount(inv), day=_ordinal(inv),
+        )
+
+    def _bucket(self, day: Optional[int]) -> Optional[int]:
+        """Date-window bucket; the window around a day lies within its bucket and the two neighbours."""
+        return None if day is None else day // self.DATE_WINDOW_DAYS
+
+    def _band(self, amount: float) -> int:
+        if amount <= 0:
+            return -1
+        return int(math.floor(math.log(amount) / math.log(self.AMOUNT_BAND_RATIO)))
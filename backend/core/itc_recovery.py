@@ -7,9 +7,9 @@ from __future__ import annotations
 
 import random
 from datetime import datetime, timedelta
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
-from backend.core.reconciliation_engine import ReconciliationEngine
+from backend.core.batch_reconciliation import batch_reconciler
 
 
 class ITCRecoveryPipeline:
@@ -28,22 +28,33 @@ class ITCRecoveryPipeline:
     ]
 
     def __init__(self) -> None:
-        self.engine = ReconciliationEngine()
         self._rng = random.Random(42)
 
-    async def get_pipeline(self, gstin: str = "", period: str = "2024-01") -> Dict[str, Any]:
-        """Build at_risk / in_progress / recovered pipeline from live reconciliation."""
+    async def reconcile_vendors(self, period: str = "2024-01") -> List[Dict[str, Any]]:
+        """Per-vendor batch results (include_mismatches) in VENDORS order."""
+        batch = await batch_reconciler.run(
+            [(vendor_gstin, period) for vendor_gstin, _ in self.VENDORS],
+            include_mismatches=True, persist=False,
+        )
+        return batch["results"]
+
+    async def get_pipeline(self, gstin: str = "", period: str = "2024-01",
+                           results: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """
+        Build at_risk / in_progress / recovered pipeline from live reconciliation.
+        Pass results from reconcile_vendors() to reuse an already-run batch.
+        """
+        if results is None:
+            results = await self.reconcile_vendors(period)
         all_mismatches: List[Dict[str, Any]] = []
 
-        for vendor_gstin, vendor_name in self.VENDORS:
-            try:
-                result = await self.engine.reconcile(gstin=vendor_gstin, period=period)
-                for mm in result.get("mismatches", []):
-                    mm["vendor_name"] = vendor_name
-                    mm["vendor_gstin_display"] = vendor_gstin
-                    all_mismatches.append(mm)
-            except Exception:
+        for (vendor_gstin, vendor_name), result in zip(self.VENDORS, results):
+            if result.get("status") != "COMPLETE":
                 continue
+            for mm in result.get("mismatches", []):
+                mm["vendor_name"] = vendor_name
+                mm["vendor_gstin_display"] = vendor_gstin
+                all_mismatches.append(mm)
 
         all_mismatches.sort(key=lambda m: m.get("amount", 0), reverse=True)
 
@@ -1,9 +1,25 @@
+import hashlib
+import math
 from datetime import datetime
-from typing import Any, Dict, List
+from functools import lru_cache
+from typing import Any, Dict, List, Tuple
 
 from backend.services.gstn_client import GSTNClient
 
 
+@lru_cache(maxsize=65536)
+def gstin_hashes(gstin: str) -> Tuple[int, int]:
+    """(md5[:8], md5[8:16]) as ints — the GSTIN-derived inputs of the heuristic factors, hashed once."""
+    digest = hashlib.md5(gstin.encode()).hexdigest()
+    return int(digest[:8], 16), int(digest[8:16], 16)
+
+
+def risk_bucket(score: int) -> str:
+    if score < 40: return "HIGH"
+    if score < 70: return "MEDIUM"
+    return "LOW"
+
+
 class NexusScorer:
     """
     NEXUS 5-Factor Vendor Compliance Scoring Engine.
@@ -109,71 +125,56 @@ class NexusScorer:
 
     def _compute_turnover_consistency(self, gstin: str) -> int:
         """Heuristic based on GSTIN characteristics."""
-        import hashlib
-        h = int(hashlib.md5(gstin.encode()).hexdigest()[:8], 16)
+        h = gstin_hashes(gstin)[0]
         return max(20, min(95, 50 + (h % 45)))
 
     def _compute_network_trust(self, gstin: str) -> int:
         """Derive network trust from graph data if available."""
         try:
             from backend.graph.graph_builder import graph_store
-            g = graph_store.nx_graph
-            if gstin in g:
-                risk = float(g.nodes[gstin].get("risk_score", 0.5))
+            g = graph_store.graph
+            i = g.id_of(gstin)
+            if i is not None:
+                risk = float(g.risk_score[i])
+                if math.isnan(risk):
+                    risk = 0.5
                 return max(10, min(95, int((1 - risk) * 100)))
         except Exception:
             pass
-        import hashlib
-        h = int(hashlib.md5(gstin.encode()).hexdigest()[:8], 16)
+        h = gstin_hashes(gstin)[0]
         return max(20, min(90, 45 + (h % 50)))
 
     def _compute_amendment_score(self, gstin: str, filing_rate: float) -> int:
         """Higher filing rate → fewer amendments needed → higher score."""
-        import hashlib
-        h = int(hashlib.md5(gstin.encode()).hexdigest()[8:16], 16)
+        h = gstin_hashes(gstin)[1]
         base = max(20, min(95, int(filing_rate * 0.9 + (h % 20))))
         return base
 
     async def get_all_vendor_scores(self, risk_level: str | None = None) -> List[Dict[str, Any]]:
-        """Get scores for all known vendors."""
-        items = []
-        for gstin in self.ALL_VENDOR_GSTINS:
-            score = await self.calculate_score(gstin)
-            items.append(score)
+        """Get scores for all known vendors (one vectorized bulk pass)."""
+        from backend.core.bulk_scorer import BulkNexusScorer
+        items = await BulkNexusScorer(self).score(self.ALL_VENDOR_GSTINS)
 
         if risk_level:
-            if risk_level == "HIGH":
-                items = [x for x in items if x["nexusScore"] < 40]
-            elif risk_level == "MEDIUM":
-                items = [x for x in items if 40 <= x["nexusScore"] < 70]
-            elif risk_level == "LOW":
-                items = [x for x in items if x["nexusScore"] >= 70]
+            items = [x for x in items if risk_bucket(x["nexusScore"]) == risk_level]
 
         items.sort(key=lambda x: x["nexusScore"], reverse=True)
         return items
 
     async def get_vendor_history(self, gstin: str, months: int = 6) -> List[Dict[str, Any]]:
-        """Compute historical score trend from filing data."""
-        filing_data = await self.client.get_filing_status(gstin)
-        filing_months = filing_data.get("months", [])
-
-        base_score = (await self.calculate_score(gstin))["nexusScore"]
-        history: List[Dict[str, Any]] = []
-
-        for i in range(min(months, len(filing_months))):
-            m = filing_months[i]
-            # Score degrades for unfiled months
-            filed = m.get("gstr1_filed", False)
-            adjustment = 3 if filed else -5
-            score_at_month = max(5, min(99, base_score - (i * 2) + (adjustment if i > 0 else 0)))
-            history.append({
-                "month": m.get("period", f"Month-{i}"),
-                "score": score_at_month,
-                "filed": filed,
-            })
-
-        history.reverse()  # chronological order
-        return history
+        """
+        Monthly score history, oldest first, read from the materialized
+        snapshot series (no GSTN calls). Months before the first scoring run
+        are seeded by BulkNexusScorer.score_and_store from the filing history.
+        """
+        from backend.database.snapshot_store import snapshot_store
+
+        snaps = snapshot_store.history(gstin, months)
+        return [
+            {"month": s["month"], "score": s["score"], "grade": s.get("grade", self._grade(s["score"])),
+             "filed": s.get("filed")}
+            for s in snaps
+        ]
 
     def _grade(self, score: int) -> str:
         if score >= 90: return "AAA"
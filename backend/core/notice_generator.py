@@ -1,12 +1,12 @@
 from datetime import datetime
 from typing import Any, Dict
 
-from backend.utils.llm_client import LLMClient
+from backend.utils.llm_client import AsyncLLMClient
 
 
 class NoticeGenerator:
     def __init__(self) -> None:
-        self.llm = LLMClient()
+        self.llm = AsyncLLMClient()
 
     async def generate(
         self,
@@ -24,7 +24,7 @@ class NoticeGenerator:
             "Output: formal letter format only, no explanations."
         )
         try:
-            draft = self.llm.ask(prompt)
+            draft = await self.llm.ask(prompt)
         except Exception:
             draft = prompt.replace(
                 "You are a GST legal expert.",
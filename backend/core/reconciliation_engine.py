@@ -1,8 +1,9 @@
-﻿import os
+﻿import asyncio
+import os
 import random
 import uuid
 from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
 from backend.models.mismatch import Mismatch, MISMATCH_LABELS
 from backend.services.gstn_client import GSTNClient
@@ -15,8 +16,15 @@ class ReconciliationEngine:
     """
 
     BUYER_GSTIN = "29AAACN0001A1Z5"  # Demo buyer
-
-    def __init__(self) -> None:
+    # Below this many invoices (both returns combined) the plain loop is as fast
+    COLUMNAR_MIN_INVOICES = 50_000
+    # reconcile_stream hands control back to the event loop every N records
+    STREAM_YIELD_EVERY = 500
+
+    def __init__(self, columnar: bool = True, match_invoices: bool = True) -> None:
+        self.columnar = columnar
+        # Pair differently-typed invoice numbers (InvoiceMatcher) before the exact join
+        self.match_invoices = match_invoices
         self.client = GSTNClient()
         self._llm = None
         try:
@@ -27,82 +35,59 @@ class ReconciliationEngine:
 
     # ── Public API ──────────────────────────────────────
 
-    async def reconcile(self, gstin: str, period: str) -> Dict[str, Any]:
-        job_id = str(uuid.uuid4())
+    async def reconcile(self, gstin: str, period: str, include_audit: bool = True,
+                        job_id: Optional[str] = None) -> Dict[str, Any]:
+        job_id = job_id or str(uuid.uuid4())
         started = datetime.utcnow()
 
-        gstr1_data = await self.client.get_gstr1(gstin=gstin, period=period)
-        gstr1_invoices = self._extract_invoices(gstr1_data)
+        gstr1_invoices, gstr2b_invoices, match_stats = await self._prepare_returns(gstin, period)
 
-        gstr2b_invoices = self._generate_gstr2b_mock(gstr1_invoices, gstin=gstin)
-
-        gstr1_map = {inv["inum"]: inv for inv in gstr1_invoices}
-        gstr2b_map = {inv["inum"]: inv for inv in gstr2b_invoices}
+        mismatches, matched_count, total_inv = self._classify(
+            gstin, period, gstr1_invoices, gstr2b_invoices
+        )
+        return self._build_result(gstin, period, mismatches, matched_count, total_inv,
+                                  include_audit=include_audit, job_id=job_id, started=started,
+                                  match_stats=match_stats)
 
-        all_ids = set(gstr1_map.keys()) | set(gstr2b_map.keys())
-        mismatches: List[Mismatch] = []
-        matched_count = 0
-
-        for inv_id in sorted(all_ids):
-            s = gstr1_map.get(inv_id)
-            b = gstr2b_map.get(inv_id)
-
-            if s and not b:
-                itc = self._calc_tax(s)
-                mismatches.append(Mismatch(
-                    invoiceId=inv_id, gstin=gstin,
-                    vendorGstin=s.get("supplier_gstin", gstin),
-                    period=period, mismatchType="TYPE_1",
-                    riskLevel=self._risk_level(itc),
-                    severity=self._severity(itc), amount=itc,
-                    supplierAmount=float(s.get("txval", s.get("val", 0))),
-                    buyerAmount=0.0, difference=itc,
-                    detail=(f"Invoice {inv_id} filed in GSTR-1 for "
-                            f"\u20b9{float(s.get('val',0)):,.0f} but NOT reflected "
-                            f"in GSTR-2B. ITC of \u20b9{itc:,.0f} is blocked under Rule 36(4)."),
-                ))
-            elif b and not s:
-                itc = self._calc_tax(b)
-                mismatches.append(Mismatch(
-                    invoiceId=inv_id, gstin=gstin,
-                    vendorGstin=b.get("supplier_gstin", gstin),
-                    period=period, mismatchType="TYPE_1",
-                    riskLevel=self._risk_level(itc),
-                    severity=self._severity(itc), amount=itc,
-                    supplierAmount=0.0,
-                    buyerAmount=float(b.get("txval", b.get("val", 0))),
-                    difference=itc,
-                    detail=(f"Invoice {inv_id} in GSTR-2B but supplier did not "
-                            f"file in GSTR-1. ITC claim of \u20b9{itc:,.0f} at risk."),
-                ))
-            elif s and b:
-                mm = self._compare_invoices(inv_id, s, b, gstin, period)
-                if mm:
-                    mismatches.append(mm)
-                else:
-                    matched_count += 1
+    async def reconcile_stream(self, gstin: str, period: str, include_audit: bool = False,
+                               job_id: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Streaming variant of reconcile() for NDJSON responses.
+        Yields one "summary" event (computed from the columnar frame, before any
+        Mismatch is built), then one "mismatch" event per gap in invoice order,
+        then a "complete" event. Records are built and dropped one at a time and
+        audit text is only rendered when include_audit is set.
+        """
+        from backend.core.columnar_reconciliation import ColumnarReconciler
 
-        total_itc = sum(m.amount for m in mismatches)
-        total_inv = len(all_ids)
-        recon_score = round((matched_count / total_inv) * 100, 1) if total_inv else 100.0
+        job_id = job_id or str(uuid.uuid4())
+        started = datetime.utcnow()
 
-        audit = self._build_audit_trail(mismatches, gstin)
+        gstr1_invoices, gstr2b_invoices, match_stats = await self._prepare_returns(gstin, period)
+        reconciler = ColumnarReconciler(self)
+        frame = await asyncio.to_thread(reconciler.build_frame, gstr1_invoices, gstr2b_invoices, gstin)
+        del gstr1_invoices, gstr2b_invoices
 
-        return {
+        yield {
+            "type": "summary",
             "gstin": gstin,
             "period": period,
-            "total_invoices_checked": total_inv,
-            "mismatches": [m.model_dump() for m in mismatches],
-            "total_itc_at_risk": round(total_itc, 2),
-            "risk_summary": self._risk_counts(mismatches),
-            "audit_trail": audit,
-            "reconciliation_score": recon_score,
-            "mismatch_breakdown": self._breakdown(mismatches),
             "jobId": job_id,
             "startedAt": started.isoformat() + "Z",
-            "completedAt": datetime.utcnow().isoformat() + "Z",
+            **reconciler.summarize(frame),
+            "match_stats": match_stats,
         }
 
+        for i, m in enumerate(reconciler.iter_mismatches(frame, gstin, period), start=1):
+            event = {"type": "mismatch", **m.model_dump()}
+            if include_audit:
+                event["audit_trail"] = self._audit_line(m)
+            yield event
+            if i % self.STREAM_YIELD_EVERY == 0:
+                await asyncio.sleep(0)  # let other requests run between batches
+
+        yield {"type": "complete", "jobId": job_id, "completedAt": datetime.utcnow().isoformat() + "Z"}
+
     # Alias for backward compat with existing routes
     async def reconcile_gstin(self, gstin: str, period: str) -> Dict[str, Any]:
         return await self.reconcile(gstin, period)
@@ -138,6 +123,105 @@ class ReconciliationEngine:
             "generatedAt": now_iso,
         }
 
+    # ── Classification ──────────────────────────────────
+
+    def _classify(self, gstin: str, period: str,
+                  gstr1_invoices: List[Dict[str, Any]],
+                  gstr2b_invoices: List[Dict[str, Any]]) -> Tuple[List[Mismatch], int, int]:
+        """
+        Returns (mismatches, matched_count, total_invoices).
+        Large periods go through the vectorized columnar core; small ones stay
+        on the per-invoice loop where pandas setup would dominate.
+        """
+        use_columnar = self.columnar and (
+            len(gstr1_invoices) + len(gstr2b_invoices) >= self.COLUMNAR_MIN_INVOICES
+        )
+        if use_columnar:
+            from backend.core.columnar_reconciliation import ColumnarReconciler
+            return ColumnarReconciler(self).classify(gstin, period, gstr1_invoices, gstr2b_invoices)
+        return self._classify_loop(gstin, period, gstr1_invoices, gstr2b_invoices)
+
+    def _build_result(self, gstin: str, period: str, mismatches: List[Mismatch],
+                      matched_count: int, total_inv: int, include_audit: bool,
+                      job_id: str, started: datetime,
+                      match_stats: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+        total_itc = sum(m.amount for m in mismatches)
+        recon_score = round((matched_count / total_inv) * 100, 1) if total_inv else 100.0
+
+        audit = self._build_audit_trail(mismatches, gstin) if include_audit else []
+
+        return {
+            "gstin": gstin,
+            "period": period,
+            "total_invoices_checked": total_inv,
+            "mismatches": [m.model_dump() for m in mismatches],
+            "total_itc_at_risk": round(total_itc, 2),
+            "risk_summary": self._risk_counts(mismatches),
+            "audit_trail": audit,
+            "reconciliation_score": recon_score,
+            "mismatch_breakdown": self._breakdown(mismatches),
+            "jobId": job_id,
+            "startedAt": started.isoformat() + "Z",
+            "completedAt": datetime.utcnow().isoformat() + "Z",
+            "match_stats": match_stats or {},
+        }
+
+    def _classify_loop(self, gstin: str, period: str,
+                       gstr1_invoices: List[Dict[str, Any]],
+                       gstr2b_invoices: List[Dict[str, Any]]) -> Tuple[List[Mismatch], int, int]:
+        gstr1_map = {inv["inum"]: inv for inv in gstr1_invoices}
+        gstr2b_map = {inv["inum"]: inv for inv in gstr2b_invoices}
+
+        all_ids = set(gstr1_map.keys()) | set(gstr2b_map.keys())
+        mismatches: List[Mismatch] = []
+        matched_count = 0
+
+        for inv_id in sorted(all_ids):
+            s = gstr1_map.get(inv_id)
+            b = gstr2b_map.get(inv_id)
+            mm = self._classify_invoice(inv_id, s, b, gstin, period)
+            if mm:
+                mismatches.append(mm)
+            elif s and b:
+                matched_count += 1
+
+        return mismatches, matched_count, len(all_ids)
+
+    def _classify_invoice(self, inv_id: str, s: Optional[Dict[str, Any]], b: Optional[Dict[str, Any]],
+                          gstin: str, period: str) -> Optional[Mismatch]:
+        """Classify one invoice ID given its GSTR-1 / GSTR-2B rows (either may be missing)."""
+        if s and not b:
+            itc = self._calc_tax(s)
+            return Mismatch(
+                invoiceId=inv_id, gstin=gstin,
+                vendorGstin=s.get("supplier_gstin", gstin),
+                period=period, mismatchType="TYPE_1",
+                riskLevel=self._risk_level(itc),
+                severity=self._severity(itc), amount=itc,
+                supplierAmount=float(s.get("txval", s.get("val", 0))),
+                buyerAmount=0.0, difference=itc,
+                detail=(f"Invoice {inv_id} filed in GSTR-1 for "
+                        f"\u20b9{float(s.get('val',0)):,.0f} but NOT reflected "
+                        f"in GSTR-2B. ITC of \u20b9{itc:,.0f} is blocked under Rule 36(4)."),
+            )
+        elif b and not s:
+            itc = self._calc_tax(b)
+            return Mismatch(
+                invoiceId=inv_id, gstin=gstin,
+                vendorGstin=b.get("supplier_gstin", gstin),
+                period=period, mismatchType="TYPE_1",
+                riskLevel=self._risk_level(itc),
+                severity=self._severity(itc), amount=itc,
+                supplierAmount=0.0,
+                buyerAmount=float(b.get("txval", b.get("val", 0))),
+                difference=itc,
+                detail=(f"Invoice {inv_id} in GSTR-2B but supplier did not "
+                        f"file in GSTR-1. ITC claim of \u20b9{itc:,.0f} at risk."),
+            )
+        elif s and b:
+            return self._compare_invoices(inv_id, s, b, gstin, period)
+        return None
+
     # ── GSTR-2B mock generator ──────────────────────────
 
     def _generate_gstr2b_mock(self, gstr1_invoices: list, gstin: str = "") -> list:
@@ -173,6 +257,23 @@ class ReconciliationEngine:
 
     # ── Internal helpers ────────────────────────────────
 
+    async def _fetch_returns(self, gstin: str, period: str) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        gstr1_data = await self.client.get_gstr1(gstin=gstin, period=period)
+        gstr1_invoices = self._extract_invoices(gstr1_data)
+        gstr2b_invoices = self._generate_gstr2b_mock(gstr1_invoices, gstin=gstin)
+        return gstr1_invoices, gstr2b_invoices
+
+    async def _prepare_returns(
+        self, gstin: str, period: str,
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], Dict[str, int]]:
+        """_fetch_returns() plus invoice-number alignment; returns per-stage match stats."""
+        gstr1_invoices, gstr2b_invoices = await self._fetch_returns(gstin, period)
+        if not self.match_invoices:
+            return gstr1_invoices, gstr2b_invoices, {}
+        from backend.core.invoice_matcher import InvoiceMatcher
+        gstr2b_invoices, stats = InvoiceMatcher().align(gstr1_invoices, gstr2b_invoices)
+        return gstr1_invoices, gstr2b_invoices, stats
+
     def _extract_invoices(self, data: Dict[str, Any]) -> List[Dict[str, Any]]:
         invoices = []
         for b2b in data.get("b2b", []):
@@ -300,24 +401,24 @@ class ReconciliationEngine:
             counts[key] = counts.get(key, 0) + 1
         return counts
 
+    _AUDIT_ACTIONS = {
+        "TYPE_1": "Contact supplier to file GSTR-1 for this period. Reverse ITC if unfiled within 15 days.",
+        "TYPE_2": "Verify invoice with supplier and request credit/debit note for the difference.",
+        "TYPE_3": "Check HSN code classification and request supplier to amend GSTR-1.",
+        "TYPE_4": "Request supplier to amend invoice with correct buyer GSTIN in GSTR-1.",
+        "TYPE_5": "Request supplier to file amendment moving invoice to correct period.",
+    }
+
     def _build_audit_trail(self, mismatches: List[Mismatch], gstin: str) -> List[str]:
-        trails = []
-        for m in mismatches:
-            label = MISMATCH_LABELS.get(m.mismatchType, m.mismatchType)
-            action_map = {
-                "TYPE_1": "Contact supplier to file GSTR-1 for this period. Reverse ITC if unfiled within 15 days.",
-                "TYPE_2": "Verify invoice with supplier and request credit/debit note for the difference.",
-                "TYPE_3": "Check HSN code classification and request supplier to amend GSTR-1.",
-                "TYPE_4": "Request supplier to amend invoice with correct buyer GSTIN in GSTR-1.",
-                "TYPE_5": "Request supplier to file amendment moving invoice to correct period.",
-            }
-            action = action_map.get(m.mismatchType, "Review and take corrective action.")
-            trail = (
-                f"Supplier (GSTIN: {m.vendorGstin}) filed invoice {m.invoiceId} "
-                f"for \u20b9{m.supplierAmount or m.amount:,.0f}. "
-                f"However, your GSTR-2B shows: {label}. "
-                f"This puts \u20b9{m.amount:,.0f} of ITC at risk. "
-                f"Recommended action: {action}"
-            )
-            trails.append(trail)
-        return trails
+        return [self._audit_line(m) for m in mismatches]
+
+    def _audit_line(self, m: Mismatch) -> str:
+        label = MISMATCH_LABELS.get(m.mismatchType, m.mismatchType)
+        action = self._AUDIT_ACTIONS.get(m.mismatchType, "Review and take corrective action.")
+        return (
+            f"Supplier (GSTIN: {m.vendorGstin}) filed invoice {m.invoiceId} "
+            f"for \u20b9{m.supplierAmount or m.amount:,.0f}. "
+            f"However, your GSTR-2B shows: {label}. "
+            f"This puts \u20b9{m.amount:,.0f} of ITC at risk. "
+            f"Recommended action: {action}"
+        )
@@ -0,0 +1,306 @@
+"""
+TaxIQ — Reconciliation Result Store
+Persists reconciliation jobs and their mismatches keyed by jobId and by
+(gstin, period), so status and paging endpoints read stored, indexed rows
+instead of re-running the reconciliation.
+Postgres (tables in schema.sql) when reachable, in-memory otherwise.
+"""
+from __future__ import annotations
+
+import json
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from loguru import logger
+from sqlalchemy import text
+
+from backend.database.postgres_client import postgres_client
+
+
+SORT_COLUMNS = {"severity": "severity", "amount": "amount"}
+
+_UPSERT_SQL = text(
+    "INSERT INTO reconciliation_mismatches "
+    "(job_id, invoice_id, mismatch_type, risk_level, severity, amount, record) "
+    "VALUES (:job_id, :invoice_id, :mismatch_type, :risk_level, :severity, "
+    ":amount, CAST(:record AS JSONB)) "
+    "ON CONFLICT (job_id, invoice_id) DO UPDATE SET "
+    "mismatch_type=EXCLUDED.mismatch_type, risk_level=EXCLUDED.risk_level, "
+    "severity=EXCLUDED.severity, amount=EXCLUDED.amount, record=EXCLUDED.record"
+)
+
+
+def _now_iso() -> str:
+    return datetime.utcnow().isoformat() + "Z"
+
+
+def _strip_summary(summary: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: v for k, v in summary.items() if k not in {"mismatches", "audit_trail", "type"}}
+
+
+def _row_params(job_id: str, r: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "job_id": job_id, "invoice_id": r["invoiceId"],
+        "mismatch_type": r["mismatchType"], "risk_level": r["riskLevel"],
+        "severity": int(r["severity"]), "amount": float(r["amount"]),
+        "record": json.dumps(r),
+    }
+
+
+@dataclass
+class _MemoryJob:
+    job_id: str
+    gstin: str
+    period: str
+    status: str = "RUNNING"
+    progress: float = 0.0
+    summary: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+    started_at: str = field(default_factory=_now_iso)
+    completed_at: Optional[str] = None
+    # invoiceId -> mismatch dict
+    records: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    # (sort_by, mismatch_type, risk_level) -> invoice IDs in page order
+    orderings: Dict[Tuple[str, Optional[str], Optional[str]], List[str]] = field(default_factory=dict)
+
+    def ordering(self, sort_by: str, mismatch_type: Optional[str], risk_level: Optional[str]) -> List[str]:
+        key = (sort_by, mismatch_type, risk_level)
+        if key not in self.orderings:
+            col = "amount" if sort_by == "amount" else "severity"
+            ids = sorted(
+                inv_id for inv_id, r in self.records.items()
+                if (not mismatch_type or r["mismatchType"] == mismatch_type)
+                and (not risk_level or r["riskLevel"] == risk_level)
+            )
+            # stable: ties keep invoice order, same as list.sort(reverse=True)
+            ids.sort(key=lambda i: self.records[i][col], reverse=True)
+            self.orderings[key] = ids
+        return self.orderings[key]
+
+
+class ReconciliationStore:
+    """
+    Job lifecycle: begin() -> add_mismatches()* -> complete() | fail().
+    Completed jobs can be patched in place with patch_mismatches().
+    Reads: get_job(), latest_job_id(), query_mismatches().
+    Mismatches are keyed by invoiceId within a job; paging ties break on it.
+    """
+
+    MAX_MEMORY_JOBS = 200
+
+    def __init__(self) -> None:
+        self._db_ready: Optional[bool] = None
+        self._lock = threading.Lock()
+        self._jobs: "OrderedDict[str, _MemoryJob]" = OrderedDict()
+        self._latest: Dict[Tuple[str, str], str] = {}
+
+    def _use_db(self) -> bool:
+        if self._db_ready is None:
+            try:
+                postgres_client.init_schema()
+                self._db_ready = True
+            except Exception as e:
+                logger.warning("Postgres not ready; reconciliation results kept in memory. err={}", str(e))
+                self._db_ready = False
+        return self._db_ready
+
+    # ── Writes ──────────────────────────────────────────
+
+    def begin(self, job_id: str, gstin: str, period: str) -> None:
+        if self._use_db():
+            with postgres_client.session() as s:
+                s.execute(
+                    text("INSERT INTO reconciliation_jobs (job_id, gstin, period, status) "
+                         "VALUES (:job_id, :gstin, :period, 'RUNNING')"),
+                    {"job_id": job_id, "gstin": gstin, "period": period},
+                )
+            return
+        with self._lock:
+            self._jobs[job_id] = _MemoryJob(job_id=job_id, gstin=gstin, period=period)
+            while len(self._jobs) > self.MAX_MEMORY_JOBS:
+                self._jobs.popitem(last=False)
+
+    def add_mismatches(self, job_id: str, records: Iterable[Dict[str, Any]]) -> int:
+        """Store mismatch dicts (Mismatch.model_dump()); a repeated invoiceId replaces the earlier row."""
+        rows = list(records)
+        if not rows:
+            return 0
+        if self._use_db():
+            with postgres_client.session() as s:
+                s.execute(_UPSERT_SQL, [_row_params(job_id, r) for r in rows])
+            return len(rows)
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                for r in rows:
+                    job.records[r["invoiceId"]] = r
+                job.orderings.clear()
+        return len(rows)
+
+    def patch_mismatches(
+        self,
+        job_id: str,
+        upserts: Iterable[Dict[str, Any]],
+        deletes: Iterable[str],
+        summary: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        """Apply an incremental re-classification: replace/insert some rows, drop others, refresh the summary."""
+        rows = list(upserts)
+        gone = list(deletes)
+        if self._use_db():
+            with postgres_client.session() as s:
+                if gone:
+                    s.execute(
+                        text("DELETE FROM reconciliation_mismatches "
+                             "WHERE job_id=:job_id AND invoice_id = ANY(:ids)"),
+                        {"job_id": job_id, "ids": gone},
+                    )
+                if rows:
+                    s.execute(_UPSERT_SQL, [_row_params(job_id, r) for r in rows])
+                if summary is not None:
+                    s.execute(
+                        text("UPDATE reconciliation_jobs SET summary=CAST(:summary AS JSONB) "
+                             "WHERE job_id=:job_id"),
+                        {"job_id": job_id, "summary": json.dumps(_strip_summary(summary))},
+                    )
+            return
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            for inv_id in gone:
+                job.records.pop(inv_id, None)
+            for r in rows:
+                job.records[r["invoiceId"]] = r
+            if rows or gone:
+                job.orderings.clear()
+            if summary is not None:
+                job.summary = _strip_summary(summary)
+
+    def complete(self, job_id: str, summary: Dict[str, Any]) -> None:
+        summary = _strip_summary(summary)
+        if self._use_db():
+            with postgres_client.session() as s:
+                s.execute(
+                    text("UPDATE reconciliation_jobs SET status='COMPLETE', progress=1, "
+                         "summary=CAST(:summary AS JSONB), completed_at=NOW() WHERE job_id=:job_id"),
+                    {"job_id": job_id, "summary": json.dumps(summary)},
+                )
+            return
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            job.status, job.progress, job.summary = "COMPLETE", 1.0, summary
+            job.completed_at = _now_iso()
+            self._latest[(job.gstin, job.period)] = job_id
+
+    def fail(self, job_id: str, error: str) -> None:
+        if self._use_db():
+            with postgres_client.session() as s:
+                s.execute(
+                    text("UPDATE reconciliation_jobs SET status='FAILED', error=:error, "
+                         "completed_at=NOW() WHERE job_id=:job_id"),
+                    {"job_id": job_id, "error": error[:2000]},
+                )
+            return
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job.status, job.error, job.completed_at = "FAILED", error, _now_iso()
+
+    def save_result(self, result: Dict[str, Any]) -> None:
+        """Persist a buffered ReconciliationEngine.reconcile() result in one go."""
+        job_id = result["jobId"]
+        self.begin(job_id, result["gstin"], result["period"])
+        self.add_mismatches(job_id, result.get("mismatches", []))
+        self.complete(job_id, result)
+
+    # ── Reads ───────────────────────────────────────────
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        if self._use_db():
+            with postgres_client.session() as s:
+                row = s.execute(
+                    text("SELECT job_id, gstin, period, status, progress, summary, error, started_at, completed_at "
+                         "FROM reconciliation_jobs WHERE job_id=:job_id"),
+                    {"job_id": job_id},
+                ).mappings().first()
+            if row is None:
+                return None
+            return {
+                "jobId": row["job_id"], "gstin": row["gstin"], "period": row["period"],
+                "status": row["status"], "progress": float(row["progress"]),
+                "summary": row["summary"] or {}, "error": row["error"],
+                "startedAt": row["started_at"].isoformat() if row["started_at"] else None,
+                "completedAt": row["completed_at"].isoformat() if row["completed_at"] else None,
+            }
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        return {
+            "jobId": job.job_id, "gstin": job.gstin, "period": job.period,
+            "status": job.status, "progress": job.progress, "summary": job.summary,
+            "error": job.error, "startedAt": job.started_at, "completedAt": job.completed_at,
+        }
+
+    def latest_job_id(self, gstin: str, period: str) -> Optional[str]:
+        """Most recent COMPLETE job for (gstin, period)."""
+        if self._use_db():
+            with postgres_client.session() as s:
+                row = s.execute(
+                    text("SELECT job_id FROM reconciliation_jobs "
+                         "WHERE gstin=:gstin AND period=:period AND status='COMPLETE' "
+                         "ORDER BY started_at DESC LIMIT 1"),
+                    {"gstin": gstin, "period": period},
+                ).first()
+            return row[0] if row else None
+        job_id = self._latest.get((gstin, period))
+        return job_id if job_id in self._jobs else None
+
+    def query_mismatches(
+        self,
+        job_id: str,
+        mismatch_type: Optional[str] = None,
+        risk_level: Optional[str] = None,
+        sort_by: str = "severity",
+        page: int = 1,
+        limit: int = 50,
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """One page of stored mismatches plus the filtered total; ties keep invoice order."""
+        page = max(1, page)
+        offset = (page - 1) * limit
+        if self._use_db():
+            col = SORT_COLUMNS.get(sort_by, "severity")
+            where = "job_id=:job_id"
+            params: Dict[str, Any] = {"job_id": job_id, "limit": limit, "offset": offset}
+            if mismatch_type:
+                where += " AND mismatch_type=:mismatch_type"
+                params["mismatch_type"] = mismatch_type
+            if risk_level:
+                where += " AND risk_level=:risk_level"
+                params["risk_level"] = risk_level
+            with postgres_client.session() as s:
+                total = s.execute(
+                    text(f"SELECT count(*) FROM reconciliation_mismatches WHERE {where}"), params
+                ).scalar_one()
+                rows = s.execute(
+                    text(f"SELECT record FROM reconciliation_mismatches WHERE {where} "
+                         f"ORDER BY {col} DESC, invoice_id ASC LIMIT :limit OFFSET :offset"),
+                    params,
+                ).fetchall()
+            items = [r[0] if isinstance(r[0], dict) else json.loads(r[0]) for r in rows]
+            return items, int(total)
+
+        job = self._jobs.get(job_id)
+        if job is None:
+            return [], 0
+        with self._lock:
+            order = job.ordering(sort_by, mismatch_type, risk_level)
+        return [job.records[i] for i in order[offset:offset + limit]], len(order)
+
+
+recon_store = ReconciliationStore()
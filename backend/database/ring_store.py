@@ -0,0 +1,147 @@
+"""
+TaxIQ — Fraud Ring Store
+Results of the ring clustering run (backend.graph.ring_clusters): one run row
+with the graph fingerprint it was computed on, its merged ring entities and
+scored communities. /api/fraud/rings and /api/fraud/communities page through
+the latest run instead of recomputing.
+Postgres (fraud_ring_runs / fraud_rings / fraud_communities in schema.sql)
+when reachable, in-memory otherwise. Only the last KEEP_RUNS runs are kept.
+"""
+from __future__ import annotations
+
+import json
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from loguru import logger
+from sqlalchemy import text
+
+from backend.database.postgres_client import postgres_client
+
+
+_INSERT_RUN_SQL = text(
+    "INSERT INTO fraud_ring_runs (run_id, fingerprint, backend, stats, created_at) "
+    "VALUES (:run_id, :fingerprint, :backend, CAST(:stats AS JSONB), NOW())"
+)
+_INSERT_RING_SQL = text(
+    "INSERT INTO fraud_rings (run_id, ring_id, confidence, fraud_amount, ring_size, record) "
+    "VALUES (:run_id, :ring_id, :confidence, :fraud_amount, :ring_size, CAST(:record AS JSONB))"
+)
+_INSERT_COMMUNITY_SQL = text(
+    "INSERT INTO fraud_communities (run_id, community_id, score, record) "
+    "VALUES (:run_id, :community_id, :score, CAST(:record AS JSONB))"
+)
+
+
+def _json(value: Any) -> Any:
+    return value if isinstance(value, (dict, list)) else json.loads(value)
+
+
+class FraudRingStore:
+    """Writes: save_run(). Reads: latest_run(), rings(), communities()."""
+
+    INSERT_BATCH = 5000
+    KEEP_RUNS = 3
+
+    def __init__(self) -> None:
+        self._db_ready: Optional[bool] = None
+        self._lock = threading.Lock()
+        self._run: Optional[Dict[str, Any]] = None
+        self._rings: List[Dict[str, Any]] = []
+        self._communities: List[Dict[str, Any]] = []
+
+    def _use_db(self) -> bool:
+        if self._db_ready is None:
+            try:
+                postgres_client.init_schema()
+                self._db_ready = True
+            except Exception as e:
+                logger.warning("Postgres not ready; fraud rings kept in memory. err={}", str(e))
+                self._db_ready = False
+        return self._db_ready
+
+    # ── Writes ──────────────────────────────────────────
+
+    def save_run(self, run: Dict[str, Any], rings: List[Dict[str, Any]], communities: List[Dict[str, Any]]) -> None:
+        """
+        run: {"run_id", "fingerprint", "backend", "stats", "created_at"}; rings in
+        ringId order (fraud amount descending), communities by score descending.
+        The run becomes visible only once all its rows are written.
+        """
+        if self._use_db():
+            with postgres_client.session() as s:
+                s.execute(_INSERT_RUN_SQL, {"run_id": run["run_id"], "fingerprint": run["fingerprint"],
+                                            "backend": run["backend"],
+                                            "stats": json.dumps({**run["stats"], "created_at": run["created_at"]})})
+                for i in range(0, len(rings), self.INSERT_BATCH):
+                    s.execute(_INSERT_RING_SQL, [
+                        {"run_id": run["run_id"], "ring_id": r["ringId"], "confidence": r["confidence"],
+                         "fraud_amount": r["fraudAmount"], "ring_size": r["ringSize"], "record": json.dumps(r)}
+                        for r in rings[i:i + self.INSERT_BATCH]
+                    ])
+                for i in range(0, len(communities), self.INSERT_BATCH):
+                    s.execute(_INSERT_COMMUNITY_SQL, [
+                        {"run_id": run["run_id"], "community_id": c["community"], "score": c["score"],
+                         "record": json.dumps(c)}
+                        for c in communities[i:i + self.INSERT_BATCH]
+                    ])
+                s.execute(
+                    text("DELETE FROM fraud_ring_runs WHERE run_id NOT IN "
+                         "(SELECT run_id FROM fraud_ring_runs ORDER BY created_at DESC LIMIT :keep)"),
+                    {"keep": self.KEEP_RUNS},
+                )
+            return
+        with self._lock:
+            self._run, self._rings, self._communities = dict(run), list(rings), list(communities)
+
+    # ── Reads ───────────────────────────────────────────
+
+    def latest_run(self) -> Optional[Dict[str, Any]]:
+        if self._use_db():
+            with postgres_client.session() as s:
+                row = s.execute(text("SELECT run_id, fingerprint, backend, stats FROM fraud_ring_runs "
+                                     "ORDER BY created_at DESC LIMIT 1")).first()
+            if row is None:
+                return None
+            stats = _json(row[3])
+            return {"run_id": row[0], "fingerprint": row[1], "backend": row[2],
+                    "created_at": stats.pop("created_at", None), "stats": stats}
+        with self._lock:
+            return dict(self._run) if self._run else None
+
+    def rings(self, run_id: str, min_confidence: float = 0.0, min_amount: float = 0.0,
+              limit: int = 50, offset: int = 0) -> Tuple[List[Dict[str, Any]], int]:
+        """One page of a run's rings (fraud amount descending) plus the filtered total."""
+        if self._use_db():
+            params = {"run_id": run_id, "min_confidence": min_confidence, "min_amount": min_amount,
+                      "limit": limit, "offset": offset}
+            where = "run_id=:run_id AND confidence >= :min_confidence AND fraud_amount >= :min_amount"
+            with postgres_client.session() as s:
+                total = s.execute(text(f"SELECT count(*) FROM fraud_rings WHERE {where}"), params).scalar_one()
+                rows = s.execute(text(f"SELECT record FROM fraud_rings WHERE {where} "
+                                      "ORDER BY fraud_amount DESC, ring_id LIMIT :limit OFFSET :offset"),
+                                 params).fetchall()
+            return [_json(r[0]) for r in rows], int(total)
+        with self._lock:
+            if not self._run or self._run["run_id"] != run_id:
+                return [], 0
+            hits = [r for r in self._rings if r["confidence"] >= min_confidence and r["fraudAmount"] >= min_amount]
+        return hits[offset:offset + limit], len(hits)
+
+    def communities(self, run_id: str, limit: int = 50, offset: int = 0) -> Tuple[List[Dict[str, Any]], int]:
+        """One page of a run's communities (score descending) plus the total."""
+        if self._use_db():
+            with postgres_client.session() as s:
+                total = s.execute(text("SELECT count(*) FROM fraud_communities WHERE run_id=:run_id"),
+                                  {"run_id": run_id}).scalar_one()
+                rows = s.execute(text("SELECT record FROM fraud_communities WHERE run_id=:run_id "
+                                      "ORDER BY score DESC, community_id LIMIT :limit OFFSET :offset"),
+                                 {"run_id": run_id, "limit": limit, "offset": offset}).fetchall()
+            return [_json(r[0]) for r in rows], int(total)
+        with self._lock:
+            if not self._run or self._run["run_id"] != run_id:
+                return [], 0
+            return self._communities[offset:offset + limit], len(self._communities)
+
+
+fraud_ring_store = FraudRingStore()
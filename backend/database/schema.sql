@@ -35,3 +35,92 @@ CREATE TABLE IF NOT EXISTS bank_transactions (
 
 CREATE INDEX IF NOT EXISTS idx_bank_txn_date ON bank_transactions(txn_date);
 
+
+CREATE TABLE IF NOT EXISTS reconciliation_jobs (
+  job_id TEXT PRIMARY KEY,
+  gstin TEXT NOT NULL,
+  period TEXT NOT NULL,
+  status TEXT NOT NULL,
+  progress NUMERIC NOT NULL DEFAULT 0,
+  summary JSONB,
+  error TEXT,
+  started_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  completed_at TIMESTAMPTZ
+);
+
+CREATE INDEX IF NOT EXISTS idx_recon_jobs_gstin_period ON reconciliation_jobs(gstin, period, started_at DESC);
+
+CREATE TABLE IF NOT EXISTS reconciliation_mismatches (
+  job_id TEXT NOT NULL REFERENCES reconciliation_jobs(job_id) ON DELETE CASCADE,
+  invoice_id TEXT COLLATE "C" NOT NULL,
+  mismatch_type TEXT NOT NULL,
+  risk_level TEXT NOT NULL,
+  severity INTEGER NOT NULL,
+  amount NUMERIC NOT NULL,
+  record JSONB NOT NULL,
+  PRIMARY KEY (job_id, invoice_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_recon_mm_severity ON reconciliation_mismatches(job_id, severity DESC, invoice_id);
+CREATE INDEX IF NOT EXISTS idx_recon_mm_amount ON reconciliation_mismatches(job_id, amount DESC, invoice_id);
+CREATE INDEX IF NOT EXISTS idx_recon_mm_type ON reconciliation_mismatches(job_id, mismatch_type, severity DESC, invoice_id);
+CREATE INDEX IF NOT EXISTS idx_recon_mm_risk ON reconciliation_mismatches(job_id, risk_level, severity DESC, invoice_id);
+
+CREATE TABLE IF NOT EXISTS vendor_scores (
+  gstin TEXT COLLATE "C" PRIMARY KEY,
+  name TEXT NOT NULL,
+  nexus_score INTEGER NOT NULL,
+  grade TEXT NOT NULL,
+  risk_level TEXT NOT NULL,
+  compliance_score INTEGER NOT NULL,
+  filing_rate INTEGER NOT NULL,
+  trend TEXT NOT NULL,
+  record JSONB NOT NULL,
+  run_id TEXT,
+  scored_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_vendor_scores_score ON vendor_scores(nexus_score DESC, gstin);
+CREATE INDEX IF NOT EXISTS idx_vendor_scores_risk ON vendor_scores(risk_level, nexus_score DESC, gstin);
+
+CREATE TABLE IF NOT EXISTS vendor_score_snapshots (
+  gstin TEXT NOT NULL,
+  month TEXT NOT NULL,
+  nexus_score INTEGER NOT NULL,
+  grade TEXT NOT NULL,
+  record JSONB NOT NULL,
+  created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  PRIMARY KEY (gstin, month)
+);
+
+CREATE TABLE IF NOT EXISTS fraud_ring_runs (
+  run_id TEXT PRIMARY KEY,
+  fingerprint TEXT NOT NULL,
+  backend TEXT NOT NULL,
+  stats JSONB NOT NULL,
+  created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_fraud_ring_runs_created ON fraud_ring_runs(created_at DESC);
+
+CREATE TABLE IF NOT EXISTS fraud_rings (
+  run_id TEXT NOT NULL REFERENCES fraud_ring_runs(run_id) ON DELETE CASCADE,
+  ring_id TEXT NOT NULL,
+  confidence NUMERIC NOT NULL,
+  fraud_amount NUMERIC NOT NULL,
+  ring_size INTEGER NOT NULL,
+  record JSONB NOT NULL,
+  PRIMARY KEY (run_id, ring_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_fraud_rings_amount ON fraud_rings(run_id, fraud_amount DESC, ring_id);
+
+CREATE TABLE IF NOT EXISTS fraud_communities (
+  run_id TEXT NOT NULL REFERENCES fraud_ring_runs(run_id) ON DELETE CASCADE,
+  community_id INTEGER NOT NULL,
+  score NUMERIC NOT NULL,
+  record JSONB NOT NULL,
+  PRIMARY KEY (run_id, community_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_fraud_communities_score ON fraud_communities(run_id, score DESC, community_id);
@@ -0,0 +1,145 @@
+"""
+TaxIQ — Vendor Score Store
+Latest NEXUS score per GSTIN, written by the bulk scoring run and read by
+/api/vendors/list with server-side filtering, sorting and pagination.
+Postgres (vendor_scores in schema.sql) when reachable, in-memory otherwise.
+"""
+from __future__ import annotations
+
+import json
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from loguru import logger
+from sqlalchemy import text
+
+from backend.database.postgres_client import postgres_client
+
+
+# API sort key -> (column, record key)
+SORT_COLUMNS = {
+    "nexusScore": ("nexus_score", "nexusScore"),
+    "complianceScore": ("compliance_score", "complianceScore"),
+    "filingRate": ("filing_rate", "filingRate"),
+    "name": ("name", "name"),
+    "gstin": ("gstin", "gstin"),
+}
+
+_UPSERT_SQL = text(
+    "INSERT INTO vendor_scores "
+    "(gstin, name, nexus_score, grade, risk_level, compliance_score, filing_rate, trend, record, run_id, scored_at) "
+    "VALUES (:gstin, :name, :nexus_score, :grade, :risk_level, :compliance_score, :filing_rate, :trend, "
+    "CAST(:record AS JSONB), :run_id, NOW()) "
+    "ON CONFLICT (gstin) DO UPDATE SET "
+    "name=EXCLUDED.name, nexus_score=EXCLUDED.nexus_score, grade=EXCLUDED.grade, "
+    "risk_level=EXCLUDED.risk_level, compliance_score=EXCLUDED.compliance_score, "
+    "filing_rate=EXCLUDED.filing_rate, trend=EXCLUDED.trend, record=EXCLUDED.record, "
+    "run_id=EXCLUDED.run_id, scored_at=NOW()"
+)
+
+
+class VendorScoreStore:
+    """Writes: upsert_many(). Reads: count(), get(), query()."""
+
+    UPSERT_BATCH = 5000
+
+    def __init__(self) -> None:
+        self._db_ready: Optional[bool] = None
+        self._lock = threading.Lock()
+        self._records: Dict[str, Dict[str, Any]] = {}
+        # (sort_by, descending, risk_level) -> GSTINs in page order
+        self._orderings: Dict[Tuple[str, bool, Optional[str]], List[str]] = {}
+
+    def _use_db(self) -> bool:
+        if self._db_ready is None:
+            try:
+                postgres_client.init_schema()
+                self._db_ready = True
+            except Exception as e:
+                logger.warning("Postgres not ready; vendor scores kept in memory. err={}", str(e))
+                self._db_ready = False
+        return self._db_ready
+
+    # ── Writes ──────────────────────────────────────────
+
+    def upsert_many(self, records: Iterable[Dict[str, Any]], run_id: str = "") -> int:
+        rows = list(records)
+        if self._use_db():
+            for i in range(0, len(rows), self.UPSERT_BATCH):
+                params = [
+                    {
+                        "gstin": r["gstin"], "name": r.get("name", ""), "nexus_score": int(r["nexusScore"]),
+                        "grade": r.get("nexusGrade", ""), "risk_level": r.get("riskLevel", ""),
+                        "compliance_score": int(r.get("complianceScore", 0)),
+                        "filing_rate": int(r.get("filingRate", 0)), "trend": r.get("trend", "FLAT"),
+                        "record": json.dumps(r), "run_id": run_id,
+                    }
+                    for r in rows[i:i + self.UPSERT_BATCH]
+                ]
+                with postgres_client.session() as s:
+                    s.execute(_UPSERT_SQL, params)
+            return len(rows)
+        with self._lock:
+            for r in rows:
+                self._records[r["gstin"]] = r
+            self._orderings.clear()
+        return len(rows)
+
+    # ── Reads ───────────────────────────────────────────
+
+    def count(self) -> int:
+        if self._use_db():
+            with postgres_client.session() as s:
+                return int(s.execute(text("SELECT count(*) FROM vendor_scores")).scalar_one())
+        return len(self._records)
+
+    def get(self, gstin: str) -> Optional[Dict[str, Any]]:
+        if self._use_db():
+            with postgres_client.session() as s:
+                row = s.execute(text("SELECT record FROM vendor_scores WHERE gstin=:gstin"),
+                                {"gstin": gstin}).first()
+            if row is None:
+                return None
+            return row[0] if isinstance(row[0], dict) else json.loads(row[0])
+        return self._records.get(gstin)
+
+    def query(
+        self,
+        risk_level: Optional[str] = None,
+        sort_by: str = "nexusScore",
+        order: str = "desc",
+        page: int = 1,
+        limit: int = 50,
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """One page of scores plus the filtered total; ties break on GSTIN."""
+        page = max(1, page)
+        offset = (page - 1) * limit
+        column, key = SORT_COLUMNS.get(sort_by, SORT_COLUMNS["nexusScore"])
+        descending = order.lower() == "desc"
+        if self._use_db():
+            where = "TRUE"
+            params: Dict[str, Any] = {"limit": limit, "offset": offset}
+            if risk_level:
+                where = "risk_level=:risk_level"
+                params["risk_level"] = risk_level
+            direction = "DESC" if descending else "ASC"
+            with postgres_client.session() as s:
+                total = s.execute(text(f"SELECT count(*) FROM vendor_scores WHERE {where}"), params).scalar_one()
+                rows = s.execute(
+                    text(f"SELECT record FROM vendor_scores WHERE {where} "
+                         f"ORDER BY {column} {direction}, gstin ASC LIMIT :limit OFFSET :offset"),
+                    params,
+                ).fetchall()
+            return [r[0] if isinstance(r[0], dict) else json.loads(r[0]) for r in rows], int(total)
+
+        with self._lock:
+            cache_key = (key, descending, risk_level)
+            ids = self._orderings.get(cache_key)
+            if ids is None:
+                ids = sorted(g for g, r in self._records.items() if not risk_level or r.get("riskLevel") == risk_level)
+                ids.sort(key=lambda g: self._records[g].get(key, 0), reverse=descending)
+                self._orderings[cache_key] = ids
+            return [self._records[g] for g in ids[offset:offset + limit]], len(ids)
+
+
+score_store = VendorScoreStore()
@@ -0,0 +1,136 @@
+"""
+TaxIQ — Vendor Score Snapshots
+Monthly NEXUS score time series per GSTIN (one row per gstin + "YYYY-MM").
+Appended by the bulk scoring run; read by the vendor history / predict
+endpoints with range queries, so they never touch GSTN.
+Postgres (vendor_score_snapshots in schema.sql) when reachable, in-memory otherwise.
+"""
+from __future__ import annotations
+
+import json
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+
+from loguru import logger
+from sqlalchemy import text
+
+from backend.database.postgres_client import postgres_client
+
+
+_UPSERT_SQL = text(
+    "INSERT INTO vendor_score_snapshots (gstin, month, nexus_score, grade, record, created_at) "
+    "VALUES (:gstin, :month, :nexus_score, :grade, CAST(:record AS JSONB), NOW()) "
+    "ON CONFLICT (gstin, month) DO UPDATE SET "
+    "nexus_score=EXCLUDED.nexus_score, grade=EXCLUDED.grade, record=EXCLUDED.record, created_at=NOW()"
+)
+
+
+class ScoreSnapshotStore:
+    """
+    Snapshot dict: {"gstin", "month", "score", "grade", "filed", "factors", "source"}.
+    Re-appending the same (gstin, month) replaces it, so the last run of a
+    month is what that month keeps.
+    """
+
+    UPSERT_BATCH = 5000
+
+    def __init__(self) -> None:
+        self._db_ready: Optional[bool] = None
+        self._lock = threading.Lock()
+        self._series: Dict[str, Dict[str, Dict[str, Any]]] = {}
+
+    def _use_db(self) -> bool:
+        if self._db_ready is None:
+            try:
+                postgres_client.init_schema()
+                self._db_ready = True
+            except Exception as e:
+                logger.warning("Postgres not ready; score snapshots kept in memory. err={}", str(e))
+                self._db_ready = False
+        return self._db_ready
+
+    # ── Writes ──────────────────────────────────────────
+
+    def append(self, snapshots: Iterable[Dict[str, Any]]) -> int:
+        rows = list(snapshots)
+        if self._use_db():
+            for i in range(0, len(rows), self.UPSERT_BATCH):
+                params = [
+                    {"gstin": r["gstin"], "month": r["month"], "nexus_score": int(r["score"]),
+                     "grade": r.get("grade", ""), "record": json.dumps(r)}
+                    for r in rows[i:i + self.UPSERT_BATCH]
+                ]
+                with postgres_client.session() as s:
+                    s.execute(_UPSERT_SQL, params)
+            return len(rows)
+        with self._lock:
+            for r in rows:
+                self._series.setdefault(r["gstin"], {})[r["month"]] = r
+        return len(rows)
+
+    # ── Reads ───────────────────────────────────────────
+
+    def range(self, gstin: str, start_month: Optional[str] = None,
+              end_month: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Snapshots with start_month <= month <= end_month, oldest first."""
+        if self._use_db():
+            where = "gstin=:gstin"
+            params: Dict[str, Any] = {"gstin": gstin}
+            if start_month:
+                where += " AND month >= :start"
+                params["start"] = start_month
+            if end_month:
+                where += " AND month <= :end"
+                params["end"] = end_month
+            with postgres_client.session() as s:
+                rows = s.execute(
+                    text(f"SELECT record FROM vendor_score_snapshots WHERE {where} ORDER BY month ASC"), params,
+                ).fetchall()
+            return [r[0] if isinstance(r[0], dict) else json.loads(r[0]) for r in rows]
+        series = self._series.get(gstin, {})
+        return [
+            series[m] for m in sorted(series)
+            if (not start_month or m >= start_month) and (not end_month or m <= end_month)
+        ]
+
+    def history(self, gstin: str, months: int) -> List[Dict[str, Any]]:
+        """The latest `months` snapshots, oldest first."""
+        if months <= 0:
+            return []
+        if self._use_db():
+            with postgres_client.session() as s:
+                rows = s.execute(
+                    text("SELECT record FROM vendor_score_snapshots WHERE gstin=:gstin "
+                         "ORDER BY month DESC LIMIT :months"),
+                    {"gstin": gstin, "months": months},
+                ).fetchall()
+            return [r[0] if isinstance(r[0], dict) else json.loads(r[0]) for r in reversed(rows)]
+        series = self._series.get(gstin, {})
+        return [series[m] for m in sorted(series)[-months:]]
+
+    def months(self, gstins: Iterable[str]) -> Dict[str, set]:
+        """Months already stored per GSTIN (GSTINs without snapshots are left out)."""
+        gstins = list(gstins)
+        out: Dict[str, set] = {}
+        if self._use_db():
+            for i in range(0, len(gstins), self.UPSERT_BATCH):
+                with postgres_client.session() as s:
+                    rows = s.execute(
+                        text("SELECT gstin, month FROM vendor_score_snapshots WHERE gstin = ANY(:gstins)"),
+                        {"gstins": gstins[i:i + self.UPSERT_BATCH]},
+                    ).fetchall()
+                for gstin, month in rows:
+                    out.setdefault(gstin, set()).add(month)
+            return out
+        with self._lock:
+            for gstin in gstins:
+                if gstin in self._series:
+                    out[gstin] = set(self._series[gstin])
+        return out
+
+    def latest(self, gstin: str) -> Optional[Dict[str, Any]]:
+        snaps = self.history(gstin, 1)
+        return snaps[0] if snaps else None
+
+
+snapshot_store = ScoreSnapshotStore()
@@ -0,0 +1,92 @@
+"""
+TaxIQ — ITC Communities
+Label propagation over CLAIMED_ITC_FROM, run on the CompactGraph edge arrays
+with array operations (no per-node Python loop):
+  - edges taken as undirected; a GSTIN adopts the label most common among
+    its neighbours; ties are broken at random, and after a few warm-up
+    rounds a node keeps its own label on a tie
+  - each round updates a random half of the nodes (semi-synchronous), which
+    stops the label swapping plain synchronous rounds fall into on
+    star- and ring-shaped claim patterns
+GSTINs without ITC edges, and invoices, get no community (-1).
+"""
+from __future__ import annotations
+
+from typing import Tuple
+
+import numpy as np
+
+from backend.graph.compact_graph import CLAIMED_ITC_FROM, CompactGraph
+
+MAX_ROUNDS = 30
+# Rounds with ties broken purely at random before a node keeps its label on a
+# tie; lets small rings settle on one label instead of freezing half-split
+WARMUP_ROUNDS = 8
+# Stop once fewer than this share of the connected nodes changed label in a round
+TOLERANCE = 0.001
+
+
+def propagate_labels(n: int, src: np.ndarray, dst: np.ndarray, max_rounds: int = MAX_ROUNDS,
+                     tol: float = TOLERANCE, seed: int = 0) -> Tuple[np.ndarray, int]:
+    """
+    Community label per node 0..n-1 for the undirected edges src[i] - dst[i]
+    (-1 for nodes without edges), as dense ids 0..k-1, largest community first.
+    Returns (labels, rounds run).
+    """
+    src, dst = np.asarray(src, dtype=np.int64), np.asarray(dst, dtype=np.int64)
+    keep = src != dst
+    node = np.concatenate([src[keep], dst[keep]])
+    nbr = np.concatenate([dst[keep], src[keep]])
+    labels = np.full(n, -1, dtype=np.int64)
+    if not len(node):
+        return labels, 0
+    active = np.unique(node)
+    labels[active] = active
+    rng = np.random.default_rng(seed)
+
+    rounds = 0
+    for rounds in range(1, max_rounds + 1):
+        # (node, neighbour label) pairs sorted, then counted per run
+        key = np.sort(node * n + labels[nbr])
+        starts = np.flatnonzero(np.r_[True, key[1:] != key[:-1]])
+        count = np.diff(np.r_[starts, len(key)]).astype(np.float64)
+        pair = key[starts]
+        owner, lab = pair // n, pair % n
+        if rounds > WARMUP_ROUNDS:
+            count += 0.5 * (lab == labels[owner])  # ties keep the current label...
+        count += 0.25 * rng.random(len(count))  # ...or go to a random one of the tied labels
+
+        groups = np.flatnonzero(np.r_[True, owner[1:] != owner[:-1]])
+        best = np.maximum.reduceat(count, groups)
+        sizes = np.diff(np.r_[groups, len(owner)])
+        is_best = count == np.repeat(best, sizes)
+        cand_owner, cand_lab = owner[is_best], lab[is_best]
+        first = np.flatnonzero(np.r_[True, cand_owner[1:] != cand_owner[:-1]])
+        winners, new = cand_owner[first], cand_lab[first]
+
+        changed = new != labels[winners]
+        if rounds > WARMUP_ROUNDS and changed.sum() <= tol * len(active):
+            break
+        move = changed & (rng.random(len(winners)) < 0.5)
+        labels[winners[move]] = new[move]
+    return _dense(labels), rounds
+
+
+def _dense(labels: np.ndarray) -> np.ndarray:
+    """Relabel to 0..k-1 by community size (descending), -1 kept."""
+    out = np.full(len(labels), -1, dtype=np.int32)
+    has = labels >= 0
+    if not has.any():
+        return out
+    uniq, inverse, counts = np.unique(labels[has], return_inverse=True, return_counts=True)
+    rank = np.empty(len(uniq), dtype=np.int32)
+    rank[np.lexsort((uniq, -counts))] = np.arange(len(uniq), dtype=np.int32)
+    out[has] = rank[inverse]
+    return out
+
+
+def itc_communities(g: CompactGraph, max_rounds: int = MAX_ROUNDS, seed: int = 0) -> np.ndarray:
+    """Community per node of g over its CLAIMED_ITC_FROM edges (see propagate_labels)."""
+    src, dst, _ = g.edge_arrays(CLAIMED_ITC_FROM)
+    labels, _ = propagate_labels(len(g), src.copy(), dst.copy(), max_rounds=max_rounds, seed=seed)
+    return labels
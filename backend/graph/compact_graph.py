@@ -0,0 +1,537 @@
+"""
+TaxIQ — Compact In-Memory Graph
+Fallback store behind GraphStore when Neo4j is unavailable:
+  - node ids (GSTINs, invoice ids) interned to ints 0..n-1
+  - node attributes in NumPy columns (kind, risk_score, registration_date,
+    invoice date / value / tax); only names and GSTIN labels stay Python strings
+  - one edge table per edge type (ISSUED, RECEIVED_BY, CLAIMED_ITC_FROM)
+    stored as int32 src / dst and float64 value arrays, with out- and in-
+    CSR adjacency built lazily after writes
+Degrees come from per-table count arrays (CLAIMED_ITC_FROM) or CSR offsets,
+so a degree lookup is O(1) and no reader filters edges by a type attribute.
+"""
+from __future__ import annotations
+
+import sys
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import networkx as nx
+import numpy as np
+
+# Node kinds
+BARE, GSTIN, INVOICE = 0, 1, 2
+_LABELS = {GSTIN: "GSTIN", INVOICE: "Invoice"}
+
+ISSUED = "ISSUED"
+RECEIVED_BY = "RECEIVED_BY"
+CLAIMED_ITC_FROM = "CLAIMED_ITC_FROM"
+# Only ITC claims carry a value that is overwritten in place; invoice edges are append-only
+_DEDUP_TYPES = {CLAIMED_ITC_FROM}
+
+_NAT = np.datetime64("NaT", "D")
+
+
+def _day(value: Any) -> np.datetime64:
+    try:
+        return np.datetime64(str(value)[:10], "D") if value else _NAT
+    except ValueError:
+        return _NAT
+
+
+def _pack_strings(items: List[str]) -> np.ndarray:
+    """Strings as one NUL-separated UTF-8 byte array (count kept in the first 8 bytes)."""
+    head = np.array([len(items)], dtype=np.int64).view(np.uint8)
+    return np.concatenate([head, np.frombuffer("\0".join(items).encode("utf-8"), dtype=np.uint8)])
+
+
+def _unpack_strings(blob: np.ndarray) -> List[str]:
+    blob = np.asarray(blob, dtype=np.uint8)
+    count = int(blob[:8].view(np.int64)[0])
+    return bytes(blob[8:]).decode("utf-8").split("\0") if count else []
+
+
+class _Grow:
+    """Append-only NumPy buffer, grown by half its size when full."""
+
+    def __init__(self, dtype: Any, fill: Any = 0) -> None:
+        self._a = np.full(64, fill, dtype=dtype)
+        self._fill = fill
+        self.n = 0
+
+    def append(self, x: Any) -> None:
+        if self.n == len(self._a):
+            self._grow(self.n + 1)
+        self._a[self.n] = x
+        self.n += 1
+
+    def extend(self, values: np.ndarray) -> None:
+        if self.n + len(values) > len(self._a):
+            self._grow(self.n + len(values))
+        self._a[self.n:self.n + len(values)] = values
+        self.n += len(values)
+
+    def extend_to(self, n: int) -> None:
+        """Grow to n items, new ones at the fill value."""
+        if n > len(self._a):
+            self._grow(n)
+        self.n = max(self.n, n)
+
+    def _grow(self, need: int) -> None:
+        cap = max(need, len(self._a) + len(self._a) // 2)
+        a = np.full(cap, self._fill, dtype=self._a.dtype)
+        a[:self.n] = self._a[:self.n]
+        self._a = a
+
+    def view(self) -> np.ndarray:
+        return self._a[:self.n]
+
+    def replace(self, values: np.ndarray) -> None:
+        self._a = np.array(values, dtype=self._a.dtype)
+        self.n = len(values)
+        if not len(self._a):
+            self._a = np.full(64, self._fill, dtype=self._a.dtype)
+
+    def __getitem__(self, i: Any) -> Any:
+        # plain ints index the buffer directly (hot path); callers stay below n
+        return self._a[i] if type(i) is int else self.view()[i]
+
+    def __setitem__(self, i: Any, x: Any) -> None:
+        if type(i) is int:
+            self._a[i] = x
+        else:
+            self.view()[i] = x
+
+    @property
+    def nbytes(self) -> int:
+        return self._a.nbytes
+
+
+class _EdgeTable:
+    """Edges of one type. CSR views: (indptr, neighbours, values)."""
+
+    def __init__(self, dedup: bool) -> None:
+        self.dedup = dedup
+        self.src = _Grow(np.int32)
+        self.dst = _Grow(np.int32)
+        self.val = _Grow(np.float64)
+        self.version = 0
+        # (src << 32 | dst) -> row, and live degree counts, for overwrite-in-place tables
+        self._row: Dict[int, int] = {}
+        self.out_count = _Grow(np.int32)
+        self.in_count = _Grow(np.int32)
+        self._compacted = 0
+        self._csr: Dict[str, Tuple[int, Tuple[np.ndarray, np.ndarray, np.ndarray]]] = {}
+
+    def add(self, u: int, v: int, value: float, n_nodes: int) -> bool:
+        """True when (u, v) is a new edge."""
+        self.version += 1
+        if self._csr:
+            self._csr.clear()  # stale after any write; rebuilt on the next read
+        if self.dedup:
+            key = (u << 32) | v
+            row = self._row.get(key)
+            if row is not None:
+                self.val[row] = value
+                return False
+            self._row[key] = self.src.n
+            if self.out_count.n < n_nodes:
+                self.out_count.extend_to(n_nodes)
+                self.in_count.extend_to(n_nodes)
+            self.out_count[u] += 1
+            self.in_count[v] += 1
+        self.src.append(u)
+        self.dst.append(v)
+        self.val.append(value)
+        return True
+
+    def add_many(self, u: np.ndarray, v: np.ndarray, value: np.ndarray, n_nodes: int) -> int:
+        """add() for arrays of edges in order (a repeated edge keeps its last value); returns how many were new."""
+        if not len(u):
+            return 0
+        self.version += 1
+        if self._csr:
+            self._csr.clear()
+        if not self.dedup:
+            self.src.extend(u)
+            self.dst.extend(v)
+            self.val.extend(value)
+            return len(u)
+        rows = np.empty(len(u), dtype=np.int64)
+        new = np.zeros(len(u), dtype=bool)
+        nxt = self.src.n
+        get = self._row.get
+        for j, key in enumerate(((u.astype(np.int64) << 32) | v).tolist()):
+            row = get(key)
+            if row is None:
+                row = self._row[key] = nxt
+                new[j] = True
+                nxt += 1
+            rows[j] = row
+        self.src.extend(u[new])
+        self.dst.extend(v[new])
+        self.val.extend(value[new])
+        # last write wins for edges repeated within the batch
+        _, last_from_end = np.unique(rows[::-1], return_index=True)
+        last = len(rows) - 1 - last_from_end
+        self.val[rows[last]] = value[last]
+        if self.out_count.n < n_nodes:
+            self.out_count.extend_to(n_nodes)
+            self.in_count.extend_to(n_nodes)
+        np.add.at(self.out_count.view(), u[new], 1)
+        np.add.at(self.in_count.view(), v[new], 1)
+        return int(new.sum())
+
+    def value(self, u: int, v: int, n_nodes: int) -> Optional[float]:
+        if self.dedup:
+            row = self._row.get((u << 32) | v)
+            return None if row is None else float(self.val[row])
+        indptr, nbrs, vals = self.csr("out", n_nodes)
+        hit = np.flatnonzero(nbrs[indptr[u]:indptr[u + 1]] == v)
+        return float(vals[indptr[u] + hit[-1]]) if len(hit) else None
+
+    def __len__(self) -> int:
+        if not self.dedup:
+            self._compact()
+        return self.src.n
+
+    def _compact(self) -> None:
+        """Drop repeated (src, dst) rows of append-only tables, keeping the last one."""
+        if self.dedup or self._compacted == self.version:
+            return
+        src, dst = self.src.view(), self.dst.view()
+        key = (src.astype(np.int64) << 32) | dst
+        _, first_from_end = np.unique(key[::-1], return_index=True)
+        keep = np.sort(len(key) - 1 - first_from_end)
+        if len(keep) != len(key):
+            self.src.replace(src[keep])
+            self.dst.replace(dst[keep])
+            self.val.replace(self.val.view()[keep])
+        self._compacted = self.version
+
+    def csr(self, direction: str, n_nodes: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        self._compact()
+        cached = self._csr.get(direction)
+        if cached and cached[0] == self.version and len(cached[1][0]) >= n_nodes + 1:
+            return cached[1]
+        keys, other = (self.src.view(), self.dst.view()) if direction == "out" else (self.dst.view(), self.src.view())
+        order = np.argsort(keys, kind="stable")
+        indptr = np.zeros(n_nodes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(keys, minlength=n_nodes), out=indptr[1:])
+        built = (indptr, other[order], self.val.view()[order])
+        self._csr[direction] = (self.version, built)
+        return built
+
+    def degrees(self, direction: str, n_nodes: int) -> np.ndarray:
+        if self.dedup:
+            counts = self.out_count if direction == "out" else self.in_count
+            counts.extend_to(n_nodes)
+            return counts.view()
+        return np.diff(self.csr(direction, n_nodes)[0])
+
+    @property
+    def nbytes(self) -> int:
+        total = self.src.nbytes + self.dst.nbytes + self.val.nbytes + self.out_count.nbytes + self.in_count.nbytes
+        total += sum(arr.nbytes for _, arrs in self._csr.values() for arr in arrs)
+        return total + sys.getsizeof(self._row) + 32 * len(self._row)
+
+
+class CompactGraph:
+    """
+    Directed multi-type graph with interned node ids. Readers get arrays
+    (degrees, CSR, attribute columns) indexed by node id; ids() / names()
+    translate between GSTIN strings and ids.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.RLock()
+        self._ids: Dict[str, int] = {}
+        self._names: List[str] = []
+        self.kind = _Grow(np.int8, BARE)
+        # NaN = never set (readers apply their own default)
+        self.risk_score = _Grow(np.float64, np.nan)
+        self.registration_date = _Grow("datetime64[D]", _NAT)
+        self.invoice_date = _Grow("datetime64[D]", _NAT)
+        self.invoice_value = _Grow(np.float64, 0.0)
+        self.invoice_tax = _Grow(np.float64, 0.0)
+        # GSTIN display attributes: node id -> (name, state, type)
+        self._labels: Dict[int, Tuple[str, str, str]] = {}
+        self._edges: Dict[str, _EdgeTable] = {}
+        self.version = 0
+        # Optional write-ahead hook (graph_snapshot.EdgeLog): every node and edge write is recorded
+        self.journal: Optional[Any] = None
+
+    # ── Nodes ───────────────────────────────────────────
+
+    def _intern(self, name: str) -> int:
+        i = self._ids.get(name)
+        if i is None:
+            i = len(self._names)
+            self._ids[name] = i
+            self._names.append(name)
+            for col in (self.kind, self.risk_score, self.registration_date,
+                        self.invoice_date, self.invoice_value, self.invoice_tax):
+                col.extend_to(i + 1)
+        return i
+
+    def add_gstin(self, gstin: str, name: str, state: str, type: str,
+                  risk_score: float = 0.1, registration_date: Optional[str] = None) -> int:
+        with self._lock:
+            i = self._intern(gstin)
+            self.kind[i] = GSTIN
+            self.risk_score[i] = risk_score
+            if registration_date:
+                self.registration_date[i] = _day(registration_date)
+            self._labels[i] = (name, sys.intern(state or ""), sys.intern(type or ""))
+            self.version += 1
+            if self.journal is not None:
+                self.journal.gstin(gstin, name, state, type, risk_score, registration_date)
+            return i
+
+    def add_invoice(self, invoice_id: str, date: str, value: float, tax: float) -> int:
+        with self._lock:
+            i = self._intern(invoice_id)
+            self.kind[i] = INVOICE
+            self.invoice_date[i] = _day(date)
+            self.invoice_value[i] = value
+            self.invoice_tax[i] = tax
+            self.version += 1
+            if self.journal is not None:
+                self.journal.invoice(invoice_id, date, value, tax)
+            return i
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._ids
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def id_of(self, name: str) -> Optional[int]:
+        return self._ids.get(name)
+
+    def ids(self, names: Sequence[str]) -> np.ndarray:
+        """Node id per name, -1 when unknown."""
+        get = self._ids.get
+        return np.fromiter((get(n, -1) for n in names), dtype=np.int64, count=len(names))
+
+    def name(self, i: int) -> str:
+        return self._names[i]
+
+    def names(self, ids: Optional[Iterable[int]] = None) -> List[str]:
+        if ids is None:
+            return list(self._names)
+        return [self._names[i] for i in ids]
+
+    def gstin_ids(self) -> np.ndarray:
+        return np.flatnonzero(self.kind.view() == GSTIN)
+
+    def label(self, i: int) -> Optional[str]:
+        return _LABELS.get(int(self.kind[i]))
+
+    def display_name(self, i: int) -> str:
+        lab = self._labels.get(i)
+        return lab[0] if lab else self._names[i]
+
+    def node_attrs(self, name: str) -> Dict[str, Any]:
+        """networkx-style attribute dict for one node (empty when unknown)."""
+        i = self._ids.get(name)
+        if i is None:
+            return {}
+        kind = int(self.kind[i])
+        attrs: Dict[str, Any] = {}
+        if kind == GSTIN:
+            n, state, typ = self._labels[i]
+            attrs = {"label": "GSTIN", "gstin": name, "name": n, "state": state, "type": typ}
+            reg = self.registration_date[i]
+            if not np.isnat(reg):
+                attrs["registration_date"] = str(reg)
+        elif kind == INVOICE:
+            date = self.invoice_date[i]
+            attrs = {"label": "Invoice", "invoice_id": name, "date": "" if np.isnat(date) else str(date),
+                     "value": float(self.invoice_value[i]), "tax": float(self.invoice_tax[i])}
+        risk = self.risk_score[i]
+        if not np.isnan(risk):
+            attrs["risk_score"] = float(risk)
+        return attrs
+
+    # ── Edges ───────────────────────────────────────────
+
+    def _table(self, etype: str) -> _EdgeTable:
+        table = self._edges.get(etype)
+        if table is None:
+            table = self._edges[etype] = _EdgeTable(dedup=etype in _DEDUP_TYPES)
+        return table
+
+    def add_edge(self, u: str, v: str, etype: str, value: float = 0.0) -> bool:
+        """Add (or, for CLAIMED_ITC_FROM, overwrite the value of) u -> v. True when new."""
+        with self._lock:
+            ui, vi = self._intern(u), self._intern(v)
+            self.version += 1
+            if self.journal is not None:
+                self.journal.edges((u,), (v,), etype, (float(value),))
+            return self._table(etype).add(ui, vi, float(value), len(self._names))
+
+    def add_edges(self, us: Sequence[str], vs: Sequence[str], etype: str,
+                  values: Optional[Sequence[float]] = None) -> int:
+        """Bulk add_edge() in order, one version bump for the batch; returns how many edges were new."""
+        with self._lock:
+            intern = self._intern
+            ui = np.fromiter((intern(u) for u in us), dtype=np.int32, count=len(us))
+            vi = np.fromiter((intern(v) for v in vs), dtype=np.int32, count=len(vs))
+            val = np.zeros(len(ui)) if values is None else np.asarray(values, dtype=np.float64)
+            self.version += 1
+            if self.journal is not None:
+                self.journal.edges(us, vs, etype, val.tolist())
+            return self._table(etype).add_many(ui, vi, val, len(self._names))
+
+    def edge_types(self) -> List[str]:
+        return list(self._edges)
+
+    def edge_version(self, etype: str) -> int:
+        table = self._edges.get(etype)
+        return table.version if table else 0
+
+    def number_of_edges(self, etype: Optional[str] = None) -> int:
+        with self._lock:
+            if etype is not None:
+                table = self._edges.get(etype)
+                return len(table) if table else 0
+            return sum(len(t) for t in self._edges.values())
+
+    def edge_arrays(self, etype: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(src ids, dst ids, values) for one edge type, one row per distinct edge."""
+        with self._lock:
+            table = self._edges.get(etype)
+            if table is None:
+                empty = np.zeros(0, dtype=np.int32)
+                return empty, empty, np.zeros(0)
+            table._compact()
+            return table.src.view(), table.dst.view(), table.val.view()
+
+    def edges(self, etype: str) -> Iterator[Tuple[str, str, float]]:
+        src, dst, val = self.edge_arrays(etype)
+        names = self._names
+        for u, v, w in zip(src.tolist(), dst.tolist(), val.tolist()):
+            yield names[u], names[v], w
+
+    def edge_value(self, u: str, v: str, etype: str) -> Optional[float]:
+        """Value of u -> v, None when there is no such edge."""
+        with self._lock:
+            table = self._edges.get(etype)
+            ui, vi = self._ids.get(u), self._ids.get(v)
+            if table is None or ui is None or vi is None:
+                return None
+            return table.value(ui, vi, len(self._names))
+
+    def csr(self, etype: str, direction: str = "out") -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(indptr, neighbour ids, edge values); neighbours of i are [indptr[i]:indptr[i+1]]."""
+        with self._lock:
+            return self._table(etype).csr(direction, len(self._names))
+
+    def out_degrees(self, etype: str) -> np.ndarray:
+        with self._lock:
+            return self._table(etype).degrees("out", len(self._names))
+
+    def in_degrees(self, etype: str) -> np.ndarray:
+        with self._lock:
+            return self._table(etype).degrees("in", len(self._names))
+
+    def out_degree(self, name: str, etype: str) -> int:
+        i = self._ids.get(name)
+        return 0 if i is None else int(self.out_degrees(etype)[i])
+
+    def in_degree(self, name: str, etype: str) -> int:
+        i = self._ids.get(name)
+        return 0 if i is None else int(self.in_degrees(etype)[i])
+
+    def successors(self, name: str, etype: str) -> List[Tuple[str, float]]:
+        i = self._ids.get(name)
+        if i is None:
+            return []
+        indptr, nbrs, vals = self.csr(etype, "out")
+        return [(self._names[j], w) for j, w in zip(nbrs[indptr[i]:indptr[i + 1]].tolist(),
+                                                     vals[indptr[i]:indptr[i + 1]].tolist())]
+
+    # ── Export ──────────────────────────────────────────
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """
+        Copy of the whole graph as flat arrays (see from_arrays): NUL-joined
+        UTF-8 string tables for names and GSTIN labels, attribute columns, and
+        src / dst / value per edge type.
+        """
+        with self._lock:
+            label_ids = np.fromiter(self._labels, dtype=np.int64, count=len(self._labels))
+            labels = [self._labels[i] for i in label_ids.tolist()]
+            out: Dict[str, np.ndarray] = {
+                "names": _pack_strings(self._names),
+                "kind": self.kind.view().copy(),
+                "risk_score": self.risk_score.view().copy(),
+                "registration_date": self.registration_date.view().copy(),
+                "invoice_date": self.invoice_date.view().copy(),
+                "invoice_value": self.invoice_value.view().copy(),
+                "invoice_tax": self.invoice_tax.view().copy(),
+                "label_ids": label_ids,
+                "label_name": _pack_strings([lab[0] for lab in labels]),
+                "label_state": _pack_strings([lab[1] for lab in labels]),
+                "label_type": _pack_strings([lab[2] for lab in labels]),
+                "edge_types": _pack_strings(list(self._edges)),
+            }
+            for k, (etype, table) in enumerate(self._edges.items()):
+                table._compact()
+                out[f"e{k}_src"] = table.src.view().copy()
+                out[f"e{k}_dst"] = table.dst.view().copy()
+                out[f"e{k}_val"] = table.val.view().copy()
+            return out
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray]) -> "CompactGraph":
+        """Rebuild a graph from to_arrays() output (arrays may be read-only memory maps)."""
+        g = cls()
+        g._names = _unpack_strings(arrays["names"])
+        g._ids = dict(zip(g._names, range(len(g._names))))
+        for col in ("kind", "risk_score", "registration_date", "invoice_date", "invoice_value", "invoice_tax"):
+            getattr(g, col).replace(arrays[col])
+        label_ids = np.asarray(arrays["label_ids"]).tolist()
+        states = [sys.intern(x) for x in _unpack_strings(arrays["label_state"])]
+        types = [sys.intern(x) for x in _unpack_strings(arrays["label_type"])]
+        g._labels = dict(zip(label_ids, zip(_unpack_strings(arrays["label_name"]), states, types)))
+        n = len(g._names)
+        for k, etype in enumerate(_unpack_strings(arrays["edge_types"])):
+            table = g._table(etype)
+            src, dst = np.asarray(arrays[f"e{k}_src"]), np.asarray(arrays[f"e{k}_dst"])
+            table.src.replace(src)
+            table.dst.replace(dst)
+            table.val.replace(arrays[f"e{k}_val"])
+            if table.dedup:
+                keys = (src.astype(np.int64) << 32) | dst
+                table._row = dict(zip(keys.tolist(), range(len(keys))))
+                table.out_count.replace(np.bincount(src, minlength=n).astype(np.int32))
+                table.in_count.replace(np.bincount(dst, minlength=n).astype(np.int32))
+            table.version = table._compacted = 1
+        g.version = 1
+        return g
+
+    def to_networkx(self) -> nx.DiGraph:
+        """networkx copy with the original attribute layout, for ad-hoc analysis."""
+        with self._lock:
+            g = nx.DiGraph()
+            for name in self._names:
+                g.add_node(name, **self.node_attrs(name))
+            for etype in self._edges:
+                for u, v, w in self.edges(etype):
+                    if etype in _DEDUP_TYPES:
+                        g.add_edge(u, v, type=etype, value=w)
+                    else:
+                        g.add_edge(u, v, type=etype)
+            return g
+
+    def memory_bytes(self) -> int:
+        """Approximate resident size: arrays, intern table and label strings."""
+        cols = (self.kind, self.risk_score, self.registration_date,
+                self.invoice_date, self.invoice_value, self.invoice_tax)
+        total = sum(c.nbytes for c in cols) + sum(t.nbytes for t in self._edges.values())
+        total += sys.getsizeof(self._ids) + sys.getsizeof(self._names)
+        total += sum(sys.getsizeof(n) for n in self._names) + 28 * len(self._names)
+        total += sys.getsizeof(self._labels) + sum(sys.getsizeof(lab[0]) + 64 for lab in self._labels.values())
+        return total
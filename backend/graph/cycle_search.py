@@ -0,0 +1,283 @@
+"""
+TaxIQ — Bounded Circular-Trading Ring Search
+Whole-graph enumeration of CLAIMED_ITC_FROM rings that stays bounded on large
+graphs, used where a full pass is unavoidable (ring index rebuilds, top-K
+ring queries over a graph the index has not seen):
+  1. split into strongly connected components; components smaller than the
+     minimum ring length cannot hold a ring and are skipped
+  2. inside a component, enumerate each ring once from its lowest-ranked
+     node with a DFS limited to the maximum ring length, entering only nodes
+     that can still get back to the start within the remaining hops
+  3. with top_k, rank nodes and edges by ITC value and stop as soon as no
+     unexplored ring can beat the current k-th best ring value
+  4. honour a wall-clock budget; the result says whether it was complete
+"""
+from __future__ import annotations
+
+import heapq
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+MIN_RING = 3
+MAX_RING = 8
+
+# Exact distances back to the start are only computed this many hops deep: the
+# DFS covers the first half of a ring and this ball the second, and a full
+# 7-hop ball around a hub is most of the component
+BACK_DEPTH = (MAX_RING - 1) // 2
+# Clock is checked every this many DFS steps
+_CLOCK_EVERY = 4096
+
+
+@dataclass
+class RingSearchResult:
+    # (ring value, ring nodes in edge order starting at the smallest node), value descending
+    rings: List[Tuple[float, Tuple[Hashable, ...]]]
+    complete: bool
+    stats: Dict[str, Any] = field(default_factory=dict)
+
+
+def canonical_ring(nodes: Iterable[Hashable]) -> Tuple[Hashable, ...]:
+    """Rotate a cycle (edge order, no repeated end node) to start at its smallest node."""
+    nodes = list(nodes)
+    i = nodes.index(min(nodes))
+    return tuple(nodes[i:] + nodes[:i])
+
+
+class _Budget(Exception):
+    pass
+
+
+def find_rings(
+    edges: Iterable[Tuple[Hashable, Hashable, float]],
+    min_len: int = MIN_RING,
+    max_len: int = MAX_RING,
+    top_k: Optional[int] = None,
+    budget_s: Optional[float] = None,
+) -> RingSearchResult:
+    """
+    Rings of min_len..max_len nodes over (from, to, value) edges.
+    top_k=None enumerates every ring; otherwise only the top_k by summed edge value.
+    """
+    started = time.perf_counter()
+    deadline = started + budget_s if budget_s else None
+
+    # Intern nodes; parallel edges keep the last value, self-loops are dropped
+    ids: Dict[Hashable, int] = {}
+    names: List[Hashable] = []
+    adj: List[Dict[int, float]] = []
+    for u, v, val in edges:
+        if u == v:
+            continue
+        for x in (u, v):
+            if x not in ids:
+                ids[x] = len(names)
+                names.append(x)
+                adj.append({})
+        adj[ids[u]][ids[v]] = float(val or 0.0)
+
+    comps = [c for c in _sccs(adj) if len(c) >= min_len]
+    stats: Dict[str, Any] = {
+        "nodes": len(names), "edges": sum(len(a) for a in adj),
+        "sccs": len(comps), "largest_scc": max((len(c) for c in comps), default=0),
+        "steps": 0,
+    }
+
+    heap: List[Tuple[float, Tuple[Hashable, ...]]] = []  # top_k min-heap
+    found: List[Tuple[float, Tuple[Hashable, ...]]] = []
+    searches = [_Component(c, adj, max_len) for c in comps]
+    if top_k:
+        searches.sort(key=lambda s: -s.bound(0))
+
+    complete = True
+    try:
+        for comp in searches:
+            if top_k and len(heap) >= top_k and heap[0][0] >= comp.bound(0):
+                break
+            comp.run(names, min_len, max_len, top_k, heap, found, deadline, stats)
+    except _Budget:
+        complete = False
+
+    rings = sorted(heap if top_k else found, key=lambda r: (-r[0], r[1]))
+    stats["elapsed_s"] = round(time.perf_counter() - started, 4)
+    return RingSearchResult(rings=rings, complete=complete, stats=stats)
+
+
+def _sccs(adj: List[Dict[int, float]]) -> List[List[int]]:
+    """Iterative Tarjan over interned adjacency."""
+    n = len(adj)
+    index = [-1] * n
+    low = [0] * n
+    on_stack = [False] * n
+    stack: List[int] = []
+    out: List[List[int]] = []
+    counter = 0
+    for root in range(n):
+        if index[root] != -1:
+            continue
+        work = [(root, iter(adj[root]))]
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = True
+        while work:
+            x, it = work[-1]
+            advanced = False
+            for y in it:
+                if index[y] == -1:
+                    index[y] = low[y] = counter
+                    counter += 1
+                    stack.append(y)
+                    on_stack[y] = True
+                    work.append((y, iter(adj[y])))
+                    advanced = True
+                    break
+                if on_stack[y] and index[y] < low[x]:
+                    low[x] = index[y]
+            if advanced:
+                continue
+            work.pop()
+            if work and low[x] < low[work[-1][0]]:
+                low[work[-1][0]] = low[x]
+            if low[x] == index[x]:
+                comp = []
+                while True:
+                    y = stack.pop()
+                    on_stack[y] = False
+                    comp.append(y)
+                    if y == x:
+                        break
+                out.append(comp)
+    return out
+
+
+class _Component:
+    """One SCC, nodes re-ranked so the highest-value edges come first."""
+
+    def __init__(self, members: List[int], adj: List[Dict[int, float]], max_len: int) -> None:
+        member = set(members)
+        best = {x: max((w for y, w in adj[x].items() if y in member), default=0.0) for x in members}
+        for x in members:
+            for y, w in adj[x].items():
+                if y in member and w > best[y]:
+                    best[y] = w
+        # rank 0 = node with the most valuable incident edge
+        order = sorted(members, key=lambda x: (-best[x], x))
+        rank = {x: r for r, x in enumerate(order)}
+        self.nodes = order
+        self.out: List[List[Tuple[int, float]]] = []
+        self.inn: List[List[int]] = [[] for _ in order]
+        by_low_end: List[List[float]] = [[] for _ in order]
+        for x in order:
+            row = sorted(((rank[y], w) for y, w in adj[x].items() if y in member), key=lambda t: -t[1])
+            self.out.append(row)
+            for ry, w in row:
+                self.inn[ry].append(rank[x])
+                by_low_end[min(rank[x], ry)].append(w)
+
+        # _bounds[s]: sum of the max_len largest edge values among ranks >= s,
+        # an upper bound on any ring whose lowest rank is s or later
+        self._bounds = [0.0] * (len(order) + 1)
+        top: List[float] = []
+        for s in range(len(order) - 1, -1, -1):
+            for w in by_low_end[s]:
+                if len(top) < max_len:
+                    heapq.heappush(top, w)
+                elif w > top[0]:
+                    heapq.heapreplace(top, w)
+            self._bounds[s] = sum(top)
+        self._walks: Optional[List[List[float]]] = None
+
+    def bound(self, s: int) -> float:
+        return self._bounds[s]
+
+    def _walk_bounds(self, max_len: int) -> List[List[float]]:
+        """
+        walks[k][x]: best value of any walk of at most k edges out of x. A ring
+        that has reached x with k hops left can add no more than this.
+        """
+        if self._walks is None:
+            src = np.array([x for x, row in enumerate(self.out) for _ in row], dtype=np.int64)
+            dst = np.array([y for row in self.out for y, _ in row], dtype=np.int64)
+            w = np.array([v for row in self.out for _, v in row], dtype=np.float64)
+            prev = np.zeros(len(self.out))
+            walks = [prev.tolist()]
+            for _ in range(max_len):
+                cur = np.zeros(len(self.out))
+                np.maximum.at(cur, src, w + prev[dst])
+                walks.append(cur.tolist())
+                prev = cur
+            self._walks = walks
+        return self._walks
+
+    def run(self, names: List[Hashable], min_len: int, max_len: int, top_k: Optional[int],
+            heap: List[Tuple[float, Tuple[Hashable, ...]]], found: List[Tuple[float, Tuple[Hashable, ...]]],
+            deadline: Optional[float], stats: Dict[str, Any]) -> None:
+        n = len(self.nodes)
+        back_depth = min(BACK_DEPTH, max_len - 1)
+        walks = self._walk_bounds(max_len) if top_k else None
+        for s in range(n - min_len + 1):
+            if top_k and len(heap) >= top_k:
+                if heap[0][0] >= self._bounds[s]:
+                    return
+                if max(w + walks[max_len - 1][y] for y, w in self.out[s]) <= heap[0][0]:
+                    continue
+            # hops back to s using only ranks > s, searched back_depth deep;
+            # anything farther is at least back_depth + 1 away
+            back = {s: 0}
+            queue = deque([s])
+            while queue:
+                x = queue.popleft()
+                d = back[x]
+                if d == back_depth:
+                    continue
+                for y in self.inn[x]:
+                    if y > s and y not in back:
+                        back[y] = d + 1
+                        queue.append(y)
+            if len(back) < 2:
+                continue
+            far = back_depth + 1
+
+            path = [s]
+            values = [0.0]
+            on_path = {s}
+            stack = [iter(self.out[s])]
+            while stack:
+                stats["steps"] += 1
+                if deadline and stats["steps"] % _CLOCK_EVERY == 0 and time.perf_counter() > deadline:
+                    raise _Budget()
+                nxt = next(stack[-1], None)
+                if nxt is None:
+                    stack.pop()
+                    on_path.discard(path.pop())
+                    values.pop()
+                    continue
+                y, w = nxt
+                value = values[-1] + w
+                if y == s:
+                    if len(path) >= min_len:
+                        self._record(names, path, value, top_k, heap, found)
+                    continue
+                if y < s or y in on_path or len(path) + back.get(y, far) > max_len:
+                    continue
+                if top_k and len(heap) >= top_k and value + walks[max_len - len(path)][y] <= heap[0][0]:
+                    continue
+                path.append(y)
+                values.append(value)
+                on_path.add(y)
+                stack.append(iter(self.out[y]))
+
+    def _record(self, names: List[Hashable], path: List[int], value: float, top_k: Optional[int],
+                heap: List[Tuple[float, Tuple[Hashable, ...]]], found: List[Tuple[float, Tuple[Hashable, ...]]]) -> None:
+        item = (value, canonical_ring(names[self.nodes[r]] for r in path))
+        if not top_k:
+            found.append(item)
+        elif len(heap) < top_k:
+            heapq.heappush(heap, item)
+        elif item > heap[0]:
+            heapq.heapreplace(heap, item)
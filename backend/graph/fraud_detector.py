@@ -1,12 +1,27 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List, Tuple
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
 
-import networkx as nx
+import numpy as np
 from loguru import logger
 
+from backend.graph.compact_graph import INVOICE
+from backend.graph.cycle_search import find_rings
 from backend.graph.graph_builder import graph_store
 from backend.graph.neo4j_client import get_neo4j_client
+from backend.graph.ring_index import ITC_EDGE, ring_index
+from backend.graph.risk_scorer import graph_risk
+
+# Wall-clock budget for a top-K ring query that has to search the whole graph
+TOP_RINGS_BUDGET_S = 5.0
+
+# Shell-company rule: a pass-through GSTIN (many buyers, almost no suppliers),
+# one with buyers and no suppliers at all, or a recent registration
+SHELL_MIN_BUYERS = 10
+SHELL_MAX_SUPPLIERS = 2
+SHELL_NO_SUPPLIER_MIN_BUYERS = 5
+SHELL_MAX_AGE_DAYS = 180
 
 
 async def detect_circular_chains() -> List[Dict[str, Any]]:
@@ -15,7 +30,8 @@ async def detect_circular_chains() -> List[Dict[str, Any]]:
       MATCH path=(a:GSTIN)-[:CLAIMED_ITC_FROM*3..8]->(a)
       RETURN path, length(path) as chain_length
       ORDER BY chain_length DESC LIMIT 20
-    networkx fallback: find simple cycles length 3..8 on CLAIMED_ITC_FROM edges.
+    in-memory fallback: read the incremental ring index (cycles of 3..8 on
+    CLAIMED_ITC_FROM edges), rebuilt only if the graph changed outside it.
     """
     if await graph_store.neo4j_available():
         q = """
@@ -27,32 +43,102 @@ async def detect_circular_chains() -> List[Dict[str, Any]]:
         rows = await get_neo4j_client().run_query(q)
         return [{"gstins": r["gstins"], "chain_length": int(r["chain_length"])} for r in rows]
 
-    g = graph_store.nx_graph
-    # subgraph of CLAIMED_ITC_FROM edges only
-    h = nx.DiGraph([(u, v) for u, v, a in g.edges(data=True) if a.get("type") == "CLAIMED_ITC_FROM"])
-    cycles = []
-    for cyc in nx.simple_cycles(h):
-        if 3 <= len(cyc) <= 8:
-            cycles.append({"gstins": cyc + [cyc[0]], "chain_length": len(cyc)})
-    cycles.sort(key=lambda x: x["chain_length"], reverse=True)
-    return cycles[:20]
+    # in-memory: rings are maintained edge by edge in the ring index
+    ring_index.sync(graph_store.graph)
+    return [{"gstins": list(r) + [r[0]], "chain_length": len(r)} for r in ring_index.rings(limit=20)]
+
+
+async def detect_top_rings(k: int = 20, budget_s: float = TOP_RINGS_BUDGET_S) -> List[Dict[str, Any]]:
+    """
+    The k rings (3..8 GSTINs) with the highest total CLAIMED_ITC_FROM value.
+    In-memory: ranked from the ring index when it is current and complete,
+    otherwise a bounded top-k search that stops once no better ring can exist.
+    """
+    if await graph_store.neo4j_available():
+        q = """
+        MATCH path=(a:GSTIN)-[:CLAIMED_ITC_FROM*3..8]->(a)
+        WITH path, reduce(s = 0.0, r IN relationships(path) | s + coalesce(r.value, 0.0)) as value
+        RETURN [n in nodes(path) | n.gstin] as gstins, length(path) as chain_length, value
+        ORDER BY value DESC
+        LIMIT $k
+        """
+        rows = await get_neo4j_client().run_query(q, {"k": k})
+        return [{"gstins": r["gstins"], "chain_length": int(r["chain_length"]), "value": float(r["value"])} for r in rows]
+
+    g = graph_store.graph
+    if ring_index.is_current(g) and ring_index.complete:
+        def ring_value(r: Tuple[str, ...]) -> float:
+            return sum(g.edge_value(r[i], r[(i + 1) % len(r)], ITC_EDGE) or 0.0 for i in range(len(r)))
+        ranked = sorted(((ring_value(r), r) for r in ring_index.rings()), key=lambda t: (-t[0], t[1]))[:k]
+    else:
+        result = find_rings(g.edges(ITC_EDGE), top_k=k, budget_s=budget_s)
+        if not result.complete:
+            logger.warning("Top-{} ring search hit its {}s budget; returning the best found", k, budget_s)
+        ranked = result.rings
+    return [{"gstins": list(r) + [r[0]], "chain_length": len(r), "value": v} for v, r in ranked]
 
 
-async def calculate_risk_scores() -> None:
+async def detect_shell_candidates() -> List[Dict[str, Any]]:
+    """
+    GSTINs matching the shell-company rule, with their buyer / supplier counts
+    (CLAIMED_ITC_FROM in- / out-degree) and days since registration (999 when unknown).
+    Neo4j: the rule runs as one Cypher query. In-memory: a mask over the graph's
+    per-edge degree counters and its parsed registration dates, so only the
+    matching GSTINs are touched in Python.
+    """
+    if await graph_store.neo4j_available():
+        q = """
+        MATCH (g:GSTIN)
+        WITH g,
+             size([(g)<-[:CLAIMED_ITC_FROM]-() | 1]) as buyers,
+             size([(g)-[:CLAIMED_ITC_FROM]->() | 1]) as suppliers,
+             CASE WHEN g.registration_date IS NULL THEN 999
+                  ELSE duration.inDays(date(g.registration_date), date()).days END as age
+        WHERE (buyers > $min_buyers AND suppliers < $max_suppliers)
+           OR (buyers > $no_supplier_buyers AND suppliers = 0)
+           OR age < $max_age
+        RETURN g.gstin as gstin, coalesce(g.name, g.gstin) as name, buyers, suppliers, age
+        ORDER BY buyers DESC, gstin
+        """
+        rows = await get_neo4j_client().run_query(q, {
+            "min_buyers": SHELL_MIN_BUYERS, "max_suppliers": SHELL_MAX_SUPPLIERS,
+            "no_supplier_buyers": SHELL_NO_SUPPLIER_MIN_BUYERS, "max_age": SHELL_MAX_AGE_DAYS,
+        })
+        return [{"gstin": r["gstin"], "name": r["name"], "buyers": int(r["buyers"]),
+                 "suppliers": int(r["suppliers"]), "days_since_registration": int(r["age"])} for r in rows]
+
+    g = graph_store.graph
+    with g._lock:
+        n = len(g)
+        buyers = g.in_degrees(ITC_EDGE)[:n]
+        suppliers = g.out_degrees(ITC_EDGE)[:n]
+        reg = g.registration_date.view()[:n]
+        not_invoice = g.kind.view()[:n] != INVOICE
+    today = np.datetime64(datetime.utcnow().date(), "D")
+    age = np.where(np.isnat(reg), 999, (today - reg).astype(np.int64))
+    match = not_invoice & (
+        ((buyers > SHELL_MIN_BUYERS) & (suppliers < SHELL_MAX_SUPPLIERS))
+        | ((buyers > SHELL_NO_SUPPLIER_MIN_BUYERS) & (suppliers == 0))
+        | (age < SHELL_MAX_AGE_DAYS)
+    )
+    ids = np.flatnonzero(match)
+    return [{"gstin": g.name(i), "name": g.display_name(i), "buyers": b, "suppliers": s, "days_since_registration": a}
+            for i, b, s, a in zip(ids.tolist(), buyers[ids].tolist(), suppliers[ids].tolist(), age[ids].tolist())]
+
+
+async def calculate_risk_scores(cycle_nodes: Optional[Set[str]] = None) -> None:
     """
     Score each GSTIN 0-1 based on:
       - ITC claim volume (out-degree on CLAIMED_ITC_FROM)
-      - Presence in cycles
+      - Presence in cycles (cycle_nodes; default: ring members)
       - Newer GSTIN heuristic (not stored; simulated)
     Updates risk_score property on GSTIN nodes.
+    In-memory scores are kept current per edge after the first full pass, so
+    a repeat call without cycle_nodes returns at once.
     """
-    cycles = await detect_circular_chains()
-    cycle_nodes = set()
-    for c in cycles:
-        for g in c["gstins"]:
-            cycle_nodes.add(g)
-
     if await graph_store.neo4j_available():
+        if cycle_nodes is None:
+            cycle_nodes = {gstin for c in await detect_circular_chains() for gstin in c["gstins"]}
         # Approx risk in Neo4j using degree + cycle membership.
         q = """
         MATCH (g:GSTIN)
@@ -72,27 +158,16 @@ async def calculate_risk_scores() -> None:
                 "MATCH (g:GSTIN) WHERE g.gstin IN $gstins SET g.risk_score = CASE WHEN g.risk_score < 0.85 THEN 0.9 ELSE g.risk_score END",
                 {"gstins": list(cycle_nodes)},
             )
+        graph_store.neo4j_version += 1
         return
 
-    g = graph_store.nx_graph
-    # compute out degree on CLAIMED_ITC_FROM
-    for node, attrs in list(g.nodes(data=True)):
-        if attrs.get("label") != "GSTIN":
-            continue
-        out_claims = 0
-        total_val = 0.0
-        for _, v, a in g.out_edges(node, data=True):
-            if a.get("type") == "CLAIMED_ITC_FROM":
-                out_claims += 1
-                total_val += float(a.get("value", 0.0))
-        risk = 0.2
-        if out_claims >= 5 or total_val > 500000:
-            risk = 0.8
-        elif out_claims >= 2 or total_val > 150000:
-            risk = 0.5
-        if node in cycle_nodes:
-            risk = max(risk, 0.9)
-        g.nodes[node]["risk_score"] = float(risk)
+    g = graph_store.graph
+    if cycle_nodes is None:
+        if graph_risk.is_current(g):
+            return
+        ring_index.sync(g)
+        cycle_nodes = ring_index.ring_nodes()
+    graph_risk.score_all(g, cycle_nodes)
 
 
 async def get_risk_summary() -> Dict[str, Any]:
@@ -118,20 +193,20 @@ async def get_risk_summary() -> Dict[str, Any]:
             "backend": "neo4j",
         }
 
-    g = graph_store.nx_graph
-    vals: List[Tuple[str, float]] = []
-    for n, a in g.nodes(data=True):
-        if a.get("label") == "GSTIN":
-            vals.append((n, float(a.get("risk_score", 0.1))))
-    high = sum(1 for _, r in vals if r > 0.7)
-    med = sum(1 for _, r in vals if 0.4 < r <= 0.7)
-    low = sum(1 for _, r in vals if r <= 0.4)
-    vals.sort(key=lambda x: x[1], reverse=True)
+    g = graph_store.graph
+    ids = g.gstin_ids()
+    risk = np.nan_to_num(g.risk_score[ids], nan=0.1)
+    # top 10 by risk, ties in node order
+    top = np.lexsort((ids, -risk))[:10] if len(ids) <= 10 else None
+    if top is None:
+        cut = np.partition(risk, len(risk) - 10)[len(risk) - 10]
+        cand = np.flatnonzero(risk >= cut)
+        top = cand[np.lexsort((ids[cand], -risk[cand]))][:10]
     return {
-        "high_risk": high,
-        "medium_risk": med,
-        "low_risk": low,
-        "top10": [{"gstin": g, "name": g, "risk_score": r} for g, r in vals[:10]],
+        "high_risk": int((risk > 0.7).sum()),
+        "medium_risk": int(((risk > 0.4) & (risk <= 0.7)).sum()),
+        "low_risk": int((risk <= 0.4).sum()),
+        "top10": [{"gstin": name, "name": name, "risk_score": r}
+                  for name, r in zip(g.names(ids[top].tolist()), risk[top].tolist())],
         "backend": "networkx",
     }
-
@@ -1,30 +1,62 @@
 from __future__ import annotations
 
-from typing import Any, Dict, Optional
+import os
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
 import networkx as nx
 from loguru import logger
 
-from backend.graph.neo4j_client import get_neo4j_client
+from backend.graph.compact_graph import ISSUED, RECEIVED_BY, CompactGraph
+from backend.graph.neo4j_client import get_neo4j_client, neo4j_health
+from backend.graph.ring_index import ITC_EDGE, ring_index
+from backend.graph.risk_scorer import graph_risk
+
+
+# A batch of ITC edges goes through add_itc_edge (incremental rings and risk)
+# only while it is small next to the graph: up to this many edges, or a tenth
+# of the existing ones. Larger batches are appended in bulk and the ring index
+# and risk scores rebuild once, on their next read.
+INCREMENTAL_BATCH_MIN = 256
+
+# Neo4j-backed read caches expire after this long even without a local write:
+# Celery workers and other API processes write without bumping neo4j_version
+NEO4J_READ_CACHE_TTL_S = float(os.getenv("NEO4J_READ_CACHE_TTL_S", "30"))
 
 
 class GraphStore:
     """
     Dual-mode store:
-    - Neo4j if available
-    - networkx fallback otherwise
+    - Neo4j if available (decided from the cached Neo4jHealth state, not a probe per call)
+    - in-memory fallback otherwise (CompactGraph: interned ids, per-edge-type CSR)
     """
 
     def __init__(self) -> None:
-        self.nx_graph = nx.DiGraph()
+        self.health = neo4j_health
+        self.graph = CompactGraph()
+        # Bumped on every write sent to Neo4j (cache stamp for Neo4j-backed reads)
+        self.neo4j_version = 0
+        self._nx_copy: Optional[nx.DiGraph] = None
+        self._nx_version: Tuple[int, int] = (0, -1)
+
+    @property
+    def nx_graph(self) -> nx.DiGraph:
+        """
+        networkx copy of the in-memory graph, rebuilt after writes. Read-only:
+        changes to it do not reach the store; write through the methods below.
+        """
+        stamp = (id(self.graph), self.graph.version)
+        if self._nx_copy is None or self._nx_version != stamp:
+            self._nx_copy = self.graph.to_networkx()
+            self._nx_version = stamp
+        return self._nx_copy
+
+    def neo4j_stamp(self) -> Tuple[str, int, int]:
+        """Cache stamp for Neo4j-backed reads: changes on a local write and every NEO4J_READ_CACHE_TTL_S."""
+        return "neo4j", self.neo4j_version, int(time.monotonic() // NEO4J_READ_CACHE_TTL_S)
 
     async def neo4j_available(self) -> bool:
-        try:
-            client = get_neo4j_client()
-            await client.run_query("RETURN 1 as ok")
-            return True
-        except Exception:
-            return False
+        return await self.health.available()
 
     async def create_gstin_node(self, gstin: str, name: str, state: str, type: str) -> None:
         if await self.neo4j_available():
@@ -34,9 +66,11 @@ class GraphStore:
             RETURN g
             """
             await get_neo4j_client().run_query(q, {"gstin": gstin, "name": name, "state": state, "type": type})
+            self.neo4j_version += 1
             return
 
-        self.nx_graph.add_node(gstin, label="GSTIN", gstin=gstin, name=name, state=state, type=type, risk_score=0.1)
+        self.graph.add_gstin(gstin, name=name, state=state, type=type, risk_score=0.1)
+        graph_risk.on_gstin(self.graph, gstin)
 
     async def create_invoice_node(self, invoice_id: str, date: str, value: float, tax: float) -> None:
         if await self.neo4j_available():
@@ -46,9 +80,10 @@ class GraphStore:
             RETURN i
             """
             await get_neo4j_client().run_query(q, {"invoice_id": invoice_id, "date": date, "value": value, "tax": tax})
+            self.neo4j_version += 1
             return
 
-        self.nx_graph.add_node(invoice_id, label="Invoice", invoice_id=invoice_id, date=date, value=value, tax=tax)
+        self.graph.add_invoice(invoice_id, date=date, value=value, tax=tax)
 
     async def link_supplier_buyer(self, supplier_gstin: str, buyer_gstin: str, invoice_id: str, itc_value: Optional[float] = None) -> None:
         if await self.neo4j_available():
@@ -63,46 +98,89 @@ class GraphStore:
             await get_neo4j_client().run_query(
                 q, {"s": supplier_gstin, "b": buyer_gstin, "inv": invoice_id, "itc": float(itc_value or 0.0)}
             )
+            self.neo4j_version += 1
             return
 
-        self.nx_graph.add_edge(supplier_gstin, invoice_id, type="ISSUED")
-        self.nx_graph.add_edge(invoice_id, buyer_gstin, type="RECEIVED_BY")
-        self.nx_graph.add_edge(buyer_gstin, supplier_gstin, type="CLAIMED_ITC_FROM", value=float(itc_value or 0.0))
+        self.graph.add_edge(supplier_gstin, invoice_id, ISSUED)
+        self.graph.add_edge(invoice_id, buyer_gstin, RECEIVED_BY)
+        self.add_itc_edge(buyer_gstin, supplier_gstin, float(itc_value or 0.0))
 
-    async def export_pyvis_data(self) -> Dict[str, Any]:
+    def add_itc_edge(self, buyer_gstin: str, supplier_gstin: str, value: float) -> None:
         """
-        Return {nodes, edges} for pyvis rendering.
+        In-memory CLAIMED_ITC_FROM edge. The ring index searches only cycles
+        through it, and risk scores are updated for its endpoints and new rings.
         """
-        if await self.neo4j_available():
-            qn = "MATCH (n) RETURN labels(n) as labels, n as n LIMIT 500"
-            qe = "MATCH (a)-[r]->(b) RETURN a.gstin as a, type(r) as t, b.gstin as b, r.value as v LIMIT 800"
-            nodes_raw = await get_neo4j_client().run_query(qn)
-            edges_raw = await get_neo4j_client().run_query(qe)
-            nodes = []
-            for row in nodes_raw:
-                n = row["n"]
-                labels = row["labels"]
-                if "GSTIN" in labels:
-                    nodes.append({"id": n.get("gstin"), "label": n.get("name", n.get("gstin")), "risk_score": float(n.get("risk_score", 0.1))})
-                elif "Invoice" in labels:
-                    nodes.append({"id": n.get("invoice_id"), "label": n.get("invoice_id"), "risk_score": 0.0})
-            edges = [{"from": e["a"], "to": e["b"], "type": e["t"], "value": float(e.get("v") or 0.0)} for e in edges_raw if e.get("a") and e.get("b")]
-            return {"nodes": nodes, "edges": edges, "backend": "neo4j"}
-
-        nodes = []
-        for nid, attrs in self.nx_graph.nodes(data=True):
-            if attrs.get("label") == "GSTIN":
-                nodes.append({"id": nid, "label": attrs.get("name", nid), "risk_score": float(attrs.get("risk_score", 0.1))})
-            else:
-                nodes.append({"id": nid, "label": str(nid), "risk_score": float(attrs.get("risk_score", 0.0))})
-        edges = []
-        for u, v, attrs in self.nx_graph.edges(data=True):
-            if attrs.get("type") == "CLAIMED_ITC_FROM":
-                edges.append({"from": u, "to": v, "type": attrs.get("type"), "value": float(attrs.get("value", 0.0))})
-            else:
-                edges.append({"from": u, "to": v, "type": attrs.get("type", "EDGE"), "value": float(attrs.get("value", 0.0))})
-        return {"nodes": nodes, "edges": edges, "backend": "networkx"}
+        ring_index.sync(self.graph)
+        old_value = self.graph.edge_value(buyer_gstin, supplier_gstin, ITC_EDGE)
+        self.graph.add_edge(buyer_gstin, supplier_gstin, ITC_EDGE, value)
+        rings = ring_index.add_edge(buyer_gstin, supplier_gstin)
+        ring_index.mark_synced(self.graph)
+        graph_risk.on_itc_edge(self.graph, buyer_gstin, supplier_gstin, value, old_value, rings)
+        if rings:
+            logger.info("Edge {} -> {} closed {} circular ring(s)", buyer_gstin, supplier_gstin, len(rings))
+
+    def load_batch(
+        self,
+        gstins: Sequence[Dict[str, Any]] = (),
+        invoices: Sequence[Dict[str, Any]] = (),
+        links: Sequence[Dict[str, Any]] = (),
+        itc_edges: Sequence[Tuple[str, str, float]] = (),
+    ) -> Dict[str, int]:
+        """
+        In-memory batch path of BulkGraphWriter: the same writes as
+        create_gstin_node / create_invoice_node / link_supplier_buyer /
+        add_itc_edge, applied in that order with array appends.
+        """
+        g = self.graph
+        for r in gstins:
+            g.add_gstin(r["gstin"], name=r["name"], state=r["state"], type=r["type"], risk_score=0.1)
+        for r in invoices:
+            g.add_invoice(r["invoice_id"], date=r["date"], value=r["value"], tax=r["tax"])
+        if links:
+            g.add_edges([r["supplier"] for r in links], [r["invoice_id"] for r in links], ISSUED)
+            g.add_edges([r["invoice_id"] for r in links], [r["buyer"] for r in links], RECEIVED_BY)
+        itc: List[Tuple[str, str, float]] = [(r["buyer"], r["supplier"], float(r["itc"])) for r in links]
+        itc.extend(itc_edges)
+
+        incremental = ring_index.is_current(g) and len(itc) <= max(
+            INCREMENTAL_BATCH_MIN, g.number_of_edges(ITC_EDGE) // 10
+        )
+        if incremental:
+            for r in gstins:
+                graph_risk.on_gstin(g, r["gstin"])
+            for buyer, supplier, value in itc:
+                self.add_itc_edge(buyer, supplier, value)
+        elif itc:
+            g.add_edges([e[0] for e in itc], [e[1] for e in itc], ITC_EDGE, [e[2] for e in itc])
+            logger.info("Bulk-loaded {} ITC edges; ring index and risk scores rebuild on next read", len(itc))
+        return {"nodes": len(gstins) + len(invoices), "edges": 3 * len(links) + len(itc_edges)}
+
+    async def neo4j_snapshot(self, edge_types: Sequence[str] = (ITC_EDGE, ISSUED, RECEIVED_BY),
+                             invoices: bool = True) -> CompactGraph:
+        """Copy of the Neo4j graph (GSTINs, invoices, the given edge types) as a CompactGraph, for whole-graph analytics."""
+        client = get_neo4j_client()
+        g = CompactGraph()
+        for r in await client.run_query(
+            "MATCH (n:GSTIN) RETURN n.gstin AS gstin, n.name AS name, n.state AS state, n.type AS type, "
+            "n.risk_score AS risk, n.registration_date AS reg"
+        ):
+            g.add_gstin(r["gstin"], r.get("name") or r["gstin"], r.get("state") or "", r.get("type") or "",
+                        risk_score=float(r["risk"]) if r.get("risk") is not None else 0.1,
+                        registration_date=r.get("reg"))
+        if invoices:
+            for r in await client.run_query(
+                "MATCH (i:Invoice) RETURN i.invoice_id AS id, i.date AS date, i.value AS value, i.tax AS tax"
+            ):
+                g.add_invoice(r["id"], r.get("date") or "", float(r.get("value") or 0.0), float(r.get("tax") or 0.0))
+        for etype in edge_types:
+            rows = await client.run_query(
+                f"MATCH (a)-[r:{etype}]->(b) RETURN coalesce(a.gstin, a.invoice_id) AS u, "
+                "coalesce(b.gstin, b.invoice_id) AS v, coalesce(r.value, 0.0) AS w"
+            )
+            rows = [r for r in rows if r.get("u") and r.get("v")]
+            if rows:
+                g.add_edges([r["u"] for r in rows], [r["v"] for r in rows], etype, [float(r["w"]) for r in rows])
+        return g
 
 
 graph_store = GraphStore()
-
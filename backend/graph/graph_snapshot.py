@@ -0,0 +1,289 @@
+"""
+TaxIQ — In-Memory Graph Snapshots
+Keeps the CompactGraph behind GraphStore across restarts:
+  - snapshot: CompactGraph.to_arrays() saved as .npy files (int32 edge
+    arrays, attribute columns, the interned node table as one UTF-8 blob)
+    plus the ring index's rings; restore memory-maps them back in
+  - edge log: every node and edge write made after the snapshot, appended
+    to a binary log and replayed on restore
+Layout under GRAPH_SNAPSHOT_DIR:
+  CURRENT          sequence number of the published snapshot (0 = none yet)
+  snap-<seq>/      *.npy + meta.json
+  log-<seq>.bin    writes made after snap-<seq> was taken
+A snapshot switches the log to log-<seq+1> under the graph lock, writes
+snap-<seq+1>, then rewrites CURRENT. If the process dies before that, the old
+snapshot is still current, and restore replays both logs in order.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import shutil
+import struct
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from loguru import logger
+
+from backend.graph.compact_graph import CompactGraph
+from backend.graph.graph_builder import GraphStore, graph_store
+from backend.graph.ring_index import ITC_EDGE, ring_index
+
+SNAPSHOT_DIR = Path(os.getenv("GRAPH_SNAPSHOT_DIR", str(Path(__file__).resolve().parents[2] / "data" / "graph_snapshot")))
+# A background snapshot is taken once the edge log grows past this size
+LOG_MAX_BYTES = int(float(os.getenv("GRAPH_LOG_MAX_MB", "256")) * 2**20)
+
+OP_GSTIN, OP_INVOICE, OP_EDGE = 1, 2, 3
+_HEADER = struct.Struct("<BBI")  # op, number of float64 fields, payload bytes
+_SEP = "\x1f"
+
+
+# ── Edge log ────────────────────────────────────────────
+
+def _record(op: int, strings: Sequence[str], numbers: Sequence[float]) -> bytes:
+    text = _SEP.join(strings).encode("utf-8")
+    nums = struct.pack(f"<{len(numbers)}d", *numbers)
+    return _HEADER.pack(op, len(numbers), len(nums) + len(text)) + nums + text
+
+
+def read_log(path: Path) -> Iterator[Tuple[int, List[str], Tuple[float, ...]]]:
+    """(op, strings, numbers) per record. A torn final record (crash mid-write) is cut off the file."""
+    data = path.read_bytes()
+    pos, end = 0, len(data)
+    while pos + _HEADER.size <= end:
+        op, n_nums, size = _HEADER.unpack_from(data, pos)
+        body = pos + _HEADER.size
+        if body + size > end:
+            logger.warning("Edge log {} ends in a partial record; dropping its last {} bytes", path.name, end - pos)
+            os.truncate(path, pos)
+            return
+        nums = struct.unpack_from(f"<{n_nums}d", data, body)
+        text = data[body + 8 * n_nums:body + size].decode("utf-8")
+        yield op, text.split(_SEP), nums
+        pos = body + size
+
+
+class EdgeLog:
+    """Append-only write log, installed as CompactGraph.journal."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        self.bytes = os.fstat(self._fd).st_size
+        self.records = 0
+
+    def gstin(self, gstin: str, name: str, state: str, type: str,
+              risk_score: float, registration_date: Optional[str]) -> None:
+        self._write(_record(OP_GSTIN, (gstin, name or "", state or "", type or "", registration_date or ""),
+                            (float(risk_score),)), 1)
+
+    def invoice(self, invoice_id: str, date: Any, value: float, tax: float) -> None:
+        self._write(_record(OP_INVOICE, (invoice_id, str(date or "")), (float(value), float(tax))), 1)
+
+    def edges(self, us: Sequence[str], vs: Sequence[str], etype: str, values: Sequence[float]) -> None:
+        self._write(b"".join(_record(OP_EDGE, (u, v, etype), (w,)) for u, v, w in zip(us, vs, values)), len(us))
+
+    def _write(self, data: bytes, records: int) -> None:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(self._fd, view):]
+        self.bytes += len(data)
+        self.records += records
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+
+# ── Snapshot / restore ──────────────────────────────────
+
+class GraphPersistence:
+    """Snapshot + edge log for one GraphStore's in-memory graph."""
+
+    def __init__(self, store: GraphStore = graph_store, directory: Path = SNAPSHOT_DIR,
+                 log_max_bytes: int = LOG_MAX_BYTES) -> None:
+        self.store = store
+        self.directory = Path(directory)
+        self.log_max_bytes = log_max_bytes
+        self._seq = 0
+        self._log: Optional[EdgeLog] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stats: Dict[str, Any] = {}
+
+    def restore(self) -> Dict[str, Any]:
+        """Load the current snapshot, replay later logs, and start logging. Replaces store.graph."""
+        t0 = time.perf_counter()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        current = self.directory / "CURRENT"
+        self._seq = int(current.read_text().strip() or 0) if current.exists() else 0
+
+        g, rings, complete = CompactGraph(), None, True
+        snap = self.directory / f"snap-{self._seq}"
+        if self._seq and snap.exists():
+            meta = json.loads((snap / "meta.json").read_text())
+            arrays = {p.stem: np.load(p, mmap_mode="r") for p in snap.glob("*.npy")}
+            g = CompactGraph.from_arrays(arrays)
+            if meta.get("rings_saved"):
+                names = g.names()
+                ids, lens = arrays["ring_nodes"].tolist(), arrays["ring_lens"].tolist()
+                rings, pos = [], 0
+                for n in lens:
+                    rings.append(tuple(names[i] for i in ids[pos:pos + n]))
+                    pos += n
+                complete = bool(meta.get("rings_complete", True))
+        loaded_s = time.perf_counter() - t0
+
+        self.store.graph = g
+        if rings is not None:
+            ring_index.restore(g, rings, complete)
+        logs = self._logs(since=self._seq)
+        replayed = self._replay(g, logs)
+        log_seq = max([self._seq] + [s for s, _ in logs])
+        self._attach(g, log_seq)
+
+        self._stats.update({
+            "restored_seq": self._seq,
+            "restore_s": round(time.perf_counter() - t0, 3),
+            "snapshot_load_s": round(loaded_s, 3),
+            "replayed_records": replayed,
+            "nodes": len(g),
+            "edges": g.number_of_edges(),
+        })
+        logger.info("Graph restored from {} (snapshot {}): nodes={} edges={} replayed={} in {:.2f}s",
+                    self.directory, self._seq, len(g), g.number_of_edges(), replayed, self._stats["restore_s"])
+        return dict(self._stats)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Write the graph (and ring index, when current) as snap-<seq+1> and start log-<seq+1>."""
+        t0 = time.perf_counter()
+        g = self.store.graph
+        seq = self._seq + 1
+        with g._lock:
+            arrays = g.to_arrays()
+            saved_rings = ring_index.is_current(g)
+            if saved_rings:
+                rings = ring_index.rings()
+                arrays["ring_nodes"] = g.ids([n for r in rings for n in r])
+                arrays["ring_lens"] = np.array([len(r) for r in rings], dtype=np.int8)
+            meta = {"seq": seq, "nodes": len(g), "edges": g.number_of_edges(), "created": time.time(),
+                    "rings_saved": saved_rings, "rings_complete": ring_index.complete}
+            self._attach(g, seq)
+
+        tmp = self.directory / f"snap-{seq}.tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir(parents=True)
+        for key, arr in arrays.items():
+            np.save(tmp / f"{key}.npy", arr)
+        (tmp / "meta.json").write_text(json.dumps(meta))
+        shutil.rmtree(self.directory / f"snap-{seq}", ignore_errors=True)
+        os.replace(tmp, self.directory / f"snap-{seq}")
+        cur_tmp = self.directory / "CURRENT.tmp"
+        cur_tmp.write_text(str(seq))
+        os.replace(cur_tmp, self.directory / "CURRENT")
+        self._seq = seq
+
+        for old in self.directory.glob("snap-*"):
+            if old.name != f"snap-{seq}":
+                shutil.rmtree(old, ignore_errors=True)
+        for s, path in self._logs(since=0):
+            if s < seq:
+                path.unlink(missing_ok=True)
+
+        size = sum(p.stat().st_size for p in (self.directory / f"snap-{seq}").iterdir())
+        self._stats.update({"snapshot_seq": seq, "snapshot_s": round(time.perf_counter() - t0, 3),
+                            "snapshot_bytes": size, "snapshot_at": meta["created"]})
+        logger.info("Graph snapshot {} written: nodes={} edges={} {:.1f} MiB in {:.2f}s",
+                    seq, meta["nodes"], meta["edges"], size / 2**20, self._stats["snapshot_s"])
+        return dict(self._stats)
+
+    def close(self) -> None:
+        if self._log is not None:
+            self.store.graph.journal = None
+            self._log.close()
+            self._log = None
+
+    # ── Background compaction ───────────────────────────
+
+    def start(self, every_s: float = 60.0) -> None:
+        """Snapshot from a background task whenever the log passes log_max_bytes."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run(every_s))
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    async def _run(self, every_s: float) -> None:
+        while True:
+            await asyncio.sleep(every_s)
+            if self._log is not None and self._log.bytes > self.log_max_bytes:
+                try:
+                    await asyncio.to_thread(self.snapshot)
+                except Exception as e:
+                    logger.warning("Background graph snapshot failed: {}", e)
+
+    def stats(self) -> Dict[str, Any]:
+        log = self._log
+        return {
+            "directory": str(self.directory),
+            "seq": self._seq,
+            "log_records": log.records if log else 0,
+            "log_bytes": log.bytes if log else 0,
+            **self._stats,
+        }
+
+    # ── Internals ───────────────────────────────────────
+
+    def _logs(self, since: int) -> List[Tuple[int, Path]]:
+        out = []
+        for p in self.directory.glob("log-*.bin"):
+            try:
+                s = int(p.stem.split("-", 1)[1])
+            except ValueError:
+                continue
+            if s >= since:
+                out.append((s, p))
+        return sorted(out)
+
+    def _attach(self, g: CompactGraph, seq: int) -> None:
+        if self._log is not None:
+            self._log.close()
+        self._log = EdgeLog(self.directory / f"log-{seq}.bin")
+        g.journal = self._log
+
+    def _replay(self, g: CompactGraph, logs: List[Tuple[int, Path]]) -> int:
+        """Apply logged writes with the journal detached; ITC edges go through GraphStore.load_batch."""
+        g.journal = None
+        count = 0
+        itc: List[Tuple[str, str, float]] = []
+        other: Dict[str, Tuple[List[str], List[str], List[float]]] = {}
+        for _, path in logs:
+            for op, strs, nums in read_log(path):
+                count += 1
+                if op == OP_GSTIN:
+                    g.add_gstin(strs[0], strs[1], strs[2], strs[3], risk_score=nums[0],
+                                registration_date=strs[4] or None)
+                elif op == OP_INVOICE:
+                    g.add_invoice(strs[0], strs[1], nums[0], nums[1])
+                elif op == OP_EDGE and strs[2] == ITC_EDGE:
+                    itc.append((strs[0], strs[1], nums[0]))
+                elif op == OP_EDGE:
+                    us, vs, ws = other.setdefault(strs[2], ([], [], []))
+                    us.append(strs[0])
+                    vs.append(strs[1])
+                    ws.append(nums[0])
+        for etype, (us, vs, ws) in other.items():
+            g.add_edges(us, vs, etype, ws)
+        if itc:
+            self.store.load_batch(itc_edges=itc)
+        return count
+
+
+graph_persistence = GraphPersistence()
@@ -0,0 +1,381 @@
+"""
+TaxIQ — Level-of-Detail Graph Export
+Bounded, paged payloads for the Fraud Graph page instead of one dump of every
+node and edge:
+  - level 0 (overview): ITC communities (label propagation) collapsed into
+    super-nodes, with aggregated CLAIMED_ITC_FROM super-edges between them
+  - level 1 (gstins): GSTINs and CLAIMED_ITC_FROM edges
+  - level 2 (detail): level 1 plus invoices and ISSUED / RECEIVED_BY edges
+Every node gets a deterministic position (communities on a spiral, largest in
+the middle, members around their community's centre), so a request can be
+clipped to a viewport box, or to one community to expand it on demand.
+A GraphView is built once per graph version (in a worker thread; for Neo4j,
+also every NEO4J_READ_CACHE_TTL_S to pick up other processes' writes) with the node
+and edge order of each level precomputed; a page is then an array slice.
+Edges are sent with the page holding their later endpoint, so every edge
+arrives after both of its nodes. While a newer view builds, the previous one
+keeps serving (marked stale) and cursors issued from it stay valid.
+"""
+from __future__ import annotations
+
+import asyncio
+import base64
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from loguru import logger
+
+from backend.graph.communities import propagate_labels
+from backend.graph.compact_graph import CLAIMED_ITC_FROM, INVOICE, ISSUED, RECEIVED_BY, CompactGraph
+from backend.graph.graph_builder import GraphStore, graph_store
+
+OVERVIEW, GSTINS, DETAIL = 0, 1, 2
+LEVEL_NAMES = {OVERVIEW: "communities", GSTINS: "gstins", DETAIL: "detail"}
+
+PAGE_SIZE = int(os.getenv("GRAPH_VIEW_PAGE_SIZE", "500"))
+# A page is cut short (at a node boundary) once it carries this many edges
+MAX_PAGE_EDGES = int(os.getenv("GRAPH_VIEW_MAX_EDGES", "2000"))
+
+_EDGE_TYPES = (CLAIMED_ITC_FROM, ISSUED, RECEIVED_BY)
+_GOLDEN = np.pi * (3.0 - np.sqrt(5.0))
+_PAD = 2.0  # layout units between neighbouring community discs
+
+
+class _Plan:
+    """Nodes of one level (and filter) in page order; edges sorted by the page position of their later end."""
+
+    __slots__ = ("nodes", "eu", "ev", "etype", "evalue", "ecount", "ekey")
+
+    def __init__(self, universe: int, nodes: np.ndarray, eu: np.ndarray, ev: np.ndarray, etype: np.ndarray,
+                 evalue: np.ndarray, ecount: Optional[np.ndarray] = None) -> None:
+        pos = np.full(universe, -1, dtype=np.int64)
+        pos[nodes] = np.arange(len(nodes))
+        pu, pv = pos[eu], pos[ev]
+        keep = (pu >= 0) & (pv >= 0)
+        key = np.maximum(pu[keep], pv[keep])
+        order = np.argsort(key, kind="stable")
+        self.nodes = nodes
+        self.eu, self.ev = eu[keep][order], ev[keep][order]
+        self.etype, self.evalue = etype[keep][order], evalue[keep][order]
+        self.ecount = ecount[keep][order] if ecount is not None else None
+        self.ekey = key[order]
+
+    def page(self, offset: int, limit: int, max_edges: int) -> Tuple[int, int, int]:
+        """(end node position, first edge, end edge) of the page starting at node `offset`."""
+        end = min(offset + limit, len(self.nodes))
+        lo = int(np.searchsorted(self.ekey, offset, side="left"))
+        if lo + max_edges < len(self.ekey) and self.ekey[lo + max_edges] < end:
+            end = max(offset + 1, int(self.ekey[lo + max_edges]))
+        hi = int(np.searchsorted(self.ekey, end, side="left"))
+        return end, lo, hi
+
+
+class GraphView:
+    """Communities, layout and per-level plans for one version of a CompactGraph."""
+
+    def __init__(self, g: CompactGraph, stamp: Hashable, build_id: int, backend: str) -> None:
+        t0 = time.perf_counter()
+        self.g, self.stamp, self.build_id, self.backend = g, stamp, build_id, backend
+        with g._lock:
+            n = len(g)
+            is_inv = g.kind.view()[:n] == INVOICE
+            tables = [tuple(a.copy() for a in g.edge_arrays(etype)) for etype in _EDGE_TYPES]
+        itc_s, itc_d, itc_v = tables[0]
+        self.n = n
+        self.is_inv = is_inv
+
+        # Communities: ITC label propagation; GSTINs without ITC edges share one
+        # trailing "unconnected" group; invoices follow their supplier, else buyer
+        comm, _ = propagate_labels(n, itc_s, itc_d)
+        comm = comm.astype(np.int64)
+        k = int(comm.max()) + 1 if n and comm.max() >= 0 else 0
+        loose = (comm < 0) & ~is_inv
+        inv_comm = np.full(n, -1, dtype=np.int64)
+        (iss_s, iss_d, _), (rec_s, rec_d, _) = tables[1], tables[2]
+        inv_comm[rec_s] = np.where(comm[rec_d] >= 0, comm[rec_d], -1)
+        inv_comm[iss_d] = np.where(comm[iss_s] >= 0, comm[iss_s], inv_comm[iss_d])
+        comm[is_inv] = inv_comm[is_inv]
+        loose |= comm < 0
+        self.unconnected = k if loose.any() else None
+        if loose.any():
+            comm[loose] = k
+            k += 1
+        self.comm, self.k = comm, k
+
+        members = np.bincount(comm, minlength=k)
+        self.n_invoices = np.bincount(comm[is_inv], minlength=k)
+        self.n_gstins = members - self.n_invoices
+        deg = np.bincount(itc_s, minlength=n)[:n] + np.bincount(itc_d, minlength=n)[:n]
+        same = comm[itc_s] == comm[itc_d] if len(itc_s) else np.zeros(0, dtype=bool)
+        self.itc_internal = np.bincount(comm[itc_s[same]], weights=itc_v[same], minlength=k)
+
+        # Layout: member order within a community is GSTINs by ITC degree, then invoices
+        order = np.lexsort((np.arange(n), -deg, is_inv, comm))
+        self.starts = np.r_[0, np.cumsum(members)[:-1]].astype(np.int64) if k else np.zeros(0, dtype=np.int64)
+        rank = np.empty(n, dtype=np.float64)
+        rank[order] = np.arange(n) - self.starts[comm[order]]
+        self.radius = np.sqrt(members.astype(np.float64))
+        area = (self.radius + _PAD) ** 2
+        dist = 2.0 * np.sqrt(np.cumsum(area) - area)
+        self.cx = dist * np.cos(np.arange(k) * _GOLDEN)
+        self.cy = dist * np.sin(np.arange(k) * _GOLDEN)
+        r = np.sqrt(rank + 0.5)
+        self.x = self.cx[comm] + r * np.cos(rank * _GOLDEN) if n else np.zeros(0)
+        self.y = self.cy[comm] + r * np.sin(rank * _GOLDEN) if n else np.zeros(0)
+        self.order = order
+
+        # Per-level plans
+        cu, cv = comm[itc_s], comm[itc_d]
+        cross = cu != cv
+        key, inverse = np.unique(cu[cross] * max(k, 1) + cv[cross], return_inverse=True)
+        self.plans: Dict[int, _Plan] = {
+            OVERVIEW: _Plan(k, np.arange(k), key // max(k, 1), key % max(k, 1), np.zeros(len(key), dtype=np.int8),
+                            np.bincount(inverse, weights=itc_v[cross], minlength=len(key)),
+                            np.bincount(inverse, minlength=len(key))),
+            GSTINS: _Plan(n, order[~is_inv[order]], itc_s, itc_d, np.zeros(len(itc_s), dtype=np.int8), itc_v),
+            DETAIL: _Plan(n, order, *_concat_edges(tables)),
+        }
+        self._filtered: "OrderedDict[Hashable, _Plan]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.build_s = time.perf_counter() - t0
+        self.built_at = time.time()
+
+    # ── Plans ───────────────────────────────────────────
+
+    def plan(self, level: int, community: Optional[int] = None,
+             bbox: Optional[Tuple[float, float, float, float]] = None) -> _Plan:
+        base = self.plans[level]
+        if community is None and bbox is None:
+            return base
+        key = (level, community, bbox)
+        with self._lock:
+            if key in self._filtered:
+                self._filtered.move_to_end(key)
+                return self._filtered[key]
+        if level == OVERVIEW:
+            keep = np.ones(self.k, dtype=bool) if community is None else np.arange(self.k) == community
+            if bbox is not None:
+                x0, y0, x1, y1 = bbox
+                dx = self.cx - np.clip(self.cx, x0, x1)
+                dy = self.cy - np.clip(self.cy, y0, y1)
+                keep &= dx * dx + dy * dy <= self.radius ** 2
+            universe = self.k
+        else:
+            keep = np.ones(self.n, dtype=bool) if community is None else self.comm == community
+            if bbox is not None:
+                x0, y0, x1, y1 = bbox
+                keep &= (self.x >= x0) & (self.x <= x1) & (self.y >= y0) & (self.y <= y1)
+            universe = self.n
+        plan = _Plan(universe, base.nodes[keep[base.nodes]], base.eu, base.ev, base.etype, base.evalue, base.ecount)
+        with self._lock:
+            self._filtered[key] = plan
+            while len(self._filtered) > 32:
+                self._filtered.popitem(last=False)
+        return plan
+
+    def auto_level(self, limit: int, community: Optional[int],
+                   bbox: Optional[Tuple[float, float, float, float]]) -> int:
+        """Most detailed level whose node set fits in one page (overview when even GSTINs don't)."""
+        for level in (DETAIL, GSTINS):
+            if len(self.plan(level, community, bbox).nodes) <= limit:
+                return level
+        return GSTINS if community is not None else OVERVIEW
+
+    # ── Pages ───────────────────────────────────────────
+
+    def page(self, level: int, offset: int, limit: int, community: Optional[int] = None,
+             bbox: Optional[Tuple[float, float, float, float]] = None,
+             max_edges: int = MAX_PAGE_EDGES) -> Dict[str, Any]:
+        plan = self.plan(level, community, bbox)
+        end, lo, hi = plan.page(offset, limit, max_edges)
+        ids = plan.nodes[offset:end]
+        if level == OVERVIEW:
+            nodes, edges = self._community_nodes(ids), self._community_edges(plan, lo, hi)
+        else:
+            nodes, edges = self._graph_nodes(ids), self._graph_edges(plan, lo, hi)
+        cursor = None
+        if end < len(plan.nodes):
+            cursor = encode_cursor({"b": self.build_id, "l": level, "c": community, "x": bbox, "o": end})
+        return {
+            "level": level,
+            "level_name": LEVEL_NAMES[level],
+            "community": community,
+            "bbox": list(bbox) if bbox else None,
+            "nodes": nodes,
+            "edges": edges,
+            "offset": offset,
+            "next_cursor": cursor,
+            "total_nodes": len(plan.nodes),
+            "total_edges": len(plan.ekey),
+            "communities": self.k,
+            "gstins": int(self.n_gstins.sum()) if self.k else 0,
+            "bounds": self.bounds(),
+        }
+
+    def bounds(self) -> List[float]:
+        if not self.k:
+            return [0.0, 0.0, 0.0, 0.0]
+        return [round(float(v), 2) for v in (np.min(self.cx - self.radius), np.min(self.cy - self.radius),
+                                             np.max(self.cx + self.radius), np.max(self.cy + self.radius))]
+
+    def _risk(self, ids: np.ndarray) -> np.ndarray:
+        risk = self.g.risk_score.view()[ids]
+        return np.where(np.isnan(risk), np.where(self.is_inv[ids], 0.0, 0.1), risk)
+
+    def _community_nodes(self, comms: np.ndarray) -> List[Dict[str, Any]]:
+        out = []
+        for c in comms.tolist():
+            gstins = self.order[self.starts[c]:self.starts[c] + self.n_gstins[c]]
+            risk = self._risk(gstins) if len(gstins) else np.zeros(1)
+            n_g = int(self.n_gstins[c])
+            if c == self.unconnected:
+                label = f"Unconnected GSTINs ({n_g})"
+            else:
+                top = self.g.display_name(int(gstins[0])) if n_g else f"Community {c}"
+                label = top if n_g <= 1 else f"{top} +{n_g - 1}"
+            out.append({
+                "id": f"C{c}",
+                "label": label,
+                "type": "Community",
+                "community": c,
+                "gstins": n_g,
+                "invoices": int(self.n_invoices[c]),
+                "itc_value": round(float(self.itc_internal[c]), 2),
+                "risk_score": round(float(risk.max()), 4),
+                "high_risk": int((risk > 0.7).sum()),
+                "x": round(float(self.cx[c]), 2),
+                "y": round(float(self.cy[c]), 2),
+                "radius": round(float(self.radius[c]), 2),
+            })
+        return out
+
+    def _community_edges(self, plan: _Plan, lo: int, hi: int) -> List[Dict[str, Any]]:
+        return [{"from": f"C{u}", "to": f"C{v}", "type": CLAIMED_ITC_FROM, "value": w, "count": n}
+                for u, v, w, n in zip(plan.eu[lo:hi].tolist(), plan.ev[lo:hi].tolist(),
+                                      plan.evalue[lo:hi].tolist(), plan.ecount[lo:hi].tolist())]
+
+    def _graph_nodes(self, ids: np.ndarray) -> List[Dict[str, Any]]:
+        g = self.g
+        risk, x, y = self._risk(ids).tolist(), self.x[ids].tolist(), self.y[ids].tolist()
+        comm, inv = self.comm[ids].tolist(), self.is_inv[ids].tolist()
+        out = []
+        for j, i in enumerate(ids.tolist()):
+            name = g.name(i)
+            node = {"id": name, "label": name if inv[j] else g.display_name(i),
+                    "type": "Invoice" if inv[j] else "GSTIN", "community": comm[j],
+                    "risk_score": round(risk[j], 4), "x": round(x[j], 2), "y": round(y[j], 2)}
+            if inv[j]:
+                node["value"] = float(g.invoice_value[i])
+            out.append(node)
+        return out
+
+    def _graph_edges(self, plan: _Plan, lo: int, hi: int) -> List[Dict[str, Any]]:
+        name = self.g.name
+        return [{"from": name(u), "to": name(v), "type": _EDGE_TYPES[t], "value": w}
+                for u, v, t, w in zip(plan.eu[lo:hi].tolist(), plan.ev[lo:hi].tolist(),
+                                      plan.etype[lo:hi].tolist(), plan.evalue[lo:hi].tolist())]
+
+
+def _concat_edges(tables: Sequence[Tuple[np.ndarray, np.ndarray, np.ndarray]]) -> Tuple[np.ndarray, ...]:
+    """All edge tables as one (src, dst, type code, value) set, ITC first."""
+    eu = np.concatenate([t[0] for t in tables]).astype(np.int64)
+    ev = np.concatenate([t[1] for t in tables]).astype(np.int64)
+    et = np.concatenate([np.full(len(t[0]), code, dtype=np.int8) for code, t in enumerate(tables)])
+    return eu, ev, et, np.concatenate([t[2] for t in tables])
+
+
+# ── Cursors ─────────────────────────────────────────────
+
+def encode_cursor(state: Dict[str, Any]) -> str:
+    return base64.urlsafe_b64encode(json.dumps(state, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    try:
+        state = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return {"b": int(state["b"]), "l": int(state["l"]), "o": int(state["o"]),
+                "c": None if state.get("c") is None else int(state["c"]),
+                "x": tuple(float(v) for v in state["x"]) if state.get("x") else None}
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError(f"Malformed cursor: {e}") from e
+
+
+# ── Exporter ────────────────────────────────────────────
+
+class GraphViewExporter:
+    """Keeps the latest GraphView of graph_store (plus the one before it, for open cursors)."""
+
+    def __init__(self, store: GraphStore = graph_store, keep: int = 2) -> None:
+        self.store = store
+        self.keep = keep
+        self._views: "OrderedDict[int, GraphView]" = OrderedDict()
+        self._latest: Optional[GraphView] = None
+        self._building: Optional[asyncio.Task] = None
+        self._next_id = 1
+
+    async def view(self) -> Tuple[GraphView, bool]:
+        """(view, stale): a stale view is served while its replacement builds."""
+        neo4j = await self.store.neo4j_available()
+        stamp = self.store.neo4j_stamp() if neo4j else (id(self.store.graph), self.store.graph.version)
+        latest = self._latest
+        if latest is not None and latest.stamp == stamp:
+            return latest, False
+        if self._building is None or self._building.done():
+            self._building = asyncio.get_running_loop().create_task(self._build(stamp, neo4j))
+        if latest is None or latest.backend != ("neo4j" if neo4j else "networkx"):
+            latest = await asyncio.shield(self._building)
+        return latest, latest.stamp != stamp
+
+    async def export(self, level: Optional[int] = None, cursor: Optional[str] = None, limit: int = PAGE_SIZE,
+                     community: Optional[int] = None,
+                     bbox: Optional[Tuple[float, float, float, float]] = None) -> Dict[str, Any]:
+        """
+        One page of the graph. Without a cursor: level None picks the most
+        detailed level that fits in one page; community / bbox restrict the
+        nodes. With a cursor: the next page of the query that issued it.
+        """
+        if cursor:
+            state = decode_cursor(cursor)
+            view = self._views.get(state["b"])
+            if view is None:
+                raise ValueError("Cursor has expired (the graph changed); request the first page again")
+            level, community, bbox, offset = state["l"], state["c"], state["x"], state["o"]
+            stale = view is not self._latest
+        else:
+            view, stale = await self.view()
+            offset = 0
+        if community is not None and not 0 <= community < view.k:
+            raise ValueError(f"Unknown community {community}")
+        if level is None:
+            level = await asyncio.to_thread(view.auto_level, limit, community, bbox)
+        page = await asyncio.to_thread(view.page, level, offset, limit, community, bbox)
+        page.update({"backend": view.backend, "stale": stale, "built_at": view.built_at})
+        return page
+
+    async def _build(self, stamp: Hashable, neo4j: bool) -> GraphView:
+        t0 = time.perf_counter()
+        g = await self.store.neo4j_snapshot() if neo4j else self.store.graph
+        build_id, self._next_id = self._next_id, self._next_id + 1
+        view = await asyncio.to_thread(GraphView, g, stamp, build_id, "neo4j" if neo4j else "networkx")
+        self._views[build_id] = view
+        while len(self._views) > self.keep:
+            self._views.popitem(last=False)
+        self._latest = view
+        logger.info("Graph view {} built: nodes={} communities={} in {:.2f}s (layout {:.2f}s)",
+                    build_id, view.n, view.k, time.perf_counter() - t0, view.build_s)
+        return view
+
+    def stats(self) -> Dict[str, Any]:
+        v = self._latest
+        return {"views": list(self._views), "latest": v.build_id if v else None,
+                "nodes": v.n if v else 0, "communities": v.k if v else 0,
+                "build_s": round(v.build_s, 3) if v else None,
+                "building": self._building is not None and not self._building.done()}
+
+
+graph_view = GraphViewExporter()
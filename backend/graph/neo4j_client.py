@@ -1,11 +1,17 @@
 from __future__ import annotations
 
+import asyncio
+import os
+import random
+import threading
+import time
 from contextlib import asynccontextmanager
 from dataclasses import dataclass
-from typing import Any, AsyncGenerator, Dict, List, Optional
+from typing import Any, AsyncGenerator, Callable, Dict, List, Optional
 
 from loguru import logger
 from neo4j import AsyncGraphDatabase
+from neo4j.exceptions import ServiceUnavailable, SessionExpired
 
 from backend.config import settings
 
@@ -24,10 +30,39 @@ class Neo4jClient:
 
     async def run_query(self, query: str, params: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         params = params or {}
+        try:
+            async with self._driver.session() as session:
+                res = await session.run(query, params)
+                data = await res.data()
+                return data
+        except _CONNECTION_ERRORS as e:
+            neo4j_health.record_failure(e)
+            raise
+
+    async def write_batches(self, query: str, rows: List[Dict[str, Any]], batch_size: int) -> int:
+        """
+        Run an UNWIND $rows query over rows in chunks of batch_size, each chunk
+        in its own explicit write transaction (retried by the driver on
+        transient errors). Returns the number of transactions committed.
+        """
+        if not rows:
+            return 0
+        batches = 0
+        try:
+            async with self._driver.session() as session:
+                for i in range(0, len(rows), batch_size):
+                    await session.execute_write(_unwind, query, rows[i:i + batch_size])
+                    batches += 1
+        except _CONNECTION_ERRORS as e:
+            neo4j_health.record_failure(e)
+            raise
+        return batches
+
+    async def ping(self) -> None:
+        """One RETURN 1 round trip; raises if the server is unreachable."""
         async with self._driver.session() as session:
-            res = await session.run(query, params)
-            data = await res.data()
-            return data
+            res = await session.run("RETURN 1 AS ok")
+            await res.consume()
 
     @asynccontextmanager
     async def session(self) -> AsyncGenerator["Neo4jClient", None]:
@@ -38,8 +73,16 @@ class Neo4jClient:
             pass
 
 
+async def _unwind(tx: Any, query: str, rows: List[Dict[str, Any]]) -> None:
+    res = await tx.run(query, {"rows": rows})
+    await res.consume()
+
+
 _singleton: Optional[Neo4jClient] = None
 
+# Errors that mean the server is unreachable, as opposed to a bad query
+_CONNECTION_ERRORS = (ServiceUnavailable, SessionExpired, OSError, asyncio.TimeoutError)
+
 
 def get_neo4j_client() -> Neo4jClient:
     global _singleton
@@ -48,3 +91,170 @@ def get_neo4j_client() -> Neo4jClient:
         logger.info("Neo4j client initialized uri={}", settings.NEO4J_URI)
     return _singleton
 
+
+
+class Neo4jHealth:
+    """
+    Cached Neo4j availability with a circuit breaker, so graph calls decide
+    between Neo4j and the in-memory fallback without a round trip.
+    - up: re-probed every interval_s (background task, or lazily on the next call)
+    - down: breaker open; re-probed after an exponential backoff
+      (backoff_base_s doubled per consecutive failure, capped at backoff_max_s, jittered)
+    - concurrent callers share one in-flight probe; each probe is bounded by timeout_s
+    A connection failure on any real query opens the breaker immediately.
+    """
+
+    def __init__(
+        self,
+        interval_s: float = 15.0,
+        timeout_s: float = 2.0,
+        backoff_base_s: float = 1.0,
+        backoff_max_s: float = 60.0,
+        client_factory: Callable[[], Neo4jClient] = get_neo4j_client,
+    ) -> None:
+        self.interval_s = interval_s
+        self.timeout_s = timeout_s
+        self.backoff_base_s = backoff_base_s
+        self.backoff_max_s = backoff_max_s
+        self._client_factory = client_factory
+        self._lock = threading.RLock()
+        self._up: Optional[bool] = None          # None until the first probe
+        self._next_probe = 0.0                   # monotonic time the cached state expires
+        self._failures = 0                       # consecutive failures
+        self._last_error: Optional[str] = None
+        self._last_change: Optional[float] = None
+        self._latency_ms: Optional[float] = None
+        self._latency_avg_ms: Optional[float] = None
+        self._counts = {"probes": 0, "probe_failures": 0, "query_failures": 0, "decisions": 0, "probe_waits": 0}
+        self._inflight: Optional[asyncio.Future] = None
+        self._task: Optional[asyncio.Task] = None
+
+    # ── Decisions ───────────────────────────────────────
+
+    async def available(self) -> bool:
+        """True if Neo4j is believed up. No round trip unless the cached state has expired."""
+        with self._lock:
+            self._counts["decisions"] += 1
+            if self._up is not None and time.monotonic() < self._next_probe:
+                return self._up
+        return await self.probe()
+
+    @property
+    def up(self) -> bool:
+        return bool(self._up)
+
+    async def probe(self) -> bool:
+        """Run (or join) one RETURN 1 probe and update the breaker."""
+        loop = asyncio.get_running_loop()
+        fut = self._inflight
+        if fut is not None and not fut.done() and fut.get_loop() is loop:
+            with self._lock:
+                self._counts["probe_waits"] += 1
+            try:
+                return await asyncio.shield(fut)
+            except asyncio.CancelledError:
+                if not fut.cancelled():
+                    raise
+                # the task running the probe was cancelled, not this caller: probe again
+                return await self.probe()
+
+        fut = loop.create_future()
+        self._inflight = fut
+        t0 = time.perf_counter()
+        try:
+            client = self._client_factory()
+            await asyncio.wait_for(client.ping(), self.timeout_s)
+        except asyncio.CancelledError:
+            fut.cancel()
+            raise
+        except Exception as e:
+            self._record(False, e, (time.perf_counter() - t0) * 1000)
+        else:
+            self._record(True, None, (time.perf_counter() - t0) * 1000)
+        finally:
+            if self._inflight is fut:
+                self._inflight = None
+        fut.set_result(bool(self._up))
+        return bool(self._up)
+
+    def record_failure(self, exc: BaseException) -> None:
+        """A real query lost the connection: open the breaker now instead of at the next probe."""
+        with self._lock:
+            self._counts["query_failures"] += 1
+            if self._up is False:
+                return
+        self._record(False, exc, None, probe=False)
+
+    # ── Background probe ────────────────────────────────
+
+    def start(self) -> None:
+        """Keep the state fresh from a background task on the running loop (call once at startup)."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    async def _run(self) -> None:
+        while True:
+            await self.probe()
+            await asyncio.sleep(max(0.05, self._next_probe - time.monotonic()))
+
+    # ── Internals ───────────────────────────────────────
+
+    def _record(self, ok: bool, exc: Optional[BaseException], latency_ms: Optional[float], probe: bool = True) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if probe:
+                self._counts["probes"] += 1
+                self._latency_ms = round(latency_ms, 2)
+                if ok:
+                    prev = self._latency_avg_ms
+                    self._latency_avg_ms = round(latency_ms if prev is None else 0.8 * prev + 0.2 * latency_ms, 2)
+            if ok:
+                self._failures = 0
+                self._next_probe = now + self.interval_s
+            else:
+                if probe:
+                    self._counts["probe_failures"] += 1
+                self._failures += 1
+                self._last_error = f"{type(exc).__name__}: {exc}" if exc is not None else None
+                backoff = min(self.backoff_max_s, self.backoff_base_s * 2 ** (self._failures - 1))
+                self._next_probe = now + backoff * random.uniform(0.8, 1.0)
+            changed = self._up is not ok
+            self._up = ok
+            if changed:
+                self._last_change = time.time()
+        if changed:
+            if ok:
+                logger.info("Neo4j reachable (probe {:.1f} ms); graph calls use Neo4j", latency_ms or 0.0)
+            else:
+                logger.warning("Neo4j unavailable ({}); using in-memory graph, next probe in {:.1f}s",
+                               self._last_error, self._next_probe - now)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "state": {True: "up", False: "down", None: "unknown"}[self._up],
+                "consecutive_failures": self._failures,
+                "next_probe_in_s": round(max(0.0, self._next_probe - time.monotonic()), 2),
+                "last_probe_ms": self._latency_ms,
+                "avg_probe_ms": self._latency_avg_ms,
+                "last_error": self._last_error,
+                "last_change": self._last_change,
+                "background": self._task is not None and not self._task.done(),
+                **self._counts,
+            }
+
+
+neo4j_health = Neo4jHealth(
+    interval_s=float(os.getenv("NEO4J_PROBE_INTERVAL_S", "15")),
+    timeout_s=float(os.getenv("NEO4J_PROBE_TIMEOUT_S", "2")),
+    backoff_max_s=float(os.getenv("NEO4J_BACKOFF_MAX_S", "60")),
+)
@@ -0,0 +1,266 @@
+"""
+TaxIQ — Fraud Ring Clustering
+Turns individual CLAIMED_ITC_FROM cycles into ring entities and scores the
+communities they sit in:
+  - communities: label propagation over the ITC graph (communities.py)
+  - rings: the ring index in memory; with Neo4j, a bounded ring search over
+    a copy of its ITC edges
+  - rings sharing a GSTIN merge into one entity (a connected component of
+    the ring edges); its fraud amount counts each distinct ring edge once
+  - community score: CYCLE_WEIGHT x cycle density (share of the community's
+    internal ITC edges that lie on a ring) + VOLUME_WEIGHT x internal ITC
+    value, log-scaled against the largest community
+A run is persisted in FraudRingStore with a fingerprint of the ITC edges
+(count and total value). Reads serve the latest run; a changed fingerprint
+only schedules a background refresh.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from loguru import logger
+
+from backend.database.ring_store import FraudRingStore, fraud_ring_store
+from backend.graph.communities import propagate_labels
+from backend.graph.compact_graph import CompactGraph
+from backend.graph.cycle_search import find_rings
+from backend.graph.graph_builder import GraphStore, graph_store
+from backend.graph.neo4j_client import get_neo4j_client
+from backend.graph.ring_index import ITC_EDGE, MAX_RING, MIN_RING, ring_index
+
+CYCLE_WEIGHT = 0.6
+VOLUME_WEIGHT = 0.4
+# Ring search budget when the rings come from Neo4j (the ring index covers the in-memory graph)
+RING_SEARCH_BUDGET_S = float(os.getenv("RING_CLUSTER_BUDGET_S", "30"))
+# Sample cycles kept per ring entity
+MAX_CYCLES = 10
+# Communities smaller than this cannot hold a ring and are not stored
+MIN_COMMUNITY = MIN_RING
+
+
+def ring_confidence(ring_size: int, amount: float) -> float:
+    """Longer rings + higher amounts = higher confidence."""
+    size_factor = min(ring_size / MAX_RING, 1.0) * 0.5
+    amount_factor = min(amount / 5_000_000, 1.0) * 0.5
+    return min(size_factor + amount_factor + 0.3, 0.99)
+
+
+def _components(n: int, u: np.ndarray, v: np.ndarray) -> np.ndarray:
+    """Connected-component label (smallest member id) per node of the undirected edges u - v; -1 off the edges."""
+    lab = np.full(n, -1, dtype=np.int64)
+    nodes = np.unique(np.concatenate([u, v]))
+    lab[nodes] = nodes
+    while True:
+        low = np.minimum(lab[u], lab[v])
+        new = lab.copy()
+        np.minimum.at(new, u, low)
+        np.minimum.at(new, v, low)
+        new[nodes] = new[new[nodes]]
+        if np.array_equal(new, lab):
+            return lab
+        lab = new
+
+
+def cluster_rings(g: CompactGraph, rings: Sequence[Tuple[str, ...]],
+                  created_at: str = "") -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    (ring entities by fraud amount, communities by score, stats) for the rings
+    of g. Ring entities carry ringId, gstins, ringSize, ringCount, cycles,
+    fraudAmount, confidence, community, communityScore, detectedOn.
+    """
+    t0 = time.perf_counter()
+    with g._lock:
+        n = len(g)
+        src, dst, val = (a.copy() for a in g.edge_arrays(ITC_EDGE))
+    comm, rounds = propagate_labels(n, src, dst)
+    comm = comm.astype(np.int64)
+    k = int(comm.max()) + 1 if n and comm.max() >= 0 else 0
+
+    # Ring edges (member i -> member i+1, last -> first) and their values
+    lens = np.array([len(r) for r in rings], dtype=np.int64)
+    flat = g.ids([x for r in rings for x in r]) if len(rings) else np.zeros(0, dtype=np.int64)
+    starts = np.r_[0, np.cumsum(lens)[:-1]].astype(np.int64) if len(rings) else np.zeros(0, dtype=np.int64)
+    nxt = np.arange(1, len(flat) + 1)
+    nxt[starts + lens - 1] = starts
+    ru, rv = flat, flat[nxt] if len(flat) else flat
+    ekey = (src.astype(np.int64) << 32) | dst.astype(np.int64)
+    order = np.argsort(ekey)
+    sorted_key, sorted_val = ekey[order], val[order]
+    rkey = (ru << 32) | rv
+    rval = np.zeros(len(rkey))
+    if len(sorted_key):
+        pos = np.minimum(np.searchsorted(sorted_key, rkey), len(sorted_key) - 1)
+        hit = sorted_key[pos] == rkey
+        rval[hit] = sorted_val[pos[hit]]
+    _, first = np.unique(rkey, return_index=True)
+    eu, ev, ew = ru[first], rv[first], rval[first]
+
+    # Ring entities: components of the ring-edge graph, densely numbered
+    clus = _components(n, eu, ev)
+    roots, clus_dense = np.unique(clus[clus >= 0], return_inverse=True)
+    cid = np.full(n, -1, dtype=np.int64)
+    cid[clus >= 0] = clus_dense
+    n_clusters = len(roots)
+    amount = np.bincount(cid[eu], weights=ew, minlength=n_clusters)
+    ring_of = cid[flat[starts]] if len(rings) else np.zeros(0, dtype=np.int64)
+    ring_count = np.bincount(ring_of, minlength=n_clusters)
+
+    # Community scores
+    same = (comm[src] == comm[dst]) & (comm[src] >= 0) if len(src) else np.zeros(0, dtype=bool)
+    internal_edges = np.bincount(comm[src[same]], minlength=k)
+    internal_value = np.bincount(comm[src[same]], weights=val[same], minlength=k)
+    ring_same = (comm[eu] == comm[ev]) & (comm[eu] >= 0) if len(eu) else np.zeros(0, dtype=bool)
+    ring_edges = np.bincount(comm[eu[ring_same]], minlength=k)
+    density = ring_edges / np.maximum(internal_edges, 1)
+    top_value = np.log1p(internal_value.max()) if k and internal_value.max() > 0 else 1.0
+    volume = np.log1p(internal_value) / top_value
+    score = CYCLE_WEIGHT * density + VOLUME_WEIGHT * volume
+    size = np.bincount(comm[comm >= 0], minlength=k)
+
+    # Members per entity, and each entity's majority community
+    members = np.flatnonzero(cid >= 0)
+    members = members[np.argsort(cid[members], kind="stable")]
+    bounds = np.r_[0, np.cumsum(np.bincount(cid[members], minlength=n_clusters))]
+    rings_by_cluster: Dict[int, List[int]] = {}
+    for ri, c in enumerate(ring_of.tolist()):
+        lst = rings_by_cluster.setdefault(c, [])
+        if len(lst) < MAX_CYCLES:
+            lst.append(ri)
+    clusters_in: Dict[int, int] = {}
+
+    entities = []
+    for c in np.argsort(-amount, kind="stable").tolist():
+        ids = members[bounds[c]:bounds[c + 1]]
+        cs = comm[ids]
+        major = int(np.bincount(cs[cs >= 0]).argmax()) if (cs >= 0).any() else -1
+        clusters_in[major] = clusters_in.get(major, 0) + 1
+        cycles = [list(rings[ri]) + [rings[ri][0]] for ri in rings_by_cluster.get(c, [])]
+        ordered = list(dict.fromkeys([x for cyc in cycles for x in cyc] + g.names(ids.tolist())))
+        fraud = round(float(amount[c]), 2)
+        entities.append({
+            "ringId": f"RING-{len(entities) + 1:03d}",
+            "gstins": ordered,
+            "ringSize": len(ordered),
+            "ringCount": int(ring_count[c]),
+            "cycles": cycles,
+            "fraudAmount": fraud,
+            "confidence": round(ring_confidence(len(ordered), fraud), 2),
+            "community": major,
+            "communityScore": round(float(score[major]), 4) if major >= 0 else 0.0,
+            "detectedOn": created_at,
+        })
+
+    communities = []
+    for c in np.lexsort((np.arange(k), -score)).tolist():
+        if size[c] < MIN_COMMUNITY:
+            continue
+        communities.append({
+            "community": c,
+            "score": round(float(score[c]), 4),
+            "size": int(size[c]),
+            "itcEdges": int(internal_edges[c]),
+            "itcValue": round(float(internal_value[c]), 2),
+            "ringEdges": int(ring_edges[c]),
+            "cycleDensity": round(float(density[c]), 4),
+            "rings": clusters_in.get(c, 0),
+        })
+
+    stats = {
+        "nodes": n, "itc_edges": len(src), "rings": len(rings), "ring_entities": n_clusters,
+        "communities": k, "propagation_rounds": rounds, "elapsed_s": round(time.perf_counter() - t0, 3),
+    }
+    return entities, communities, stats
+
+
+class RingClusterService:
+    """Computes, persists and serves ring entities and community scores for graph_store."""
+
+    def __init__(self, store: GraphStore = graph_store, results: FraudRingStore = fraud_ring_store) -> None:
+        self.store = store
+        self.results = results
+        self._task: Optional[asyncio.Task] = None
+
+    async def fingerprint(self) -> str:
+        """backend:edge count:total value of the CLAIMED_ITC_FROM edges."""
+        if await self.store.neo4j_available():
+            rows = await get_neo4j_client().run_query(
+                "MATCH ()-[r:CLAIMED_ITC_FROM]->() RETURN count(r) AS n, sum(coalesce(r.value, 0.0)) AS v"
+            )
+            row = rows[0] if rows else {"n": 0, "v": 0.0}
+            return f"neo4j:{int(row['n'])}:{float(row['v'] or 0.0):.2f}"
+        g = self.store.graph
+        with g._lock:
+            _, _, val = g.edge_arrays(ITC_EDGE)
+            return f"networkx:{len(val)}:{float(val.sum()):.2f}"
+
+    async def refresh(self) -> Dict[str, Any]:
+        """Recompute and persist now; concurrent callers share one run."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        return await asyncio.shield(self._task)
+
+    def schedule_refresh(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+            self._task.add_done_callback(_log_failure)
+
+    async def latest(self) -> Tuple[Dict[str, Any], bool]:
+        """(latest run, stale). Computes the first run inline; later changes refresh in the background."""
+        run = await asyncio.to_thread(self.results.latest_run)
+        if run is None:
+            return await self.refresh(), False
+        stale = run["fingerprint"] != await self.fingerprint()
+        if stale:
+            self.schedule_refresh()
+        return run, stale
+
+    async def rings(self, min_confidence: float = 0.0, min_amount: float = 0.0,
+                    limit: int = 50, offset: int = 0) -> Dict[str, Any]:
+        run, stale = await self.latest()
+        rings, total = await asyncio.to_thread(self.results.rings, run["run_id"], min_confidence, min_amount,
+                                               limit, offset)
+        return {"rings": rings, "total": total, "runId": run["run_id"], "computedAt": run["created_at"],
+                "stale": stale, "backend": run["backend"]}
+
+    async def communities(self, limit: int = 50, offset: int = 0) -> Dict[str, Any]:
+        run, stale = await self.latest()
+        items, total = await asyncio.to_thread(self.results.communities, run["run_id"], limit, offset)
+        return {"communities": items, "total": total, "runId": run["run_id"], "computedAt": run["created_at"],
+                "stale": stale, "backend": run["backend"]}
+
+    async def _run(self) -> Dict[str, Any]:
+        t0 = time.perf_counter()
+        fingerprint = await self.fingerprint()
+        neo4j = fingerprint.startswith("neo4j:")
+        created_at = datetime.utcnow().isoformat() + "Z"
+        if neo4j:
+            g = await self.store.neo4j_snapshot(edge_types=(ITC_EDGE,), invoices=False)
+            result = await asyncio.to_thread(find_rings, g.edges(ITC_EDGE), MIN_RING, MAX_RING,
+                                             None, RING_SEARCH_BUDGET_S)
+            rings, complete = [r for _, r in result.rings], result.complete
+        else:
+            g = self.store.graph
+            await asyncio.to_thread(ring_index.sync, g)
+            rings, complete = ring_index.rings(), ring_index.complete
+        entities, communities, stats = await asyncio.to_thread(cluster_rings, g, rings, created_at)
+        stats.update({"rings_complete": complete, "total_s": round(time.perf_counter() - t0, 3)})
+        run = {"run_id": uuid.uuid4().hex, "fingerprint": fingerprint, "backend": "neo4j" if neo4j else "networkx",
+               "stats": stats, "created_at": created_at}
+        await asyncio.to_thread(self.results.save_run, run, entities, communities)
+        logger.info("Ring clustering run {}: {} rings -> {} entities, {} communities in {:.2f}s",
+                    run["run_id"][:8], stats["rings"], stats["ring_entities"], stats["communities"], stats["total_s"])
+        return run
+
+
+def _log_failure(task: asyncio.Task) -> None:
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning("Background ring clustering failed: {}", task.exception())
+
+
+ring_clusters = RingClusterService()
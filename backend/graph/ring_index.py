@@ -0,0 +1,228 @@
+"""
+TaxIQ — Incremental Circular-Trading Ring Index
+Keeps every CLAIMED_ITC_FROM cycle of 3..8 GSTINs in an index that is
+updated edge by edge, so ingesting an invoice never re-enumerates the graph.
+
+A cycle through a new edge u -> v is a simple path v ~> u of 2..7 hops.
+add_edge() finds them with:
+  1. a bidirectional BFS (forward from v, backward from u) whose depths add
+     up to 7; if the two balls do not meet, u and v share no short cycle
+     and nothing else is searched
+  2. a depth-limited DFS from v to u that only enters nodes the two balls
+     allow at that hop — the part of the strongly connected component a
+     cycle through u -> v can use
+Rings are stored once, rotated to start at their smallest GSTIN. Whole-graph
+rebuilds go through the bounded search in cycle_search.
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from loguru import logger
+
+from backend.graph.compact_graph import CLAIMED_ITC_FROM, CompactGraph
+from backend.graph.cycle_search import canonical_ring, find_rings
+
+ITC_EDGE = CLAIMED_ITC_FROM
+MIN_RING = 3
+MAX_RING = 8
+
+Ring = Tuple[str, ...]
+
+
+class RingIndex:
+    """
+    Adjacency of CLAIMED_ITC_FROM edges plus the rings they close.
+    sync() rebuilds from the in-memory graph when it changed behind the index's back.
+    """
+
+    # Cap on rings recorded for a single new edge (dense cliques explode combinatorially)
+    MAX_RINGS_PER_EDGE = 500
+    # Wall-clock budget for a whole-graph rebuild
+    REBUILD_BUDGET_S = float(os.getenv("RING_REBUILD_BUDGET_S", "10"))
+
+    def __init__(self) -> None:
+        self._lock = threading.RLock()
+        self._succ: Dict[str, Set[str]] = {}
+        self._pred: Dict[str, Set[str]] = {}
+        self._rings: Dict[Ring, None] = {}
+        self._by_node: Dict[str, Set[Ring]] = {}
+        self._stamp: Optional[Tuple[int, int]] = None
+        # False once a rebuild ran out of budget or an edge hit MAX_RINGS_PER_EDGE
+        self.complete = True
+        self._searches = 0
+        self._search_s = 0.0
+
+    # ── Updates ─────────────────────────────────────────
+
+    def add_edge(self, u: str, v: str) -> List[Ring]:
+        """Record u -> v and return the rings it closes."""
+        with self._lock:
+            if u == v or v in self._succ.get(u, ()):
+                return []
+            self._succ.setdefault(u, set()).add(v)
+            self._pred.setdefault(v, set()).add(u)
+            t0 = time.perf_counter()
+            found = self._rings_through(u, v)
+            self._searches += 1
+            self._search_s += time.perf_counter() - t0
+            new = [r for r in found if r not in self._rings]
+            for r in new:
+                self._rings[r] = None
+                for n in r:
+                    self._by_node.setdefault(n, set()).add(r)
+            return new
+
+    def mark_synced(self, g: CompactGraph) -> None:
+        """Record that the index reflects `g` as it is now."""
+        self._stamp = (id(g), g.edge_version(ITC_EDGE))
+
+    def is_current(self, g: CompactGraph) -> bool:
+        return self._stamp == (id(g), g.edge_version(ITC_EDGE))
+
+    def sync(self, g: CompactGraph) -> None:
+        """Rebuild from `g` if edges were added without going through add_edge()."""
+        with self._lock:
+            if not self.is_current(g):
+                self.rebuild(g)
+
+    def rebuild(self, g: CompactGraph) -> None:
+        """Reload the graph's CLAIMED_ITC_FROM edges and re-enumerate rings with the bounded search."""
+        with self._lock:
+            self._succ.clear()
+            self._pred.clear()
+            self._rings.clear()
+            self._by_node.clear()
+            edges = list(g.edges(ITC_EDGE))
+            for u, v, _ in edges:
+                if u != v:
+                    self._succ.setdefault(u, set()).add(v)
+                    self._pred.setdefault(v, set()).add(u)
+            result = find_rings(edges, MIN_RING, MAX_RING, budget_s=self.REBUILD_BUDGET_S)
+            for _, r in result.rings:
+                self._rings[r] = None
+                for n in r:
+                    self._by_node.setdefault(n, set()).add(r)
+            self.complete = result.complete
+            self.mark_synced(g)
+            if not result.complete:
+                logger.warning("Ring index rebuild hit its {}s budget; {} rings indexed so far",
+                               self.REBUILD_BUDGET_S, len(self._rings))
+            logger.info("Ring index rebuilt edges={} rings={} in {:.3f}s",
+                        len(edges), len(self._rings), result.stats["elapsed_s"])
+
+    def restore(self, g: CompactGraph, rings: List[Ring], complete: bool) -> None:
+        """Load rings saved alongside a graph snapshot instead of re-enumerating them."""
+        with self._lock:
+            self._succ.clear()
+            self._pred.clear()
+            self._rings.clear()
+            self._by_node.clear()
+            for u, v, _ in g.edges(ITC_EDGE):
+                if u != v:
+                    self._succ.setdefault(u, set()).add(v)
+                    self._pred.setdefault(v, set()).add(u)
+            for r in rings:
+                self._rings[r] = None
+                for n in r:
+                    self._by_node.setdefault(n, set()).add(r)
+            self.complete = complete
+            self.mark_synced(g)
+
+    # ── Reads ───────────────────────────────────────────
+
+    def rings(self, limit: Optional[int] = None) -> List[Ring]:
+        """Longest rings first; ties in GSTIN order."""
+        with self._lock:
+            out = sorted(self._rings, key=lambda r: (-len(r), r))
+        return out if limit is None else out[:limit]
+
+    def rings_for(self, gstin: str) -> List[Ring]:
+        with self._lock:
+            return sorted(self._by_node.get(gstin, ()), key=lambda r: (-len(r), r))
+
+    def ring_nodes(self) -> Set[str]:
+        with self._lock:
+            return set(self._by_node)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "rings": len(self._rings),
+                "edges": sum(len(s) for s in self._succ.values()),
+                "complete": self.complete,
+                "searches": self._searches,
+                "search_ms_total": round(self._search_s * 1000, 2),
+            }
+
+    # ── Bounded search ──────────────────────────────────
+
+    def _rings_through(self, u: str, v: str) -> List[Ring]:
+        max_hops = MAX_RING - 1  # v ~> u path length, edges
+        if not self._pred.get(u) or not self._succ.get(v):
+            return []
+
+        # 1. bidirectional BFS: grow the smaller frontier until the two depths
+        #    cover max_hops; every short v ~> u path then has a node in both balls
+        dist_f: Dict[str, int] = {v: 0}
+        dist_b: Dict[str, int] = {u: 0}
+        front_f, front_b = [v], [u]
+        depth_f = depth_b = 0
+        while depth_f + depth_b < max_hops and front_f and front_b:
+            if len(front_f) <= len(front_b):
+                depth_f += 1
+                front_f = self._expand(front_f, self._succ, dist_f, depth_f)
+            else:
+                depth_b += 1
+                front_b = self._expand(front_b, self._pred, dist_b, depth_b)
+        if dist_f.keys().isdisjoint(dist_b.keys()):
+            return []
+
+        # 2. depth-limited DFS v ~> u. A node at hop p <= depth_f must be in the
+        #    forward ball; its remaining distance to u is dist_b, or more than
+        #    depth_b when outside the backward ball
+        found: List[Ring] = []
+        path = [v]
+        on_path = {v}
+        stack = [iter(self._succ.get(v, ()))]
+        while stack:
+            y = next(stack[-1], None)
+            if y is None:
+                stack.pop()
+                on_path.discard(path.pop())
+                continue
+            depth = len(path)  # hops once y is appended
+            if y == u:
+                if depth >= MIN_RING - 1:
+                    found.append(canonical_ring([u] + path))
+                    if len(found) >= self.MAX_RINGS_PER_EDGE:
+                        if self.complete:
+                            logger.warning("Ring search capped at {} rings for edge {} -> {}; index incomplete",
+                                           self.MAX_RINGS_PER_EDGE, u, v)
+                        self.complete = False
+                        break
+                continue
+            if y in on_path or (depth <= depth_f and y not in dist_f):
+                continue
+            if depth + dist_b.get(y, depth_b + 1) > max_hops:
+                continue
+            path.append(y)
+            on_path.add(y)
+            stack.append(iter(self._succ.get(y, ())))
+        return found
+
+    @staticmethod
+    def _expand(frontier: List[str], adj: Dict[str, Set[str]], dist: Dict[str, int], depth: int) -> List[str]:
+        nxt: List[str] = []
+        for x in frontier:
+            for y in adj.get(x, ()):
+                if y not in dist:
+                    dist[y] = depth
+                    nxt.append(y)
+        return nxt
+
+
+ring_index = RingIndex()
@@ -0,0 +1,104 @@
+"""
+TaxIQ — Vectorized GSTIN Risk Scoring
+risk_score for every GSTIN of the in-memory graph from its CLAIMED_ITC_FROM
+edge table:
+  - out-claim count and total claimed value per GSTIN by array reductions
+  - the claim thresholds applied as masks
+  - cycle membership passed in as a precomputed set (ring index members)
+Once a full pass has run, on_itc_edge() keeps scores current as edges arrive:
+a new edge re-scores its two endpoints, plus members of any ring it closed.
+"""
+from __future__ import annotations
+
+import threading
+from typing import Iterable, Optional, Set, Tuple
+
+import numpy as np
+
+from backend.graph.compact_graph import CLAIMED_ITC_FROM, GSTIN, CompactGraph
+
+CYCLE_RISK = 0.9
+
+
+def risk_from_claims(out_claims: np.ndarray, total_val: np.ndarray, in_cycle: np.ndarray) -> np.ndarray:
+    """0.8 / 0.5 / 0.2 by claim count or value, at least 0.9 for ring members."""
+    risk = np.where(
+        (out_claims >= 5) | (total_val > 500000), 0.8,
+        np.where((out_claims >= 2) | (total_val > 150000), 0.5, 0.2),
+    )
+    return np.where(in_cycle, np.maximum(risk, CYCLE_RISK), risk)
+
+
+class GraphRiskScorer:
+    """Writes CompactGraph.risk_score; incremental once score_all() has run on the graph."""
+
+    def __init__(self) -> None:
+        self._lock = threading.RLock()
+        self._stamp: Optional[Tuple[int, int]] = None
+        self._out_value = np.zeros(0)
+        self._cycle_nodes: Set[str] = set()
+
+    def is_current(self, g: CompactGraph) -> bool:
+        return self._stamp == (id(g), g.edge_version(CLAIMED_ITC_FROM))
+
+    def score_all(self, g: CompactGraph, cycle_nodes: Iterable[str]) -> int:
+        """Full pass over every GSTIN; returns how many were scored."""
+        with self._lock:
+            n = len(g)
+            src, _, val = g.edge_arrays(CLAIMED_ITC_FROM)
+            out_claims = g.out_degrees(CLAIMED_ITC_FROM)[:n]
+            out_value = np.bincount(src, weights=val, minlength=n)
+            self._cycle_nodes = set(cycle_nodes)
+            in_cycle = np.zeros(n, dtype=bool)
+            ids = g.ids(list(self._cycle_nodes))
+            in_cycle[ids[ids >= 0]] = True
+
+            gstins = g.kind.view() == GSTIN
+            risk = risk_from_claims(out_claims, out_value, in_cycle)
+            g.risk_score[gstins] = risk[gstins]
+            self._out_value = out_value
+            self._stamp = (id(g), g.edge_version(CLAIMED_ITC_FROM))
+            return int(gstins.sum())
+
+    def on_itc_edge(self, g: CompactGraph, buyer: str, supplier: str, value: float,
+                    old_value: Optional[float], new_rings: Iterable[Tuple[str, ...]] = ()) -> None:
+        """
+        Call right after buyer -> supplier was written (old_value: its value before,
+        None if new). No-op until a full pass has scored this graph.
+        """
+        with self._lock:
+            if self._stamp != (id(g), g.edge_version(CLAIMED_ITC_FROM) - 1):
+                return
+            self._grow(len(g))
+            self._out_value[g.id_of(buyer)] += value - (old_value or 0.0)
+            touched = {buyer, supplier}
+            for ring in new_rings:
+                self._cycle_nodes.update(ring)
+                touched.update(ring)
+            self._rescore(g, touched)
+            self._stamp = (id(g), g.edge_version(CLAIMED_ITC_FROM))
+
+    def on_gstin(self, g: CompactGraph, gstin: str) -> None:
+        """A GSTIN node was (re)created with the default risk; score it like the full pass would."""
+        with self._lock:
+            if self.is_current(g):
+                self._grow(len(g))
+                self._rescore(g, [gstin])
+
+    def _grow(self, n: int) -> None:
+        if len(self._out_value) < n:
+            extra = max(n - len(self._out_value), len(self._out_value) // 2)
+            self._out_value = np.concatenate([self._out_value, np.zeros(extra)])
+
+    def _rescore(self, g: CompactGraph, gstins: Iterable[str]) -> None:
+        ids = g.ids(list(gstins))
+        ids = ids[ids >= 0]
+        ids = ids[g.kind[ids] == GSTIN]
+        if not len(ids):
+            return
+        out_claims = g.out_degrees(CLAIMED_ITC_FROM)[ids]
+        in_cycle = np.array([g.name(i) in self._cycle_nodes for i in ids.tolist()], dtype=bool)
+        g.risk_score[ids] = risk_from_claims(out_claims, self._out_value[ids], in_cycle)
+
+
+graph_risk = GraphRiskScorer()
@@ -0,0 +1,365 @@
+"""
+TaxIQ — Graph Traversal
+Investigator queries over the in-memory graph, run on the CompactGraph CSR
+adjacency (no edge scans):
+  - ego_network: k-hop neighbourhood of a GSTIN over CLAIMED_ITC_FROM in
+    either direction, breadth-first, capped at max_nodes
+  - shortest_path: bidirectional BFS between two GSTINs along CLAIMED_ITC_FROM
+  - invoice_chain: GSTIN -ISSUED-> Invoice -RECEIVED_BY-> buyer -ISSUED-> ...
+Results are cached per query and dropped as soon as the graph changes; node
+attributes (risk scores move without a graph write) are filled in per call.
+Neo4j-backed results also expire every NEO4J_READ_CACHE_TTL_S, since writes
+from other processes are not seen here.
+"""
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+from backend.graph.compact_graph import CLAIMED_ITC_FROM, INVOICE, ISSUED, RECEIVED_BY, CompactGraph
+from backend.graph.graph_builder import graph_store
+from backend.graph.neo4j_client import get_neo4j_client
+
+MAX_NODES = 500
+
+
+class TraversalCache:
+    """
+    LRU of query results tagged with the graph state they were computed on:
+    (id, version) of a CompactGraph, or GraphStore.neo4j_stamp() for Neo4j.
+    A lookup under a new stamp drops every entry.
+    """
+
+    def __init__(self, max_entries: int = 256) -> None:
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._stamp: Optional[Hashable] = None
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    def lookup(self, stamp: Hashable, key: Hashable) -> Tuple[bool, Any]:
+        with self._lock:
+            if stamp != self._stamp:
+                if self._entries:
+                    self._stats["invalidations"] += 1
+                self._entries.clear()
+                self._stamp = stamp
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return True, self._entries[key]
+            self._stats["misses"] += 1
+            return False, None
+
+    def store(self, stamp: Hashable, key: Hashable, value: Any) -> None:
+        with self._lock:
+            if self._stamp == stamp:
+                self._entries[key] = value
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+
+    def get(self, g: CompactGraph, key: Hashable, compute: Callable[[], Any]) -> Any:
+        stamp = (id(g), g.version)
+        hit, value = self.lookup(stamp, key)
+        if not hit:
+            value = compute()
+            self.store(stamp, key, value)
+        return value
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"size": len(self._entries), **self._stats}
+
+
+traversal_cache = TraversalCache()
+
+
+def _node(g: CompactGraph, i: int, **extra: Any) -> Dict[str, Any]:
+    risk = float(g.risk_score[i])
+    out = {"id": g.name(i), "label": g.label(i) or "Node", "name": g.display_name(i),
+           "risk_score": None if np.isnan(risk) else risk}
+    if g.kind[i] == INVOICE:
+        date = g.invoice_date[i]
+        out.update(amount=float(g.invoice_value[i]), tax=float(g.invoice_tax[i]),
+                   date="" if np.isnat(date) else str(date))
+    out.update(extra)
+    return out
+
+
+def _neighbours(indptr: np.ndarray, nbrs: np.ndarray, i: int) -> np.ndarray:
+    return nbrs[indptr[i]:indptr[i + 1]] if i + 1 < len(indptr) else nbrs[:0]
+
+
+def ego_network(g: CompactGraph, gstin: str, hops: int = 2, max_nodes: int = MAX_NODES) -> Optional[Dict[str, Any]]:
+    """Nodes within `hops` ITC edges of gstin (either direction), nearest first; None if unknown."""
+    res = traversal_cache.get(g, ("ego", gstin, hops, max_nodes), lambda: _ego(g, gstin, hops, max_nodes))
+    return _with_nodes(g, res)
+
+
+def _with_nodes(g: CompactGraph, res: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    if res is None:
+        return None
+    out = {k: v for k, v in res.items() if k != "hop"}
+    out["nodes"] = [_node(g, i, hop=d) for i, d in res["hop"].items()]
+    return out
+
+
+def _ego(g: CompactGraph, gstin: str, hops: int, max_nodes: int) -> Optional[Dict[str, Any]]:
+    start = g.id_of(gstin)
+    if start is None:
+        return None
+    out_ptr, out_nbr, out_val = g.csr(CLAIMED_ITC_FROM, "out")
+    in_ptr, in_nbr, _ = g.csr(CLAIMED_ITC_FROM, "in")
+    hop = {start: 0}
+    frontier = [start]
+    truncated = False
+    for depth in range(1, hops + 1):
+        nxt: List[int] = []
+        for x in frontier:
+            for y in np.concatenate([_neighbours(out_ptr, out_nbr, x), _neighbours(in_ptr, in_nbr, x)]).tolist():
+                if y not in hop:
+                    if len(hop) >= max_nodes:
+                        truncated = True
+                        break
+                    hop[y] = depth
+                    nxt.append(y)
+            if truncated:
+                break
+        frontier = nxt
+        if truncated or not frontier:
+            break
+
+    links = []
+    for x in hop:
+        lo, hi = (out_ptr[x], out_ptr[x + 1]) if x + 1 < len(out_ptr) else (0, 0)
+        for y, w in zip(out_nbr[lo:hi].tolist(), out_val[lo:hi].tolist()):
+            if y in hop:
+                links.append({"source": g.name(x), "target": g.name(y), "type": CLAIMED_ITC_FROM, "value": w})
+    return {
+        "gstin": gstin,
+        "hops": hops,
+        "hop": hop,
+        "links": links,
+        "truncated": truncated,
+    }
+
+
+def shortest_path(g: CompactGraph, source: str, target: str, max_hops: int = 12) -> Optional[Dict[str, Any]]:
+    """Fewest-hop CLAIMED_ITC_FROM path source -> target; None if either GSTIN is unknown."""
+    return traversal_cache.get(g, ("path", source, target, max_hops), lambda: _shortest(g, source, target, max_hops))
+
+
+def _shortest(g: CompactGraph, source: str, target: str, max_hops: int) -> Optional[Dict[str, Any]]:
+    s, t = g.id_of(source), g.id_of(target)
+    if s is None or t is None:
+        return None
+    if s == t:
+        return {"source": source, "target": target, "path": [source], "length": 0, "edges": []}
+    out_ptr, out_nbr, _ = g.csr(CLAIMED_ITC_FROM, "out")
+    in_ptr, in_nbr, _ = g.csr(CLAIMED_ITC_FROM, "in")
+    # parent pointers from each side; always grow the smaller frontier
+    fwd: Dict[int, int] = {s: -1}
+    bwd: Dict[int, int] = {t: -1}
+    front_f, front_b = [s], [t]
+    meet = -1
+    hops = 0
+    while front_f and front_b and meet < 0 and hops < max_hops:
+        hops += 1
+        forward = len(front_f) <= len(front_b)
+        ptr, nbr, seen, other = (out_ptr, out_nbr, fwd, bwd) if forward else (in_ptr, in_nbr, bwd, fwd)
+        nxt: List[int] = []
+        for x in (front_f if forward else front_b):
+            for y in _neighbours(ptr, nbr, x).tolist():
+                if y in seen:
+                    continue
+                seen[y] = x
+                if y in other:
+                    meet = y
+                    break
+                nxt.append(y)
+            if meet >= 0:
+                break
+        if forward:
+            front_f = nxt
+        else:
+            front_b = nxt
+    if meet < 0:
+        return {"source": source, "target": target, "path": [], "length": None, "edges": []}
+
+    path = []
+    x = meet
+    while x != -1:
+        path.append(x)
+        x = fwd[x]
+    path.reverse()
+    x = bwd[meet]
+    while x != -1:
+        path.append(x)
+        x = bwd[x]
+    names = g.names(path)
+    edges = [{"source": u, "target": v, "type": CLAIMED_ITC_FROM, "value": g.edge_value(u, v, CLAIMED_ITC_FROM)}
+             for u, v in zip(names, names[1:])]
+    return {"source": source, "target": target, "path": names, "length": len(path) - 1, "edges": edges}
+
+
+def invoice_chain(g: CompactGraph, gstin: str, depth: int = 3, period: Optional[str] = None,
+                  max_nodes: int = MAX_NODES) -> Optional[Dict[str, Any]]:
+    """
+    Follow invoices downstream of gstin: its issued invoices, their buyers,
+    the buyers' issued invoices, ... for `depth` GSTIN hops. period (YYYY-MM)
+    keeps only invoices dated in that month.
+    """
+    res = traversal_cache.get(g, ("chain", gstin, depth, period, max_nodes),
+                              lambda: _chain(g, gstin, depth, period, max_nodes))
+    return _with_nodes(g, res)
+
+
+def _chain(g: CompactGraph, gstin: str, depth: int, period: Optional[str], max_nodes: int) -> Optional[Dict[str, Any]]:
+    start = g.id_of(gstin)
+    if start is None:
+        return None
+    iss_ptr, iss_nbr, _ = g.csr(ISSUED, "out")
+    rec_ptr, rec_nbr, _ = g.csr(RECEIVED_BY, "out")
+    month = np.datetime64(period, "M") if period else None
+    dates = g.invoice_date.view()
+
+    seen = {start: 0}
+    links: List[Dict[str, Any]] = []
+    frontier = [start]
+    truncated = False
+    for hop in range(1, depth + 1):
+        nxt: List[int] = []
+        for x in frontier:
+            invs = _neighbours(iss_ptr, iss_nbr, x)
+            if month is not None and len(invs):
+                invs = invs[dates[invs].astype("datetime64[M]") == month]
+            for inv in invs.tolist():
+                buyers = _neighbours(rec_ptr, rec_nbr, inv).tolist()
+                if inv not in seen:
+                    if len(seen) + len(buyers) >= max_nodes:
+                        truncated = True
+                        break
+                    seen[inv] = hop
+                links.append({"source": g.name(x), "target": g.name(inv), "type": ISSUED})
+                for b in buyers:
+                    links.append({"source": g.name(inv), "target": g.name(b), "type": RECEIVED_BY})
+                    if b not in seen:
+                        seen[b] = hop
+                        nxt.append(b)
+            if truncated:
+                break
+        frontier = nxt
+        if truncated or not frontier:
+            break
+
+    return {"gstin": gstin, "period": period, "depth": depth, "hop": seen, "links": links, "truncated": truncated}
+
+
+# ── Dual-mode API (Neo4j if available, else the in-memory graph) ──────
+
+async def get_network(gstin: str, hops: int = 2, max_nodes: int = MAX_NODES) -> Optional[Dict[str, Any]]:
+    if not await graph_store.neo4j_available():
+        return ego_network(graph_store.graph, gstin, hops, max_nodes)
+    key = ("neo4j-ego", gstin, hops, max_nodes)
+    return await _cached_neo4j(key, lambda: _neo4j_network(gstin, hops, max_nodes))
+
+
+async def get_shortest_path(source: str, target: str, max_hops: int = 12) -> Optional[Dict[str, Any]]:
+    if not await graph_store.neo4j_available():
+        return shortest_path(graph_store.graph, source, target, max_hops)
+    key = ("neo4j-path", source, target, max_hops)
+    return await _cached_neo4j(key, lambda: _neo4j_shortest(source, target, max_hops))
+
+
+async def get_invoice_chain(gstin: str, depth: int = 3, period: Optional[str] = None,
+                            max_nodes: int = MAX_NODES) -> Optional[Dict[str, Any]]:
+    if not await graph_store.neo4j_available():
+        return invoice_chain(graph_store.graph, gstin, depth, period, max_nodes)
+    key = ("neo4j-chain", gstin, depth, period, max_nodes)
+    return await _cached_neo4j(key, lambda: _neo4j_chain(gstin, depth, period, max_nodes))
+
+
+async def _cached_neo4j(key: Hashable, compute: Callable[[], Awaitable[Any]]) -> Any:
+    stamp = graph_store.neo4j_stamp()
+    hit, value = traversal_cache.lookup(stamp, key)
+    if not hit:
+        value = await compute()
+        traversal_cache.store(stamp, key, value)
+    return value
+
+
+async def _neo4j_network(gstin: str, hops: int, max_nodes: int) -> Optional[Dict[str, Any]]:
+    # variable-length bounds cannot be parameters; hops is an int validated by the caller
+    q = f"""
+    MATCH p = (c:GSTIN {{gstin: $gstin}})-[:CLAIMED_ITC_FROM*0..{int(hops)}]-(n:GSTIN)
+    WITH n, min(length(p)) AS hop ORDER BY hop LIMIT $max_nodes
+    WITH collect({{n: n, hop: hop}}) AS rows
+    WITH rows, [r IN rows | r.n] AS ns
+    UNWIND rows AS row
+    WITH row, ns, row.n AS a
+    OPTIONAL MATCH (a)-[r:CLAIMED_ITC_FROM]->(b) WHERE b IN ns
+    RETURN a.gstin AS gstin, a.name AS name, a.risk_score AS risk, row.hop AS hop,
+           collect(CASE WHEN b IS NULL THEN NULL ELSE {{target: b.gstin, value: r.value}} END) AS out
+    """
+    rows = await get_neo4j_client().run_query(q, {"gstin": gstin, "max_nodes": max_nodes})
+    if not rows:
+        return None
+    nodes = [{"id": r["gstin"], "label": "GSTIN", "name": r.get("name") or r["gstin"],
+              "risk_score": r.get("risk"), "hop": r["hop"]} for r in rows]
+    links = [{"source": r["gstin"], "target": o["target"], "type": CLAIMED_ITC_FROM, "value": float(o.get("value") or 0.0)}
+             for r in rows for o in r["out"] if o]
+    return {"gstin": gstin, "hops": hops, "links": links, "truncated": len(rows) >= max_nodes, "nodes": nodes}
+
+
+async def _neo4j_shortest(source: str, target: str, max_hops: int) -> Optional[Dict[str, Any]]:
+    q = f"""
+    MATCH (a:GSTIN {{gstin: $s}}), (b:GSTIN {{gstin: $t}})
+    OPTIONAL MATCH p = shortestPath((a)-[:CLAIMED_ITC_FROM*..{int(max_hops)}]->(b))
+    RETURN [n IN nodes(p) | n.gstin] AS path, [r IN relationships(p) | r.value] AS values
+    """
+    rows = await get_neo4j_client().run_query(q, {"s": source, "t": target})
+    if not rows:
+        return None
+    path = rows[0]["path"] or []
+    values = rows[0]["values"] or []
+    edges = [{"source": u, "target": v, "type": CLAIMED_ITC_FROM, "value": w}
+             for u, v, w in zip(path, path[1:], values)]
+    return {"source": source, "target": target, "path": path, "length": len(path) - 1 if path else None,
+            "edges": edges}
+
+
+async def _neo4j_chain(gstin: str, depth: int, period: Optional[str], max_nodes: int) -> Optional[Dict[str, Any]]:
+    q = f"""
+    MATCH (s:GSTIN {{gstin: $gstin}})
+    OPTIONAL MATCH p = (s)-[:ISSUED|RECEIVED_BY*2..{2 * int(depth)}]->(:GSTIN)
+    WHERE all(n IN nodes(p) WHERE NOT n:Invoice OR $period IS NULL OR n.date STARTS WITH $period)
+    RETURN [n IN nodes(p) | {{id: coalesce(n.gstin, n.invoice_id), label: labels(n)[0], name: n.name,
+                              risk: n.risk_score, amount: n.value, tax: n.tax, date: n.date}}] AS nodes,
+           [r IN relationships(p) | type(r)] AS types
+    LIMIT $max_nodes
+    """
+    rows = await get_neo4j_client().run_query(q, {"gstin": gstin, "period": period, "max_nodes": max_nodes})
+    if not rows:
+        return None
+    nodes: Dict[str, Dict[str, Any]] = {gstin: {"id": gstin, "label": "GSTIN", "name": gstin, "risk_score": None, "hop": 0}}
+    links: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    for row in rows:
+        path = row["nodes"] or []
+        for k, n in enumerate(path):
+            hop = (k + 1) // 2  # GSTIN hops: invoice k=1 and its buyer k=2 are both hop 1
+            known = nodes.get(n["id"])
+            if known is not None and known["hop"] <= hop and k:
+                continue
+            item = {"id": n["id"], "label": n["label"], "name": n.get("name") or n["id"],
+                    "risk_score": n.get("risk"), "hop": hop}
+            if n["label"] == "Invoice":
+                item.update(amount=float(n.get("amount") or 0.0), tax=float(n.get("tax") or 0.0),
+                            date=str(n.get("date") or ""))
+            nodes[n["id"]] = item
+        for (a, b), t in zip(zip(path, path[1:]), row["types"] or []):
+            links[(a["id"], b["id"])] = {"source": a["id"], "target": b["id"], "type": t}
+    return {"gstin": gstin, "period": period, "depth": depth, "links": list(links.values()),
+            "truncated": len(rows) >= max_nodes, "nodes": list(nodes.values())}
@@ -1,11 +1,12 @@
 from __future__ import annotations
 
+import asyncio
 import os
 import tempfile
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
-from fastapi import FastAPI, File, Form, HTTPException, UploadFile
+from fastapi import FastAPI, File, Form, HTTPException, Query, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import FileResponse, JSONResponse
 from loguru import logger
@@ -44,24 +45,51 @@ app.include_router(whatsapp_router)
 @app.on_event("startup")
 async def _startup() -> None:
     ensure_sample_data()
+    from backend.graph.neo4j_client import neo4j_health
+    neo4j_health.start()
+    if _graph_persist():
+        from backend.graph.graph_snapshot import graph_persistence
+        try:
+            graph_persistence.restore()
+            graph_persistence.start()
+        except Exception as e:
+            logger.warning("Graph snapshot restore skipped: {}", str(e))
     try:
         postgres_client.init_schema()
     except Exception as e:
         logger.warning("Postgres init skipped (not reachable): {}", str(e))
 
 
+@app.on_event("shutdown")
+async def _shutdown() -> None:
+    from backend.graph.neo4j_client import neo4j_health
+    from backend.utils.llm_client import aclose_llm_pool
+    await neo4j_health.stop()
+    await aclose_llm_pool()
+    if _graph_persist():
+        from backend.graph.graph_snapshot import graph_persistence
+        await graph_persistence.stop()
+        try:
+            graph_persistence.snapshot()
+        except Exception as e:
+            logger.warning("Graph snapshot on shutdown failed: {}", str(e))
+        graph_persistence.close()
+
+
+def _graph_persist() -> bool:
+    return os.getenv("GRAPH_PERSIST", "true").lower() == "true"
+
+
 @app.get("/health")
 async def health() -> Dict[str, Any]:
     status: Dict[str, Any] = {"ok": True, "service": "taxiq-backend"}
 
-    # Neo4j — True if connected, "demo" if using networkx fallback
-    try:
-        from backend.graph.neo4j_client import get_neo4j_client
-        nc = get_neo4j_client()
-        res = await nc.run_query("RETURN 1 AS ok")
-        status["neo4j"] = True
-    except Exception:
-        status["neo4j"] = "demo"          # networkx fallback active
+    # Neo4j — True if connected, "demo" if using networkx fallback (cached breaker state)
+    from backend.graph.neo4j_client import neo4j_health
+    status["neo4j"] = True if await neo4j_health.available() else "demo"
+    status["neo4j_health"] = neo4j_health.stats()
+    from backend.graph.graph_view import graph_view
+    status["graph_view"] = graph_view.stats()
 
     # PostgreSQL — True if connected, "demo" if using in-memory fallback
     try:
@@ -87,6 +115,18 @@ async def health() -> Dict[str, Any]:
     # WhatsApp Bot — True if Twilio configured, "demo" if mock mode
     status["whatsapp"] = True if os.getenv("TWILIO_ACCOUNT_SID") else "demo"
 
+    # GSTN response cache — hit/miss/coalesced counters per endpoint
+    from backend.services.gstn_client import gstn_cache
+    status["gstn_cache"] = gstn_cache.stats()
+
+    # LLM response cache — SQLite, hit/miss/eviction counters
+    from backend.utils.llm_cache import llm_cache
+    status["llm_cache"] = llm_cache.stats() if llm_cache is not None else "disabled"
+
+    if _graph_persist():
+        from backend.graph.graph_snapshot import graph_persistence
+        status["graph_snapshot"] = graph_persistence.stats()
+
     return status
 
 
@@ -128,6 +168,13 @@ async def fraud_load_mock() -> Dict[str, Any]:
     return await load_mock_fraud_data()
 
 
+@app.post("/fraud/graph-snapshot")
+async def fraud_graph_snapshot() -> Dict[str, Any]:
+    """Snapshot the in-memory graph now (also done on shutdown and when the edge log grows large)."""
+    from backend.graph.graph_snapshot import graph_persistence
+    return await asyncio.to_thread(graph_persistence.snapshot)
+
+
 @app.post("/fraud/run")
 async def fraud_run_detection() -> Dict[str, Any]:
     agent = FraudAgent()
@@ -135,9 +182,30 @@ async def fraud_run_detection() -> Dict[str, Any]:
 
 
 @app.get("/fraud/graph-data")
-async def fraud_graph_data() -> Dict[str, Any]:
+async def fraud_graph_data(
+    level: Optional[int] = Query(default=None, ge=0, le=2),
+    cursor: Optional[str] = None,
+    limit: int = Query(default=500, ge=1, le=5000),
+    community: Optional[int] = Query(default=None, ge=0),
+    bbox: Optional[str] = Query(default=None, description="Viewport as x0,y0,x1,y1 in layout units"),
+) -> Dict[str, Any]:
+    """
+    Paged, level-of-detail graph: level 0 = communities, 1 = GSTINs, 2 = with
+    invoices (default: the most detailed level that fits in one page).
+    Follow next_cursor for further pages.
+    """
+    box = None
+    if bbox:
+        try:
+            x0, y0, x1, y1 = (float(v) for v in bbox.split(","))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="bbox must be x0,y0,x1,y1")
+        box = (min(x0, x1), min(y0, y1), max(x0, x1), max(y0, y1))
     agent = FraudAgent()
-    return await agent.get_graph_visualization_data()
+    try:
+        return await agent.get_graph_visualization_data(level=level, cursor=cursor, limit=limit, community=community, bbox=box)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 @app.post("/tax/analyze")
@@ -159,7 +227,9 @@ async def tax_analyze(
 
         agent = TaxSaverAgent()
         try:
-            return agent.analyze(str(out_path), annual_income=annual_income, age=age, has_senior_parents=has_senior_parents, name=name)
+            # parsing waits on rate-limited Gemini batches; keep it off the event loop
+            return await asyncio.to_thread(agent.analyze, str(out_path), annual_income=annual_income, age=age,
+                                           has_senior_parents=has_senior_parents, name=name)
         except Exception as e:
             logger.exception("Tax analysis failed")
             raise HTTPException(status_code=400, detail=f"Could not parse/analyze CSV: {e}")
@@ -1,6 +1,22 @@
+import os
+from typing import Dict, Iterator, Optional
+
+import numpy as np
 import pandas as pd
+from pandas.api.types import union_categoricals
+
+try:
+    from pandas.tseries.api import guess_datetime_format
+except ImportError:  # pandas < 2.2
+    from pandas._libs.tslibs.parsing import guess_datetime_format
 
-from backend.tax_engine.classifier import classify_transaction
+from backend.tax_engine.classifier import classify_unique
+from backend.tax_engine.keyword_matcher import normalize_series
+
+# Rows per read_csv chunk; bounds memory on multi-year statements
+STATEMENT_CHUNK_ROWS = int(os.getenv("STATEMENT_CHUNK_ROWS", "250000"))
+# Gemini results kept across chunks, oldest dropped beyond this
+KNOWN_DESCRIPTIONS_MAX = 200_000
 
 
 def _find_col(cols: list[str], candidates: list[str]) -> str | None:
@@ -11,68 +27,123 @@ def _find_col(cols: list[str], candidates: list[str]) -> str | None:
     return None
 
 
-def parse_bank_statement(csv_path: str) -> pd.DataFrame:
-    """
-    Parse common Indian bank CSVs and normalize:
-    date, description, amount, txn_type
-    Then add: tax_category, tax_section, is_deductible, confidence
-    """
-    df = pd.read_csv(csv_path)
-    df.columns = [c.strip() for c in df.columns]
+def _statement_columns(csv_path: str) -> Dict[str, Optional[str]]:
+    """Source column (as written in the file) for date, desc, debit, credit."""
+    raw = pd.read_csv(csv_path, nrows=0).columns.tolist()
+    by_stripped = {c.strip(): c for c in raw}
+    cols = list(by_stripped)
 
-    date_col = _find_col(df.columns.tolist(), ["Date", "Txn Date", "Transaction Date", "Value Date"])
-    desc_col = _find_col(df.columns.tolist(), ["Description", "Narration", "Particulars", "Remarks"])
-    debit_col = _find_col(df.columns.tolist(), ["Debit", "Withdrawal", "Dr Amount", "Debit Amount"])
-    credit_col = _find_col(df.columns.tolist(), ["Credit", "Deposit", "Cr Amount", "Credit Amount"])
+    date_col = _find_col(cols, ["Date", "Txn Date", "Transaction Date", "Value Date"])
+    desc_col = _find_col(cols, ["Description", "Narration", "Particulars", "Remarks"])
+    debit_col = _find_col(cols, ["Debit", "Withdrawal", "Dr Amount", "Debit Amount"])
+    credit_col = _find_col(cols, ["Credit", "Deposit", "Cr Amount", "Credit Amount"])
 
     if not date_col or not desc_col or (not debit_col and not credit_col):
         raise ValueError("Unsupported bank CSV format. Expected columns like Date/Description and Debit/Credit.")
+    return {k: by_stripped[v] if v else None
+            for k, v in {"date": date_col, "desc": desc_col, "debit": debit_col, "credit": credit_col}.items()}
+
+
+def _date_format(raw: pd.Series) -> Optional[str]:
+    """
+    Date format for the whole statement, guessed from its first non-empty date
+    the way a whole-column pd.to_datetime(dayfirst=True) would ("mixed" = per
+    value, dateutil). None while no date has been seen. A guessed format always
+    parses the date it came from and "mixed" already reads DD-MM-YYYY, so the
+    old all-NaT retry with "%d-%m-%Y" is not needed.
+    """
+    first = next((v for v in raw.dropna().astype(str) if v), None)
+    if first is None:
+        return None
+    return guess_datetime_format(first, dayfirst=True) or "mixed"
+
+
+def _parse_dates(raw: pd.Series, fmt: Optional[str]) -> np.ndarray:
+    """YYYY-MM-DD string per row (NaN if unparseable); each distinct date string parsed once."""
+    codes, uniques = pd.factorize(raw)
+    dates = pd.to_datetime(uniques, errors="coerce", format=fmt, dayfirst=True)
+    formatted = np.append(np.asarray(dates.strftime("%Y-%m-%d"), dtype=object), np.nan)
+    return formatted[codes]  # code -1 (missing) picks the trailing NaN
 
-    # date parse (multi-format)
-    df["_date"] = pd.to_datetime(df[date_col], errors="coerce", dayfirst=True, infer_datetime_format=True)
-    if df["_date"].isna().all():
-        df["_date"] = pd.to_datetime(df[date_col], errors="coerce", format="%d-%m-%Y")
 
-    df["_desc"] = df[desc_col].astype(str).fillna("")
+def _normalize_chunk(df: pd.DataFrame, cols: Dict[str, Optional[str]], date_format: Optional[str]) -> pd.DataFrame:
 
-    debit = df[debit_col].fillna(0) if debit_col else 0
-    credit = df[credit_col].fillna(0) if credit_col else 0
+    zeros = np.zeros(len(df), dtype=np.float64)
+    debit = pd.to_numeric(df[cols["debit"]], errors="coerce").fillna(0).to_numpy(np.float64) if cols["debit"] else zeros
+    credit = pd.to_numeric(df[cols["credit"]], errors="coerce").fillna(0).to_numpy(np.float64) if cols["credit"] else zeros
 
     # normalize amount + txn_type
-    amount = []
-    txn_type = []
-    for d, c in zip(pd.to_numeric(debit, errors="coerce").fillna(0), pd.to_numeric(credit, errors="coerce").fillna(0)):
-        if c > 0:
-            amount.append(float(c))
-            txn_type.append("CREDIT")
-        else:
-            amount.append(float(d))
-            txn_type.append("DEBIT")
-
-    out = pd.DataFrame(
+    is_credit = credit > 0
+    return pd.DataFrame(
         {
-            "date": df["_date"].dt.strftime("%Y-%m-%d"),
-            "description": df["_desc"],
-            "amount": amount,
-            "txn_type": txn_type,
+            "date": _parse_dates(df[cols["date"]], date_format),
+            "description": df[cols["desc"]].astype(str),
+            "amount": np.where(is_credit, credit, debit),
+            "txn_type": np.where(is_credit, "CREDIT", "DEBIT").astype(object),
         }
     )
 
-    # classify
-    cats = []
-    secs = []
-    deduct = []
-    conf = []
-    for desc, amt in zip(out["description"].tolist(), out["amount"].tolist()):
-        r = classify_transaction(description=desc, amount=float(amt))
-        cats.append(r["category"])
-        secs.append(r["tax_section"])
-        deduct.append(bool(r["is_deductible"]))
-        conf.append(float(r["confidence"]))
-
-    out["tax_category"] = cats
-    out["tax_section"] = secs
-    out["is_deductible"] = deduct
-    out["confidence"] = conf
+
+def _classify_chunk(out: pd.DataFrame, known: Dict[str, Dict]) -> pd.DataFrame:
+    """Classify each distinct normalised description once, then take per row."""
+    # exact duplicates first (cheap), then normalise only the distinct raw strings
+    raw_codes, raw_uniques = pd.factorize(out["description"])
+    norm_codes, uniques = pd.factorize(normalize_series(pd.Series(raw_uniques, dtype=object)))
+    codes = norm_codes[raw_codes]
+    first_row = np.flatnonzero(~pd.Series(codes).duplicated().to_numpy())  # factorize numbers by first appearance
+    per_unique = classify_unique(
+        uniques.tolist(),
+        out["description"].to_numpy()[first_row].tolist(),
+        out["amount"].to_numpy()[first_row].tolist(),
+        known=known,
+    )
+    if len(known) > KNOWN_DESCRIPTIONS_MAX:
+        newest = list(known.items())[-KNOWN_DESCRIPTIONS_MAX:]
+        known.clear()
+        known.update(newest)
+
+    for col, src in (("tax_category", "category"), ("tax_section", "tax_section")):
+        cat_codes, categories = pd.factorize(per_unique[src])
+        out[col] = pd.Categorical.from_codes(cat_codes[codes], categories=categories)
+    out["is_deductible"] = per_unique["is_deductible"].to_numpy()[codes]
+    out["confidence"] = per_unique["confidence"].to_numpy()[codes]
     return out
 
+
+def iter_bank_statement(csv_path: str, chunksize: int = STATEMENT_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """
+    parse_bank_statement one chunk at a time (same columns, index restarting
+    per chunk), for statements too large to hold at once. Only the four
+    source columns are read; descriptions already sent to Gemini in an
+    earlier chunk are not sent again.
+    """
+    cols = _statement_columns(csv_path)
+    usecols = sorted({c for c in cols.values() if c})
+    known: Dict[str, Dict] = {}
+    # inferred once (first chunk with a date) so every chunk parses dates alike
+    date_format: Optional[str] = None
+    empty = True
+    for df in pd.read_csv(csv_path, usecols=usecols, chunksize=chunksize):
+        empty = False
+        date_format = date_format or _date_format(df[cols["date"]])
+        yield _classify_chunk(_normalize_chunk(df, cols, date_format), known)
+    if empty:
+        yield _classify_chunk(_normalize_chunk(pd.read_csv(csv_path, usecols=usecols, nrows=0), cols, None), known)
+
+
+def parse_bank_statement(csv_path: str, chunksize: int = STATEMENT_CHUNK_ROWS) -> pd.DataFrame:
+    """
+    Parse common Indian bank CSVs and normalize:
+    date, description, amount, txn_type
+    Then add: tax_category, tax_section, is_deductible, confidence
+    (tax_category / tax_section as categoricals)
+    """
+    chunks = list(iter_bank_statement(csv_path, chunksize=chunksize))
+    if len(chunks) == 1:
+        return chunks[0]
+    # concat keeps a categorical only when every chunk has the same categories
+    for col in ("tax_category", "tax_section"):
+        categories = union_categoricals([c[col] for c in chunks]).categories
+        for c in chunks:
+            c[col] = c[col].cat.set_categories(categories)
+    return pd.concat(chunks, ignore_index=True)
@@ -1,10 +1,11 @@
+import asyncio
 import re
 from typing import Any, Dict
 
 from backend.config import settings
 from backend.models.invoice import Invoice
 from backend.pipelines.ocr_pipeline import extract_text_from_image
-from backend.utils.llm_client import LLMClient, image_file_to_b64
+from backend.utils.llm_client import AsyncLLMClient, LLMClient, image_file_to_b64
 
 
 _GSTIN_RE = re.compile(r"\b\d{2}[A-Z0-9]{10}\d[A-Z0-9][A-Z0-9]Z[A-Z0-9]\b", re.IGNORECASE)
@@ -88,33 +89,20 @@ def _normalize_invoice_dict(raw: Dict[str, Any]) -> Dict[str, Any]:
     return out
 
 
-def parse_invoice(image_path: str) -> Invoice:
-    """
-    Image -> OCR -> Claude JSON extraction -> Invoice model.
-    DEMO fallback if no Anthropic key.
-    """
-    raw_text = extract_text_from_image(image_path)
+_SYSTEM_PROMPT = (
+    "You are an Indian GST invoice parser. Extract the following "
+    "fields strictly as JSON with EXACTLY these keys:\n"
+    "  vendor_name (str), vendor_gstin (str or null), "
+    "  buyer_gstin (str or null), invoice_number (str), "
+    "  invoice_date (str YYYY-MM-DD), total_value (float), "
+    "  taxable_value (float), cgst (float), sgst (float), igst (float), "
+    "  hsn_codes (list of {code, description, value}).\n"
+    "GSTIN format: 2 digits + 10 alphanumeric + 1 digit + 1 char + Z + 1 char.\n"
+    "Return ONLY valid JSON, no markdown, no explanation."
+)
 
-    system_prompt = (
-        "You are an Indian GST invoice parser. Extract the following "
-        "fields strictly as JSON with EXACTLY these keys:\n"
-        "  vendor_name (str), vendor_gstin (str or null), "
-        "  buyer_gstin (str or null), invoice_number (str), "
-        "  invoice_date (str YYYY-MM-DD), total_value (float), "
-        "  taxable_value (float), cgst (float), sgst (float), igst (float), "
-        "  hsn_codes (list of {code, description, value}).\n"
-        "GSTIN format: 2 digits + 10 alphanumeric + 1 digit + 1 char + Z + 1 char.\n"
-        "Return ONLY valid JSON, no markdown, no explanation."
-    )
-
-    llm = LLMClient()
-    image_b64 = image_file_to_b64(image_path)
-    payload: Dict[str, Any] = llm.ask_json(
-        prompt=f"OCR_TEXT:\n{raw_text}",
-        image_b64=image_b64,
-        system_prompt=system_prompt,
-    )
 
+def _to_invoice(payload: Any) -> Invoice:
     # DEMO mode from llm_client returns wrapped JSON; normalize.
     if isinstance(payload, dict) and "invoice" in payload:
         inv_dict = payload["invoice"]
@@ -131,3 +119,29 @@ def parse_invoice(image_path: str) -> Invoice:
 
     return invoice
 
+
+def parse_invoice(image_path: str) -> Invoice:
+    """
+    Image -> OCR -> Claude JSON extraction -> Invoice model.
+    DEMO fallback if no Anthropic key.
+    Blocking; async callers use parse_invoice_async.
+    """
+    raw_text = extract_text_from_image(image_path)
+    payload: Dict[str, Any] = LLMClient().ask_json(
+        prompt=f"OCR_TEXT:\n{raw_text}",
+        image_b64=image_file_to_b64(image_path),
+        system_prompt=_SYSTEM_PROMPT,
+    )
+    return _to_invoice(payload)
+
+
+async def parse_invoice_async(image_path: str) -> Invoice:
+    """parse_invoice without blocking the event loop: OCR in a worker thread, Gemini via AsyncLLMClient."""
+    raw_text = await asyncio.to_thread(extract_text_from_image, image_path)
+    image_b64 = await asyncio.to_thread(image_file_to_b64, image_path)
+    payload: Dict[str, Any] = await AsyncLLMClient().ask_json(
+        prompt=f"OCR_TEXT:\n{raw_text}",
+        image_b64=image_b64,
+        system_prompt=_SYSTEM_PROMPT,
+    )
+    return _to_invoice(payload)
@@ -1,17 +1,133 @@
+import asyncio
+import copy
 import os
 import random
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Any, Dict, List
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Tuple
 
 from backend.services.mock_gstn import MockGSTNClient
 
 
+class GSTNCache:
+    """
+    Process-wide LRU cache for GSTN responses, shared by every GSTNClient.
+    - per-endpoint TTL (seconds)
+    - LRU eviction beyond max_entries
+    - request coalescing: concurrent misses for the same key share one
+      upstream call instead of each issuing their own
+    Callers get a deep copy, so mutating a response never touches the cache.
+    """
+
+    TTLS: Dict[str, float] = {
+        "taxpayer_profile": 24 * 3600,
+        "gstr1": 6 * 3600,
+        "gstr2b": 6 * 3600,
+        "filing_status": 3600,
+    }
+
+    def __init__(self, max_entries: int = 2048) -> None:
+        self.max_entries = max_entries
+        self._lock = threading.RLock()
+        self._entries: "OrderedDict[Tuple[str, Hashable], Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[Tuple[str, Hashable], asyncio.Future] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    async def get(self, endpoint: str, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        k = (endpoint, key)
+        now = time.monotonic()
+        with self._lock:
+            hit = self._entries.get(k)
+            if hit is not None and hit[0] > now:
+                self._entries.move_to_end(k)
+                self._count(endpoint, "hits")
+                return copy.deepcopy(hit[1])
+            if hit is not None:
+                del self._entries[k]
+                self._count(endpoint, "expired")
+
+        loop = asyncio.get_running_loop()
+        fut = self._inflight.get(k)
+        if fut is not None and fut.get_loop() is loop:
+            self._count(endpoint, "coalesced")
+            try:
+                return copy.deepcopy(await asyncio.shield(fut))
+            except asyncio.CancelledError:
+                if not fut.cancelled():
+                    raise
+                # the leading request was cancelled, not this caller: fetch again
+                return await self.get(endpoint, key, fetch)
+
+        self._count(endpoint, "misses")
+        fut = loop.create_future()
+        self._inflight[k] = fut
+        try:
+            value = await fetch()
+        except asyncio.CancelledError:
+            fut.cancel()
+            raise
+        except Exception as e:
+            fut.set_exception(e)
+            fut.exception()  # mark retrieved when nobody else was waiting
+            raise
+        finally:
+            if self._inflight.get(k) is fut:
+                del self._inflight[k]
+        fut.set_result(value)
+
+        ttl = self.TTLS.get(endpoint, 600)
+        with self._lock:
+            self._entries[k] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(k)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._count(endpoint, "evictions")
+        return copy.deepcopy(value)
+
+    def invalidate(self, endpoint: str | None = None) -> None:
+        with self._lock:
+            if endpoint is None:
+                self._entries.clear()
+            else:
+                for k in [k for k in self._entries if k[0] == endpoint]:
+                    del self._entries[k]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            per_endpoint = {ep: dict(c) for ep, c in self._stats.items()}
+            size = len(self._entries)
+        totals: Dict[str, int] = {}
+        for c in per_endpoint.values():
+            for name, n in c.items():
+                totals[name] = totals.get(name, 0) + n
+        lookups = totals.get("hits", 0) + totals.get("misses", 0) + totals.get("coalesced", 0)
+        return {
+            "size": size,
+            "max_entries": self.max_entries,
+            "upstream_calls": totals.get("misses", 0),
+            "hit_rate": round((lookups - totals.get("misses", 0)) / lookups, 3) if lookups else 0.0,
+            "totals": totals,
+            "endpoints": per_endpoint,
+        }
+
+    def _count(self, endpoint: str, name: str) -> None:
+        with self._lock:
+            c = self._stats.setdefault(endpoint, {})
+            c[name] = c.get(name, 0) + 1
+
+
+gstn_cache = GSTNCache(max_entries=int(os.getenv("GSTN_CACHE_MAX_ENTRIES", "2048")))
+
+
 class GSTNClient:
     """
     GSTN API client.
     When MOCK_GSTN=true (default for hackathon), delegates to MockGSTNClient
     and returns realistic structured JSON matching GSTN API schema.
     When MOCK_GSTN=false, would call real GSP endpoint (not wired for hackathon).
+    All fetches go through the shared gstn_cache (TTL + LRU + coalescing).
     """
 
     BASE_URL = "https://api.gst.gov.in"
@@ -22,8 +138,32 @@ class GSTNClient:
         self._mock = MockGSTNClient()
         self._rng = random.Random(42)
 
+    # ── Public API (cached) ─────────────────────────────
+
     async def get_taxpayer_profile(self, gstin: str) -> Dict[str, Any]:
-        """Fetch taxpayer profile. Uses gstin[-3:] as seed for variation."""
+        """Fetch taxpayer profile."""
+        return await gstn_cache.get("taxpayer_profile", gstin, lambda: self._fetch_taxpayer_profile(gstin))
+
+    async def get_gstr1(self, gstin: str, period: str, otp: str = "") -> Dict[str, Any]:
+        """Fetch GSTR-1 (outward supplies filed by supplier)."""
+        return await gstn_cache.get("gstr1", (gstin, period), lambda: self._fetch_gstr1(gstin, period, otp))
+
+    async def get_gstr2b(self, gstin: str, period: str) -> Dict[str, Any]:
+        """Fetch GSTR-2B (auto-drafted ITC statement for buyer)."""
+        return await gstn_cache.get("gstr2b", (gstin, period), lambda: self._fetch_gstr2b(gstin, period))
+
+    async def get_filing_status(self, gstin: str) -> Dict[str, Any]:
+        """Fetch filing compliance status for the last 12 months."""
+        return await gstn_cache.get("filing_status", gstin, lambda: self._fetch_filing_status(gstin))
+
+    @staticmethod
+    def cache_stats() -> Dict[str, Any]:
+        return gstn_cache.stats()
+
+    # ── Upstream fetches ────────────────────────────────
+
+    async def _fetch_taxpayer_profile(self, gstin: str) -> Dict[str, Any]:
+        """Uses gstin[-3:] as seed for variation."""
         seed = int(gstin[-3:-1], 36) % 100 if len(gstin) >= 3 else 42
         rng = random.Random(seed)
         states = {"27": "Maharashtra", "29": "Karnataka", "07": "Delhi",
@@ -45,8 +185,7 @@ class GSTNClient:
             "lastFiledDate": datetime.utcnow().strftime("%Y-%m") + "-11",
         }
 
-    async def get_gstr1(self, gstin: str, period: str, otp: str = "") -> Dict[str, Any]:
-        """Fetch GSTR-1 (outward supplies filed by supplier)."""
+    async def _fetch_gstr1(self, gstin: str, period: str, otp: str = "") -> Dict[str, Any]:
         raw = await self._mock.get_gstr1(gstin=gstin, period=period, otp=otp)
         invoices = raw.get("invoices", [])
         b2b_entries = []
@@ -81,8 +220,7 @@ class GSTNClient:
             "total_tax": sum(e["camt"] + e["samt"] + e["iamt"] for e in b2b_entries),
         }
 
-    async def get_gstr2b(self, gstin: str, period: str) -> Dict[str, Any]:
-        """Fetch GSTR-2B (auto-drafted ITC statement for buyer)."""
+    async def _fetch_gstr2b(self, gstin: str, period: str) -> Dict[str, Any]:
         gstr1 = await self._mock.get_gstr1(gstin=gstin, period=period)
         all_invoices = gstr1.get("invoices", [])
         # Simulate real-world: ~85% of GSTR-1 invoices reflect in GSTR-2B
@@ -121,8 +259,7 @@ class GSTNClient:
             "total_itc_available": sum(e["itc_avail"] for e in reflected),
         }
 
-    async def get_filing_status(self, gstin: str) -> Dict[str, Any]:
-        """Fetch filing compliance status for the last 12 months."""
+    async def _fetch_filing_status(self, gstin: str) -> Dict[str, Any]:
         raw = await self._mock.get_filing_status(gstin=gstin)
         months = raw.get("months", [])
         filed_count = sum(1 for m in months if m.get("filed"))
@@ -1,6 +1,7 @@
 import os
 
 from celery import Celery
+from celery.schedules import crontab
 
 
 def _redis_url() -> str:
@@ -15,6 +16,7 @@ celery_app = Celery(
         "backend.tasks.ingest_gstr1",
         "backend.tasks.ingest_gstr2b",
         "backend.tasks.run_reconciliation",
+        "backend.tasks.score_vendors",
     ],
 )
 
@@ -24,4 +26,10 @@ celery_app.conf.update(
     result_serializer="json",
     timezone="UTC",
     enable_utc=True,
+    beat_schedule={
+        "score-vendors-nightly": {
+            "task": "backend.tasks.score_vendors.score_vendors",
+            "schedule": crontab(hour=1, minute=30),
+        },
+    },
 )
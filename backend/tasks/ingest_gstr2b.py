@@ -1,5 +1,7 @@
 import asyncio
 
+from loguru import logger
+
 from backend.tasks.celery_app import celery_app
 
 
@@ -20,12 +22,27 @@ def ingest_gstr2b(self, gstin: str, period: str) -> dict:
             postgres_client.store_gstr2b(gstin, period, invoices)
         except Exception:
             pass  # DB optional
+        # graph optional; without Neo4j the load would only fill this worker's
+        # private in-memory GraphStore, which the API never sees
+        graph = "skipped"
+        try:
+            from backend.graph.bulk_writer import load_b2b
+            from backend.graph.graph_builder import graph_store
+            loop = asyncio.get_event_loop()
+            if loop.run_until_complete(graph_store.neo4j_available()):
+                graph = loop.run_until_complete(load_b2b(gstin, data.get("b2b", [])))
+            else:
+                logger.warning("Neo4j unavailable; graph load skipped for GSTR-2B {} {}", gstin, period)
+        except Exception:
+            logger.exception("Graph load failed for GSTR-2B {} {}", gstin, period)
+            graph = "failed"
         return {
             "gstin": gstin,
             "period": period,
             "status": "success",
             "invoices_ingested": len(invoices),
             "total_itc_available": data.get("total_itc_available", 0),
+            "graph": graph,
         }
     except Exception as exc:
         raise self.retry(exc=exc, countdown=30)
@@ -0,0 +1,15 @@
+import asyncio
+
+from backend.tasks.celery_app import celery_app
+
+
+@celery_app.task(bind=True, max_retries=2)
+def score_vendors(self) -> dict:
+    """Nightly bulk NEXUS scoring of the vendor master list into vendor_scores."""
+    try:
+        from backend.core.bulk_scorer import BulkNexusScorer
+        return asyncio.get_event_loop().run_until_complete(
+            BulkNexusScorer().score_and_store()
+        )
+    except Exception as exc:
+        raise self.retry(exc=exc, countdown=300)
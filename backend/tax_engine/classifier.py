@@ -1,7 +1,21 @@
-import re
-from typing import Dict
+import asyncio
+import json
+import os
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
-from backend.utils.llm_client import LLMClient
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from backend.tax_engine.keyword_matcher import KeywordMatcher, normalize
+from backend.utils.llm_client import AsyncLLMClient, LLMClient, run_sync
+
+# Unknown descriptions packed into one Gemini prompt by classify_transactions
+CLASSIFY_BATCH_SIZE = int(os.getenv("LLM_CLASSIFY_BATCH", "50"))
+# ~40 output tokens per classified item
+CLASSIFY_BATCH_MAX_TOKENS = 4096
+
+_FAILED = {"category": "OTHER", "tax_section": "", "is_deductible": False, "confidence": 0.4}
 
 
 _KEYWORDS = {
@@ -24,28 +38,61 @@ _KEYWORDS = {
 }
 
 
+# Keyword table compiled once; priority = section order, then keyword order
+_MATCHER = KeywordMatcher([(k, section) for section, keys in _KEYWORDS.items() for k in keys])
+
+_SECTION_RESULT: Dict[str, Dict] = {
+    "80C": {"category": "80C", "tax_section": "80C", "is_deductible": True, "confidence": 0.92},
+    "80D": {"category": "80D", "tax_section": "80D", "is_deductible": True, "confidence": 0.92},
+    "NPS": {"category": "NPS", "tax_section": "80CCD1B", "is_deductible": True, "confidence": 0.9},
+    "HOME_LOAN": {"category": "HOME_LOAN", "tax_section": "24B", "is_deductible": True, "confidence": 0.85},
+    "MEDICAL": {"category": "MEDICAL", "tax_section": "80D", "is_deductible": False, "confidence": 0.55},
+}
+
+
 def _norm(s: str) -> str:
-    return re.sub(r"\s+", " ", (s or "").lower()).strip()
+    return normalize(s)
+
+
+def _section_result(section: str) -> Dict:
+    hit = _SECTION_RESULT.get(section)
+    if hit is not None:
+        return dict(hit)
+    return {"category": section, "tax_section": "", "is_deductible": False, "confidence": 0.75}
+
+
+def _keyword_result(d: str) -> Optional[Dict]:
+    """Keyword-table classification of a normalised description, None if no keyword matches."""
+    section = _MATCHER.label(d)
+    return None if section is None else _section_result(section)
+
+
+def keyword_sections(descriptions: pd.Series) -> pd.Series:
+    """Keyword-table section per description (None where no keyword matches), same index."""
+    return _MATCHER.label_series(descriptions)
+
+
+def _from_llm(data: Any) -> Dict:
+    try:
+        return {
+            "category": str(data.get("category", "OTHER")),
+            "tax_section": str(data.get("tax_section", "")),
+            "is_deductible": bool(data.get("is_deductible", False)),
+            "confidence": float(data.get("confidence", 0.5)),
+        }
+    except Exception:
+        return dict(_FAILED)
 
 
 def classify_transaction(description: str, amount: float) -> Dict:
     """
     Keyword match first; else call Claude.
     Returns: {category, tax_section, is_deductible, confidence}
+    For a whole statement use classify_transactions (one prompt per batch).
     """
-    d = _norm(description)
-
-    for section, keys in _KEYWORDS.items():
-        if any(k in d for k in keys):
-            if section in {"80C", "80D"}:
-                return {"category": section, "tax_section": section, "is_deductible": True, "confidence": 0.92}
-            if section == "NPS":
-                return {"category": "NPS", "tax_section": "80CCD1B", "is_deductible": True, "confidence": 0.9}
-            if section == "HOME_LOAN":
-                return {"category": "HOME_LOAN", "tax_section": "24B", "is_deductible": True, "confidence": 0.85}
-            if section == "MEDICAL":
-                return {"category": "MEDICAL", "tax_section": "80D", "is_deductible": False, "confidence": 0.55}
-            return {"category": section, "tax_section": "", "is_deductible": False, "confidence": 0.75}
+    hit = _keyword_result(_norm(description))
+    if hit is not None:
+        return hit
 
     # LLM fallback
     llm = LLMClient()
@@ -55,13 +102,122 @@ def classify_transaction(description: str, amount: float) -> Dict:
         f"Description: {description}\nAmount: {amount}\n"
     )
     try:
-        data = llm.ask_json(prompt)
-        return {
-            "category": str(data.get("category", "OTHER")),
-            "tax_section": str(data.get("tax_section", "")),
-            "is_deductible": bool(data.get("is_deductible", False)),
-            "confidence": float(data.get("confidence", 0.5)),
-        }
+        return _from_llm(llm.ask_json(prompt))
     except Exception:
-        return {"category": "OTHER", "tax_section": "", "is_deductible": False, "confidence": 0.4}
+        return dict(_FAILED)
+
+
+async def _classify_batch(llm: AsyncLLMClient, items: List[Tuple[str, float]]) -> List[Dict]:
+    """One JSON-array prompt for up to CLASSIFY_BATCH_SIZE (description, amount) pairs."""
+    prompt = (
+        "Classify each Indian bank transaction below into a category and whether it is tax-deductible.\n"
+        "Return ONLY a JSON array with one object per transaction, with keys: "
+        "id, category, tax_section, is_deductible, confidence.\n"
+        "Transactions:\n"
+        + json.dumps([{"id": k, "description": d, "amount": a} for k, (d, a) in enumerate(items)], ensure_ascii=False)
+    )
+    try:
+        data = await llm.ask_json(prompt, max_output_tokens=CLASSIFY_BATCH_MAX_TOKENS)
+    except Exception as e:
+        logger.warning("Batch classification failed for {} descriptions: {}", len(items), str(e))
+        return [dict(_FAILED) for _ in items]
+    if isinstance(data, dict):  # DEMO mode answers with a single object
+        return [_from_llm(data) for _ in items]
+    by_id: Dict[int, Any] = {}
+    for x in data if isinstance(data, list) else []:
+        try:
+            by_id[int(x["id"])] = x
+        except (KeyError, TypeError, ValueError):
+            continue
+    return [_from_llm(by_id[k]) if k in by_id else dict(_FAILED) for k in range(len(items))]
+
+
+async def classify_transactions_async(descriptions: Sequence[str], amounts: Sequence[float]) -> List[Dict]:
+    """
+    classify_transaction for a whole statement:
+      1. descriptions normalised and deduplicated; keyword table once per unique one
+      2. unique unmatched descriptions packed CLASSIFY_BATCH_SIZE per JSON-array
+         prompt, sent concurrently (AsyncLLMClient pool + 15 RPM bucket)
+      3. results fanned back out per row (rows with one description share a dict)
+    """
+    norm = [_norm(d) for d in descriptions]
+    first: Dict[str, int] = {}
+    for i, d in enumerate(norm):
+        first.setdefault(d, i)
+
+    results: Dict[str, Dict] = {}
+    unknown: List[Tuple[str, int]] = []
+    for d, i in first.items():
+        hit = _keyword_result(d)
+        if hit is None:
+            unknown.append((d, i))
+        else:
+            results[d] = hit
+
+    if unknown:
+        logger.info("Classifying {} rows: {} unique descriptions, {} for Gemini",
+                    len(norm), len(first), len(unknown))
+        answers = await classify_unknown_async([(descriptions[i], float(amounts[i])) for _, i in unknown])
+        for (d, _), r in zip(unknown, answers):
+            results[d] = r
+    return [results[d] for d in norm]
+
+
+async def classify_unknown_async(items: Sequence[Tuple[str, float]]) -> List[Dict]:
+    """
+    Gemini classification for distinct (description, amount) pairs the keyword
+    table missed: CLASSIFY_BATCH_SIZE per JSON-array prompt, sent concurrently
+    (AsyncLLMClient pool + 15 RPM bucket).
+    """
+    llm = AsyncLLMClient()
+    batches = [list(items[k:k + CLASSIFY_BATCH_SIZE]) for k in range(0, len(items), CLASSIFY_BATCH_SIZE)]
+    answers = await asyncio.gather(*(_classify_batch(llm, batch) for batch in batches))
+    return [r for answer in answers for r in answer]
+
+
+def classify_transactions(descriptions: Sequence[str], amounts: Sequence[float]) -> List[Dict]:
+    """Blocking classify_transactions_async (runs on the shared LLM loop)."""
+    return run_sync(classify_transactions_async(descriptions, amounts))
+
+
+def classify_unique(normalized: Sequence[str], descriptions: Sequence[str], amounts: Sequence[float],
+                    known: Optional[Dict[str, Dict]] = None) -> pd.DataFrame:
+    """
+    Column-wise classification of distinct normalised descriptions (entry i
+    came from descriptions[i] / amounts[i]): category, tax_section,
+    is_deductible, confidence, one row per entry. Keyword hits are filled per
+    section; misses come from `known` (results of earlier calls, e.g. earlier
+    chunks of one statement) or from classify_unknown_async, and are added to it.
+    """
+    normalized = list(normalized)
+    n = len(normalized)
+    ids = _MATCHER.first_many(normalized)
+    category = np.empty(n, dtype=object)
+    tax_section = np.empty(n, dtype=object)
+    is_deductible = np.zeros(n, dtype=bool)
+    confidence = np.zeros(n, dtype=np.float64)
+
+    sections = np.array(_MATCHER.labels + [None], dtype=object)[ids]
+    for section in set(sections[ids >= 0].tolist()):
+        mask = sections == section
+        r = _section_result(section)
+        category[mask], tax_section[mask] = r["category"], r["tax_section"]
+        is_deductible[mask], confidence[mask] = r["is_deductible"], r["confidence"]
+
+    known = {} if known is None else known
+    miss = np.flatnonzero(ids < 0).tolist()
+    pending = [i for i in miss if normalized[i] not in known]
+    if pending:
+        logger.info("Classifying {} descriptions: {} missed the keyword table, {} for Gemini",
+                    n, len(miss), len(pending))
+        answers = run_sync(classify_unknown_async([(descriptions[i], float(amounts[i])) for i in pending]))
+        known.update((normalized[i], r) for i, r in zip(pending, answers))
+    if miss:
+        found = [known[normalized[i]] for i in miss]
+        category[miss] = [r["category"] for r in found]
+        tax_section[miss] = [r["tax_section"] for r in found]
+        is_deductible[miss] = [r["is_deductible"] for r in found]
+        confidence[miss] = [r["confidence"] for r in found]
 
+    return pd.DataFrame({"category": category, "tax_section": tax_section,
+                         "is_deductible": is_deductible, "confidence": confidence})
@@ -8,6 +8,8 @@ from typing import Any, Dict, List, Optional
 
 from loguru import logger
 
+from backend.tax_engine.keyword_matcher import KeywordMatcher
+
 
 class CrossLayerEnricher:
     """
@@ -49,6 +51,8 @@ class CrossLayerEnricher:
         "mutual fund": ("ELSS/Mutual Fund", "Section 80C"),
         "elss": ("ELSS Tax Saver", "Section 80C"),
     }
+    # VENDOR_KEYWORDS compiled once, priority = dict order
+    _VENDOR_MATCHER = KeywordMatcher(list(VENDOR_KEYWORDS.items()))
 
     # Tax rate for estimation (30% slab + 4% cess)
     ESTIMATED_TAX_RATE = 0.312
@@ -117,28 +121,28 @@ class CrossLayerEnricher:
             # Strategy 2: Vendor name keyword match
             vendor_lower = vendor.lower()
             matched = False
-            for keyword, (desc, section) in self.VENDOR_KEYWORDS.items():
-                if keyword in vendor_lower:
-                    tax_saved = round(amount * self.ESTIMATED_TAX_RATE, 2)
-                    sec_key = section.split()[-1] if " " in section else section
-                    if sec_key in claimed_sections:
-                        continue
-                    results.append({
-                        "invoice_id": inv_id,
-                        "vendor_name": vendor,
-                        "amount": amount,
-                        "hsn_code": hsn,
-                        "suggested_deduction": desc,
-                        "tax_section": section,
-                        "estimated_tax_saved": tax_saved,
-                        "confidence": 0.70,
-                        "note": (
-                            f"This ₹{amount:,.0f} payment to {vendor} "
-                            f"suggests {desc} — may qualify under {section}."
-                        ),
-                    })
-                    matched = True
-                    break
+            for k in self._VENDOR_MATCHER.match_all(vendor_lower):
+                desc, section = self._VENDOR_MATCHER.labels[k]
+                tax_saved = round(amount * self.ESTIMATED_TAX_RATE, 2)
+                sec_key = section.split()[-1] if " " in section else section
+                if sec_key in claimed_sections:
+                    continue
+                results.append({
+                    "invoice_id": inv_id,
+                    "vendor_name": vendor,
+                    "amount": amount,
+                    "hsn_code": hsn,
+                    "suggested_deduction": desc,
+                    "tax_section": section,
+                    "estimated_tax_saved": tax_saved,
+                    "confidence": 0.70,
+                    "note": (
+                        f"This ₹{amount:,.0f} payment to {vendor} "
+                        f"suggests {desc} — may qualify under {section}."
+                    ),
+                })
+                matched = True
+                break
 
         # Sort by estimated_tax_saved DESC
         results.sort(key=lambda x: x["estimated_tax_saved"], reverse=True)
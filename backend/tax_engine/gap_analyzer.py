@@ -33,7 +33,7 @@ def analyze_gaps(df: pd.DataFrame, annual_income: float, age: int, has_senior_pa
     Sum investments per tax_section; compare to limits; compute gaps + urgency + potential saving.
     """
     _ = age
-    invested = df[df["is_deductible"] == True].groupby("tax_section")["amount"].sum().to_dict()  # noqa: E712
+    invested = df[df["is_deductible"] == True].groupby("tax_section", observed=True)["amount"].sum().to_dict()  # noqa: E712
     today = date.today()
     months_remaining = _months_remaining_till_march31(today)
     tax_rate = _applicable_tax_rate(annual_income)
@@ -0,0 +1,136 @@
+"""
+TaxIQ — Keyword Matcher
+Substring keyword tables (tax classifier, cross-layer vendor keywords)
+compiled once into regexes instead of scanning every keyword per text:
+  - one alternation of all keywords: a single search rejects texts that
+    match nothing (most bank narrations)
+  - a lookahead scan over the same alternation, ordered by priority, finds
+    the highest-priority keyword starting at each position
+  - keywords that share a start position with a higher-priority one
+    (prefixes / extensions of it) are checked explicitly, so match_all()
+    returns exactly the keywords `k in text` would
+Priority is the order of the entries passed in; first() returns what the
+old `for k in keywords: if k in text` loop returned.
+first_series() works column-wise instead: distinct texts joined into one
+string, one C-level search per keyword (lowest priority first, so the
+highest-priority hit is written last), hit offsets mapped back to rows.
+"""
+from __future__ import annotations
+
+import re
+from typing import Generic, List, Optional, Sequence, Tuple, TypeVar
+
+import numpy as np
+import pandas as pd
+
+L = TypeVar("L")
+
+_SEP = "\n"
+
+
+def normalize(text: Optional[str]) -> str:
+    """Lower-case, whitespace runs collapsed to one space, stripped (same as re.sub(r"\\s+", " ", ...).strip())."""
+    return " ".join((text or "").lower().split())
+
+
+def normalize_series(texts: pd.Series) -> pd.Series:
+    """normalize() over a Series (missing values become "")."""
+    return pd.Series([normalize(t if isinstance(t, str) else "" if pd.isna(t) else str(t)) for t in texts.tolist()],
+                     index=texts.index, dtype=object)
+
+
+class KeywordMatcher(Generic[L]):
+    """
+    entries: (keyword, label) in priority order. Texts passed in must already
+    be normalised the way the keywords are (see normalize()).
+    """
+
+    def __init__(self, entries: Sequence[Tuple[str, L]]) -> None:
+        self.keywords: List[str] = [k for k, _ in entries]
+        self.labels: List[L] = [label for _, label in entries]
+        # First (highest-priority) entry per distinct keyword string
+        self._index = {}
+        for i, k in enumerate(self.keywords):
+            self._index.setdefault(k, i)
+        ordered = sorted(self._index, key=self._index.__getitem__)
+        alternation = "|".join(re.escape(k) for k in ordered) or "(?!)"
+        self._any = re.compile(alternation)
+        self._scan = re.compile(f"(?=({alternation}))")
+        # Lower-priority entries that also match wherever entry i matches
+        # (prefixes, duplicates), and ones that may (extensions of it)
+        n = len(self.keywords)
+        self._prefixes: List[List[int]] = [[] for _ in range(n)]
+        self._extensions: List[List[int]] = [[] for _ in range(n)]
+        for i, k in enumerate(self.keywords):
+            for j in range(i + 1, n):
+                other = self.keywords[j]
+                if k.startswith(other):
+                    self._prefixes[i].append(j)
+                elif other.startswith(k):
+                    self._extensions[i].append(j)
+
+    def __len__(self) -> int:
+        return len(self.keywords)
+
+    # ── Scalar API ──────────────────────────────────────
+
+    def first(self, text: str) -> int:
+        """Index of the highest-priority keyword contained in text, -1 if none."""
+        if self._any.search(text) is None:
+            return -1
+        return min(self._index[k] for k in self._scan.findall(text))
+
+    def label(self, text: str) -> Optional[L]:
+        i = self.first(text)
+        return None if i < 0 else self.labels[i]
+
+    def match_all(self, text: str) -> List[int]:
+        """Indices of every keyword contained in text, in priority order."""
+        if self._any.search(text) is None:
+            return []
+        found = set()
+        for m in self._scan.finditer(text):
+            i = self._index[m.group(1)]
+            found.add(i)
+            found.update(self._prefixes[i])
+            found.update(j for j in self._extensions[i] if text.startswith(self.keywords[j], m.start()))
+        return sorted(found)
+
+    # ── Series API ──────────────────────────────────────
+
+    def first_series(self, texts: pd.Series, normalized: bool = False) -> np.ndarray:
+        """
+        first() per row as an int64 array (-1 = no keyword). Texts are
+        normalised (unless normalized=True) and deduplicated, so each distinct
+        description is matched once.
+        """
+        if not normalized:
+            texts = normalize_series(texts)
+        codes, uniques = pd.factorize(texts, use_na_sentinel=True)
+        per_unique = self.first_many([str(u) for u in uniques])
+        out = np.full(len(codes), -1, dtype=np.int64)
+        has = codes >= 0
+        out[has] = per_unique[codes[has]]
+        return out
+
+    def first_many(self, texts: List[str]) -> np.ndarray:
+        """first() for a list of normalised texts (best with distinct ones), as an int64 array."""
+        if not texts:
+            return np.empty(0, dtype=np.int64)
+        if any(_SEP in k for k in self.keywords):
+            return np.fromiter((self.first(t) for t in texts), dtype=np.int64, count=len(texts))
+        lengths = np.fromiter((len(t) for t in texts), dtype=np.int64, count=len(texts))
+        starts = np.concatenate([[0], np.cumsum(lengths + 1)[:-1]])
+        joined = _SEP.join(texts)
+        out = np.full(len(texts), -1, dtype=np.int64)
+        for i in sorted(set(self._index.values()), reverse=True):
+            hits = [m.start() for m in re.finditer(re.escape(self.keywords[i]), joined)]
+            if hits:
+                out[np.searchsorted(starts, np.asarray(hits, dtype=np.int64), side="right") - 1] = i
+        return out
+
+    def label_series(self, texts: pd.Series, normalized: bool = False) -> pd.Series:
+        """label() per row, None where no keyword matches; same index as texts."""
+        idx = self.first_series(texts, normalized=normalized)
+        labels = np.array(self.labels + [None], dtype=object)
+        return pd.Series(labels[idx], index=texts.index)
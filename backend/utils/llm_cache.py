@@ -0,0 +1,237 @@
+"""
+TaxIQ — LLM Response Cache
+Gemini is called at temperature 0, so the same (model, system prompt, prompt,
+image) always gets the same answer; AsyncLLMClient asks here first.
+  - key: SHA-256 over model, system prompt, prompt and the image's SHA-256
+  - stored in SQLite at LLM_CACHE_PATH (WAL), survives restarts and is
+    shared by the API process and Celery workers on the same host
+  - TTL per entry (LLM_CACHE_TTL_S), LRU eviction by last access once the
+    stored responses pass LLM_CACHE_MAX_MB
+  - concurrent misses for one key on the same loop share one upstream call
+  - an optional validator keeps unusable answers (e.g. non-JSON where JSON
+    was asked for) out of the cache, and drops them if already stored
+Falls back to an in-memory SQLite database if the file cannot be opened.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from loguru import logger
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE", "true").lower() == "true"
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", str(Path(__file__).resolve().parents[2] / "data" / "llm_cache.sqlite3"))
+LLM_CACHE_MAX_MB = float(os.getenv("LLM_CACHE_MAX_MB", "256"))
+LLM_CACHE_TTL_S = float(os.getenv("LLM_CACHE_TTL_S", str(30 * 24 * 3600)))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_responses (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    response TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_llm_responses_accessed ON llm_responses(accessed_at);
+"""
+
+
+def cache_key(model: str, prompt: str, system_prompt: Optional[str] = None, image_b64: Optional[str] = None,
+              max_output_tokens: Optional[int] = None) -> str:
+    """max_output_tokens only when it differs from the client default (a shorter limit can truncate)."""
+    image_hash = hashlib.sha256(image_b64.encode("ascii")).hexdigest() if image_b64 else ""
+    parts = [model, system_prompt or "", prompt, image_hash]
+    if max_output_tokens is not None:
+        parts.append(max_output_tokens)
+    blob = json.dumps(parts, ensure_ascii=False)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """get_or_fetch() for callers, stats() for /health, clear() for ops."""
+
+    # Expired rows are swept every N stores
+    PURGE_EVERY = 256
+
+    def __init__(self, path: str = LLM_CACHE_PATH, max_bytes: int = int(LLM_CACHE_MAX_MB * 2**20),
+                 ttl_s: float = LLM_CACHE_TTL_S) -> None:
+        self.max_bytes = max_bytes
+        self.ttl_s = ttl_s
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._stats: Dict[str, int] = {"hits": 0, "misses": 0, "coalesced": 0, "stores": 0,
+                                       "rejected": 0, "expired": 0, "evictions": 0}
+        self._db, self.path = self._open(path)
+        self._bytes = int(self._db.execute("SELECT COALESCE(SUM(size), 0) FROM llm_responses").fetchone()[0])
+
+    @staticmethod
+    def _open(path: str) -> Tuple[sqlite3.Connection, str]:
+        try:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute("PRAGMA busy_timeout=5000")
+            db.executescript(_SCHEMA)
+            return db, path
+        except (OSError, sqlite3.Error) as e:
+            logger.warning("LLM cache at {} unavailable; using in-memory cache. err={}", path, str(e))
+            db = sqlite3.connect(":memory:", check_same_thread=False, isolation_level=None)
+            db.executescript(_SCHEMA)
+            return db, ":memory:"
+
+    # ── Public API ──────────────────────────────────────
+
+    async def get_or_fetch(self, key: str, model: str, fetch: Callable[[], Awaitable[Tuple[str, bool]]],
+                           validate: Optional[Callable[[str], bool]] = None) -> str:
+        """
+        Cached response for key, else fetch() -> (response, cacheable). Only
+        cacheable responses are stored (not DEMO fallbacks after errors), and
+        only if validate(response) passes when a validator is given; a stored
+        response that fails it is dropped and fetched again.
+        """
+        hit = self.get(key)
+        if hit is not None:
+            if validate is None or validate(hit):
+                return hit
+            self.delete(key)
+            self._count("rejected")
+
+        loop = asyncio.get_running_loop()
+        fut = self._inflight.get(key)
+        if fut is not None and fut.get_loop() is loop:
+            self._count("coalesced")
+            try:
+                return await asyncio.shield(fut)
+            except asyncio.CancelledError:
+                if not fut.cancelled():
+                    raise
+                # the leading request was cancelled, not this caller: fetch again
+                return await self.get_or_fetch(key, model, fetch, validate=validate)
+
+        fut = loop.create_future()
+        self._inflight[key] = fut
+        try:
+            response, cacheable = await fetch()
+        except asyncio.CancelledError:
+            fut.cancel()
+            raise
+        except Exception as e:
+            fut.set_exception(e)
+            fut.exception()  # mark retrieved when nobody else was waiting
+            raise
+        finally:
+            if self._inflight.get(key) is fut:
+                del self._inflight[key]
+        fut.set_result(response)
+        if cacheable and (validate is None or validate(response)):
+            self.put(key, model, response)
+        elif cacheable:
+            self._count("rejected")
+        return response
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT response, size, expires_at FROM llm_responses WHERE key=?",
+                                   (key,)).fetchone()
+            if row is None:
+                self._stats["misses"] += 1
+                return None
+            if row[2] <= now:
+                self._db.execute("DELETE FROM llm_responses WHERE key=?", (key,))
+                self._bytes -= row[1]
+                self._stats["expired"] += 1
+                self._stats["misses"] += 1
+                return None
+            self._db.execute("UPDATE llm_responses SET accessed_at=? WHERE key=?", (now, key))
+            self._stats["hits"] += 1
+            return row[0]
+
+    def put(self, key: str, model: str, response: str) -> None:
+        size = len(response.encode("utf-8"))
+        now = time.time()
+        with self._lock:
+            old = self._db.execute("SELECT size FROM llm_responses WHERE key=?", (key,)).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO llm_responses (key, model, response, size, created_at, expires_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, model, response, size, now, now + self.ttl_s, now),
+            )
+            self._bytes += size - (old[0] if old else 0)
+            self._stats["stores"] += 1
+            if self._stats["stores"] % self.PURGE_EVERY == 0:
+                self._purge_expired(now)
+            if self._bytes > self.max_bytes:
+                self._evict()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            row = self._db.execute("SELECT size FROM llm_responses WHERE key=?", (key,)).fetchone()
+            if row is not None:
+                self._db.execute("DELETE FROM llm_responses WHERE key=?", (key,))
+                self._bytes -= row[0]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM llm_responses")
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = self._db.execute("SELECT COUNT(*) FROM llm_responses").fetchone()[0]
+            counters = dict(self._stats)
+        lookups = counters["hits"] + counters["misses"]
+        return {
+            "path": self.path,
+            "entries": int(entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hit_rate": round(counters["hits"] / lookups, 3) if lookups else 0.0,
+            **counters,
+        }
+
+    # ── Internals (caller holds _lock) ──────────────────
+
+    def _purge_expired(self, now: float) -> None:
+        row = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_responses WHERE expires_at <= ?",
+                               (now,)).fetchone()
+        if row[0]:
+            self._db.execute("DELETE FROM llm_responses WHERE expires_at <= ?", (now,))
+            self._bytes -= int(row[1])
+            self._stats["expired"] += int(row[0])
+
+    def _evict(self) -> None:
+        """Drop least recently used rows until the cache is back under 90% of max_bytes."""
+        target = int(self.max_bytes * 0.9)
+        # other processes write the same file: recount before dropping anything
+        self._bytes = int(self._db.execute("SELECT COALESCE(SUM(size), 0) FROM llm_responses").fetchone()[0])
+        while self._bytes > target:
+            rows = self._db.execute("SELECT key, size FROM llm_responses ORDER BY accessed_at LIMIT 256").fetchall()
+            if not rows:
+                self._bytes = 0
+                return
+            drop = []
+            for key, size in rows:
+                drop.append((key,))
+                self._bytes -= size
+                if self._bytes <= target:
+                    break
+            self._db.executemany("DELETE FROM llm_responses WHERE key=?", drop)
+            self._stats["evictions"] += len(drop)
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
+
+
+llm_cache = LLMCache() if LLM_CACHE_ENABLED else None
@@ -1,12 +1,20 @@
+import asyncio
 import base64
 import json
+import os
+import threading
 import time
-from typing import Any, Optional
+import weakref
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, TypeVar
 
 import httpx
 from loguru import logger
 
 from backend.config import settings
+from backend.utils.llm_cache import LLMCache, cache_key, llm_cache
+
+T = TypeVar("T")
 
 
 # ── Helpers ──────────────────────────────────────────────
@@ -24,13 +32,22 @@ def _safe_json_loads(text: str) -> Any:
     try:
         return json.loads(t)
     except Exception:
-        start = t.find("{")
-        end = t.rfind("}")
+        # outermost object or array, whichever opens first
+        start = min((i for i in (t.find("{"), t.find("[")) if i != -1), default=-1)
+        end = t.rfind("}" if start != -1 and t[start] == "{" else "]")
         if start != -1 and end != -1 and end > start:
             return json.loads(t[start : end + 1])
         raise
 
 
+def _parses_json(text: str) -> bool:
+    try:
+        _safe_json_loads(text)
+    except ValueError:
+        return False
+    return True
+
+
 _DEMO_INVOICE = {
     "demo": True,
     "message": "[DEMO DATA] AI API unavailable; returning deterministic mock JSON.",
@@ -50,78 +67,260 @@ _DEMO_INVOICE = {
 }
 
 
+# ── Limits & connection pool ─────────────────────────
+GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL", "https://generativelanguage.googleapis.com")
+# Free-tier quota; requests are spaced evenly (burst of LLM_BURST) across the process
+LLM_RPM = float(os.getenv("LLM_RPM", "15"))
+LLM_BURST = int(os.getenv("LLM_BURST", "1"))
+# Requests in flight per event loop (also the pool's connection cap)
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+LLM_TIMEOUT_S = float(os.getenv("LLM_TIMEOUT_S", "60"))
+MAX_ATTEMPTS = 3
+MAX_OUTPUT_TOKENS = 1200
+
+
+class TokenBucket:
+    """
+    Token bucket shared by every event loop and thread of the process.
+    reserve() takes a token at once and returns how long the caller must wait
+    before using it, so concurrent callers queue up in arrival order.
+    """
+
+    def __init__(self, rate_per_min: float, burst: int = 1, clock: Callable[[], float] = time.monotonic) -> None:
+        self.rate = rate_per_min / 60.0
+        self.capacity = float(max(1, burst))
+        self._clock = clock
+        self._tokens = self.capacity
+        self._stamp = clock()
+        self._lock = threading.Lock()
+        self.waited_s = 0.0
+
+    def reserve(self) -> float:
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.capacity, self._tokens + (now - self._stamp) * self.rate)
+            self._stamp = now
+            self._tokens -= 1.0
+            wait = 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+            self.waited_s += wait
+            return wait
+
+    async def acquire(self) -> float:
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+
+llm_bucket = TokenBucket(LLM_RPM, LLM_BURST)
+
+
+@dataclass
+class _Pool:
+    client: httpx.AsyncClient
+    slots: asyncio.Semaphore
+
+
+# httpx.AsyncClient and asyncio.Semaphore are bound to the loop that first uses
+# them: one pool per running loop (the FastAPI loop, the sync shim's loop)
+_pools: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _Pool]" = weakref.WeakKeyDictionary()
+
+
+def _pool() -> _Pool:
+    loop = asyncio.get_running_loop()
+    pool = _pools.get(loop)
+    if pool is None or pool.client.is_closed:
+        pool = _Pool(
+            client=httpx.AsyncClient(
+                timeout=httpx.Timeout(LLM_TIMEOUT_S, connect=10.0),
+                limits=httpx.Limits(max_connections=LLM_MAX_CONCURRENCY,
+                                    max_keepalive_connections=LLM_MAX_CONCURRENCY),
+            ),
+            slots=asyncio.Semaphore(LLM_MAX_CONCURRENCY),
+        )
+        _pools[loop] = pool
+    return pool
+
+
+async def aclose_llm_pool() -> None:
+    """Close the current loop's pooled client (app shutdown)."""
+    pool = _pools.pop(asyncio.get_running_loop(), None)
+    if pool is not None:
+        await pool.client.aclose()
+
+
+class _SyncLoop:
+    """
+    Background event loop for sync callers (Celery tasks, pandas pipelines):
+    they share its pooled client and the process-wide bucket instead of
+    opening a connection per call. Recreated after fork (prefork workers).
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pid = 0
+
+    def run(self, coro: Awaitable[T]) -> T:
+        with self._lock:
+            if self._loop is None or self._pid != os.getpid():
+                self._loop = asyncio.new_event_loop()
+                self._pid = os.getpid()
+                threading.Thread(target=self._loop.run_forever, name="llm-sync-loop", daemon=True).start()
+            loop = self._loop
+        return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+
+_sync_loop = _SyncLoop()
+
+
+def run_sync(coro: Awaitable[T]) -> T:
+    """Run an LLM coroutine from sync code on the shared background loop."""
+    return _sync_loop.run(coro)
+
+
 # ── LLM Client (Google Gemini — FREE, vision-capable) ───
-class LLMClient:
+class AsyncLLMClient:
     """
-    Google Gemini wrapper via REST API.
+    Google Gemini wrapper via REST API, non-blocking.
     Free tier: 15 RPM · 1 M tokens/min · 1 500 req/day.
     gemini-2.5-flash supports vision — invoice images sent natively.
+    Every attempt takes a token from llm_bucket and a slot from the loop's
+    pool; 429 / 5xx / network errors back off with asyncio.sleep.
+    Successful responses are kept in llm_cache (use_cache=False to bypass).
     Falls back to DEMO JSON if key missing or API error.
     """
 
-    GEMINI_URL = "https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent"
+    GEMINI_PATH = "/v1beta/models/{model}:generateContent"
 
-    def __init__(self) -> None:
+    def __init__(self, base_url: Optional[str] = None, api_key: Optional[str] = None,
+                 bucket: Optional[TokenBucket] = None, backoff_s: float = 1.0,
+                 use_cache: bool = True) -> None:
         self.model = "gemini-2.5-flash"
+        self.base_url = (base_url or GEMINI_BASE_URL).rstrip("/")
+        self.api_key = api_key
+        self.bucket = bucket or llm_bucket
+        self.backoff_s = backoff_s
+        self.cache: Optional[LLMCache] = llm_cache if use_cache else None
 
-    def ask(self, prompt: str, image_b64: str | None = None,
-            system_prompt: str | None = None) -> str:
-        api_key = settings.GOOGLE_API_KEY
+    async def ask(self, prompt: str, image_b64: str | None = None,
+                  system_prompt: str | None = None, max_output_tokens: int = MAX_OUTPUT_TOKENS,
+                  validate: Optional[Callable[[str], bool]] = None) -> str:
+        """validate: a response that fails it is returned but not cached."""
+        api_key = self.api_key if self.api_key is not None else settings.GOOGLE_API_KEY
         if not api_key:
             logger.warning("LLMClient.ask called without GOOGLE_API_KEY -> DEMO mode")
-            return self._demo_json()
-
-        url = self.GEMINI_URL.format(model=self.model) + f"?key={api_key}"
-
-        # Build parts (text + optional inline image)
-        parts: list[dict] = [{"text": prompt}]
-        if image_b64:
-            parts.append({"inlineData": {"mimeType": "image/jpeg", "data": image_b64}})
+            return _demo_json()
+        if self.cache is None:
+            text, _ = await self._call(api_key, prompt, image_b64, system_prompt, max_output_tokens)
+            return text
+        key = cache_key(self.model, prompt, system_prompt, image_b64,
+                        max_output_tokens=None if max_output_tokens == MAX_OUTPUT_TOKENS else max_output_tokens)
+        return await self.cache.get_or_fetch(
+            key, self.model, lambda: self._call(api_key, prompt, image_b64, system_prompt, max_output_tokens),
+            validate=validate,
+        )
 
-        body: dict[str, Any] = {
-            "contents": [{"parts": parts}],
-            "generationConfig": {"temperature": 0, "maxOutputTokens": 1200},
-        }
-        if system_prompt:
-            body["systemInstruction"] = {"parts": [{"text": system_prompt}]}
+    async def _call(self, api_key: str, prompt: str, image_b64: str | None,
+                    system_prompt: str | None, max_output_tokens: int) -> Tuple[str, bool]:
+        """(response text, cacheable); DEMO fallbacks are not cacheable."""
+        url = self.base_url + self.GEMINI_PATH.format(model=self.model)
+        body = _request_body(prompt, image_b64, system_prompt, max_output_tokens)
+        pool = _pool()
 
-        for attempt in range(1, 4):
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            retry_after: Optional[float] = None
             try:
-                logger.info("Gemini call attempt={} model={}", attempt, self.model)
-                t0 = time.time()
-                with httpx.Client(timeout=60) as client:
-                    resp = client.post(url, json=body)
+                async with pool.slots:
+                    waited = await self.bucket.acquire()
+                    logger.info("Gemini call attempt={} model={} queued_s={:.2f}", attempt, self.model, waited)
+                    t0 = time.time()
+                    resp = await pool.client.post(url, params={"key": api_key}, json=body)
+                if resp.status_code == 429:
+                    retry_after = _retry_after(resp)
+                    raise httpx.HTTPStatusError("rate limited", request=resp.request, response=resp)
                 if 400 <= resp.status_code < 500:
                     logger.warning("Gemini returned {} — {}", resp.status_code, resp.text[:200])
-                    return self._demo_json()
+                    return _demo_json(), False
                 resp.raise_for_status()
-                data = resp.json()
-                text = (
-                    data.get("candidates", [{}])[0]
-                    .get("content", {})
-                    .get("parts", [{}])[0]
-                    .get("text", "")
-                )
-                dt = time.time() - t0
-                logger.info("Gemini response chars={} latency_s={:.2f}", len(text), dt)
-                return _strip_fences(text)
+                text = _response_text(resp.json())
+                logger.info("Gemini response chars={} latency_s={:.2f}", len(text), time.time() - t0)
+                return _strip_fences(text), True
             except Exception as e:
-                wait = 2 ** (attempt - 1)
-                logger.exception("Gemini call failed attempt={} err={}", attempt, str(e))
-                time.sleep(wait)
+                logger.warning("Gemini call failed attempt={} err={}", attempt, str(e))
+                if attempt < MAX_ATTEMPTS:
+                    await asyncio.sleep(retry_after if retry_after is not None else self.backoff_s * 2 ** (attempt - 1))
 
-        logger.warning("Gemini call failed after 3 attempts — falling back to DEMO mode")
-        return self._demo_json()
+        logger.warning("Gemini call failed after {} attempts — falling back to DEMO mode", MAX_ATTEMPTS)
+        return _demo_json(), False
 
-    def ask_json(self, prompt: str, image_b64: str | None = None,
-                 system_prompt: str | None = None) -> Any:
+    async def ask_json(self, prompt: str, image_b64: str | None = None,
+                       system_prompt: str | None = None, max_output_tokens: int = MAX_OUTPUT_TOKENS) -> Any:
         return _safe_json_loads(
-            self.ask(prompt=prompt, image_b64=image_b64, system_prompt=system_prompt)
+            await self.ask(prompt=prompt, image_b64=image_b64, system_prompt=system_prompt,
+                           max_output_tokens=max_output_tokens, validate=_parses_json)
         )
 
+
+class LLMClient:
+    """
+    Blocking facade over AsyncLLMClient for sync code (Celery tasks, the
+    pandas tax pipelines). Calls run on a shared background loop, so they
+    reuse its connection pool and count against the same 15 RPM bucket.
+    Async code should use AsyncLLMClient directly.
+    """
+
+    def __init__(self, base_url: Optional[str] = None, api_key: Optional[str] = None,
+                 bucket: Optional[TokenBucket] = None, use_cache: bool = True) -> None:
+        self.aio = AsyncLLMClient(base_url=base_url, api_key=api_key, bucket=bucket, use_cache=use_cache)
+        self.model = self.aio.model
+
+    def ask(self, prompt: str, image_b64: str | None = None,
+            system_prompt: str | None = None) -> str:
+        return run_sync(self.aio.ask(prompt=prompt, image_b64=image_b64, system_prompt=system_prompt))
+
+    def ask_json(self, prompt: str, image_b64: str | None = None,
+                 system_prompt: str | None = None) -> Any:
+        return run_sync(self.aio.ask_json(prompt=prompt, image_b64=image_b64, system_prompt=system_prompt))
+
     @staticmethod
     def _demo_json() -> str:
-        return json.dumps(_DEMO_INVOICE)
+        return _demo_json()
+
+
+def _request_body(prompt: str, image_b64: str | None, system_prompt: str | None,
+                  max_output_tokens: int = MAX_OUTPUT_TOKENS) -> Dict[str, Any]:
+    # Build parts (text + optional inline image)
+    parts: list[dict] = [{"text": prompt}]
+    if image_b64:
+        parts.append({"inlineData": {"mimeType": "image/jpeg", "data": image_b64}})
+    body: Dict[str, Any] = {
+        "contents": [{"parts": parts}],
+        "generationConfig": {"temperature": 0, "maxOutputTokens": max_output_tokens},
+    }
+    if system_prompt:
+        body["systemInstruction"] = {"parts": [{"text": system_prompt}]}
+    return body
+
+
+def _response_text(data: Dict[str, Any]) -> str:
+    return (
+        data.get("candidates", [{}])[0]
+        .get("content", {})
+        .get("parts", [{}])[0]
+        .get("text", "")
+    )
+
+
+def _retry_after(resp: httpx.Response) -> Optional[float]:
+    try:
+        return min(60.0, float(resp.headers["retry-after"]))
+    except (KeyError, ValueError):
+        return None
+
+
+def _demo_json() -> str:
+    return json.dumps(_DEMO_INVOICE)
 
 
 def image_file_to_b64(path: str) -> str:
@@ -0,0 +1,104 @@
+"""
+Benchmark: per-row vs batched bank transaction classification.
+
+    python -m benchmarks.bench_bank_classify              # 500, 2000 rows
+    python -m benchmarks.bench_bank_classify 10000
+
+Per size it builds a statement where ~40% of rows hit the keyword table and
+the rest are UPI / card narrations over N/8 merchants (case and spacing
+varied, so normalisation is what deduplicates them). Gemini is a local stub
+answering in STUB_LATENCY_S. Reports Gemini calls and wall time for the old
+per-row classify_transaction loop vs classify_transactions, and what the
+calls alone would take under the 15 RPM quota (one request every 4 s).
+The response cache is disabled and the bucket opened up for the comparison.
+"""
+from __future__ import annotations
+
+import json
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, List, Tuple
+
+STUB_LATENCY_S = 0.05
+DEFAULT_SIZES = [500, 2000]
+
+
+class _Stub(BaseHTTPRequestHandler):
+    calls = 0
+
+    def do_POST(self) -> None:  # noqa: N802
+        req = json.loads(self.rfile.read(int(self.headers.get("content-length", 0))))
+        type(self).calls += 1
+        prompt = req["contents"][0]["parts"][0]["text"]
+        time.sleep(STUB_LATENCY_S)
+        one = {"category": "OTHER", "tax_section": "", "is_deductible": False, "confidence": 0.6}
+        if "Transactions:\n" in prompt:
+            items = json.loads(prompt.split("Transactions:\n", 1)[1])
+            answer: Any = [{"id": x["id"], **one} for x in items]
+        else:
+            answer = one
+        body = json.dumps({"candidates": [{"content": {"parts": [{"text": json.dumps(answer)}]}}]}).encode()
+        self.send_response(200)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args: Any) -> None:
+        pass
+
+
+def make_statement(n: int, seed: int = 0) -> Tuple[List[str], List[float]]:
+    rng = random.Random(seed)
+    known = ["NEFT/LIC PREMIUM/POLICY{}", "SBI MUTUAL FUND ELSS SIP", "UPI/SWIGGY/ORDER", "AMAZON PAY",
+             "STAR HEALTH PREMIUM", "APOLLO PHARMACY", "HOME LOAN EMI/HDFC"]
+    merchants = [f"UPI/MERCHANT{m:05d}/PAYMENT" for m in range(max(1, n // 8))]
+    descs, amounts = [], []
+    for _ in range(n):
+        if rng.random() < 0.4:
+            d = rng.choice(known).format(rng.randint(1, 9))
+        else:
+            d = rng.choice(merchants)
+            d = d.lower() if rng.random() < 0.3 else d.replace("/", " / ") if rng.random() < 0.3 else d
+        descs.append(d)
+        amounts.append(round(rng.uniform(50, 50_000), 2))
+    return descs, amounts
+
+
+def run(sizes: List[int]) -> None:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Stub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ.update({"GEMINI_BASE_URL": f"http://127.0.0.1:{server.server_address[1]}",
+                       "GOOGLE_API_KEY": "stub", "LLM_CACHE": "false", "LLM_RPM": "1000000",
+                       "LLM_BURST": "1000", "LLM_MAX_CONCURRENCY": "16"})
+    from loguru import logger
+
+    from backend.tax_engine.classifier import classify_transaction, classify_transactions
+    logger.remove()
+
+    print(f"{'rows':>7} {'old_calls':>10} {'old_s':>7} {'old_15rpm_min':>14} "
+          f"{'new_calls':>10} {'new_s':>6} {'new_15rpm_s':>12} {'same':>5}")
+    try:
+        for n in sizes:
+            descs, amounts = make_statement(n)
+            _Stub.calls = 0
+            t0 = time.perf_counter()
+            old = [classify_transaction(d, a) for d, a in zip(descs, amounts)]
+            old_s, old_calls = time.perf_counter() - t0, _Stub.calls
+
+            _Stub.calls = 0
+            t0 = time.perf_counter()
+            new = classify_transactions(descs, amounts)
+            new_s, new_calls = time.perf_counter() - t0, _Stub.calls
+            print(f"{n:>7} {old_calls:>10} {old_s:>7.2f} {old_calls * 4 / 60:>14.1f} "
+                  f"{new_calls:>10} {new_s:>6.2f} {max(0, new_calls - 1) * 4:>12} {str(old == new):>5}")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    run([int(a) for a in sys.argv[1:]] or DEFAULT_SIZES)
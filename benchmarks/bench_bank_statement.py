@@ -0,0 +1,113 @@
+"""
+Benchmark: row-loop vs vectorized bank statement parser.
+
+    python -m benchmarks.bench_bank_statement              # 100k, 1M rows
+    python -m benchmarks.bench_bank_statement 3000000
+
+Writes two statement CSVs per size (descriptions from bench_bank_classify,
+~1 in 10 rows a credit): "repeat" as generated, "unique" with a UPI
+reference on half the rows, which leaves ~half the rows as distinct
+descriptions the keyword table misses. Parsed in DEMO mode (no Gemini key,
+cache off), so no network time is included. Reports seconds and result MiB
+for the previous parse_bank_statement (Python zip loop for amount /
+txn_type, per-row classification lists) and the chunked, vectorized one,
+and checks the two frames match.
+"""
+from __future__ import annotations
+
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import List
+
+os.environ.update({"GOOGLE_API_KEY": "", "LLM_CACHE": "false"})
+
+import pandas as pd  # noqa: E402
+from loguru import logger  # noqa: E402
+
+from backend.pipelines.csv_parser import _find_col, parse_bank_statement  # noqa: E402
+from backend.tax_engine.classifier import classify_transactions  # noqa: E402
+from benchmarks.bench_bank_classify import make_statement  # noqa: E402
+
+DEFAULT_SIZES = [100_000, 1_000_000]
+
+
+def old_parse(csv_path: str) -> pd.DataFrame:
+    """The previous parse_bank_statement."""
+    df = pd.read_csv(csv_path)
+    df.columns = [c.strip() for c in df.columns]
+    date_col = _find_col(df.columns.tolist(), ["Date", "Txn Date", "Transaction Date", "Value Date"])
+    desc_col = _find_col(df.columns.tolist(), ["Description", "Narration", "Particulars", "Remarks"])
+    debit_col = _find_col(df.columns.tolist(), ["Debit", "Withdrawal", "Dr Amount", "Debit Amount"])
+    credit_col = _find_col(df.columns.tolist(), ["Credit", "Deposit", "Cr Amount", "Credit Amount"])
+    df["_date"] = pd.to_datetime(df[date_col], errors="coerce", dayfirst=True)
+    if df["_date"].isna().all():
+        df["_date"] = pd.to_datetime(df[date_col], errors="coerce", format="%d-%m-%Y")
+    df["_desc"] = df[desc_col].astype(str).fillna("")
+    debit = df[debit_col].fillna(0) if debit_col else 0
+    credit = df[credit_col].fillna(0) if credit_col else 0
+    amount = []
+    txn_type = []
+    for d, c in zip(pd.to_numeric(debit, errors="coerce").fillna(0), pd.to_numeric(credit, errors="coerce").fillna(0)):
+        if c > 0:
+            amount.append(float(c))
+            txn_type.append("CREDIT")
+        else:
+            amount.append(float(d))
+            txn_type.append("DEBIT")
+    out = pd.DataFrame({"date": df["_date"].dt.strftime("%Y-%m-%d"), "description": df["_desc"],
+                        "amount": amount, "txn_type": txn_type})
+    cats, secs, deduct, conf = [], [], [], []
+    for r in classify_transactions(out["description"].tolist(), out["amount"].tolist()):
+        cats.append(r["category"])
+        secs.append(r["tax_section"])
+        deduct.append(bool(r["is_deductible"]))
+        conf.append(float(r["confidence"]))
+    out["tax_category"] = cats
+    out["tax_section"] = secs
+    out["is_deductible"] = deduct
+    out["confidence"] = conf
+    return out
+
+
+def write_statement(path: str, n: int, unique_refs: bool = True) -> None:
+    rng = random.Random(1)
+    descs, amounts = make_statement(n)
+    start = pd.Timestamp("2021-04-01")
+    dates = (start + pd.to_timedelta([rng.randrange(3 * 365) for _ in range(n)], unit="D")).strftime("%d/%m/%Y")
+    credit = [rng.random() < 0.1 for _ in range(n)]
+    pd.DataFrame({
+        "Date": dates,
+        "Narration": [f"{d}/UPI{i:012d}" if unique_refs and i % 2 else d for i, d in enumerate(descs)],
+        "Withdrawal": [None if c else a for c, a in zip(credit, amounts)],
+        "Deposit": [a if c else None for c, a in zip(credit, amounts)],
+        "Balance": 0.0,
+    }).to_csv(path, index=False)
+
+
+def run(sizes: List[int]) -> None:
+    logger.remove()
+    print(f"{'rows':>9} {'variant':>8} {'old_s':>7} {'old_MiB':>8} {'new_s':>7} {'new_MiB':>8} {'speedup':>8} {'same':>5}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n, variant in ((n, v) for n in sizes for v in ("repeat", "unique")):
+            path = os.path.join(tmp, f"statement_{n}_{variant}.csv")
+            write_statement(path, n, unique_refs=variant == "unique")
+
+            t0 = time.perf_counter()
+            old = old_parse(path)
+            old_s = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            new = parse_bank_statement(path)
+            new_s = time.perf_counter() - t0
+
+            same = new.astype({"tax_category": object, "tax_section": object}).equals(old)
+            old_mib = old.memory_usage(deep=True).sum() / 2**20
+            new_mib = new.memory_usage(deep=True).sum() / 2**20
+            print(f"{n:>9} {variant:>8} {old_s:>7.2f} {old_mib:>8.1f} {new_s:>7.2f} {new_mib:>8.1f} "
+                  f"{old_s / new_s:>7.1f}x {str(same):>5}")
+
+
+if __name__ == "__main__":
+    run([int(a) for a in sys.argv[1:]] or DEFAULT_SIZES)
@@ -0,0 +1,99 @@
+"""
+Benchmark: per-item GraphStore writes vs BulkGraphWriter on the in-memory graph.
+
+    python -m benchmarks.bench_bulk_graph_load            # 10k, 100k invoices
+    python -m benchmarks.bench_bulk_graph_load 500000 --batch 10000
+
+Each invoice is a GSTIN pair, the invoice node and its supplier/buyer link
+(ISSUED, RECEIVED_BY, CLAIMED_ITC_FROM), as GSTAgent.load_into_graph writes it.
+Neo4j is not contacted: the store's health state is forced down so both paths
+take the fallback. rings_s is the first ring read after the load (a ring index
+rebuild after a bulk load, a no-op after per-item). For Neo4j the column "neo4j_tx" is the number of write
+transactions the bulk path would send (per-item: four queries per invoice).
+"""
+from __future__ import annotations
+
+import asyncio
+import math
+import random
+import sys
+import time
+from typing import List, Tuple
+
+from backend.graph.bulk_writer import GRAPH_BATCH_SIZE, BulkGraphWriter
+from backend.graph.graph_builder import GraphStore
+from backend.graph.ring_index import ring_index
+
+DEFAULT_SIZES = [10_000, 100_000]
+INVOICES_PER_GSTIN = 4  # sparse, like a month of one taxpayer's trading partners
+
+
+class _Down:
+    async def available(self) -> bool:
+        return False
+
+
+def invoices(n: int) -> List[Tuple[str, str, str, float]]:
+    rng = random.Random(5)
+    gstins = [f"27AAAC{i:06d}Z{i % 10}" for i in range(max(2, n // INVOICES_PER_GSTIN))]
+    return [(rng.choice(gstins), rng.choice(gstins), f"INV/{i:08d}", float(rng.randint(1_000, 100_000)))
+            for i in range(n)]
+
+
+async def per_item(rows: List[Tuple[str, str, str, float]]) -> Tuple[GraphStore, float]:
+    store = GraphStore()
+    store.health = _Down()
+    t0 = time.perf_counter()
+    for s, b, inv, tax in rows:
+        await store.create_gstin_node(s, "Supplier", s[:2], "REGULAR")
+        await store.create_gstin_node(b, "Buyer", b[:2], "REGULAR")
+        await store.create_invoice_node(inv, "2024-01-15", tax / 0.18, tax)
+        await store.link_supplier_buyer(s, b, inv, tax)
+    return store, time.perf_counter() - t0
+
+
+async def bulk(rows: List[Tuple[str, str, str, float]], batch: int) -> Tuple[GraphStore, float]:
+    store = GraphStore()
+    store.health = _Down()
+    t0 = time.perf_counter()
+    async with BulkGraphWriter(store, batch_size=batch) as w:
+        for s, b, inv, tax in rows:
+            await w.add_gstin(s, "Supplier", s[:2], "REGULAR")
+            await w.add_gstin(b, "Buyer", b[:2], "REGULAR")
+            await w.add_invoice(inv, "2024-01-15", tax / 0.18, tax)
+            await w.link(s, b, inv, tax)
+    return store, time.perf_counter() - t0
+
+
+def rings_after(store: GraphStore) -> Tuple[float, set]:
+    """First ring read after the load (a rebuild when the load was bulk)."""
+    t0 = time.perf_counter()
+    ring_index.sync(store.graph)
+    return time.perf_counter() - t0, set(ring_index.rings())
+
+
+async def run(sizes: List[int], batch: int) -> None:
+    print(f"{'invoices':>9} {'path':>9} {'load_s':>8} {'edges/s':>10} {'rings_s':>8} {'rings':>6} {'neo4j_tx':>9} {'same':>5}")
+    for n in sizes:
+        rows = invoices(n)
+        ref, dt = await per_item(rows)
+        ring_s, ref_rings = rings_after(ref)
+        print(f"{n:>9} {'per-item':>9} {dt:>8.2f} {ref.graph.number_of_edges() / dt:>10.0f} "
+              f"{ring_s:>8.2f} {len(ref_rings):>6} {4 * n:>9} {'':>5}")
+        got, dt = await bulk(rows, batch)
+        ring_s, rings = rings_after(got)
+        same = rings == ref_rings and all(
+            sorted(ref.graph.edges(t)) == sorted(got.graph.edges(t)) for t in ref.graph.edge_types())
+        tx = 4 * math.ceil(n / batch)
+        print(f"{n:>9} {'bulk':>9} {dt:>8.2f} {got.graph.number_of_edges() / dt:>10.0f} "
+              f"{ring_s:>8.2f} {len(rings):>6} {tx:>9} {str(same):>5}")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    batch = GRAPH_BATCH_SIZE
+    if "--batch" in args:
+        i = args.index("--batch")
+        batch = int(args[i + 1])
+        del args[i:i + 2]
+    asyncio.run(run([int(a) for a in args] or DEFAULT_SIZES, batch))
@@ -0,0 +1,87 @@
+"""
+Benchmark: networkx DiGraph vs CompactGraph for the in-memory ITC graph.
+
+    python -m benchmarks.bench_graph_memory            # 100k, 500k invoices
+    python -m benchmarks.bench_graph_memory 1000000
+
+Each invoice adds an Invoice node, ISSUED / RECEIVED_BY edges and a
+CLAIMED_ITC_FROM edge between GSTINs that trade with a fixed set of partners
+(the layout GraphStore.link_supplier_buyer writes). Reports traced memory,
+build time and the cost of CLAIMED_ITC_FROM out-degree for every GSTIN.
+"""
+from __future__ import annotations
+
+import gc
+import random
+import sys
+import time
+import tracemalloc
+from typing import Any, List, Tuple
+
+import networkx as nx
+
+from backend.graph.compact_graph import CLAIMED_ITC_FROM, ISSUED, RECEIVED_BY, CompactGraph
+
+DEFAULT_SIZES = [100_000, 500_000]
+GSTINS = [f"27AAAC{i:05d}A1Z{i % 10}" for i in range(5000)]
+PARTNERS = 10
+
+
+def build(kind: str, n: int) -> Tuple[Any, float]:
+    rng = random.Random(2)
+    partners = {g: rng.sample(GSTINS, PARTNERS) for g in GSTINS}
+    t0 = time.perf_counter()
+    if kind == "networkx":
+        g = nx.DiGraph()
+        for x in GSTINS:
+            g.add_node(x, label="GSTIN", gstin=x, name=f"Vendor {x}", state="MH", type="REGULAR", risk_score=0.1)
+    else:
+        g = CompactGraph()
+        for x in GSTINS:
+            g.add_gstin(x, f"Vendor {x}", "MH", "REGULAR")
+    for i in range(n):
+        buyer = rng.choice(GSTINS)
+        supplier = rng.choice(partners[buyer])
+        inv = f"INV/{i:08d}"
+        value = float(rng.randint(1_000, 1_000_000))
+        if kind == "networkx":
+            g.add_node(inv, label="Invoice", invoice_id=inv, date="2024-01-15", value=value, tax=value * 0.18)
+            g.add_edge(supplier, inv, type=ISSUED)
+            g.add_edge(inv, buyer, type=RECEIVED_BY)
+            g.add_edge(buyer, supplier, type=CLAIMED_ITC_FROM, value=value)
+        else:
+            g.add_invoice(inv, "2024-01-15", value, value * 0.18)
+            g.add_edge(supplier, inv, ISSUED)
+            g.add_edge(inv, buyer, RECEIVED_BY)
+            g.add_edge(buyer, supplier, CLAIMED_ITC_FROM, value)
+    return g, time.perf_counter() - t0
+
+
+def degrees(kind: str, g: Any) -> float:
+    t0 = time.perf_counter()
+    if kind == "networkx":
+        for x in GSTINS:
+            sum(1 for _, _, a in g.out_edges(x, data=True) if a.get("type") == CLAIMED_ITC_FROM)
+    else:
+        for x in GSTINS:
+            g.out_degree(x, CLAIMED_ITC_FROM)
+    return time.perf_counter() - t0
+
+
+def run(sizes: List[int]) -> None:
+    print(f"{'invoices':>9} {'backend':>9} {'MiB':>8} {'build_s':>8} {'degree_ms':>10}")
+    for n in sizes:
+        for kind in ("networkx", "compact"):
+            gc.collect()
+            tracemalloc.start()
+            g, build_s = build(kind, n)
+            mem = tracemalloc.get_traced_memory()[0] / 2**20
+            tracemalloc.stop()
+            degrees(kind, g)  # first compact call builds the CSR
+            deg_ms = degrees(kind, g) * 1000
+            print(f"{n:>9} {kind:>9} {mem:>8.1f} {build_s:>8.2f} {deg_ms:>10.2f}")
+            del g
+
+
+if __name__ == "__main__":
+    run([int(a) for a in sys.argv[1:]] or DEFAULT_SIZES)
@@ -0,0 +1,92 @@
+"""
+Benchmark: restoring the in-memory graph from a snapshot vs replaying its edge log.
+
+    python -m benchmarks.bench_graph_snapshot            # 5M edges
+    python -m benchmarks.bench_graph_snapshot 1000000
+
+The graph follows the invoice layout GraphStore writes: each invoice is an
+Invoice node with ISSUED / RECEIVED_BY edges and a CLAIMED_ITC_FROM claim
+between GSTINs, so N edges means N / 3 invoices. Every write goes through the
+edge log. "replay" restores from the log alone (what a restart costs without
+a snapshot); "snapshot" restores from snap-<seq> written afterwards.
+"""
+from __future__ import annotations
+
+import random
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+from backend.graph.compact_graph import CLAIMED_ITC_FROM, ISSUED, RECEIVED_BY
+from backend.graph.graph_builder import GraphStore
+from backend.graph.graph_snapshot import GraphPersistence
+
+DEFAULT_SIZES = [5_000_000]
+CHUNK = 100_000
+
+
+def build(store: GraphStore, n_edges: int) -> None:
+    rng = random.Random(4)
+    n_inv = n_edges // 3
+    gstins = [f"27AAAC{i:07d}Z{i % 10}" for i in range(max(10, n_inv // 20))]
+    for x in gstins:
+        store.graph.add_gstin(x, f"Vendor {x}", "27", "REGULAR")
+    for start in range(0, n_inv, CHUNK):
+        ids = range(start, min(n_inv, start + CHUNK))
+        sup = [rng.choice(gstins) for _ in ids]
+        buy = [rng.choice(gstins) for _ in ids]
+        inv = [f"INV/{i:09d}" for i in ids]
+        for i in inv:
+            store.graph.add_invoice(i, "2024-01-15", 118000.0, 18000.0)
+        store.graph.add_edges(sup, inv, ISSUED)
+        store.graph.add_edges(inv, buy, RECEIVED_BY)
+        store.graph.add_edges(buy, sup, CLAIMED_ITC_FROM, np.full(len(inv), 18000.0))
+
+
+def same(a: GraphStore, b: GraphStore) -> bool:
+    if a.graph.names() != b.graph.names():
+        return False
+    return all(np.array_equal(x, y) for t in a.graph.edge_types()
+               for x, y in zip(a.graph.edge_arrays(t), b.graph.edge_arrays(t)))
+
+
+def run(sizes: List[int]) -> None:
+    print(f"{'edges':>9} {'nodes':>9} {'log_MiB':>8} {'replay_s':>9} {'snap_write_s':>12} "
+          f"{'snap_MiB':>9} {'restore_s':>10} {'same':>5}")
+    for n in sizes:
+        d = Path(tempfile.mkdtemp(prefix="taxiq-graph-"))
+        try:
+            src = GraphStore()
+            p = GraphPersistence(src, d)
+            p.restore()
+            build(src, n)
+            log_mib = p.stats()["log_bytes"] / 2**20
+            p.close()
+
+            t0 = time.perf_counter()
+            replayed = GraphStore()
+            p = GraphPersistence(replayed, d)
+            p.restore()
+            replay_s = time.perf_counter() - t0
+            snap = p.snapshot()
+            p.close()
+            del replayed
+
+            t0 = time.perf_counter()
+            restored = GraphStore()
+            GraphPersistence(restored, d).restore()
+            restore_s = time.perf_counter() - t0
+            print(f"{src.graph.number_of_edges():>9} {len(src.graph):>9} {log_mib:>8.1f} {replay_s:>9.2f} "
+                  f"{snap['snapshot_s']:>12.2f} {snap['snapshot_bytes'] / 2**20:>9.1f} {restore_s:>10.2f} "
+                  f"{str(same(src, restored)):>5}")
+        finally:
+            shutil.rmtree(d, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    run([int(a) for a in sys.argv[1:]] or DEFAULT_SIZES)
@@ -0,0 +1,88 @@
+"""
+Benchmark: investigator traversals on synthetic scale-free ITC graphs.
+
+    python -m benchmarks.bench_graph_traversal              # 10k, 100k, 1M edges
+    python -m benchmarks.bench_graph_traversal 200000 --queries 500
+
+Per size, for random GSTINs it reports the mean latency of a 2-hop ego
+network (first call and cached repeat) and of a bidirectional-BFS shortest
+path, next to the networkx equivalents (ego_graph on the undirected view,
+shortest_path) on the smaller sizes.
+"""
+from __future__ import annotations
+
+import random
+import sys
+import time
+from typing import List
+
+import networkx as nx
+
+from backend.graph.compact_graph import CLAIMED_ITC_FROM, CompactGraph
+from backend.graph.traversal import ego_network, shortest_path
+from benchmarks.bench_ring_search import make_graph
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+BASELINE_MAX_EDGES = 100_000
+
+
+def _ms(total_s: float, n: int) -> float:
+    return 1000 * total_s / max(1, n)
+
+
+def run(sizes: List[int], queries: int) -> None:
+    print(f"{'edges':>9} {'ego_ms':>8} {'ego_hit_ms':>10} {'path_ms':>8} {'found':>6} "
+          f"{'nx_ego_ms':>9} {'nx_path_ms':>10}")
+    for n in sizes:
+        edges = make_graph(n)
+        g = CompactGraph()
+        names = sorted({u for u, _, _ in edges} | {v for _, v, _ in edges})
+        for name in names:
+            g.add_gstin(name, name, "27", "REGULAR")
+        us, vs, ws = zip(*edges)
+        g.add_edges(us, vs, CLAIMED_ITC_FROM, ws)
+        rng = random.Random(7)
+        sample = [rng.choice(names) for _ in range(queries)]
+        pairs = [(rng.choice(names), rng.choice(names)) for _ in range(queries)]
+
+        ego_network(g, names[0])  # builds the CSR once, outside the timings
+        t0 = time.perf_counter()
+        for s in sample:
+            ego_network(g, s, hops=2)
+        ego_s = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        for s in sample:
+            ego_network(g, s, hops=2)
+        hit_s = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        found = sum(shortest_path(g, s, t)["length"] is not None for s, t in pairs)
+        path_s = time.perf_counter() - t0
+
+        line = (f"{len(edges):>9} {_ms(ego_s, queries):>8.3f} {_ms(hit_s, queries):>10.3f} "
+                f"{_ms(path_s, queries):>8.3f} {found:>6}")
+        if n <= BASELINE_MAX_EDGES:
+            h = nx.DiGraph((u, v) for u, v, _ in edges)
+            und = h.to_undirected(as_view=True)
+            t0 = time.perf_counter()
+            for s in sample:
+                nx.ego_graph(und, s, radius=2)
+            nx_ego_s = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            for s, t in pairs:
+                try:
+                    nx.shortest_path(h, s, t)
+                except nx.NetworkXNoPath:
+                    pass
+            nx_path_s = time.perf_counter() - t0
+            line += f" {_ms(nx_ego_s, queries):>9.3f} {_ms(nx_path_s, queries):>10.3f}"
+        print(line)
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    queries = 200  # stays under the cache size so the repeat pass is all hits
+    if "--queries" in args:
+        i = args.index("--queries")
+        queries = int(args[i + 1])
+        del args[i:i + 2]
+    run([int(a) for a in args] or DEFAULT_SIZES, queries)
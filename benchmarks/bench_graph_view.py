@@ -0,0 +1,78 @@
+"""
+Benchmark: level-of-detail graph export vs the old full dump.
+
+    python -m benchmarks.bench_graph_view              # 10k, 100k, 1M ITC edges
+    python -m benchmarks.bench_graph_view 200000
+
+Per size (scale-free ITC graph from bench_ring_search, GSTINs only) it
+reports the old export (every node and edge as a dict, JSON-encoded), the
+one-off GraphView build (communities, layout, level plans), and the first
+overview page, a GSTIN page and a community expansion, each with its JSON size.
+"""
+from __future__ import annotations
+
+import json
+import math
+import sys
+import time
+from typing import Any, Dict, List, Tuple
+
+from backend.graph.compact_graph import CLAIMED_ITC_FROM, GSTIN, CompactGraph
+from backend.graph.graph_view import GSTINS, OVERVIEW, GraphView
+from benchmarks.bench_ring_search import make_graph
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+
+
+def old_export(g: CompactGraph) -> Dict[str, Any]:
+    """The removed GraphStore.export_pyvis_data in-memory path, plus FraudAgent's decoration."""
+    kind = g.kind.view().tolist()
+    risk = g.risk_score.view().tolist()
+    nodes = []
+    for i, nid in enumerate(g.names()):
+        r = risk[i]
+        if kind[i] == GSTIN:
+            nodes.append({"id": nid, "label": g.display_name(i), "risk_score": 0.1 if math.isnan(r) else r})
+        else:
+            nodes.append({"id": nid, "label": str(nid), "risk_score": 0.0 if math.isnan(r) else r})
+    edges = [{"from": u, "to": v, "type": t, "value": float(w)} for t in g.edge_types() for u, v, w in g.edges(t)]
+    for n in nodes:
+        r = float(n.get("risk_score", 0.0))
+        n["color"] = "red" if r > 0.7 else "orange" if r > 0.4 else "green"
+    for e in edges:
+        e["width"] = 1 + min(8, float(e.get("value", 0.0)) / 50000.0)
+    return {"nodes": nodes, "edges": edges}
+
+
+def _timed(fn: Any) -> Tuple[Any, float, int]:
+    t0 = time.perf_counter()
+    out = fn()
+    body = json.dumps(out)
+    return out, time.perf_counter() - t0, len(body)
+
+
+def run(sizes: List[int]) -> None:
+    print(f"{'edges':>9} {'old_s':>7} {'old_MiB':>8} {'build_s':>8} {'comms':>7} "
+          f"{'ovw_ms':>7} {'ovw_KiB':>8} {'gst_ms':>7} {'gst_KiB':>8} {'exp_ms':>7} {'exp_KiB':>8}")
+    for n in sizes:
+        edges = make_graph(n)
+        g = CompactGraph()
+        for name in sorted({u for u, _, _ in edges} | {v for _, v, _ in edges}):
+            g.add_gstin(name, name, "27", "REGULAR")
+        us, vs, ws = zip(*edges)
+        g.add_edges(us, vs, CLAIMED_ITC_FROM, ws)
+
+        _, old_s, old_b = _timed(lambda: old_export(g))
+        t0 = time.perf_counter()
+        view = GraphView(g, None, 1, "networkx")
+        build_s = time.perf_counter() - t0
+        _, ovw_s, ovw_b = _timed(lambda: view.page(OVERVIEW, 0, 500))
+        _, gst_s, gst_b = _timed(lambda: view.page(GSTINS, 0, 500))
+        _, exp_s, exp_b = _timed(lambda: view.page(GSTINS, 0, 500, community=0))
+        print(f"{len(edges):>9} {old_s:>7.2f} {old_b / 2**20:>8.1f} {build_s:>8.2f} {view.k:>7} "
+              f"{1000 * ovw_s:>7.1f} {ovw_b / 1024:>8.1f} {1000 * gst_s:>7.1f} {gst_b / 1024:>8.1f} "
+              f"{1000 * exp_s:>7.1f} {exp_b / 1024:>8.1f}")
+
+
+if __name__ == "__main__":
+    run([int(a) for a in sys.argv[1:]] or DEFAULT_SIZES)
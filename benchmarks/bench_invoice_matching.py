@@ -0,0 +1,74 @@
+"""
+Benchmark: staged invoice-number matching (exact -> canonical -> fuzzy).
+
+    python -m benchmarks.bench_invoice_matching          # 10k, 100k
+    python -m benchmarks.bench_invoice_matching 200000
+
+Synthetic periods where buyers re-type some supplier invoice numbers:
+  - 6% separator / zero-padding variants   -> canonical stage
+  - 3% fiscal-year / prefix variants       -> fuzzy stage
+  - 4% genuinely missing on each side      -> stay unmatched
+Reports time per size and how many pairs each stage recovered.
+"""
+from __future__ import annotations
+
+import random
+import sys
+import time
+from typing import Any, Dict, List, Tuple
+
+from backend.core.invoice_matcher import InvoiceMatcher
+
+DEFAULT_SIZES = [10_000, 100_000]
+SUPPLIERS = [f"27AAACS{i:04d}K1Z{i % 10}" for i in range(200)]
+
+
+def make_returns(n: int, seed: int = 11) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], Dict[str, int]]:
+    rng = random.Random(seed)
+    gstr1: List[Dict[str, Any]] = []
+    gstr2b: List[Dict[str, Any]] = []
+    expected = {"canonical": 0, "fuzzy": 0}
+    for i in range(n):
+        code = i % len(SUPPLIERS)
+        supplier = SUPPLIERS[code]
+        serial = i // len(SUPPLIERS) + 1
+        txval = float(rng.randint(10_000, 900_000))
+        day = rng.randint(1, 28)
+        inv = {"inum": f"S{code:03d}/23-24/{serial:05d}", "idt": f"{day:02d}-01-2024",
+               "txval": txval, "val": round(txval * 1.18, 2), "supplier_gstin": supplier}
+        r = rng.random()
+        if r < 0.04:
+            gstr1.append(inv)                             # missing in 2B
+            continue
+        if r < 0.08:
+            gstr2b.append({**inv, "inum": f"X-{i}"})    # missing in GSTR-1
+            continue
+        gstr1.append(inv)
+        b = dict(inv)
+        if r < 0.14:
+            b["inum"] = f"s{code}-2324-{serial}"
+            expected["canonical"] += 1
+        elif r < 0.17:
+            b["inum"] = f"S{code:03d}/2023-24/{serial:05d}"
+            b["txval"] = round(txval * 0.9, 2)
+            expected["fuzzy"] += 1
+        gstr2b.append(b)
+    return gstr1, gstr2b, expected
+
+
+def run(sizes: List[int]) -> None:
+    matcher = InvoiceMatcher()
+    print(f"{'invoices':>10} {'align_s':>8} {'exact':>7} {'canon':>7} {'fuzzy':>7} "
+          f"{'scored':>8} {'left_1':>7} {'left_2b':>7}  expected(canon,fuzzy)")
+    for n in sizes:
+        gstr1, gstr2b, expected = make_returns(n)
+        t0 = time.perf_counter()
+        _, st = matcher.align(gstr1, gstr2b)
+        dt = time.perf_counter() - t0
+        print(f"{n:>10} {dt:>8.2f} {st['exact']:>7} {st['canonical']:>7} {st['fuzzy']:>7} "
+              f"{st['candidates_scored']:>8} {st['unmatched_gstr1']:>7} {st['unmatched_gstr2b']:>7}  "
+              f"({expected['canonical']}, {expected['fuzzy']})")
+
+
+if __name__ == "__main__":
+    run([int(a) for a in sys.argv[1:]] or DEFAULT_SIZES)
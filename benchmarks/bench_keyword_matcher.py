@@ -0,0 +1,63 @@
+"""
+Benchmark: nested keyword scan vs the compiled KeywordMatcher.
+
+    python -m benchmarks.bench_keyword_matcher              # 10k, 100k, 1M rows
+    python -m benchmarks.bench_keyword_matcher 200000
+
+Descriptions come from bench_bank_classify.make_statement (~40% keyword
+hits, the rest over N/8 merchants). Two variants per size: as generated
+(repeating narrations) and with a unique UPI reference appended to every
+row, as real statements have. Reports seconds for the old per-row
+_norm + nested any() loop, KeywordMatcher.first per row, and
+classifier.keyword_sections over the Series, and checks all three agree.
+"""
+from __future__ import annotations
+
+import re
+import sys
+import time
+from typing import List, Optional
+
+import pandas as pd
+
+from backend.tax_engine.classifier import _KEYWORDS, _MATCHER, keyword_sections
+from backend.tax_engine.keyword_matcher import normalize
+from benchmarks.bench_bank_classify import make_statement
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+
+
+def old_section(description: str) -> Optional[str]:
+    """The removed classify_transaction keyword loop."""
+    d = re.sub(r"\s+", " ", (description or "").lower()).strip()
+    for section, keys in _KEYWORDS.items():
+        if any(k in d for k in keys):
+            return section
+    return None
+
+
+def run(sizes: List[int]) -> None:
+    print(f"{'rows':>9} {'variant':>8} {'old_s':>7} {'scalar_s':>9} {'series_s':>9} {'speedup':>8} {'same':>5}")
+    for n in sizes:
+        base, _ = make_statement(n)
+        for variant, descs in (("repeat", base), ("unique", [f"{d}/UPI{i:012d}" for i, d in enumerate(base)])):
+            t0 = time.perf_counter()
+            old = [old_section(d) for d in descs]
+            old_s = time.perf_counter() - t0
+
+            t0 = time.perf_counter()
+            scalar = [_MATCHER.label(normalize(d)) for d in descs]
+            scalar_s = time.perf_counter() - t0
+
+            s = pd.Series(descs)
+            t0 = time.perf_counter()
+            series = keyword_sections(s).tolist()
+            series_s = time.perf_counter() - t0
+
+            same = old == scalar == series
+            print(f"{n:>9} {variant:>8} {old_s:>7.2f} {scalar_s:>9.2f} {series_s:>9.2f} "
+                  f"{old_s / series_s:>7.1f}x {str(same):>5}")
+
+
+if __name__ == "__main__":
+    run([int(a) for a in sys.argv[1:]] or DEFAULT_SIZES)
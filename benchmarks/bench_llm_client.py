@@ -0,0 +1,147 @@
+"""
+Benchmark: blocking vs async Gemini client, against a local stub server.
+
+    python -m benchmarks.bench_llm_client              # 8, 32 concurrent calls
+    python -m benchmarks.bench_llm_client 64
+
+A threaded stub on 127.0.0.1 answers generateContent in the Gemini response
+shape after STUB_LATENCY_S. Per size it reports, for N concurrent calls made
+from async code, the wall time and the longest event-loop stall seen by a
+10 ms ticker: the old client (new httpx.Client per call, blocking the loop)
+vs AsyncLLMClient. A last run checks the token bucket spacing (RPM=600,
+burst 1), a 429 + Retry-After retry, and the response cache: N distinct
+prompts sent twice through an LLMCache in a temporary directory.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Awaitable, Callable, List, Tuple
+
+import httpx
+
+from backend.utils.llm_cache import LLMCache
+from backend.utils.llm_client import AsyncLLMClient, LLMClient, TokenBucket
+
+DEFAULT_SIZES = [8, 32]
+STUB_LATENCY_S = 0.2
+
+
+class _Stub(BaseHTTPRequestHandler):
+    fail_next = 0
+    calls = 0
+
+    def do_POST(self) -> None:  # noqa: N802
+        self.rfile.read(int(self.headers.get("content-length", 0)))
+        type(self).calls += 1
+        if type(self).fail_next > 0:
+            type(self).fail_next -= 1
+            self.send_response(429)
+            self.send_header("retry-after", "0.1")
+            self.end_headers()
+            return
+        time.sleep(STUB_LATENCY_S)
+        body = json.dumps({"candidates": [{"content": {"parts": [{"text": '{"ok": true}'}]}}]}).encode()
+        self.send_response(200)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args: Any) -> None:
+        pass
+
+
+def _old_ask(url: str) -> str:
+    """The removed LLMClient.ask request path: one httpx.Client per call, on the caller's thread."""
+    with httpx.Client(timeout=60) as client:
+        resp = client.post(url, params={"key": "stub"}, json={"contents": [{"parts": [{"text": "hi"}]}]})
+    return resp.json()["candidates"][0]["content"]["parts"][0]["text"]
+
+
+async def _with_ticker(work: Callable[[], Awaitable[Any]]) -> Tuple[float, float]:
+    """(wall seconds, longest gap between 10 ms ticks) while work runs."""
+    stall = 0.0
+    done = False
+
+    async def ticker() -> None:
+        nonlocal stall
+        last = time.perf_counter()
+        while not done:
+            await asyncio.sleep(0.01)
+            now = time.perf_counter()
+            stall = max(stall, now - last - 0.01)
+            last = now
+
+    t = asyncio.create_task(ticker())
+    await asyncio.sleep(0.02)  # ticker running before the work starts
+    t0 = time.perf_counter()
+    await work()
+    wall = time.perf_counter() - t0
+    done = True
+    await t
+    return wall, stall
+
+
+async def _run(base: str, sizes: List[int]) -> None:
+    url = base + AsyncLLMClient.GEMINI_PATH.format(model="gemini-2.5-flash")
+    fast = TokenBucket(rate_per_min=1e6, burst=1000)
+    client = AsyncLLMClient(base_url=base, api_key="stub", bucket=fast, use_cache=False)
+
+    print(f"{'calls':>6} {'old_s':>7} {'old_stall_ms':>13} {'async_s':>8} {'async_stall_ms':>15}")
+    for n in sizes:
+        async def old() -> None:
+            for _ in range(n):  # each call blocks the loop, so they serialise anyway
+                _old_ask(url)
+
+        async def new() -> None:
+            await asyncio.gather(*(client.ask("hi") for _ in range(n)))
+
+        old_s, old_stall = await _with_ticker(old)
+        new_s, new_stall = await _with_ticker(new)
+        print(f"{n:>6} {old_s:>7.2f} {1000 * old_stall:>13.0f} {new_s:>8.2f} {1000 * new_stall:>15.0f}")
+
+    limited = AsyncLLMClient(base_url=base, api_key="stub", bucket=TokenBucket(rate_per_min=600, burst=1),
+                             use_cache=False)
+    t0 = time.perf_counter()
+    await asyncio.gather(*(limited.ask("hi") for _ in range(10)))
+    print(f"bucket 600 RPM burst 1: 10 calls in {time.perf_counter() - t0:.2f}s (>= 0.90s expected)")
+
+    _Stub.fail_next, _Stub.calls = 1, 0
+    out = await client.ask_json("hi")
+    print(f"429 then 200: result={out} upstream_calls={_Stub.calls}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cached = AsyncLLMClient(base_url=base, api_key="stub", bucket=fast)
+        cached.cache = LLMCache(path=f"{tmp}/llm_cache.sqlite3")
+        n = max(sizes)
+        for label in ("cold", "warm"):
+            _Stub.calls = 0
+            t0 = time.perf_counter()
+            await asyncio.gather(*(cached.ask(f"classify txn {i}") for i in range(n)))
+            print(f"cache {label}: {n} prompts in {1000 * (time.perf_counter() - t0):.1f} ms, "
+                  f"upstream_calls={_Stub.calls}")
+        print(f"cache stats: {cached.cache.stats()}")
+
+
+def run(sizes: List[int]) -> None:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Stub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        asyncio.run(_run(base, sizes))
+        shim = LLMClient(base_url=base, api_key="stub", bucket=TokenBucket(rate_per_min=1e6, burst=100),
+                     use_cache=False)
+        t0 = time.perf_counter()
+        print(f"sync shim: {shim.ask_json('hi')} in {time.perf_counter() - t0:.2f}s")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    run([int(a) for a in sys.argv[1:]] or DEFAULT_SIZES)
@@ -0,0 +1,91 @@
+"""
+Benchmark: per-invoice graph load latency, probe-per-call vs cached Neo4j health.
+
+    python -m benchmarks.bench_neo4j_health                 # simulated server
+    python -m benchmarks.bench_neo4j_health --rtt-ms 5 --connect-ms 2000
+
+One invoice is what GSTAgent.load_into_graph writes: two GSTIN nodes, the
+invoice node and the supplier/buyer link. The server is a stand-in client with
+a fixed round-trip time; "down" means each call waits connect_ms and then
+fails (unreachable host). A refused port on localhost is measured with the real
+driver too. "per-call" is the old behaviour: a RETURN 1 probe before every write.
+"""
+from __future__ import annotations
+
+import asyncio
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+from neo4j.exceptions import ServiceUnavailable
+
+from backend.graph import neo4j_client
+from backend.graph.graph_builder import graph_store
+from backend.graph.neo4j_client import Neo4jClient, Neo4jHealth
+
+INVOICES = 50
+
+
+class _SimClient:
+    """Neo4j stand-in: every call costs one round trip, or a connect timeout when down."""
+
+    def __init__(self, rtt_ms: float, connect_ms: float, down: bool) -> None:
+        self.rtt_s = rtt_ms / 1000
+        self.connect_s = connect_ms / 1000
+        self.down = down
+        self.calls = 0
+
+    async def run_query(self, query: str, params: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        self.calls += 1
+        if self.down:
+            await asyncio.sleep(self.connect_s)
+            raise ServiceUnavailable("simulated: server unreachable")
+        await asyncio.sleep(self.rtt_s)
+        return []
+
+    async def ping(self) -> None:
+        await self.run_query("RETURN 1 AS ok")
+
+
+async def load(n: int) -> float:
+    t0 = time.perf_counter()
+    for i in range(n):
+        supplier, buyer, inv = f"27AAACS{i:04d}A1Z5", f"29AAACB{i:04d}A1Z5", f"BENCH/{i:06d}"
+        await graph_store.create_gstin_node(gstin=supplier, name="Supplier", state="27", type="REGULAR")
+        await graph_store.create_gstin_node(gstin=buyer, name="Buyer", state="29", type="REGULAR")
+        await graph_store.create_invoice_node(invoice_id=inv, date="2024-01-15", value=118000.0, tax=18000.0)
+        await graph_store.link_supplier_buyer(supplier_gstin=supplier, buyer_gstin=buyer, invoice_id=inv, itc_value=18000.0)
+    return (time.perf_counter() - t0) / n * 1000
+
+
+async def run(rtt_ms: float, connect_ms: float) -> None:
+    print(f"{'server':>14} {'probe':>9} {'ms/invoice':>11} {'calls/invoice':>14}")
+    cases = [("up", False), ("down", True)]
+    for label, down in cases:
+        for mode in ("per-call", "cached"):
+            client = _SimClient(rtt_ms, connect_ms, down)
+            neo4j_client._singleton = client  # type: ignore[assignment]
+            # interval 0 / no backoff reproduces the old probe before every call
+            graph_store.health = (Neo4jHealth(interval_s=0, backoff_base_s=0, timeout_s=60) if mode == "per-call"
+                                  else Neo4jHealth(timeout_s=60))
+            n = INVOICES if not down or mode == "cached" else max(2, INVOICES // 10)
+            ms = await load(n)
+            print(f"{label:>14} {mode:>9} {ms:>11.2f} {client.calls / n:>14.2f}")
+
+    # real driver, nothing listening: connection refused comes back fast, but is still paid per call
+    for mode in ("per-call", "cached"):
+        neo4j_client._singleton = Neo4jClient("bolt://127.0.0.1:7999", "neo4j", "neo4j")
+        graph_store.health = (Neo4jHealth(interval_s=0, backoff_base_s=0) if mode == "per-call" else Neo4jHealth())
+        ms = await load(INVOICES)
+        print(f"{'refused(real)':>14} {mode:>9} {ms:>11.2f} {graph_store.health.stats()['probes'] / INVOICES:>14.2f}")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    opts = {"--rtt-ms": 2.0, "--connect-ms": 1000.0}
+    for k in opts:
+        if k in args:
+            i = args.index(k)
+            opts[k] = float(args[i + 1])
+            del args[i:i + 2]
+    asyncio.run(run(opts["--rtt-ms"], opts["--connect-ms"]))
@@ -0,0 +1,83 @@
+"""
+Benchmark: per-invoice reconciliation loop vs columnar core.
+
+    python -m benchmarks.bench_reconciliation            # 10k, 100k, 1M
+    python -m benchmarks.bench_reconciliation 10000 50000
+
+Synthetic GSTR-1/GSTR-2B pairs exercise all five mismatch types; every run
+also checks that both engines emit identical Mismatch records.
+"""
+from __future__ import annotations
+
+import random
+import sys
+import time
+from typing import Any, Dict, List, Tuple
+
+from backend.core.columnar_reconciliation import ColumnarReconciler
+from backend.core.reconciliation_engine import ReconciliationEngine
+
+GSTIN = "27AADCB2230M1ZT"
+PERIOD = "2024-01"
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+
+
+def make_returns(n: int, seed: int = 7) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    rng = random.Random(seed)
+    gstr1: List[Dict[str, Any]] = []
+    gstr2b: List[Dict[str, Any]] = []
+    for i in range(n):
+        txval = float(rng.randint(10_000, 900_000))
+        day = rng.randint(1, 28)
+        inv = {
+            "inum": f"INV-{i:07d}", "idt": f"{day:02d}-01-2024",
+            "val": round(txval * 1.18, 2), "txval": txval,
+            "camt": round(txval * 0.09, 2), "samt": round(txval * 0.09, 2), "iamt": 0.0,
+            "supplier_gstin": GSTIN,
+        }
+        gstr1.append(inv)
+        r = rng.random()
+        if r < 0.08:
+            continue                                   # TYPE_1 (missing in 2B)
+        b = dict(inv)
+        if r < 0.20:                                   # TYPE_2
+            b["txval"] = round(txval * rng.uniform(0.7, 0.95), 2)
+        elif r < 0.25:                                 # TYPE_3
+            b["camt"] = b["samt"] = round(txval * 0.14, 2)
+        elif r < 0.28:                                 # TYPE_4
+            b["buyer_gstin_mismatch"] = True
+        elif r < 0.32:                                 # TYPE_5
+            b["idt"] = f"{day:02d}-03-2024"
+        gstr2b.append(b)
+    for j in range(n // 50):                           # TYPE_1 (missing in GSTR-1)
+        gstr2b.append({"inum": f"EXTRA-{j:06d}", "idt": "10-01-2024",
+                       "val": 59_000.0, "txval": 50_000.0, "supplier_gstin": GSTIN})
+    return gstr1, gstr2b
+
+
+def _timed(fn, *args) -> Tuple[float, Any]:
+    t0 = time.perf_counter()
+    out = fn(*args)
+    return time.perf_counter() - t0, out
+
+
+def run(sizes: List[int]) -> None:
+    engine = ReconciliationEngine(columnar=False)
+    columnar = ColumnarReconciler(engine)
+    # frame_s = join + vectorized classification only; columnar_s also
+    # materializes every Mismatch, which costs the same on both paths.
+    print(f"{'invoices':>10} {'loop_s':>9} {'frame_s':>9} {'columnar_s':>11} {'speedup':>8}  identical")
+    for n in sizes:
+        gstr1, gstr2b = make_returns(n)
+        t_loop, (mm_loop, matched_loop, total_loop) = _timed(
+            engine._classify_loop, GSTIN, PERIOD, gstr1, gstr2b)
+        t_frame, _ = _timed(columnar.build_frame, gstr1, gstr2b, GSTIN)
+        t_col, (mm_col, matched_col, total_col) = _timed(
+            columnar.classify, GSTIN, PERIOD, gstr1, gstr2b)
+        same = (matched_loop, total_loop) == (matched_col, total_col) and \
+            [m.model_dump() for m in mm_loop] == [m.model_dump() for m in mm_col]
+        print(f"{n:>10} {t_loop:>9.2f} {t_frame:>9.2f} {t_col:>11.2f} {t_loop / t_col:>7.1f}x  {same}")
+
+
+if __name__ == "__main__":
+    run([int(a) for a in sys.argv[1:]] or DEFAULT_SIZES)
@@ -47,13 +47,57 @@ if run_btn:
             st.error(r.text)
 
 
-if refresh_btn or "fraud_graph" not in st.session_state:
+LEVELS = {"Auto": None, "Communities": 0, "GSTINs": 1, "GSTINs + invoices": 2}
+view_cols = st.columns([0.3, 0.3, 0.2, 0.2])
+with view_cols[0]:
+    level_name = st.selectbox("Detail level", list(LEVELS), index=0)
+with view_cols[1]:
+    # community super-nodes from the last overview page(s), kept while one of them is expanded
+    communities = st.session_state.get("fraud_graph_communities", [])
+    expand = st.selectbox(
+        "Expand community",
+        [None] + [n["community"] for n in communities],
+        format_func=lambda c: "—" if c is None else next(f"{n['label']} ({n['gstins']} GSTINs)" for n in communities if n["community"] == c),
+    )
+with view_cols[2]:
+    page_size = st.number_input("Page size", min_value=50, max_value=5000, value=500, step=50)
+with view_cols[3]:
+    more_btn = st.button("Load more", use_container_width=True,
+                         disabled=not st.session_state.get("fraud_graph", {}).get("next_cursor"))
+
+
+def _fetch_graph(params):
+    r = api_get("/fraud/graph-data", params=params)
+    if r.status_code != 200:
+        st.error(r.text)
+        return None
+    page = r.json()
+    if page.get("level") == 0:
+        known = [] if "cursor" not in params else st.session_state.get("fraud_graph_communities", [])
+        st.session_state["fraud_graph_communities"] = known + page["nodes"]
+    return page
+
+
+query = {"limit": int(page_size)}
+if expand is not None:
+    query.update({"community": expand, "level": LEVELS[level_name] or 1})
+elif LEVELS[level_name] is not None:
+    query["level"] = LEVELS[level_name]
+
+if refresh_btn or st.session_state.get("fraud_graph_query") != query or "fraud_graph" not in st.session_state:
     with st.spinner("Fetching graph visualization data…"):
-        r = api_get("/fraud/graph-data")
-        if r.status_code == 200:
-            st.session_state["fraud_graph"] = r.json()
-        else:
-            st.error(r.text)
+        page = _fetch_graph(query)
+        if page is not None:
+            st.session_state["fraud_graph"] = page
+            st.session_state["fraud_graph_query"] = query
+elif more_btn:
+    with st.spinner("Fetching next page…"):
+        cur = st.session_state["fraud_graph"]
+        page = _fetch_graph({"cursor": cur["next_cursor"], "limit": int(page_size)})
+        if page is not None:
+            page["nodes"] = cur["nodes"] + page["nodes"]
+            page["edges"] = cur["edges"] + page["edges"]
+            st.session_state["fraud_graph"] = page
 
 
 graph = st.session_state.get("fraud_graph", {"nodes": [], "edges": []})
@@ -64,7 +108,7 @@ if graph.get("backend") and graph.get("backend") != "neo4j":
 
 metrics = st.columns(3)
 with metrics[0]:
-    st.metric("Total GSTINs in Network", len([n for n in graph.get("nodes", []) if str(n.get("id", "")).startswith("27")]))
+    st.metric("Total GSTINs in Network", int(graph.get("gstins", 0)))
 with metrics[1]:
     rs = result.get("risk_summary", {})
     st.metric("High Risk GSTINs (red)", int(rs.get("high_risk", 0)))
@@ -75,18 +119,33 @@ with metrics[2]:
 st.divider()
 
 st.markdown("### Interactive Fraud Network")
+st.caption(
+    f"{graph.get('level_name', '')} view · showing {len(graph.get('nodes', []))} of {graph.get('total_nodes', 0)} nodes, "
+    f"{len(graph.get('edges', []))} of {graph.get('total_edges', 0)} edges · {graph.get('communities', 0)} communities"
+)
 net = Network(height="560px", width="100%", bgcolor="#0A1628", font_color="white", directed=True)
-net.barnes_hut(gravity=-20000, central_gravity=0.3, spring_length=120, spring_strength=0.02, damping=0.09)
+# Nodes come with precomputed positions; physics only for small graphs
+if len(graph.get("nodes", [])) <= 300:
+    net.barnes_hut(gravity=-20000, central_gravity=0.3, spring_length=120, spring_strength=0.02, damping=0.09)
+else:
+    net.toggle_physics(False)
 
 for n in graph.get("nodes", []):
     r = float(n.get("risk_score", 0))
     color = "#FF3B5C" if r > 0.7 else "#FF9933" if r > 0.4 else "#00B894"
-    net.add_node(n["id"], label=n.get("label", n["id"]), title=f"risk={r:.2f}", color=color)
+    if n.get("type") == "Community":
+        title = f"{n['gstins']} GSTINs · ITC ₹{n['itc_value']:,.0f} · {n['high_risk']} high risk · max risk={r:.2f}"
+        net.add_node(n["id"], label=n.get("label", n["id"]), title=title, color=color, shape="dot",
+                     size=10 + 4 * min(n["gstins"], 100) ** 0.5, x=30 * n["x"], y=30 * n["y"])
+    else:
+        net.add_node(n["id"], label=n.get("label", n["id"]), title=f"risk={r:.2f}", color=color,
+                     x=30 * n.get("x", 0), y=30 * n.get("y", 0))
 
 for e in graph.get("edges", []):
     width = float(e.get("width", 2))
     val = float(e.get("value", 0))
-    net.add_edge(e["from"], e["to"], value=val, width=width, title=f"ITC value ₹{val:,.0f}")
+    title = f"ITC value ₹{val:,.0f}" + (f" · {e['count']} claims" if "count" in e else "")
+    net.add_edge(e["from"], e["to"], value=val, width=width, title=title)
 
 html = net.generate_html()
 st.components.v1.html(html, height=600, scrolling=True)